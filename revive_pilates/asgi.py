@@ -3,6 +3,11 @@ ASGI config for revive_pilates project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The availability SSE stream (/api/studio/availability/stream/) needs an ASGI
+server so long-lived connections don't hold a worker thread, e.g.:
+
+    gunicorn revive_pilates.asgi:application -k uvicorn.workers.UvicornWorker
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -169,6 +169,46 @@ DATABASES = {
 }
 
 
+# Cache
+# Redis en producción (definir REDIS_URL); memoria local en desarrollo y tests.
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'revive',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'revive-pilates',
+        }
+    }
+
+# Con LocMem cada proceso (cada instancia de la función en Vercel) tiene su
+# propio cache y las invalidaciones por señales solo llegan al que atendió la
+# escritura. Sin cache compartido, lo que se invalida por señales se guarda a
+# lo sumo LOCAL_CACHE_TIMEOUT segundos.
+SHARED_CACHE = bool(REDIS_URL)
+LOCAL_CACHE_TIMEOUT = int(os.environ.get('LOCAL_CACHE_TIMEOUT', 30))
+
+# Broadcaster de cambios de cupos para el stream SSE de disponibilidad.
+# En memoria por proceso; reemplazar por un backend pub/sub con varios workers.
+AVAILABILITY_BROADCASTER = 'studio.broadcast.InProcessBroadcaster'
+
+# Hilos por proceso para tareas en segundo plano (reservas múltiples
+# asíncronas, correos de notificación); ver studio/tasks/background.py
+BACKGROUND_TASK_WORKERS = int(os.environ.get('BACKGROUND_TASK_WORKERS', 2))
+
+# Token con el que Vercel Cron llama a /api/studio/cron/<tarea>/ (Vercel lo
+# envía como "Authorization: Bearer ..." si se define CRON_SECRET en el
+# proyecto). Sin él el endpoint rechaza todas las llamadas.
+CRON_SECRET = os.environ.get('CRON_SECRET')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -283,6 +323,8 @@ CORS_EXPOSE_HEADERS = [
     "x-sedes-selected",
     "x-sede-id",
     "x-total-count",
+    "etag",
+    "last-modified",
 ]
 
 # Configuración de Logging - Simplificada
@@ -1,21 +1,28 @@
 # studio/admin.py
-from django.contrib import admin
+from django.contrib import admin, messages
 
 from .models import (
     Booking,
     BulkBooking,
+    ClassOccupancy,
+    ClassOccurrence,
     ClassType,
+    DailyClosingFact,
     Membership,
     MonthlyRevenue,
     Payment,
+    PaymentEntitlement,
     PlanIntent,
     Promotion,
     PromotionInstance,
     Schedule,
     Sede,
+    StandingReservation,
     TimeSlot,
     Venta,
+    WaitlistEntry,
 )
+from .schedule_overlap import validate_schedules
 
 
 @admin.register(Sede)
@@ -43,6 +50,15 @@ class TimeSlotAdmin(admin.ModelAdmin):
 class ScheduleAdmin(admin.ModelAdmin):
     list_display = ("day", "time_slot", "is_individual", "capacity", "sede")
     list_filter = ("sede", "day", "is_individual")
+    actions = ["check_overlaps"]
+
+    @admin.action(description="Validar solapamientos de los horarios seleccionados")
+    def check_overlaps(self, request, queryset):
+        errors = validate_schedules(queryset.select_related("class_type"))
+        for schedule, message in errors:
+            self.message_user(request, f"{schedule}: {message}", messages.WARNING)
+        if not errors:
+            self.message_user(request, "Ningún horario se solapa.", messages.SUCCESS)
 
 
 @admin.register(Membership)
@@ -63,7 +79,7 @@ class PaymentAdmin(admin.ModelAdmin):
         "extra_classes",
         "sede",
     )
-    list_filter = ("sede", "payment_method", "date_paid")
+    list_filter = ("sede", "method", "payment_method", "date_paid")
     date_hierarchy = "date_paid"
 
 
@@ -74,6 +90,59 @@ class BookingAdmin(admin.ModelAdmin):
     date_hierarchy = "class_date"
 
 
+@admin.register(ClassOccupancy)
+class ClassOccupancyAdmin(admin.ModelAdmin):
+    list_display = ("schedule", "class_date", "booked", "updated_at")
+    list_filter = ("schedule__sede", "class_date")
+    date_hierarchy = "class_date"
+    readonly_fields = ("booked",)
+
+
+@admin.register(ClassOccurrence)
+class ClassOccurrenceAdmin(admin.ModelAdmin):
+    list_display = ("schedule", "date", "start", "end", "capacity", "coach", "sede")
+    list_filter = ("sede", "date")
+    date_hierarchy = "date"
+
+
+@admin.register(DailyClosingFact)
+class DailyClosingFactAdmin(admin.ModelAdmin):
+    list_display = ("date", "sede", "total_pagos", "total_ventas", "asistencias", "updated_at")
+    list_filter = ("sede",)
+    date_hierarchy = "date"
+
+
+@admin.register(PaymentEntitlement)
+class PaymentEntitlementAdmin(admin.ModelAdmin):
+    list_display = ("payment", "allowed", "used", "no_shows", "updated_at")
+    search_fields = ("payment__client__first_name", "payment__client__last_name")
+    readonly_fields = ("allowed", "used", "no_shows", "counted_on")
+
+
+@admin.register(StandingReservation)
+class StandingReservationAdmin(admin.ModelAdmin):
+    list_display = (
+        "client",
+        "schedule",
+        "start_date",
+        "end_date",
+        "is_active",
+        "materialized_until",
+        "last_conflict",
+    )
+    list_filter = ("is_active", "sede")
+    search_fields = ("client__first_name", "client__last_name")
+    readonly_fields = ("materialized_until", "last_conflict")
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ("client", "schedule", "class_date", "status", "created_at", "booking")
+    list_filter = ("status", "class_date", "sede")
+    search_fields = ("client__first_name", "client__last_name")
+    readonly_fields = ("booking",)
+
+
 @admin.register(PlanIntent)
 class PlanIntentAdmin(admin.ModelAdmin):
     list_display = ("id", "client", "membership", "selected_at", "is_confirmed", "sede")
@@ -132,7 +201,7 @@ class VentaAdmin(admin.ModelAdmin):
         "date_sold",
         "sede",
     )
-    list_filter = ("payment_method", "date_sold", "sede")
+    list_filter = ("method", "payment_method", "date_sold", "sede")
     search_fields = ("client__first_name", "client__last_name", "product_name")
     date_hierarchy = "date_sold"
 
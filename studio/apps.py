@@ -5,6 +5,9 @@ class StudioConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "studio"
 
+    def ready(self):
+        from studio import signals  # noqa: F401
+
     # def ready(self):
     #     from studio.tasks import scheduler
     #     scheduler.start()
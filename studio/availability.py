@@ -0,0 +1,393 @@
+# studio/availability.py
+"""
+Servicio de disponibilidad de clases.
+
+Calcula los slots de uno o varios días con un número constante de consultas,
+sin importar cuántos horarios (Schedule) tenga cada sede:
+
+  1. Schedules del día con ``select_related`` de coach y tipo de clase.
+  2. Un único GROUP BY de reservas activas por (schedule_id, class_date).
+  3. Un único mapa de TimeSlot indexado por (sede_id, start_time).
+  4. (Opcional) Las reservas del cliente en el rango consultado.
+
+Los slots públicos (sin cliente) se guardan en el cache de Django por
+(sede, fecha); ver ``get_cached_slots`` y los receivers en studio/signals.py.
+"""
+import hashlib
+import json
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Booking, Schedule, TimeSlot
+
+# Máximo de días que se pueden consultar en una sola llamada de rango
+MAX_RANGE_DAYS = 31
+
+# Días que el modal de reagendar puede pedir en una sola llamada
+MAX_RESCHEDULE_DAYS = 14
+
+# Mapear weekday (0=Monday) a código de día definido en Schedule.DAY_CHOICES
+DAY_CODES = {
+    0: "MON",
+    1: "TUE",
+    2: "WED",
+    3: "THU",
+    4: "FRI",
+    5: "SAT",
+    6: "SUN",
+}
+
+
+def day_code_for(target_date):
+    """Código de día (MON, TUE, ...) para una fecha."""
+    return DAY_CODES[target_date.weekday()]
+
+
+def parse_time_slot(value):
+    """Convierte el campo ``Schedule.time_slot`` ('16:30') en ``time``."""
+    return datetime.strptime(value[:5], "%H:%M").time()
+
+
+def get_schedules_for_days(day_codes, sede_ids=None):
+    """Plantillas de horario para los días indicados, con coach y tipo de clase."""
+    schedules = Schedule.objects.filter(day__in=set(day_codes)).select_related(
+        "class_type", "coach"
+    )
+    if sede_ids is not None:
+        schedules = schedules.filter(sede_id__in=sede_ids)
+    return list(schedules)
+
+
+def get_occupancy(schedule_ids, start_date, end_date):
+    """
+    Reservas activas por (schedule_id, class_date) en un solo GROUP BY.
+    """
+    if not schedule_ids:
+        return {}
+
+    rows = (
+        Booking.objects.filter(
+            schedule_id__in=schedule_ids,
+            class_date__range=[start_date, end_date],
+            status="active",
+        )
+        .exclude(attendance_status="cancelled")
+        .values("schedule_id", "class_date")
+        .annotate(booked=Count("id"))
+        .order_by()
+    )
+    return {(row["schedule_id"], row["class_date"]): row["booked"] for row in rows}
+
+
+def get_time_slot_map(sede_ids):
+    """TimeSlots activos indexados por (sede_id, start_time)."""
+    sede_ids = {sede_id for sede_id in sede_ids if sede_id is not None}
+    if not sede_ids:
+        return {}
+
+    time_slot_map = {}
+    for time_slot in TimeSlot.objects.filter(sede_id__in=sede_ids, is_active=True):
+        time_slot_map.setdefault((time_slot.sede_id, time_slot.start_time), time_slot)
+    return time_slot_map
+
+
+def get_client_booked_keys(client_id, schedule_ids, start_date, end_date):
+    """Conjunto de (schedule_id, class_date) que el cliente ya tiene reservados."""
+    if not client_id or not schedule_ids:
+        return set()
+
+    return set(
+        Booking.objects.filter(
+            client_id=client_id,
+            schedule_id__in=schedule_ids,
+            class_date__range=[start_date, end_date],
+            status="active",
+        ).values_list("schedule_id", "class_date")
+    )
+
+
+def get_slot_bounds(schedule, target_date, time_slot_map):
+    """
+    Inicio y fin (naive) del slot. Usa la duración real del TimeSlot de la sede
+    y, si no existe, una hora como fallback.
+    """
+    slot_start = parse_time_slot(schedule.time_slot)
+    time_slot = time_slot_map.get((schedule.sede_id, slot_start))
+
+    start_time = datetime.combine(target_date, slot_start)
+    if time_slot:
+        end_time = datetime.combine(target_date, time_slot.end_time)
+    else:
+        end_time = start_time + timedelta(hours=1)
+    return start_time, end_time
+
+
+def build_slot(schedule, target_date, booked, time_slot_map):
+    """Representación de un slot tal como la consumen los frontends."""
+    start_time, end_time = get_slot_bounds(schedule, target_date, time_slot_map)
+    available_slots = max(0, schedule.capacity - booked)
+
+    return {
+        "schedule_id": schedule.id,
+        "class_type": schedule.class_type.name if schedule.class_type else None,
+        "is_individual": schedule.is_individual,
+        "capacity": schedule.capacity,
+        "booked": booked,
+        "available_slots": available_slots,
+        "coach": (
+            schedule.coach.first_name + " " + schedule.coach.last_name
+            if schedule.coach
+            else "Sin asignar"
+        ),
+        "available": booked < schedule.capacity,
+        "start": start_time.isoformat(),
+        "end": end_time.isoformat(),
+    }
+
+
+def get_slots_by_date(dates, sede_ids=None, client_id=None):
+    """
+    Devuelve ``{fecha: [slots ordenados por inicio]}`` para todas las fechas.
+
+    Si se indica ``client_id`` cada slot incluye ``client_has_booking``.
+    """
+    dates = sorted(set(dates))
+    if not dates:
+        return {}
+
+    start_date, end_date = dates[0], dates[-1]
+    schedules = get_schedules_for_days((day_code_for(d) for d in dates), sede_ids)
+    schedule_ids = [schedule.id for schedule in schedules]
+
+    occupancy = get_occupancy(schedule_ids, start_date, end_date)
+    time_slot_map = get_time_slot_map(schedule.sede_id for schedule in schedules)
+    client_keys = get_client_booked_keys(
+        client_id, schedule_ids, start_date, end_date
+    )
+
+    schedules_by_day = defaultdict(list)
+    for schedule in schedules:
+        schedules_by_day[schedule.day].append(schedule)
+
+    slots_by_date = {}
+    for target_date in dates:
+        slots = []
+        for schedule in schedules_by_day.get(day_code_for(target_date), []):
+            key = (schedule.id, target_date)
+            slot = build_slot(
+                schedule, target_date, occupancy.get(key, 0), time_slot_map
+            )
+            if client_id:
+                slot["client_has_booking"] = key in client_keys
+            slots.append(slot)
+        slots_by_date[target_date] = sorted(slots, key=lambda x: x["start"])
+
+    return slots_by_date
+
+
+def get_slots(target_date, sede_ids=None, client_id=None):
+    """Slots de un solo día (ver ``get_slots_by_date``)."""
+    return get_slots_by_date([target_date], sede_ids, client_id)[target_date]
+
+
+def get_reschedule_options(start_date, days, client_id, current_key=None, sede_ids=None):
+    """
+    Slots a los que se puede mover una reserva durante ``days`` días desde
+    ``start_date``, con las mismas consultas agrupadas de ``get_slots_by_date``.
+    Un slot se puede elegir si tiene cupo y el cliente no tiene ya una reserva
+    en él; ``current_key`` es el (schedule_id, class_date) que se está moviendo.
+    """
+    dates = [start_date + timedelta(days=offset) for offset in range(days)]
+    slots_by_date = get_slots_by_date(dates, sede_ids, client_id)
+
+    options = []
+    for target_date in dates:
+        slots = slots_by_date[target_date]
+        for slot in slots:
+            is_current_booking = current_key == (slot["schedule_id"], target_date)
+            can_reschedule_to = slot["available"] and (
+                not slot["client_has_booking"] or is_current_booking
+            )
+            slot["is_current_booking"] = is_current_booking
+            slot["available"] = can_reschedule_to
+            slot["can_reschedule_to"] = can_reschedule_to
+        options.append(
+            {
+                "date": target_date.isoformat(),
+                "slots": slots,
+                "total_available_slots": sum(slot["available_slots"] for slot in slots),
+                "total_schedules": len(slots),
+            }
+        )
+    return options
+
+
+def get_availability_matrix(start_date, end_date, sede_ids=None, client_id=None):
+    """
+    Matriz compacta de disponibilidad para un rango de fechas.
+
+    Los datos fijos de cada horario se envían una sola vez en ``schedules``;
+    cada día solo lleva la ocupación por ``schedule_id``::
+
+        {
+            "schedules": {id: {...}},
+            "days": [{"date": "2030-01-07", "slots": [{"schedule_id": 1, ...}]}],
+        }
+    """
+    dates = [
+        start_date + timedelta(days=offset)
+        for offset in range((end_date - start_date).days + 1)
+    ]
+    schedules = get_schedules_for_days(
+        {day_code_for(d) for d in dates}, sede_ids
+    )
+    schedule_ids = [schedule.id for schedule in schedules]
+
+    occupancy = get_occupancy(schedule_ids, start_date, end_date)
+    time_slot_map = get_time_slot_map(schedule.sede_id for schedule in schedules)
+    client_keys = get_client_booked_keys(
+        client_id, schedule_ids, start_date, end_date
+    )
+
+    schedules_by_day = defaultdict(list)
+    schedule_info = {}
+    for schedule in sorted(schedules, key=lambda s: parse_time_slot(s.time_slot)):
+        schedules_by_day[schedule.day].append(schedule)
+        start_time, end_time = get_slot_bounds(schedule, start_date, time_slot_map)
+        schedule_info[schedule.id] = {
+            "day": schedule.day,
+            "sede_id": schedule.sede_id,
+            "class_type": schedule.class_type.name if schedule.class_type else None,
+            "is_individual": schedule.is_individual,
+            "capacity": schedule.capacity,
+            "coach": (
+                schedule.coach.first_name + " " + schedule.coach.last_name
+                if schedule.coach
+                else "Sin asignar"
+            ),
+            "start_time": start_time.strftime("%H:%M"),
+            "end_time": end_time.strftime("%H:%M"),
+        }
+
+    days = []
+    for target_date in dates:
+        slots = []
+        for schedule in schedules_by_day.get(day_code_for(target_date), []):
+            key = (schedule.id, target_date)
+            booked = occupancy.get(key, 0)
+            slot = {
+                "schedule_id": schedule.id,
+                "booked": booked,
+                "available_slots": max(0, schedule.capacity - booked),
+                "available": booked < schedule.capacity,
+            }
+            if client_id:
+                slot["client_has_booking"] = key in client_keys
+            slots.append(slot)
+        days.append({"date": target_date.isoformat(), "slots": slots})
+
+    return {"schedules": schedule_info, "days": days}
+
+
+# ---------------------------------------------------------------------------
+# Cache por (sede, fecha)
+# ---------------------------------------------------------------------------
+
+# Los slots se invalidan por señales; con cache compartido el timeout solo
+# limita la memoria usada, sin él es lo que tarda otra instancia en ver un cambio
+AVAILABILITY_CACHE_TIMEOUT = (
+    60 * 60 * 24 if settings.SHARED_CACHE else settings.LOCAL_CACHE_TIMEOUT
+)
+
+# Clave usada cuando la consulta no filtra por sede
+ALL_SEDES = "all"
+
+
+def _version_key(sede_key):
+    return f"availability:version:{sede_key}"
+
+
+def _slots_key(sede_key, version, target_date):
+    return f"availability:slots:{sede_key}:{version}:{target_date.isoformat()}"
+
+
+def _get_versions(sede_keys):
+    """
+    Versión actual de cada sede. Cambiar un Schedule o TimeSlot genera una
+    versión nueva, lo que invalida todas las fechas de esa sede a la vez.
+    """
+    versions = cache.get_many([_version_key(key) for key in sede_keys])
+    result = {}
+    for key in sede_keys:
+        version = versions.get(_version_key(key))
+        if version is None:
+            cache.add(_version_key(key), time.time_ns(), None)
+            version = cache.get(_version_key(key))
+        result[key] = version
+    return result
+
+
+def _build_cache_entry(slots):
+    payload = json.dumps(slots, sort_keys=True, default=str).encode()
+    return {
+        "slots": slots,
+        "etag": hashlib.md5(payload).hexdigest(),
+        "last_modified": timezone.now().replace(microsecond=0),
+    }
+
+
+def get_cached_slots(target_date, sede_ids=None):
+    """
+    Slots públicos de un día usando el cache por (sede, fecha).
+
+    Devuelve ``(slots, etag, last_modified)``; si todas las sedes están en
+    cache no se consulta la base de datos.
+    """
+    sede_keys = sorted(set(sede_ids)) if sede_ids is not None else [ALL_SEDES]
+    versions = _get_versions(sede_keys)
+    keys = {
+        sede_key: _slots_key(sede_key, versions[sede_key], target_date)
+        for sede_key in sede_keys
+    }
+    entries = cache.get_many(list(keys.values()))
+
+    slots = []
+    etags = []
+    last_modified = None
+    for sede_key in sede_keys:
+        entry = entries.get(keys[sede_key])
+        if entry is None:
+            sede_filter = None if sede_key == ALL_SEDES else [sede_key]
+            entry = _build_cache_entry(get_slots(target_date, sede_ids=sede_filter))
+            cache.set(keys[sede_key], entry, AVAILABILITY_CACHE_TIMEOUT)
+
+        slots.extend(entry["slots"])
+        etags.append(entry["etag"])
+        if last_modified is None or entry["last_modified"] > last_modified:
+            last_modified = entry["last_modified"]
+
+    etag = hashlib.md5(":".join(etags).encode()).hexdigest()
+    return sorted(slots, key=lambda x: x["start"]), f'"{etag}"', last_modified
+
+
+def invalidate_slots(sede_id, target_date):
+    """Invalida los slots de una fecha (cambió la ocupación de una clase)."""
+    sede_keys = [ALL_SEDES] if sede_id is None else [sede_id, ALL_SEDES]
+    versions = _get_versions(sede_keys)
+    cache.delete_many(
+        [_slots_key(key, versions[key], target_date) for key in sede_keys]
+    )
+
+
+def invalidate_sede(sede_id):
+    """Invalida todas las fechas de una sede (cambió un horario o TimeSlot)."""
+    sede_keys = [ALL_SEDES] if sede_id is None else [sede_id, ALL_SEDES]
+    cache.set_many(
+        {_version_key(key): time.time_ns() for key in sede_keys}, None
+    )
@@ -0,0 +1,457 @@
+# studio/booking_policy.py
+"""
+Reglas de reserva compartidas por todos los puntos de entrada
+(``BookingViewSet.create``, ``create_authenticated_booking`` y
+``BulkBookingViewSet.create_multiple``).
+
+El flujo es siempre el mismo, para una o para muchas reservas:
+
+1. ``load_context`` precarga en un número acotado de consultas todo lo que
+   las reglas necesitan: horarios, filas de ocupación (bloqueadas), reservas
+   existentes del cliente, pago vigente con su libro de clases (bloqueado),
+   la compra de la promoción y la membresía de clase individual.
+2. ``decide`` evalúa cada solicitud en memoria, en orden, y devuelve una
+   ``BookingDecision`` por solicitud (aceptada con su ``Booking`` sin guardar,
+   o rechazada con código y mensaje).
+3. ``apply`` inserta las aceptadas con un único ``bulk_create`` y actualiza
+   cupos, libro de clases, clase de prueba y cache/stream de disponibilidad.
+
+``book`` ejecuta los tres pasos dentro de una transacción. ``load_contexts``
+precarga varios clientes a la vez para las reservas generadas por el sistema
+(reservas fijas, ver ``studio/standing.py``).
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .closing_facts import mark_dirty
+from .dashboard import BOOKINGS, invalidate_dashboard
+from .entitlements import change_entitlements, get_entitlement, get_entitlements
+from .models import (
+    Booking,
+    ClassOccupancy,
+    Membership,
+    Payment,
+    PromotionInstance,
+    Schedule,
+)
+from .seats import lock_occupancies
+from .signals import run_now_and_on_commit, seats_changed
+
+# Id de membresía que el frontend usa para "clase individual"
+INDIVIDUAL_MEMBERSHIP_ID = 1
+
+MESSAGES = {
+    "schedule_not_found": "Horario no encontrado.",
+    "invalid_date": "Formato de fecha inválido.",
+    "past_date": "No se pueden hacer reservas para fechas pasadas.",
+    "membership_not_found": "Membresía no encontrada.",
+    "class_full": "No hay cupo disponible para este horario.",
+    "not_enough_slots": "Solo hay {available} cupos disponibles, se solicitaron {requested}.",
+    "duplicate": "Ya tienes una reserva para este horario en esta fecha.",
+    "no_individual_membership": "No se encontró membresía de clase individual configurada.",
+    "no_membership": "No tienes una membresía activa y ya usaste tu clase de prueba gratuita. Por favor adquiere un plan para continuar.",
+    "promotion_not_linked": "Esta promoción no está asociada correctamente a tu cuenta.",
+    "promotion_inactive": "La promoción que adquiriste ya no está activa.",
+    "limit_reached": "Has alcanzado tu límite de clases ({limit}).",
+}
+
+
+class BookingRequest:
+    """Solicitud de reserva; ``data`` conserva el dict original del cliente."""
+
+    def __init__(self, schedule_id, class_date, data=None):
+        self.schedule_id = schedule_id
+        self.class_date = class_date
+        self.data = data if data is not None else {}
+
+    @property
+    def key(self):
+        return (self.schedule_id, self.class_date)
+
+
+class BookingDecision:
+    INDIVIDUAL = "individual"
+    TRIAL = "trial"
+    MEMBERSHIP = "membership"
+
+    def __init__(self, request, kind=None, booking=None, code=None, **params):
+        self.request = request
+        self.kind = kind
+        self.booking = booking
+        self.code = code
+        self.message = MESSAGES[code].format(**params) if code else None
+
+    @property
+    def ok(self):
+        return self.code is None
+
+
+class BookingContext:
+    """Datos precargados para decidir las reservas de un cliente."""
+
+    def __init__(
+        self,
+        client,
+        schedules,
+        occupancies,
+        booked_keys,
+        payment=None,
+        entitlement=None,
+        promo_instance=None,
+        individual_membership=None,
+        membership_error=None,
+    ):
+        self.client = client
+        self.schedules = schedules
+        self.occupancies = occupancies
+        self.booked_keys = booked_keys
+        self.payment = payment
+        self.entitlement = entitlement
+        self.promo_instance = promo_instance
+        self.individual_membership = individual_membership
+        self.membership_error = membership_error
+        # Estado que cambia a medida que se aceptan reservas del lote
+        self.trial_available = not client.trial_used
+        self.used_in_batch = 0
+
+
+def _load_individual_membership(membership_id):
+    """
+    Membresía de clase individual solicitada, o ``(None, código de error)``.
+    Acepta el id legado ``1`` o cualquier membresía cuyo nombre diga
+    "individual".
+    """
+    if membership_id in (None, ""):
+        return None, None
+    try:
+        membership_id = int(membership_id)
+    except (TypeError, ValueError):
+        return None, "membership_not_found"
+
+    membership = Membership.objects.filter(pk=membership_id).first()
+    if membership and "individual" in membership.name.lower():
+        return membership, None
+    if membership_id == INDIVIDUAL_MEMBERSHIP_ID:
+        individual = Membership.objects.filter(name__icontains="individual").first()
+        return individual, (None if individual else "no_individual_membership")
+    if membership is None:
+        return None, "membership_not_found"
+    return None, None
+
+
+def current_payments(clients, today=None):
+    """
+    Pagos vigentes de ``clients`` sin contar clases individuales, el más
+    reciente primero para cada cliente.
+    """
+    today = today or timezone.localdate()
+    return (
+        Payment.objects.filter(
+            client__in=clients, valid_from__lte=today, valid_until__gte=today
+        )
+        .exclude(membership__name__icontains="individual")
+        .select_related("membership", "promotion")
+        .order_by("client_id", "-valid_until")
+    )
+
+
+def current_payment(client, today=None):
+    """Pago vigente más reciente del cliente, sin contar clases individuales."""
+    return current_payments([client], today=today).first()
+
+
+def load_context(client, requests, membership_id=None):
+    """
+    Precarga todo lo necesario para decidir ``requests``. Debe llamarse dentro
+    de una transacción: bloquea la ocupación de las clases y el libro del pago.
+    """
+    schedules = Schedule.objects.select_related("class_type").in_bulk(
+        {request.schedule_id for request in requests if request.schedule_id}
+    )
+    seats = {
+        request.key
+        for request in requests
+        if request.schedule_id in schedules and request.class_date is not None
+    }
+
+    individual_membership, membership_error = _load_individual_membership(
+        membership_id
+    )
+    requested_individual = individual_membership or membership_error
+
+    occupancies = lock_occupancies(seats)
+    booked_keys = set()
+    if seats:
+        booked_keys = set(
+            Booking.objects.filter(
+                client=client,
+                schedule_id__in={schedule_id for schedule_id, _ in seats},
+                class_date__in={class_date for _, class_date in seats},
+            ).values_list("schedule_id", "class_date")
+        )
+
+    payment = entitlement = promo_instance = None
+    # La clase de prueba cubre una sola reserva; el resto necesita pago
+    needs_payment = not requested_individual and (
+        client.trial_used or len(seats) > 1
+    )
+    if needs_payment:
+        payment = current_payment(client)
+        if payment:
+            entitlement = get_entitlement(payment, lock=True)
+            if payment.promotion_id:
+                promo_instance = (
+                    PromotionInstance.objects.filter(
+                        promotion_id=payment.promotion_id, clients=client
+                    )
+                    .select_related("promotion")
+                    .order_by("-created_at")
+                    .first()
+                )
+
+    return BookingContext(
+        client,
+        schedules,
+        occupancies,
+        booked_keys,
+        payment=payment,
+        entitlement=entitlement,
+        promo_instance=promo_instance,
+        individual_membership=individual_membership,
+        membership_error=membership_error,
+    )
+
+
+def load_contexts(requests_by_client):
+    """
+    ``load_context`` para varios clientes a la vez (``{client: [requests]}``)
+    con un número de consultas que no depende de cuántos clientes haya.
+    Todos los contextos comparten horarios y filas de ocupación, así el cupo
+    que toma un cliente ya no está libre para el siguiente. Sin clase de
+    prueba ni individual: cada reserva se descuenta del pago vigente.
+    """
+    clients = {client.pk: client for client in requests_by_client}
+    requests = [r for client_requests in requests_by_client.values() for r in client_requests]
+    schedules = Schedule.objects.select_related("class_type").in_bulk(
+        {request.schedule_id for request in requests if request.schedule_id}
+    )
+    seats = {
+        request.key
+        for request in requests
+        if request.schedule_id in schedules and request.class_date is not None
+    }
+
+    occupancies = lock_occupancies(seats)
+    booked_keys = defaultdict(set)
+    if seats:
+        for client_id, schedule_id, class_date in Booking.objects.filter(
+            client_id__in=clients,
+            schedule_id__in={schedule_id for schedule_id, _ in seats},
+            class_date__in={class_date for _, class_date in seats},
+        ).values_list("client_id", "schedule_id", "class_date"):
+            booked_keys[client_id].add((schedule_id, class_date))
+
+    payments = {}
+    for payment in current_payments(clients):
+        payments.setdefault(payment.client_id, payment)
+    entitlements = get_entitlements(payments.values(), lock=True)
+
+    promo_instances = {}
+    promotion_ids = {p.promotion_id for p in payments.values() if p.promotion_id}
+    if promotion_ids:
+        links = (
+            PromotionInstance.clients.through.objects.filter(
+                client_id__in=clients,
+                promotioninstance__promotion_id__in=promotion_ids,
+            )
+            .select_related("promotioninstance__promotion")
+            .order_by("-promotioninstance__created_at")
+        )
+        for link in links:
+            instance = link.promotioninstance
+            promo_instances.setdefault((link.client_id, instance.promotion_id), instance)
+
+    contexts = {}
+    for client_id, client in clients.items():
+        payment = payments.get(client_id)
+        context = BookingContext(
+            client,
+            schedules,
+            occupancies,
+            booked_keys[client_id],
+            payment=payment,
+            entitlement=entitlements.get(payment.pk) if payment else None,
+            promo_instance=(
+                promo_instances.get((client_id, payment.promotion_id))
+                if payment and payment.promotion_id
+                else None
+            ),
+        )
+        context.trial_available = False
+        contexts[client_id] = context
+    return contexts
+
+
+def decide(
+    context,
+    requests,
+    number_of_slots=1,
+    attendance_status="pending",
+    allow_without_payment=False,
+    reject_past=False,
+    bulk_booking=None,
+    default_sede_id=None,
+):
+    """
+    Decide cada solicitud en orden, sin consultas. ``allow_without_payment``
+    permite a recepción registrar clases sin pago vigente (check-in manual) y
+    ``reject_past`` rechaza fechas pasadas (reservas hechas por el cliente).
+    """
+    today = timezone.localdate()
+    decisions = []
+
+    for request in requests:
+        schedule = context.schedules.get(request.schedule_id)
+        if schedule is None:
+            decisions.append(BookingDecision(request, code="schedule_not_found"))
+            continue
+        if request.class_date is None:
+            decisions.append(BookingDecision(request, code="invalid_date"))
+            continue
+        if reject_past and request.class_date < today:
+            decisions.append(BookingDecision(request, code="past_date"))
+            continue
+        if context.membership_error:
+            decisions.append(BookingDecision(request, code=context.membership_error))
+            continue
+        if request.key in context.booked_keys:
+            decisions.append(BookingDecision(request, code="duplicate"))
+            continue
+
+        occupancy = context.occupancies[request.key]
+        available = schedule.capacity - occupancy.booked
+        if available <= 0:
+            decisions.append(BookingDecision(request, code="class_full"))
+            continue
+        if number_of_slots > available:
+            decisions.append(
+                BookingDecision(
+                    request,
+                    code="not_enough_slots",
+                    available=available,
+                    requested=number_of_slots,
+                )
+            )
+            continue
+
+        booking = Booking(
+            client=context.client,
+            schedule=schedule,
+            class_date=request.class_date,
+            attendance_status=attendance_status,
+            bulk_booking=bulk_booking,
+            sede_id=schedule.sede_id or default_sede_id,
+        )
+
+        if context.individual_membership:
+            # Pendiente de pago: no ocupa cupo hasta confirmarse
+            booking.membership = context.individual_membership
+            booking.status = "pending"
+            kind = BookingDecision.INDIVIDUAL
+        elif context.trial_available:
+            context.trial_available = False
+            kind = BookingDecision.TRIAL
+        else:
+            code = _membership_error(context, allow_without_payment)
+            if code:
+                params = {"limit": context.entitlement.limit} if context.entitlement else {}
+                decisions.append(BookingDecision(request, code=code, **params))
+                continue
+            if context.payment:
+                booking.payment = context.payment
+                booking.membership = context.payment.membership
+                if booking.entitlement_key():
+                    context.used_in_batch += 1
+            kind = BookingDecision.MEMBERSHIP
+
+        context.booked_keys.add(request.key)
+        if booking.seat_key():
+            occupancy.booked += 1
+        decisions.append(BookingDecision(request, kind=kind, booking=booking))
+
+    return decisions
+
+
+def _membership_error(context, allow_without_payment):
+    """Código de error de la regla de membresía/promoción/límite, o None."""
+    if context.payment is None:
+        return None if allow_without_payment else "no_membership"
+    if context.payment.promotion_id:
+        if context.promo_instance is None:
+            return "promotion_not_linked"
+        if not context.promo_instance.is_active():
+            return "promotion_inactive"
+    if not context.entitlement.has_room(extra=context.used_in_batch):
+        return "limit_reached"
+    return None
+
+
+def save_decisions(decisions, occupancies):
+    """
+    Guarda las reservas aceptadas de ``decisions`` (pueden ser de varios
+    clientes) con un único ``bulk_create`` y actualiza cupos, libro de clases
+    y cache/stream. ``occupancies`` son las filas bloqueadas con las que se
+    decidió. Devuelve las reservas creadas.
+    """
+    created = Booking.objects.bulk_create(
+        [decision.booking for decision in decisions if decision.ok]
+    )
+    if not created:
+        return created
+
+    # bulk_create no pasa por Booking.save(): contadores y cache se hacen aquí
+    reserved = [booking.seat_key() for booking in created if booking.seat_key()]
+    rows = [occupancies[seat] for seat in set(reserved)]
+    for row in rows:
+        row.updated_at = timezone.now()
+    ClassOccupancy.objects.bulk_update(rows, ["booked", "updated_at"])
+    change_entitlements(added=[booking.entitlement_key() for booking in created])
+
+    for booking in created:
+        booking._loaded_seat = booking.seat_key()
+        booking._loaded_entitlement = booking.entitlement_key()
+        booking._loaded_class_date = booking.class_date
+
+    seats_changed(reserved=reserved)
+    mark_dirty({booking.class_date for booking in created})
+    run_now_and_on_commit(
+        invalidate_dashboard, {booking.sede_id for booking in created}, BOOKINGS
+    )
+    return created
+
+
+def apply(context, decisions):
+    """
+    Guarda las reservas aceptadas del cliente y marca su clase de prueba como
+    usada si corresponde. Devuelve las reservas creadas.
+    """
+    created = save_decisions(decisions, context.occupancies)
+    if any(d.kind == BookingDecision.TRIAL for d in decisions if d.ok):
+        context.client.trial_used = True
+        context.client.save(update_fields=["trial_used"])
+    return created
+
+
+def book(client, requests, membership_id=None, **rules):
+    """
+    Decide y guarda ``requests`` para ``client`` en una sola transacción.
+    ``rules`` se pasan a ``decide``. Devuelve las decisiones; las aceptadas
+    tienen su ``booking`` ya guardado.
+    """
+    with transaction.atomic():
+        context = load_context(client, requests, membership_id=membership_id)
+        decisions = decide(context, requests, **rules)
+        apply(context, decisions)
+    return decisions
@@ -0,0 +1,111 @@
+# studio/broadcast.py
+"""
+Broadcaster de eventos de disponibilidad para el endpoint SSE.
+
+El backend se elige con ``settings.AVAILABILITY_BROADCASTER`` (ruta a la
+clase). ``InProcessBroadcaster`` entrega los mensajes solo a los clientes
+conectados al mismo proceso; con varios workers se puede reemplazar por un
+backend pub/sub (p. ej. Redis) que implemente la misma interfaz:
+
+    publish(channel, message)          # síncrono, desde vistas/señales
+    subscribe(channel) -> Subscription # con ``await get(timeout)`` y ``close()``
+    has_subscribers(channel) -> bool   # True si no se puede saber
+"""
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BROADCASTER = "studio.broadcast.InProcessBroadcaster"
+
+# Mensajes pendientes por suscriptor antes de descartar los más nuevos
+SUBSCRIPTION_QUEUE_SIZE = 100
+
+
+def availability_channel(sede_id, class_date):
+    """Canal de cambios de cupos para una sede y fecha."""
+    return f"availability:{sede_id}:{class_date.isoformat()}"
+
+
+class Subscription:
+    def __init__(self, broadcaster, channel):
+        self.broadcaster = broadcaster
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIPTION_QUEUE_SIZE)
+
+    def deliver(self, message):
+        """Encola un mensaje desde cualquier hilo."""
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.warning(f"Subscription queue full for {self.channel}, dropping message")
+
+    async def get(self, timeout=None):
+        """Siguiente mensaje, o ``None`` si pasa ``timeout`` sin mensajes."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+
+class InProcessBroadcaster:
+    """Broadcaster en memoria del proceso (un solo worker ASGI)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def has_subscribers(self, channel):
+        with self._lock:
+            return bool(self._subscriptions.get(channel))
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.deliver(message)
+            except RuntimeError:
+                # El event loop del suscriptor ya se cerró
+                self.unsubscribe(subscription)
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster():
+    """Instancia única del broadcaster configurado."""
+    global _broadcaster
+    if _broadcaster is None:
+        with _broadcaster_lock:
+            if _broadcaster is None:
+                path = getattr(settings, "AVAILABILITY_BROADCASTER", DEFAULT_BROADCASTER)
+                _broadcaster = import_string(path)()
+    return _broadcaster
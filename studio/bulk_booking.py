@@ -0,0 +1,74 @@
+# studio/bulk_booking.py
+"""
+Creación de reservas múltiples (BulkBooking) sobre las reglas compartidas de
+``studio/booking_policy.py``: todas las reservas del lote se deciden con los
+mismos datos precargados y se insertan con un único ``bulk_create``.
+"""
+from datetime import datetime
+
+from .booking_policy import BookingRequest, book
+
+
+def _parse_items(bookings_data):
+    """Convierte cada reserva solicitada en un ``BookingRequest``."""
+    requests = []
+    for booking_data in bookings_data:
+        try:
+            schedule_id = int(booking_data["schedule_id"])
+        except (TypeError, ValueError):
+            schedule_id = None
+        try:
+            class_date = datetime.strptime(booking_data["class_date"], "%Y-%m-%d").date()
+        except (TypeError, ValueError):
+            class_date = None
+        requests.append(BookingRequest(schedule_id, class_date, data=booking_data))
+    return requests
+
+
+def create_bulk_bookings(
+    client, bulk_booking, bookings_data, number_of_slots=1, membership_id=None
+):
+    """
+    Crea las reservas solicitadas para ``client`` y devuelve
+    ``(successful_bookings, failed_bookings, errors, created)`` con el mismo
+    formato que la respuesta de ``create-multiple``; ``created`` son las
+    instancias de Booking insertadas.
+    """
+    decisions = book(
+        client,
+        _parse_items(bookings_data),
+        membership_id=membership_id,
+        number_of_slots=number_of_slots,
+        bulk_booking=bulk_booking,
+    )
+
+    successful_bookings = []
+    failed_bookings = []
+    errors = []
+    created = []
+    for decision in decisions:
+        booking_data = decision.request.data
+        if decision.ok:
+            booking = decision.booking
+            created.append(booking)
+            successful_bookings.append(
+                {
+                    "id": booking.id,
+                    "schedule": str(booking.schedule),
+                    "class_date": booking_data["class_date"],
+                    "status": booking.status,
+                }
+            )
+        else:
+            failed_bookings.append(
+                {
+                    "schedule_id": booking_data["schedule_id"],
+                    "class_date": booking_data["class_date"],
+                    "error": decision.message,
+                }
+            )
+            errors.append(
+                f"{booking_data['schedule_id']} / {booking_data['class_date']}: {decision.message}"
+            )
+
+    return successful_bookings, failed_bookings, errors, created
@@ -0,0 +1,117 @@
+# studio/closing_facts.py
+"""
+Tabla de cierres diarios (``DailyClosingFact``): una fila por (día, sede).
+
+Los totales se calculan con ``reporting.daily_buckets`` (tres consultas
+agrupadas: pagos, ventas y reservas). Las señales de Payment/Venta/Booking
+marcan los días tocados con ``mark_dirty`` y al confirmar la transacción se
+recalculan solo esos días; ``rebuild_closing_facts`` recalcula un rango
+completo (comando ``rebuild_closing_facts``). Los endpoints leen estas filas
+con ``reporting.closing_days``.
+"""
+import threading
+
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Min
+
+from .models import Booking, DailyClosingFact, Payment, Venta
+from .reporting import daily_buckets, local_day
+
+_dirty = threading.local()
+
+
+def compute_facts(days=None, start=None, end=None):
+    """
+    Calcula las filas de cierre (sin guardarlas) para los días ``days`` o el
+    rango ``start``-``end`` (incluido). Devuelve ``{(fecha, sede_id): fila}``.
+    """
+    buckets = daily_buckets(start=start, end=end, days=days, by_sede=True)
+    return {
+        (day, sede_id): DailyClosingFact(date=day, sede_id=sede_id, **totals)
+        for (day, sede_id), totals in buckets.items()
+    }
+
+
+def _replace_facts(existing, **bounds):
+    """
+    Recalcula con ``compute_facts(**bounds)`` y reemplaza las filas
+    ``existing`` (queryset). Si otro recálculo de los mismos días confirmó
+    primero, el constraint único falla y se reintenta una vez recalculando
+    con los datos ya confirmados.
+    """
+    for attempt in range(2):
+        facts = list(compute_facts(**bounds).values())
+        try:
+            with transaction.atomic():
+                existing.delete()
+                DailyClosingFact.objects.bulk_create(facts, batch_size=1000)
+            return len(facts)
+        except IntegrityError:
+            if attempt:
+                raise
+    return 0
+
+
+def refresh_closing_facts(days):
+    """Recalcula los días ``days`` (todas las sedes). Devuelve las filas escritas."""
+    days = sorted({local_day(day) for day in days if day})
+    if not days:
+        return 0
+    return _replace_facts(DailyClosingFact.objects.filter(date__in=days), days=days)
+
+
+def rebuild_closing_facts(start, end):
+    """Recalcula todos los días entre ``start`` y ``end`` (incluido)."""
+    return _replace_facts(
+        DailyClosingFact.objects.filter(date__gte=start, date__lte=end),
+        start=start,
+        end=end,
+    )
+
+
+def activity_range():
+    """(primer día, último día) con pagos, ventas o reservas, o ``None``."""
+    days = []
+    for queryset, field in (
+        (Payment.objects.all(), "paid_on"),
+        (Venta.objects.all(), "sold_on"),
+        (Booking.objects.all(), "class_date"),
+    ):
+        bounds = queryset.aggregate(first=Min(field), last=Max(field))
+        days.extend(local_day(value) for value in bounds.values() if value)
+    return (min(days), max(days)) if days else None
+
+
+def mark_trial_days_dirty(client_ids):
+    """
+    Marca los días con asistencias de ``client_ids``: ``pruebas`` depende de
+    ``Client.trial_used`` y cambia en todos esos días cuando cambia el cliente.
+    """
+    if client_ids:
+        mark_dirty(
+            Booking.objects.filter(client_id__in=client_ids, attendance_status="attended")
+            .values_list("class_date", flat=True)
+            .distinct()
+        )
+
+
+def _flush_dirty():
+    days = getattr(_dirty, "days", None)
+    _dirty.days = set()
+    if days:
+        refresh_closing_facts(days)
+
+
+def mark_dirty(days):
+    """
+    Marca días para recalcular al confirmar la transacción actual. Varias
+    escrituras en la misma transacción se recalculan juntas una sola vez.
+    """
+    days = {local_day(day) for day in days if day}
+    if not days:
+        return
+    if getattr(_dirty, "days", None) is None:
+        _dirty.days = set()
+    _dirty.days.update(days)
+    # robust: un fallo en el cierre no debe afectar el pago o la reserva
+    transaction.on_commit(_flush_dirty, robust=True)
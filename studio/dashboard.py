@@ -0,0 +1,454 @@
+# studio/dashboard.py
+"""
+Datos del dashboard de administración (``get_dashboard_data``).
+
+Todo sale de consultas agrupadas con un número fijo de consultas (~14) sin
+importar cuántos días, meses, horarios, membresías o clientes haya:
+reservas por día, ocupación por TimeSlot (``utilization``), pagos por día y
+por mes (el mismo conteo mensual alimenta crecimiento y renovaciones) y los
+clientes recientes con su última visita, clases tomadas y total pagado
+anotados con subconsultas.
+
+El payload se arma por secciones (reservas, pagos, clientes) y cada sección se
+guarda en cache por conjunto de sedes con ``DASHBOARD_CACHE_TIMEOUT``. Las
+señales de Payment, Booking y Client cambian la versión de la sede tocada
+(``invalidate_dashboard``), así que solo se recalculan las secciones que
+dependen de lo que cambió; el scheduler refresca las combinaciones de uso
+común (``refresh_dashboard_snapshots``).
+"""
+import calendar
+import hashlib
+import time
+from datetime import date, timedelta
+
+from accounts.models import Client
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from .models import Booking, Membership, Payment
+from .reporting import month_bounds
+from .utilization import time_slot_utilization
+
+# Ventana de la ocupación por horario (timeSlotStats)
+UTILIZATION_DAYS = 28
+
+RECENT_CLIENTS = 10
+AT_RISK_DAYS = 14
+
+# Las escrituras invalidan por señales; el timeout acota lo que no las dispara
+# (membresías, datos fuera de señales) y el scheduler refresca antes de vencer
+DASHBOARD_CACHE_TIMEOUT = 60 * 15
+
+# Tipos de escritura que invalidan el dashboard de una sede
+BOOKINGS = "bookings"
+PAYMENTS = "payments"
+CLIENTS = "clients"
+
+
+def _previous_month(year, month):
+    return (year, month - 1) if month > 1 else (year - 1, 12)
+
+
+def _subquery(queryset, aggregate, output_field):
+    """Valor de ``aggregate`` sobre ``queryset`` (filtrado por OuterRef) como subconsulta."""
+    return Subquery(
+        queryset.order_by().values("client_id").annotate(value=aggregate).values("value")[:1],
+        output_field=output_field,
+    )
+
+
+def _recent_clients(sede_ids):
+    """Los clientes más recientes con clases tomadas, última visita y total pagado."""
+    attended = Booking.objects.filter(
+        client_id=OuterRef("pk"), sede_id__in=sede_ids, attendance_status="attended"
+    )
+    payments = Payment.objects.filter(client_id=OuterRef("pk"), sede_id__in=sede_ids)
+    return list(
+        Client.objects.filter(sede_id__in=sede_ids)
+        .select_related("current_membership")
+        .annotate(
+            classes_taken=Coalesce(
+                _subquery(attended, Count("id"), IntegerField()), 0
+            ),
+            last_visit=Subquery(
+                attended.order_by("-class_date").values("class_date")[:1]
+            ),
+            total_value=Coalesce(
+                _subquery(
+                    payments, Sum("amount"), DecimalField(max_digits=12, decimal_places=2)
+                ),
+                0,
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+        )
+        .order_by("-created_at")[:RECENT_CLIENTS]
+    )
+
+
+def _membership_name(client):
+    return client.current_membership.name if client.current_membership else "Sin membresía"
+
+
+def booking_section(sede_ids, today):
+    """Reservas del día, por día, por asistencia y por horario (4 consultas)."""
+    # Reservas por día (últimos 15 días, incluye hoy)
+    booking_days = dict(
+        Booking.objects.filter(
+            sede_id__in=sede_ids,
+            class_date__gte=today - timedelta(days=14),
+            class_date__lte=today,
+        )
+        .values("class_date")
+        .annotate(count=Count("id"))
+        .values_list("class_date", "count")
+    )
+    daily_bookings = []
+    for i in range(14, -1, -1):
+        day = today - timedelta(days=i)
+        daily_bookings.append({"date": day.strftime("%d/%m"), "count": booking_days.get(day, 0)})
+
+    attendance_dict = dict(
+        Booking.objects.filter(sede_id__in=sede_ids)
+        .values("attendance_status")
+        .annotate(count=Count("id"))
+        .values_list("attendance_status", "count")
+    )
+
+    # Horarios configurados (TimeSlot) de las sedes, últimas 4 semanas
+    utilization = time_slot_utilization(
+        today - timedelta(days=UTILIZATION_DAYS - 1), today, sede_ids=sede_ids
+    )
+    time_slot_stats = [
+        {
+            "time_slot": slot["time_slot"],
+            "count": slot["booked"],
+            "capacity": slot["capacity"],
+            "utilization": slot["utilization"],
+        }
+        for slot in utilization["slots"]
+    ]
+
+    return {
+        "todayBookings": booking_days.get(today, 0),
+        "dailyBookings": daily_bookings,
+        "attendanceStats": {
+            "attended": attendance_dict.get("attended", 0),
+            "no_show": attendance_dict.get("no_show", 0),
+            "cancelled": attendance_dict.get("cancelled", 0),
+        },
+        "timeSlotStats": time_slot_stats,
+    }
+
+
+def payment_section(sede_ids, today):
+    """Ingresos por día y por mes, métodos de pago y pagos recientes (4 consultas)."""
+    current_year = today.year
+    payments = Payment.objects.filter(sede_id__in=sede_ids)
+
+    # Ingresos diarios (últimos 30 días, incluye hoy)
+    revenue_days = dict(
+        payments.filter(paid_on__gte=today - timedelta(days=29), paid_on__lte=today)
+        .values("paid_on")
+        .annotate(total=Sum("amount"))
+        .values_list("paid_on", "total")
+    )
+    daily_revenue = []
+    for i in range(29, -1, -1):
+        day = today - timedelta(days=i)
+        daily_revenue.append(
+            {"date": day.strftime("%d/%m"), "amount": float(revenue_days.get(day) or 0)}
+        )
+
+    # Meses de la gráfica de crecimiento: los 12 anteriores (y el previo de cada uno)
+    chart_months = []
+    for i in range(12, 0, -1):
+        month_date = today - timedelta(days=30 * i)
+        chart_months.append((month_date.year, month_date.month))
+    # Una sola consulta agrupada por mes cubre la gráfica y las renovaciones del año
+    months_start = min(
+        month_bounds(*_previous_month(*chart_months[0]))[0], date(current_year, 1, 1)
+    )
+    by_month = {
+        (row["year"], row["month"]): row
+        for row in payments.filter(
+            paid_on__gte=months_start, paid_on__lte=date(current_year, 12, 31)
+        )
+        .annotate(year=ExtractYear("paid_on"), month=ExtractMonth("paid_on"))
+        .values("year", "month")
+        .annotate(total=Sum("amount"), count=Count("id"))
+    }
+
+    def month_total(year, month):
+        return (by_month.get((year, month)) or {}).get("total") or 0
+
+    def month_count(year, month):
+        return (by_month.get((year, month)) or {}).get("count") or 0
+
+    monthly_revenue_data = []
+    for year, month in chart_months:
+        revenue = month_total(year, month)
+        payment_count = month_count(year, month)
+        prev_revenue = month_total(*_previous_month(year, month))
+        growth = ((revenue - prev_revenue) / prev_revenue) * 100 if prev_revenue > 0 else 0
+        monthly_revenue_data.append(
+            {
+                "year": year,
+                "month": month,
+                "month_name": calendar.month_name[month],
+                "total_amount": float(revenue),
+                "payment_count": payment_count,
+                "average_payment": float(revenue / payment_count) if payment_count > 0 else 0,
+                "growth": growth,
+            }
+        )
+
+    # Métodos de pago (texto original) y total histórico en una consulta
+    payment_methods = list(
+        payments.values("payment_method")
+        .annotate(count=Count("id"), total=Sum("amount"))
+        .order_by("-count")
+    )
+    total_revenue = sum(item["total"] or 0 for item in payment_methods)
+
+    recent_payments_data = [
+        {
+            "client_name": f"{payment.client.first_name or ''} {payment.client.last_name or ''}".strip(),
+            "membership_name": payment.membership.name if payment.membership else "N/A",
+            "amount": float(payment.amount),
+            "date_paid": payment.date_paid.strftime("%d/%m/%Y"),
+            "payment_method": payment.payment_method or "Efectivo",
+            "valid_until": (
+                payment.valid_until.strftime("%d/%m/%Y") if payment.valid_until else "N/A"
+            ),
+        }
+        for payment in payments.select_related("client", "membership").order_by("-date_paid")[:10]
+    ]
+
+    return {
+        "todayRevenue": float(revenue_days.get(today) or 0),
+        "totalRevenue": float(total_revenue),
+        "dailyRevenue": daily_revenue,
+        "paymentMethods": [
+            {"method": item["payment_method"] or "Efectivo", "count": item["count"]}
+            for item in payment_methods
+        ],
+        "recentPayments": recent_payments_data,
+        "monthlyRevenue": monthly_revenue_data,
+        "renewalStats": [
+            {"month": calendar.month_name[month], "count": month_count(current_year, month)}
+            for month in range(1, 13)
+        ],
+    }
+
+
+def client_section(sede_ids, today):
+    """
+    Clientes activos/nuevos, clientes recientes y membresías (5 consultas).
+    Depende también de reservas (última visita) y pagos (totales por cliente).
+    """
+    first_of_month, last_of_month = month_bounds(today.year, today.month)
+    # Clientes activos y nuevos en una sola consulta
+    client_counts = Client.objects.filter(sede_id__in=sede_ids).aggregate(
+        active=Count(
+            "id", filter=Q(current_membership__isnull=False, status="A")
+        ),
+        new=Count(
+            "id",
+            filter=Q(created_at__date__gte=first_of_month, created_at__date__lte=last_of_month),
+        ),
+    )
+    active_clients = client_counts["active"]
+    new_clients = client_counts["new"]
+
+    payments = Payment.objects.filter(sede_id__in=sede_ids)
+
+    recent_clients = _recent_clients(sede_ids)
+    top_clients = [
+        {
+            "name": f"{client.first_name} {client.last_name}",
+            "email": client.email or "N/A",
+            "membership_name": _membership_name(client),
+            "classes_taken": client.classes_taken,
+            "last_visit": client.last_visit.strftime("%d/%m/%Y") if client.last_visit else "N/A",
+            "status": "active" if client.status == "A" else "inactive",
+            "total_value": client.total_value,
+        }
+        for client in recent_clients
+    ]
+    clients_at_risk = [
+        {
+            "name": f"{client.first_name} {client.last_name}",
+            "email": client.email or "N/A",
+            "membership_name": _membership_name(client),
+            "last_visit": client.last_visit.strftime("%d/%m/%Y"),
+            "days_since_visit": (today - client.last_visit).days,
+            "remaining_classes": (
+                client.current_membership.classes_per_month
+                if client.current_membership and client.current_membership.classes_per_month
+                else "Ilimitado"
+            ),
+        }
+        for client in recent_clients
+        if client.last_visit and (today - client.last_visit).days > AT_RISK_DAYS
+    ]
+
+    # Membresías: clientes activos e ingresos del mes agrupados por membresía
+    active_by_membership = dict(
+        Client.objects.filter(sede_id__in=sede_ids, status="A", current_membership__isnull=False)
+        .values("current_membership")
+        .annotate(count=Count("id"))
+        .values_list("current_membership", "count")
+    )
+    revenue_by_membership = dict(
+        payments.filter(
+            paid_on__gte=first_of_month, paid_on__lte=last_of_month, valid_until__gte=today
+        )
+        .values("membership")
+        .annotate(total=Sum("amount"))
+        .values_list("membership", "total")
+    )
+    membership_details = [
+        {
+            "name": membership.name,
+            "active_clients": active_by_membership.get(membership.id, 0),
+            "classes_per_month": membership.classes_per_month or "Ilimitado",
+            "price": float(membership.price),
+            "percentage": (
+                active_by_membership.get(membership.id, 0) / max(active_clients, 1)
+            )
+            * 100,
+            "monthly_revenue": revenue_by_membership.get(membership.id) or 0,
+        }
+        for membership in Membership.objects.filter(
+            Q(scope="GLOBAL") | Q(sede_id__in=sede_ids)
+        ).distinct()
+    ]
+
+    return {
+        "activeClients": active_clients,
+        "newClients": new_clients,
+        # Datos de clientes (mock por ahora)
+        "ageGroups": [
+            {"range": "18-25", "count": int(active_clients * 0.2)},
+            {"range": "26-35", "count": int(active_clients * 0.4)},
+            {"range": "36-45", "count": int(active_clients * 0.3)},
+            {"range": "46+", "count": int(active_clients * 0.1)},
+        ],
+        "clientStatus": {
+            "active": active_clients,
+            "inactive": int(active_clients * 0.1),
+            "new": new_clients,
+            "at_risk": int(active_clients * 0.05),
+        },
+        "topClients": top_clients,
+        "clientsAtRisk": clients_at_risk,
+        # Datos de membresías (mock por ahora)
+        "membershipStats": [
+            {"name": "Mensual", "count": int(active_clients * 0.4)},
+            {"name": "Trimestral", "count": int(active_clients * 0.3)},
+            {"name": "Anual", "count": int(active_clients * 0.2)},
+            {"name": "Clase Suelta", "count": int(active_clients * 0.1)},
+        ],
+        "membershipDetails": membership_details,
+    }
+
+
+# Sección -> (función, tipos de escritura de los que depende)
+SECTIONS = {
+    "bookings": (booking_section, (BOOKINGS,)),
+    "payments": (payment_section, (PAYMENTS,)),
+    "clients": (client_section, (CLIENTS, BOOKINGS, PAYMENTS)),
+}
+
+
+def build_dashboard(sede_ids, today=None):
+    """Payload completo del dashboard para ``sede_ids`` (sin cache)."""
+    today = today or timezone.localdate()
+    data = {}
+    for builder, _ in SECTIONS.values():
+        data.update(builder(sede_ids, today))
+    return data
+
+
+# ---------------------------------------------------------------------------
+# Cache por conjunto de sedes
+# ---------------------------------------------------------------------------
+
+
+def _version_key(kind, sede_id):
+    return f"dashboard:version:{kind}:{sede_id}"
+
+
+def _get_versions(sede_ids):
+    """Versión actual de cada ``(tipo, sede)``; una escritura genera una nueva."""
+    keys = [
+        _version_key(kind, sede_id)
+        for kind in (BOOKINGS, PAYMENTS, CLIENTS)
+        for sede_id in sede_ids
+    ]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, time.time_ns(), None)
+        versions.update(cache.get_many(missing))
+    return versions
+
+
+def _section_key(section, sede_ids, versions, today):
+    kinds = SECTIONS[section][1]
+    stamp = ":".join(
+        str(versions.get(_version_key(kind, sede_id))) for kind in kinds for sede_id in sede_ids
+    )
+    digest = hashlib.md5(stamp.encode()).hexdigest()
+    sede_key = ",".join(str(sede_id) for sede_id in sede_ids)
+    return f"dashboard:{section}:{sede_key}:{today.isoformat()}:{digest}"
+
+
+def get_dashboard(sede_ids, fresh=False):
+    """
+    Payload del dashboard desde el cache; recalcula solo las secciones que
+    faltan (o todas con ``fresh``). ``as_of`` es la hora de la sección más
+    antigua.
+    """
+    sede_ids = sorted(set(sede_ids))
+    today = timezone.localdate()
+    versions = _get_versions(sede_ids)
+    keys = {section: _section_key(section, sede_ids, versions, today) for section in SECTIONS}
+    entries = {} if fresh else cache.get_many(list(keys.values()))
+
+    data = {}
+    as_of = None
+    for section, (builder, _) in SECTIONS.items():
+        entry = entries.get(keys[section])
+        if entry is None:
+            entry = {"data": builder(sede_ids, today), "as_of": timezone.now()}
+            cache.set(keys[section], entry, DASHBOARD_CACHE_TIMEOUT)
+        data.update(entry["data"])
+        if as_of is None or entry["as_of"] < as_of:
+            as_of = entry["as_of"]
+
+    data["as_of"] = as_of.isoformat()
+    return data
+
+
+def invalidate_dashboard(sede_ids, kind):
+    """Invalida las secciones que dependen de ``kind`` para las sedes ``sede_ids``."""
+    sede_ids = {sede_id for sede_id in sede_ids if sede_id is not None}
+    if sede_ids:
+        cache.set_many({_version_key(kind, sede_id): time.time_ns() for sede_id in sede_ids}, None)
+
+
+def refresh_dashboard_snapshots(sede_ids):
+    """
+    Recalcula el dashboard de cada sede y del conjunto completo ``sede_ids``
+    (lo que se pide sin elegir sede). Devuelve las combinaciones refrescadas.
+    """
+    combinations = [[sede_id] for sede_id in sede_ids]
+    if len(sede_ids) > 1:
+        combinations.append(list(sede_ids))
+    for combination in combinations:
+        get_dashboard(combination, fresh=True)
+    return len(combinations)
@@ -0,0 +1,196 @@
+# studio/entitlements.py
+"""
+Libro de clases por pago (``PaymentEntitlement``).
+
+Cada pago tiene una fila con las clases permitidas (plan o promoción más
+extras), las usadas (reservas activas asistidas o pendientes a futuro) y los
+no-shows, que dan derecho a una reposición. ``Booking.save`` y la señal
+``post_delete`` aplican el cambio de cada reserva con un UPDATE ``F()``, así
+que validar el límite es una sola lectura de la fila (con ``lock=True`` dentro
+de una transacción para que dos reservas simultáneas no superen el límite).
+
+Las reservas pendientes dejan de contar cuando su fecha pasa: ``get_entitlements``
+recalcula antes de devolverlas las filas cuyo último recálculo (``counted_on``)
+es de un día anterior, así validar nunca depende de que haya corrido el job
+diario ``refresh_recent_entitlements``. Las filas faltantes se crean bajo
+demanda y ``rebuild_payment_entitlements`` reconstruye todo el libro.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db.models import Case, Count, F, Q, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Booking, Payment, PaymentEntitlement
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def allowed_classes_expression():
+    """Clases permitidas de un pago como expresión SQL (0 = ilimitado)."""
+    extra = F("extra_classes")
+    return Case(
+        When(
+            promotion__isnull=False,
+            then=Coalesce("promotion__clases_por_cliente", 0) + extra,
+        ),
+        When(
+            membership__classes_per_month__gt=0,
+            then=F("membership__classes_per_month") + extra,
+        ),
+        default=Value(0),
+    )
+
+
+def refresh_entitlements(payment_ids):
+    """
+    Recalcula desde las reservas el libro de los pagos indicados (tres
+    consultas) y devuelve el número de filas escritas.
+    """
+    payment_ids = list(payment_ids)
+    if not payment_ids:
+        return 0
+
+    today = timezone.localdate()
+    allowed = dict(
+        Payment.objects.filter(id__in=payment_ids)
+        .annotate(allowed=allowed_classes_expression())
+        .values_list("id", "allowed")
+    )
+    counts = {
+        row["payment_id"]: row
+        for row in Booking.objects.filter(status="active", payment_id__in=allowed)
+        .values("payment_id")
+        .annotate(
+            used=Count(
+                "id",
+                filter=Q(attendance_status="attended")
+                | Q(attendance_status="pending", class_date__gte=today),
+            ),
+            no_shows=Count("id", filter=Q(attendance_status="no_show")),
+        )
+    }
+
+    rows = [
+        PaymentEntitlement(
+            payment_id=payment_id,
+            allowed=allowed_classes,
+            used=counts.get(payment_id, {}).get("used", 0),
+            no_shows=counts.get(payment_id, {}).get("no_shows", 0),
+            counted_on=today,
+        )
+        for payment_id, allowed_classes in allowed.items()
+    ]
+    PaymentEntitlement.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["payment"],
+        update_fields=["allowed", "used", "no_shows", "counted_on", "updated_at"],
+    )
+    return len(rows)
+
+
+def rebuild_entitlements(only_valid=False):
+    """Reconstruye el libro completo (o solo de pagos vigentes) por lotes."""
+    payments = Payment.objects.order_by("id")
+    if only_valid:
+        payments = payments.filter(valid_until__gte=timezone.localdate())
+    payment_ids = list(payments.values_list("id", flat=True))
+
+    total = 0
+    for start in range(0, len(payment_ids), REBUILD_BATCH_SIZE):
+        total += refresh_entitlements(payment_ids[start : start + REBUILD_BATCH_SIZE])
+    return total
+
+
+def refresh_recent_entitlements(days=7):
+    """
+    Recalcula los pagos con clases en los últimos ``days`` días: las reservas
+    pendientes de esas fechas ya no cuentan como usadas.
+    """
+    today = timezone.localdate()
+    payment_ids = (
+        Booking.objects.filter(
+            class_date__gte=today - timedelta(days=days),
+            class_date__lt=today,
+            payment__isnull=False,
+        )
+        .values_list("payment_id", flat=True)
+        .distinct()
+    )
+    return refresh_entitlements(payment_ids)
+
+
+def change_entitlements(removed=(), added=()):
+    """
+    Aplica al libro las claves ``(payment_id, campo)`` de
+    ``Booking.entitlement_key`` que dejan de contar (``removed``) o empiezan a
+    contar (``added``). Debe llamarse después de guardar las reservas: si falta
+    la fila del pago se crea con el conteo real.
+    """
+    deltas = Counter()
+    for key in removed:
+        if key is not None:
+            deltas[key] -= 1
+    for key in added:
+        if key is not None:
+            deltas[key] += 1
+
+    by_payment = defaultdict(dict)
+    for (payment_id, field), delta in deltas.items():
+        if delta:
+            by_payment[payment_id][field] = delta
+
+    # Un UPDATE por combinación de cambios, no por pago
+    by_change = defaultdict(list)
+    for payment_id, fields in by_payment.items():
+        by_change[tuple(sorted(fields.items()))].append(payment_id)
+
+    missing = []
+    for change, payment_ids in by_change.items():
+        rows = PaymentEntitlement.objects.filter(payment_id__in=payment_ids)
+        updated = rows.update(
+            updated_at=timezone.now(),
+            **{field: Greatest(F(field) + delta, Value(0)) for field, delta in change},
+        )
+        if updated < len(payment_ids):
+            existing = set(rows.values_list("payment_id", flat=True))
+            missing += [payment_id for payment_id in payment_ids if payment_id not in existing]
+    refresh_entitlements(missing)
+
+
+def get_entitlements(payments, lock=False):
+    """
+    Filas del libro de ``payments`` (instancias o ids) como
+    ``{payment_id: PaymentEntitlement}``; las faltantes y las recalculadas
+    antes de hoy se recalculan. Con ``lock=True`` se bloquean hasta el final
+    de la transacción.
+    """
+    payment_ids = {getattr(payment, "pk", payment) for payment in payments}
+    if not payment_ids:
+        return {}
+    queryset = PaymentEntitlement.objects.all()
+    if lock:
+        queryset = queryset.select_for_update()
+
+    today = timezone.localdate()
+    entitlements = queryset.in_bulk(payment_ids)
+    stale = payment_ids - {
+        payment_id
+        for payment_id, entitlement in entitlements.items()
+        if entitlement.counted_on is not None and entitlement.counted_on >= today
+    }
+    if stale:
+        refresh_entitlements(stale)
+        entitlements.update(queryset.in_bulk(stale))
+    return entitlements
+
+
+def get_entitlement(payment, lock=False):
+    """
+    Fila del libro de ``payment`` (instancia o id). Con ``lock=True`` se
+    bloquea hasta el final de la transacción.
+    """
+    payment_id = getattr(payment, "pk", payment)
+    return get_entitlements([payment_id], lock=lock).get(payment_id)
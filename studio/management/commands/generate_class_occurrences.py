@@ -0,0 +1,33 @@
+# studio/management/commands/generate_class_occurrences.py
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from studio.occurrences import OCCURRENCE_WEEKS_AHEAD, generate_occurrences
+
+
+class Command(BaseCommand):
+    help = "Genera el calendario de clases (ClassOccurrence) a partir de los horarios"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--weeks",
+            type=int,
+            default=OCCURRENCE_WEEKS_AHEAD,
+            help=f"Semanas a generar (por defecto {OCCURRENCE_WEEKS_AHEAD})",
+        )
+        parser.add_argument(
+            "--from-date",
+            type=str,
+            help="Generar desde esta fecha (YYYY-MM-DD); por defecto hoy",
+        )
+
+    def handle(self, *args, **options):
+        start = None
+        if options["from_date"]:
+            start = parse_date(options["from_date"])
+            if not start:
+                raise CommandError("Formato de fecha inválido. Usa YYYY-MM-DD.")
+
+        total = generate_occurrences(weeks=options["weeks"], start=start)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Calendario generado: {total} clases"))
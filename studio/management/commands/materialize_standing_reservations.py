@@ -0,0 +1,41 @@
+# studio/management/commands/materialize_standing_reservations.py
+from django.core.management.base import BaseCommand
+
+from studio.standing import STANDING_WEEKS_AHEAD, materialize_standing_reservations
+
+
+class Command(BaseCommand):
+    help = "Genera las reservas de las próximas semanas a partir de las reservas fijas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--weeks",
+            type=int,
+            default=STANDING_WEEKS_AHEAD,
+            help=f"Semanas a generar desde hoy (por defecto {STANDING_WEEKS_AHEAD})",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Muestra el resultado sin guardar nada",
+        )
+
+    def handle(self, *args, **options):
+        result = materialize_standing_reservations(
+            weeks=options["weeks"], dry_run=options["dry_run"]
+        )
+
+        for conflict in result["conflicts"]:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"⚠️ {conflict['client']} - horario {conflict['schedule_id']} "
+                    f"{conflict['class_date']}: {conflict['error']}"
+                )
+            )
+        prefix = "(simulación) " if options["dry_run"] else ""
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {prefix}{result['created']} reservas creadas de "
+                f"{result['standings']} reservas fijas, {len(result['conflicts'])} conflictos"
+            )
+        )
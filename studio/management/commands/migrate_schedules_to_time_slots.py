@@ -1,5 +1,8 @@
 from django.core.management.base import BaseCommand
+from collections import defaultdict
+
 from studio.models import Schedule, TimeSlot, Sede
+from studio.schedule_overlap import validate_schedules
 from django.db import transaction
 
 
@@ -20,23 +23,31 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING("DRY RUN - No changes will be made"))
         
         # Get all schedules that need migration
-        schedules_to_migrate = Schedule.objects.filter(sede__isnull=False)
+        schedules_to_migrate = list(
+            Schedule.objects.filter(sede__isnull=False).select_related("sede")
+        )
         
-        self.stdout.write(f"Found {schedules_to_migrate.count()} schedules to migrate")
+        self.stdout.write(f"Found {len(schedules_to_migrate)} schedules to migrate")
+        
+        # TimeSlots activos por sede, cargados una sola vez
+        time_slots_by_sede = defaultdict(list)
+        for time_slot in TimeSlot.objects.filter(is_active=True).order_by('start_time'):
+            time_slots_by_sede[time_slot.sede_id].append(time_slot)
         
         migrated_count = 0
         skipped_count = 0
+        to_update = []
         
         with transaction.atomic():
             for schedule in schedules_to_migrate:
                 # Find matching TimeSlot for this schedule's sede and time_slot
-                try:
-                    time_slot = TimeSlot.objects.get(
-                        sede=schedule.sede,
-                        start_time=schedule.time_slot,
-                        is_active=True
-                    )
-                    
+                time_slots = time_slots_by_sede[schedule.sede_id]
+                time_slot = next(
+                    (t for t in time_slots if t.time_slot_value == schedule.time_slot),
+                    None,
+                )
+                
+                if time_slot:
                     if dry_run:
                         self.stdout.write(f"Would migrate Schedule {schedule.id}:")
                         self.stdout.write(f"  - Sede: {schedule.sede.name}")
@@ -51,29 +62,39 @@ class Command(BaseCommand):
                     
                     migrated_count += 1
                     
-                except TimeSlot.DoesNotExist:
+                else:
                     # This schedule has a time_slot that doesn't exist in TimeSlot
                     self.stdout.write(f"⚠️  Schedule {schedule.id} has invalid time_slot: {schedule.time_slot}")
                     self.stdout.write(f"   Sede: {schedule.sede.name}")
                     self.stdout.write(f"   Day: {schedule.day}")
                     
                     # Try to find the closest TimeSlot
-                    closest_time_slot = TimeSlot.objects.filter(
-                        sede=schedule.sede,
-                        is_active=True
-                    ).order_by('start_time').first()
+                    closest_time_slot = time_slots[0] if time_slots else None
                     
                     if closest_time_slot:
                         if dry_run:
                             self.stdout.write(f"   Would update to: {closest_time_slot.start_time}")
                         else:
-                            schedule.time_slot = closest_time_slot.start_time.strftime('%H:%M')
-                            schedule.save()
-                            self.stdout.write(f"   ✅ Updated to: {closest_time_slot.start_time}")
+                            schedule.time_slot = closest_time_slot.time_slot_value
+                            to_update.append(schedule)
                         migrated_count += 1
                     else:
                         self.stdout.write(f"   ❌ No TimeSlots found for sede {schedule.sede.name}")
                         skipped_count += 1
+            
+            # Validar todos los cambios juntos y guardar solo los que no se solapan
+            invalid = validate_schedules(to_update)
+            for schedule, message in invalid:
+                self.stdout.write(f"   ❌ Schedule {schedule.id}: {message}")
+            invalid_ids = {schedule.id for schedule, _ in invalid}
+            valid = [s for s in to_update if s.id not in invalid_ids]
+            for schedule in valid:
+                # save() (no bulk_update) para que las señales invaliden la
+                # disponibilidad y regeneren las ocurrencias
+                schedule.save(validate_overlap=False, update_fields=["time_slot"])
+                self.stdout.write(f"   ✅ Schedule {schedule.id} updated to: {schedule.time_slot}")
+            migrated_count -= len(invalid)
+            skipped_count += len(invalid)
         
         if dry_run:
             self.stdout.write(f"\nWould migrate: {migrated_count} schedules")
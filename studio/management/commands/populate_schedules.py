@@ -1,6 +1,7 @@
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand
-from studio.models import ClassType, Schedule, Sede
+from studio.models import ClassType, Schedule, Sede, TimeSlot
+from studio.schedule_overlap import validate_schedules
 
 User = get_user_model()
 
@@ -36,15 +37,29 @@ class Command(BaseCommand):
             )
             return
 
-        created_count = 0
+        # Horarios configurados (TimeSlot) y schedules existentes de la sede
+        time_slots = list(
+            TimeSlot.objects.filter(sede=sede_punto_roosevelt, is_active=True).order_by(
+                "start_time"
+            )
+        )
+        existing = {
+            (schedule.day, schedule.time_slot): schedule
+            for schedule in Schedule.objects.filter(
+                sede=sede_punto_roosevelt
+            ).select_related("coach")
+        }
+        new_schedules = []
 
         for day_code, day_name in Schedule.DAY_CHOICES:
             if day_code == "SUN":
                 self.stdout.write("⛔ Domingo omitido.")
                 continue  # No crear horarios para domingo
 
-            for time_code, time_display in Schedule.TIME_SLOTS:
-                hour = int(time_code.split(":")[0])
+            for time_slot in time_slots:
+                time_code = time_slot.time_slot_value
+                time_display = time_slot.time_slot_display
+                hour = time_slot.start_time.hour
 
                 # Sábados: solo horarios de 07:00 a 10:00
                 if day_code == "SAT" and (hour < 7 or hour > 10):
@@ -61,33 +76,49 @@ class Command(BaseCommand):
                     coach = None
 
                 if coach:
-                    schedule, created = Schedule.objects.get_or_create(
-                        day=day_code,
-                        time_slot=time_code,
-                        sede=sede_punto_roosevelt,
-                        defaults={
-                            "class_type": pilates_reformer,
-                            "is_individual": False,
-                            "capacity": 9,
-                            "coach": coach,
-                        },
-                    )
-                    if created:
-                        created_count += 1
-                        self.stdout.write(
-                            self.style.SUCCESS(
-                                f"✅ Creado: {day_name} {time_display} con {coach.username} en {sede_punto_roosevelt.name}"
+                    schedule = existing.get((day_code, time_code))
+                    if schedule is None:
+                        new_schedules.append(
+                            Schedule(
+                                day=day_code,
+                                time_slot=time_code,
+                                sede=sede_punto_roosevelt,
+                                class_type=pilates_reformer,
+                                is_individual=False,
+                                capacity=9,
+                                coach=coach,
                             )
                         )
                     else:
+                        coach_name = schedule.coach.username if schedule.coach else "sin coach"
                         self.stdout.write(
-                            f"➡️ Ya existe: {day_name} {time_display} con {schedule.coach.username} en {sede_punto_roosevelt.name}"
+                            f"➡️ Ya existe: {day_name} {time_display} con {coach_name} en {sede_punto_roosevelt.name}"
                         )
                 else:
                     self.stdout.write(
                         f"⚠️ Omitido: {day_name} {time_display} (sin coach asignado)"
                     )
 
+        # Se validan todos los nuevos juntos (y contra los existentes) en una pasada
+        invalid = validate_schedules(new_schedules)
+        for schedule, message in invalid:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"⚠️ Omitido: {schedule.get_day_display()} {schedule.time_slot} ({message})"
+                )
+            )
+        invalid_ids = {id(schedule) for schedule, _ in invalid}
+        created = [s for s in new_schedules if id(s) not in invalid_ids]
+        for schedule in created:
+            # save() (no bulk_create) para que las señales invaliden la
+            # disponibilidad y generen las ocurrencias; ya se validó arriba
+            schedule.save(validate_overlap=False)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"✅ Creado: {schedule.get_day_display()} {schedule.time_slot} con {schedule.coach.username} en {sede_punto_roosevelt.name}"
+                )
+            )
+
         self.stdout.write(
-            self.style.SUCCESS(f"🎉 Total de nuevos schedules creados para {sede_punto_roosevelt.name}: {created_count}")
+            self.style.SUCCESS(f"🎉 Total de nuevos schedules creados para {sede_punto_roosevelt.name}: {len(created)}")
         )
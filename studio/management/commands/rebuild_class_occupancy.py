@@ -0,0 +1,31 @@
+# studio/management/commands/rebuild_class_occupancy.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from studio.seats import rebuild_occupancy
+
+
+class Command(BaseCommand):
+    help = "Recalcula los contadores de cupos (ClassOccupancy) a partir de las reservas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--from-date",
+            type=str,
+            help="Solo recalcular clases desde esta fecha (YYYY-MM-DD)",
+        )
+
+    def handle(self, *args, **options):
+        from_date = None
+        if options["from_date"]:
+            from_date = parse_date(options["from_date"])
+            if not from_date:
+                raise CommandError("Formato de fecha inválido. Usa YYYY-MM-DD.")
+
+        with transaction.atomic():
+            fixed = rebuild_occupancy(from_date)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ Contadores de cupos recalculados: {fixed} corregidos")
+        )
@@ -0,0 +1,44 @@
+# studio/management/commands/rebuild_closing_facts.py
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from studio.closing_facts import activity_range, rebuild_closing_facts
+
+
+class Command(BaseCommand):
+    help = "Recalcula los cierres diarios (DailyClosingFact) desde pagos, ventas y reservas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--from-date",
+            type=str,
+            help="Recalcular desde esta fecha (YYYY-MM-DD); por defecto el primer movimiento",
+        )
+        parser.add_argument(
+            "--to-date",
+            type=str,
+            help="Recalcular hasta esta fecha (YYYY-MM-DD); por defecto el último movimiento",
+        )
+
+    def handle(self, *args, **options):
+        bounds = {}
+        for option in ("from_date", "to_date"):
+            if options[option]:
+                bounds[option] = parse_date(options[option])
+                if not bounds[option]:
+                    raise CommandError("Formato de fecha inválido. Usa YYYY-MM-DD.")
+
+        activity = activity_range()
+        if activity is None and len(bounds) < 2:
+            self.stdout.write("No hay pagos, ventas ni reservas")
+            return
+        start = bounds.get("from_date") or activity[0]
+        end = bounds.get("to_date") or activity[1]
+        if end < start:
+            raise CommandError("La fecha final debe ser igual o posterior a la inicial.")
+
+        total = rebuild_closing_facts(start, end)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ Cierres recalculados del {start} al {end}: {total} filas")
+        )
@@ -0,0 +1,24 @@
+# studio/management/commands/rebuild_payment_entitlements.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from studio.entitlements import rebuild_entitlements
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el libro de clases por pago (PaymentEntitlement) a partir de las reservas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--only-valid",
+            action="store_true",
+            help="Solo pagos vigentes (valid_until >= hoy)",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = rebuild_entitlements(only_valid=options["only_valid"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ Libro de clases reconstruido para {total} pagos")
+        )
@@ -0,0 +1,48 @@
+# studio/management/commands/reconcile_monthly_revenue.py
+from django.core.management.base import BaseCommand, CommandError
+
+from studio.revenue import reconcile_monthly_revenue
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara MonthlyRevenue (por sede y global) con un recálculo agrupado de "
+        "pagos y ventas y corrige las diferencias"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, help="Solo este año")
+        parser.add_argument("--month", type=int, help="Solo este mes (requiere --year)")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Mostrar las diferencias sin corregirlas",
+        )
+
+    def handle(self, *args, **options):
+        year, month = options["year"], options["month"]
+        if month and not year:
+            raise CommandError("--month requiere --year.")
+        if month and not 1 <= month <= 12:
+            raise CommandError("El mes debe estar entre 1 y 12.")
+
+        months = None
+        if year:
+            months = {(year, month)} if month else {(year, m) for m in range(1, 13)}
+
+        drift = reconcile_monthly_revenue(months, repair=not options["dry_run"])
+
+        for row in drift:
+            sede = row["sede_id"] or "global"
+            before = row["before"]["total_amount"] if row["before"] else "-"
+            self.stdout.write(
+                f"{row['year']}-{row['month']:02d} sede {sede}: "
+                f"Q{before} -> Q{row['after']['total_amount']}"
+            )
+
+        if options["dry_run"]:
+            self.stdout.write(f"{len(drift)} filas con diferencias (sin cambios)")
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"✅ Ingresos mensuales conciliados: {len(drift)} filas corregidas")
+            )
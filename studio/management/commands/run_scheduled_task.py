@@ -0,0 +1,19 @@
+# studio/management/commands/run_scheduled_task.py
+from django.core.management.base import BaseCommand
+
+from studio.tasks.jobs import TASKS, run_scheduled_task
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta tareas programadas por id (para un cron del sistema cuando el "
+        "scheduler no corre dentro del proceso)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("task_ids", nargs="+", choices=sorted(TASKS))
+
+    def handle(self, *args, **options):
+        for task_id in options["task_ids"]:
+            run_scheduled_task(task_id)
+            self.stdout.write(self.style.SUCCESS(f"✅ Tarea {task_id} ejecutada"))
@@ -448,3 +448,48 @@ def send_bulk_booking_confirmation_email(client, bookings):
         html_message=html_message,
         fail_silently=False,
     )
+
+
+def send_waitlist_promotion_email(booking, client):
+    """Enviar email cuando un cliente pasa de la lista de espera a la clase"""
+    class_name = booking.schedule.class_type.name if booking.schedule.class_type else "Clase"
+
+    subject = f"¡Tienes lugar! - {class_name}"
+
+    html_message = f"""
+    <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+        <div style="text-align: center; padding: 20px; background-color: #f8f9fa;">
+            <img src="https://revivepilates.s3.us-east-2.amazonaws.com/imgs/revivewhite.png" alt="Revive Pilates" style="max-width: 200px;">
+            <h1 style="color: #2c3e50; margin-top: 20px;">Se liberó un cupo</h1>
+        </div>
+
+        <div style="padding: 30px;">
+            <p>Hola {client.first_name},</p>
+
+            <p>Se liberó un lugar en la clase en la que estabas en lista de espera y ya quedó reservado a tu nombre.</p>
+
+            <div style="background-color: #d4edda; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                <h3 style="color: #155724; margin-top: 0;">✅ Detalles de tu clase:</h3>
+                <p><strong>Clase:</strong> {class_name}</p>
+                <p><strong>Fecha:</strong> {booking.class_date}</p>
+                <p><strong>Hora:</strong> {booking.schedule.time_slot}</p>
+            </div>
+
+            <p>Si ya no puedes asistir, cancela tu reserva desde tu cuenta para liberar el lugar.</p>
+
+            <p>Saludos,<br>
+            <strong>Equipo Revive Pilates</strong></p>
+        </div>
+    </div>
+    """
+
+    plain_message = strip_tags(html_message)
+
+    send_mail(
+        subject,
+        plain_message,
+        "no-reply@revivepilatesgt.com",
+        [client.email],
+        html_message=html_message,
+        fail_silently=False,
+    )
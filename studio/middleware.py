@@ -1,11 +1,31 @@
 import logging
 
 # from django.http import JsonResponse
+from django.conf import settings
+from django.core.cache import cache
 from django.utils.deprecation import MiddlewareMixin
 from studio.models import Sede
 
 logger = logging.getLogger(__name__)
 
+ACTIVE_SEDE_IDS_CACHE_KEY = "sedes:active_ids"
+
+
+def get_active_sede_ids():
+    """
+    IDs de sedes activas, en cache hasta que cambie alguna Sede (o unos
+    segundos si el cache no es compartido entre instancias).
+    """
+    return cache.get_or_set(
+        ACTIVE_SEDE_IDS_CACHE_KEY,
+        lambda: list(Sede.objects.filter(status=True).values_list("id", flat=True)),
+        None if settings.SHARED_CACHE else settings.LOCAL_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_active_sede_ids():
+    cache.delete(ACTIVE_SEDE_IDS_CACHE_KEY)
+
 
 class SedeFilterMiddleware(MiddlewareMixin):
     """
@@ -56,8 +76,10 @@ class SedeFilterMiddleware(MiddlewareMixin):
         valid_sede_ids = []
 
         if sede_ids:
-            valid_sedes = Sede.objects.filter(id__in=sede_ids, status=True)
-            valid_sede_ids = list(valid_sedes.values_list("id", flat=True))
+            active_sede_ids = set(get_active_sede_ids())
+            valid_sede_ids = [
+                sede_id for sede_id in sede_ids if sede_id in active_sede_ids
+            ]
 
             if len(valid_sede_ids) != len(sede_ids):
                 invalid_ids = set(sede_ids) - set(valid_sede_ids)
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('studio', '0006_payment_effective_from_payment_effective_until_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('class_date', models.DateField()),
+                ('booked', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancies', to='studio.schedule')),
+            ],
+            options={
+                'verbose_name': 'Ocupación de clase',
+                'verbose_name_plural': 'Ocupación de clases',
+                'unique_together': {('schedule', 'class_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('studio', '0007_classoccupancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bulkbooking',
+            name='failed_items',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='bulkbooking',
+            name='request_data',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('studio', '0008_bulkbooking_request_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentEntitlement',
+            fields=[
+                ('payment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='entitlement', serialize=False, to='studio.payment')),
+                ('allowed', models.PositiveIntegerField(default=0, help_text='Clases del plan o promoción más extras. 0 = ilimitado.')),
+                ('used', models.PositiveIntegerField(default=0, help_text='Reservas activas asistidas o pendientes a futuro.')),
+                ('no_shows', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Clases por pago',
+                'verbose_name_plural': 'Clases por pago',
+            },
+        ),
+    ]
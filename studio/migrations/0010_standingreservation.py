@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_client_email_sent_client_first_login_and_more'),
+        ('studio', '0009_paymententitlement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StandingReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(blank=True, help_text='Vacío = sin fecha de fin', null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('materialized_until', models.DateField(blank=True, null=True)),
+                ('last_conflict', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='standing_reservations', to='accounts.client')),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='standing_reservations', to='studio.schedule')),
+                ('sede', models.ForeignKey(blank=True, help_text='Sede del horario reservado', null=True, on_delete=django.db.models.deletion.CASCADE, to='studio.sede')),
+            ],
+            options={
+                'verbose_name': 'Reserva fija',
+                'verbose_name_plural': 'Reservas fijas',
+                'ordering': ['client', 'schedule'],
+                'indexes': [models.Index(fields=['is_active', 'materialized_until'], name='studio_stan_is_acti_5b4af8_idx')],
+            },
+        ),
+    ]
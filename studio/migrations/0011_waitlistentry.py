@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_client_email_sent_client_first_login_and_more'),
+        ('studio', '0010_standingreservation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('class_date', models.DateField()),
+                ('status', models.CharField(choices=[('waiting', 'En espera'), ('promoted', 'Promovido'), ('skipped', 'Omitido'), ('left', 'Salió de la lista')], default='waiting', max_length=10)),
+                ('notes', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('booking', models.OneToOneField(blank=True, help_text='Reserva creada al promover', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_entry', to='studio.booking')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='accounts.client')),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='studio.schedule')),
+                ('sede', models.ForeignKey(blank=True, help_text='Sede del horario', null=True, on_delete=django.db.models.deletion.CASCADE, to='studio.sede')),
+            ],
+            options={
+                'verbose_name': 'Lista de espera',
+                'verbose_name_plural': 'Lista de espera',
+                'ordering': ['schedule', 'class_date', 'created_at', 'id'],
+                'indexes': [models.Index(fields=['schedule', 'class_date', 'status', 'created_at'], name='waitlist_queue_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'waiting')), fields=('client', 'schedule', 'class_date'), name='unique_waiting_client_per_class')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('studio', '0011_waitlistentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassOccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('capacity', models.PositiveIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('coach', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='class_occurrences', to=settings.AUTH_USER_MODEL)),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='studio.schedule')),
+                ('sede', models.ForeignKey(blank=True, help_text='Sede del horario', null=True, on_delete=django.db.models.deletion.CASCADE, to='studio.sede')),
+            ],
+            options={
+                'verbose_name': 'Clase programada',
+                'verbose_name_plural': 'Clases programadas',
+                'ordering': ['start'],
+                'indexes': [models.Index(fields=['sede', 'start'], name='occurrence_sede_start_idx')],
+                'unique_together': {('schedule', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('studio', '0012_classoccurrence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='classoccurrence',
+            index=models.Index(fields=['coach', 'start'], name='occurrence_coach_start_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('studio', '0013_classoccurrence_coach_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyClosingFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('efectivo', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('transferencia', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('visalink', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_pagos', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('paquetes_vendidos', models.PositiveIntegerField(default=0)),
+                ('total_ventas', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('asistencias', models.PositiveIntegerField(default=0)),
+                ('pruebas', models.PositiveIntegerField(default=0)),
+                ('no_shows', models.PositiveIntegerField(default=0)),
+                ('clases_individuales', models.PositiveIntegerField(default=0)),
+                ('individuales_asistidas', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('sede', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='studio.sede')),
+            ],
+            options={
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'sede'), name='unique_closing_fact_per_sede'), models.UniqueConstraint(condition=models.Q(('sede__isnull', True)), fields=('date',), name='unique_closing_fact_without_sede')],
+            },
+        ),
+    ]
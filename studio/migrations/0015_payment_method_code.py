@@ -0,0 +1,66 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:10
+
+import unicodedata
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Copia de studio.models.PAYMENT_METHOD_ALIASES al crear la migración
+ALIASES = {
+    "efectivo": "efectivo",
+    "cash": "efectivo",
+    "transferencia": "transferencia",
+    "transfer": "transferencia",
+    "deposito": "transferencia",
+    "visalink": "visalink",
+    "card": "visalink",
+}
+
+
+def normalize(value):
+    if not value:
+        return "otro"
+    key = unicodedata.normalize("NFKD", value).encode("ascii", "ignore").decode()
+    return ALIASES.get(key.strip().lower(), "otro")
+
+
+def backfill_methods(apps, schema_editor):
+    # Un UPDATE por cada texto distinto (son pocos), no por fila
+    for model_name in ("Payment", "Venta"):
+        model = apps.get_model("studio", model_name)
+        values = model.objects.values_list("payment_method", flat=True).distinct()
+        for value in list(values):
+            method = normalize(value)
+            if method != "otro":
+                model.objects.filter(payment_method=value).update(method=method)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_client_email_sent_client_first_login_and_more'),
+        ('studio', '0014_dailyclosingfact'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='method',
+            field=models.CharField(choices=[('efectivo', 'Efectivo'), ('transferencia', 'Transferencia / depósito'), ('visalink', 'VisaLink / tarjeta'), ('otro', 'Otro')], default='otro', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='venta',
+            name='method',
+            field=models.CharField(choices=[('efectivo', 'Efectivo'), ('transferencia', 'Transferencia / depósito'), ('visalink', 'VisaLink / tarjeta'), ('otro', 'Otro')], default='otro', editable=False, max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['date_paid', 'method'], name='payment_date_method_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['date_sold', 'method'], name='venta_date_method_idx'),
+        ),
+        migrations.RunPython(backfill_methods, migrations.RunPython.noop),
+    ]
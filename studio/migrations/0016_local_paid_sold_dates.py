@@ -0,0 +1,63 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:11
+
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def backfill_local_dates(apps, schema_editor):
+    # Un UPDATE por tabla: la fecha local se calcula en la base de datos
+    tz = ZoneInfo(settings.TIME_ZONE)
+    Payment = apps.get_model("studio", "Payment")
+    Venta = apps.get_model("studio", "Venta")
+    Payment.objects.update(paid_on=TruncDate("date_paid", tzinfo=tz))
+    Venta.objects.update(sold_on=TruncDate("date_sold", tzinfo=tz))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_client_email_sent_client_first_login_and_more'),
+        ('studio', '0015_payment_method_code'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='payment',
+            name='payment_date_method_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='venta',
+            name='venta_date_method_idx',
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='paid_on',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='venta',
+            name='sold_on',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_local_dates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['paid_on', 'sede'], name='payment_paid_on_sede_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['paid_on', 'method'], name='payment_paid_on_method_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['sold_on', 'sede'], name='venta_sold_on_sede_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['sold_on', 'method'], name='venta_sold_on_method_idx'),
+        ),
+    ]
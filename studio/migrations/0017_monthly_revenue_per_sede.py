@@ -0,0 +1,64 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:24
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def clear_monthly_revenue(apps, schema_editor):
+    # Las filas globales podían estar duplicadas; se recalculan abajo
+    apps.get_model("studio", "MonthlyRevenue").objects.all().delete()
+
+
+def backfill_monthly_revenue(apps, schema_editor):
+    # Filas por sede y globales desde dos consultas agrupadas
+    MonthlyRevenue = apps.get_model("studio", "MonthlyRevenue")
+    Payment = apps.get_model("studio", "Payment")
+    Venta = apps.get_model("studio", "Venta")
+
+    totals = defaultdict(
+        lambda: {"total_amount": 0, "payment_count": 0, "venta_total": 0, "venta_count": 0}
+    )
+    for model, field, amount, amount_fields, count_field in (
+        (Payment, "paid_on", "amount", ("total_amount",), "payment_count"),
+        (Venta, "sold_on", "total_amount", ("total_amount", "venta_total"), "venta_count"),
+    ):
+        rows = (
+            model.objects.filter(**{f"{field}__isnull": False})
+            .order_by()
+            .annotate(year=ExtractYear(field), month=ExtractMonth(field))
+            .values("year", "month", "sede_id")
+            .annotate(total=Sum(amount), count=Count("id"))
+        )
+        for row in rows:
+            for scope in {row["sede_id"], None}:
+                bucket = totals[(row["year"], row["month"], scope)]
+                for total_field in amount_fields:
+                    bucket[total_field] += row["total"] or 0
+                bucket[count_field] += row["count"]
+
+    MonthlyRevenue.objects.bulk_create(
+        [
+            MonthlyRevenue(year=year, month=month, sede_id=sede_id, **values)
+            for (year, month, sede_id), values in totals.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('studio', '0016_local_paid_sold_dates'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_monthly_revenue, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='monthlyrevenue',
+            constraint=models.UniqueConstraint(condition=models.Q(('sede__isnull', True)), fields=('year', 'month'), name='unique_global_monthly_revenue'),
+        ),
+        migrations.RunPython(backfill_monthly_revenue, migrations.RunPython.noop),
+    ]
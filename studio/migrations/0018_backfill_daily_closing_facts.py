@@ -0,0 +1,94 @@
+# Generated by Django 5.2.6 on 2026-10-17 09:12
+
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count, F, Q, Sum
+
+METHOD_FIELDS = ("efectivo", "transferencia", "visalink")
+FACT_FIELDS = (
+    "efectivo",
+    "transferencia",
+    "visalink",
+    "total_pagos",
+    "paquetes_vendidos",
+    "total_ventas",
+    "asistencias",
+    "pruebas",
+    "no_shows",
+    "clases_individuales",
+    "individuales_asistidas",
+)
+
+
+def backfill_closing_facts(apps, schema_editor):
+    # Mismas tres consultas agrupadas que reporting.daily_buckets(by_sede=True)
+    DailyClosingFact = apps.get_model("studio", "DailyClosingFact")
+    Payment = apps.get_model("studio", "Payment")
+    Venta = apps.get_model("studio", "Venta")
+    Booking = apps.get_model("studio", "Booking")
+
+    totals = defaultdict(lambda: dict.fromkeys(FACT_FIELDS, 0))
+
+    payments = (
+        Payment.objects.filter(paid_on__isnull=False)
+        .order_by()
+        .annotate(day=F("paid_on"))
+        .values("day", "sede_id", "method")
+        .annotate(total=Sum("amount"), count=Count("id"))
+    )
+    for row in payments:
+        bucket = totals[(row["day"], row["sede_id"])]
+        bucket["total_pagos"] += row["total"] or 0
+        bucket["paquetes_vendidos"] += row["count"]
+        if row["method"] in METHOD_FIELDS:
+            bucket[row["method"]] += row["total"] or 0
+
+    ventas = (
+        Venta.objects.filter(sold_on__isnull=False)
+        .order_by()
+        .annotate(day=F("sold_on"))
+        .values("day", "sede_id")
+        .annotate(total=Sum("total_amount"))
+    )
+    for row in ventas:
+        totals[(row["day"], row["sede_id"])]["total_ventas"] += row["total"] or 0
+
+    attended = Q(attendance_status="attended")
+    individual = Q(schedule__is_individual=True)
+    bookings = (
+        Booking.objects.order_by()
+        .annotate(day=F("class_date"))
+        .values("day", "sede_id")
+        .annotate(
+            asistencias=Count("id", filter=attended),
+            pruebas=Count("id", filter=attended & Q(client__trial_used=True)),
+            no_shows=Count("id", filter=Q(attendance_status="no_show")),
+            clases_individuales=Count("id", filter=individual),
+            individuales_asistidas=Count("id", filter=attended & individual),
+        )
+    )
+    for row in bookings:
+        bucket = totals[(row.pop("day"), row.pop("sede_id"))]
+        for field, value in row.items():
+            bucket[field] += value
+
+    DailyClosingFact.objects.all().delete()
+    DailyClosingFact.objects.bulk_create(
+        [
+            DailyClosingFact(date=day, sede_id=sede_id, **values)
+            for (day, sede_id), values in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('studio', '0017_monthly_revenue_per_sede'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_closing_facts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 09:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('studio', '0018_backfill_daily_closing_facts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymententitlement',
+            name='counted_on',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
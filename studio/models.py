@@ -1,9 +1,10 @@
 # studio/models.py
-from datetime import timedelta, date
+import unicodedata
+from datetime import datetime, timedelta, date
 
 from accounts.models import Client, CustomUser
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 
@@ -120,63 +121,30 @@ class Schedule(models.Model):
     # Manager personalizado
     objects = ScheduleManager()
 
-    def save(self, *args, **kwargs):
+    def save(self, *args, validate_overlap=True, **kwargs):
         # Si es una clase individual, forzamos la capacidad a 1.
         if self.is_individual:
             self.capacity = 1
         
         # Validar que no haya solapamiento de horarios para la misma sede y día
-        self.validate_no_overlap()
+        # (los comandos masivos validan antes con validate_schedules)
+        if validate_overlap:
+            self.validate_no_overlap()
         
         super().save(*args, **kwargs)
     
-    def validate_no_overlap(self):
-        """Valida que no haya solapamiento de horarios para la misma sede y día"""
-        if not self.sede or not self.day or not self.time_slot:
+    def validate_no_overlap(self, checker=None):
+        """
+        Valida que no haya solapamiento de horarios para la misma sede y día.
+        ``checker`` (``OverlapChecker``) permite reutilizar los horarios ya
+        cargados al validar varios seguidos.
+        """
+        if not self.sede_id or not self.day or not self.time_slot:
             return
-        
-        # Buscar TimeSlot correspondiente
-        try:
-            time_slot_obj = TimeSlot.objects.get(
-                sede=self.sede,
-                start_time=self.time_slot,
-                is_active=True
-            )
-            start_time = time_slot_obj.start_time
-            end_time = time_slot_obj.end_time
-        except TimeSlot.DoesNotExist:
-            # Si no existe TimeSlot, usar duración de 1 hora como fallback
-            from datetime import datetime, timedelta
-            start_time = datetime.strptime(self.time_slot, "%H:%M").time()
-            end_time = (datetime.combine(datetime.today(), start_time) + timedelta(hours=1)).time()
-        
-        # Buscar schedules que se solapen
-        overlapping_schedules = Schedule.objects.filter(
-            sede=self.sede,
-            day=self.day
-        ).exclude(id=self.id)  # Excluir el schedule actual si es una actualización
-        
-        for schedule in overlapping_schedules:
-            try:
-                schedule_time_slot = TimeSlot.objects.get(
-                    sede=schedule.sede,
-                    start_time=schedule.time_slot,
-                    is_active=True
-                )
-                schedule_start = schedule_time_slot.start_time
-                schedule_end = schedule_time_slot.end_time
-            except TimeSlot.DoesNotExist:
-                from datetime import datetime, timedelta
-                schedule_start = datetime.strptime(schedule.time_slot, "%H:%M").time()
-                schedule_end = (datetime.combine(datetime.today(), schedule_start) + timedelta(hours=1)).time()
-            
-            # Verificar solapamiento
-            if (start_time < schedule_end and end_time > schedule_start):
-                raise ValidationError(
-                    f"El horario se solapa con otro schedule existente: "
-                    f"{schedule.get_day_display()} {schedule.time_slot} "
-                    f"({schedule.class_type.name if schedule.class_type else 'Sin tipo'})"
-                )
+        from .schedule_overlap import OverlapChecker
+
+        checker = checker or OverlapChecker.for_schedules([self])
+        checker.check(self)
 
     def __str__(self):
         tipo = "Individual" if self.is_individual else "Grupal"
@@ -309,6 +277,45 @@ class PromotionInstance(models.Model):
         return f"Compra #{self.id} - {self.promotion.name}"
 
 
+PAYMENT_METHOD_CHOICES = [
+    ("efectivo", "Efectivo"),
+    ("transferencia", "Transferencia / depósito"),
+    ("visalink", "VisaLink / tarjeta"),
+    ("otro", "Otro"),
+]
+
+# Texto libre (sin tildes, en minúsculas) -> método canónico
+PAYMENT_METHOD_ALIASES = {
+    "efectivo": "efectivo",
+    "cash": "efectivo",
+    "transferencia": "transferencia",
+    "transfer": "transferencia",
+    "deposito": "transferencia",
+    "visalink": "visalink",
+    "card": "visalink",
+}
+
+
+def local_date(value):
+    """Fecha en la zona horaria del estudio de un ``datetime`` (None si no hay)."""
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        # Texto o date asignados directamente al campo
+        value = models.DateTimeField().to_python(value)
+    if timezone.is_aware(value):
+        return timezone.localdate(value)
+    return value.date()
+
+
+def normalize_payment_method(value):
+    """Método canónico (``PAYMENT_METHOD_CHOICES``) del texto libre de un pago o venta."""
+    if not value:
+        return "otro"
+    key = unicodedata.normalize("NFKD", value).encode("ascii", "ignore").decode()
+    return PAYMENT_METHOD_ALIASES.get(key.strip().lower(), "otro")
+
+
 class Payment(models.Model):
     client = models.ForeignKey(Client, on_delete=models.CASCADE)
     membership = models.ForeignKey(Membership, on_delete=models.CASCADE)
@@ -319,8 +326,14 @@ class Payment(models.Model):
         "PromotionInstance", on_delete=models.SET_NULL, null=True, blank=True
     )
     payment_method = models.CharField(max_length=100, blank=True, null=True)
+    # Se calcula de payment_method al guardar; es lo que usan los reportes
+    method = models.CharField(
+        max_length=20, choices=PAYMENT_METHOD_CHOICES, default="otro", editable=False
+    )
     amount = models.DecimalField(max_digits=6, decimal_places=2)
     date_paid = models.DateTimeField(default=timezone.now)
+    # Fecha local de date_paid, para filtrar por día/mes sin convertir zona horaria
+    paid_on = models.DateField(null=True, blank=True, editable=False)
     
     # Campos para sistema de recibos/pólizas
     valid_from = models.DateField(
@@ -400,7 +413,24 @@ class Payment(models.Model):
         related_name="payments_modified",
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["paid_on", "sede"], name="payment_paid_on_sede_idx"),
+            # Totales por día y método en los cierres
+            models.Index(fields=["paid_on", "method"], name="payment_paid_on_method_idx"),
+        ]
+
     def save(self, *args, **kwargs):
+        self.method = normalize_payment_method(self.payment_method)
+        self.paid_on = local_date(self.date_paid)
+        update_fields = kwargs.get("update_fields")
+        if update_fields:
+            derived = {"payment_method": "method", "date_paid": "paid_on"}
+            kwargs["update_fields"] = {
+                *update_fields,
+                *(derived[field] for field in update_fields if field in derived),
+            }
+
         # Solo manejar promociones
         if self.promotion:
             self.amount = self.promotion.price
@@ -467,7 +497,11 @@ class Venta(models.Model):
     price_per_unit = models.DecimalField(max_digits=8, decimal_places=2)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_method = models.CharField(max_length=100, blank=True, null=True)
+    method = models.CharField(
+        max_length=20, choices=PAYMENT_METHOD_CHOICES, default="otro", editable=False
+    )
     date_sold = models.DateTimeField()
+    sold_on = models.DateField(null=True, blank=True, editable=False)
     notes = models.TextField(blank=True, null=True)
     # Multisite support
     sede = models.ForeignKey(
@@ -495,8 +529,16 @@ class Venta(models.Model):
         related_name="ventas_modified",
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["sold_on", "sede"], name="venta_sold_on_sede_idx"),
+            models.Index(fields=["sold_on", "method"], name="venta_sold_on_method_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         self.total_amount = self.quantity * self.price_per_unit
+        self.method = normalize_payment_method(self.payment_method)
+        self.sold_on = local_date(self.date_sold)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -524,6 +566,9 @@ class BulkBooking(models.Model):
     successful_bookings = models.PositiveIntegerField(default=0)
     failed_bookings = models.PositiveIntegerField(default=0)
     notes = models.TextField(blank=True, null=True)
+    # Solicitud original y errores, para el procesamiento en segundo plano
+    request_data = models.JSONField(null=True, blank=True)
+    failed_items = models.JSONField(default=list, blank=True)
     # Multisite support
     sede = models.ForeignKey(
         Sede,
@@ -539,6 +584,17 @@ class BulkBooking(models.Model):
     def __str__(self):
         return f"Bulk Booking #{self.id} - {self.client} ({self.status})"
 
+    @property
+    def processed_bookings(self):
+        return self.successful_bookings + self.failed_bookings
+
+    @property
+    def progress(self):
+        """Porcentaje de reservas ya procesadas (0-100)."""
+        if not self.total_bookings:
+            return 100
+        return round(self.processed_bookings * 100 / self.total_bookings)
+
     def update_status(self):
         """Update status based on booking results"""
         if self.failed_bookings == 0:
@@ -547,7 +603,7 @@ class BulkBooking(models.Model):
             self.status = "failed"
         else:
             self.status = "partial"
-        self.save(update_fields=["status"])
+        self.save(update_fields=["status", "successful_bookings", "failed_bookings"])
 
 
 class Booking(models.Model):
@@ -637,6 +693,71 @@ class Booking(models.Model):
     class Meta:
         unique_together = ("client", "schedule", "class_date")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Cupo que ocupaba la reserva al cargarla (ver ClassOccupancy)
+        instance._loaded_seat = instance.seat_key()
+        instance._loaded_entitlement = instance.entitlement_key()
+        instance._loaded_class_date = instance.class_date
+        return instance
+
+    def seat_key(self):
+        """
+        (schedule_id, class_date) del cupo que ocupa esta reserva, o ``None``
+        si no ocupa cupo (cancelada, pendiente de pago o asistencia cancelada).
+        """
+        if (
+            self.status != "active"
+            or self.attendance_status == "cancelled"
+            or not self.schedule_id
+        ):
+            return None
+        class_date = self._meta.get_field("class_date").to_python(self.class_date)
+        return (self.schedule_id, class_date)
+
+    def entitlement_key(self):
+        """
+        (payment_id, campo) con el que esta reserva cuenta en el libro de su
+        pago (``PaymentEntitlement``): ``"used"`` si está asistida o pendiente a
+        futuro, ``"no_shows"`` si no se presentó, o ``None`` si no cuenta.
+        """
+        if self.status != "active" or not self.payment_id:
+            return None
+        if self.attendance_status == "no_show":
+            return (self.payment_id, "no_shows")
+        if self.attendance_status == "attended":
+            return (self.payment_id, "used")
+        if self.attendance_status == "pending":
+            class_date = self._meta.get_field("class_date").to_python(self.class_date)
+            if class_date >= timezone.localdate():
+                return (self.payment_id, "used")
+        return None
+
+    def save(self, *args, **kwargs):
+        from .entitlements import change_entitlements
+        from .seats import move_seat
+
+        previous_seat = getattr(self, "_loaded_seat", None)
+        current_seat = self.seat_key()
+        previous_entitlement = getattr(self, "_loaded_entitlement", None)
+        current_entitlement = self.entitlement_key()
+
+        with transaction.atomic():
+            if previous_seat != current_seat:
+                # Lanza ClassFullError si el nuevo horario ya no tiene cupo
+                move_seat(previous_seat, current_seat, self.schedule)
+            # Disponible para los receivers de post_save (studio/signals.py)
+            self._previous_seat = previous_seat
+            super().save(*args, **kwargs)
+            if previous_entitlement != current_entitlement:
+                change_entitlements(
+                    removed=[previous_entitlement], added=[current_entitlement]
+                )
+        self._loaded_seat = current_seat
+        self._loaded_entitlement = current_entitlement
+        self._loaded_class_date = self.class_date
+
     def __str__(self):
         if self.status == "cancelled":
             details = f" ({self.get_cancellation_type_display()}"
@@ -647,6 +768,248 @@ class Booking(models.Model):
         return f"{self.client} - {self.schedule} on {self.class_date} ({self.get_attendance_status_display()})"
 
 
+class ClassOccurrence(models.Model):
+    """
+    Clase concreta en el calendario: un ``Schedule`` en una fecha, con hora
+    de inicio/fin, capacidad y coach tal como estaban al generarla. Se generan
+    N semanas hacia adelante (ver ``studio/occurrences.py``) para que las
+    consultas por fecha sean un rango sobre ``(sede, start)``.
+    """
+
+    schedule = models.ForeignKey(
+        Schedule, on_delete=models.CASCADE, related_name="occurrences"
+    )
+    date = models.DateField()
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+    capacity = models.PositiveIntegerField()
+    coach = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="class_occurrences",
+    )
+    # Multisite support
+    sede = models.ForeignKey(
+        Sede,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        help_text="Sede del horario",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["start"]
+        unique_together = ("schedule", "date")
+        indexes = [
+            models.Index(fields=["sede", "start"], name="occurrence_sede_start_idx"),
+            # Agenda del coach
+            models.Index(fields=["coach", "start"], name="occurrence_coach_start_idx"),
+        ]
+        verbose_name = "Clase programada"
+        verbose_name_plural = "Clases programadas"
+
+    def __str__(self):
+        return f"{self.schedule} - {self.date}"
+
+
+class StandingReservation(models.Model):
+    """
+    Reserva fija semanal: el cliente ocupa el mismo horario cada semana entre
+    ``start_date`` y ``end_date``. El job ``reservas_fijas`` genera las
+    reservas de las próximas semanas (ver ``studio/standing.py``).
+    """
+
+    client = models.ForeignKey(
+        Client, on_delete=models.CASCADE, related_name="standing_reservations"
+    )
+    schedule = models.ForeignKey(
+        Schedule, on_delete=models.CASCADE, related_name="standing_reservations"
+    )
+    start_date = models.DateField()
+    end_date = models.DateField(
+        null=True, blank=True, help_text="Vacío = sin fecha de fin"
+    )
+    is_active = models.BooleanField(default=True)
+    # Última fecha ya generada; las siguientes corridas continúan desde aquí
+    materialized_until = models.DateField(null=True, blank=True)
+    last_conflict = models.CharField(max_length=255, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Multisite support
+    sede = models.ForeignKey(
+        Sede,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        help_text="Sede del horario reservado",
+    )
+
+    class Meta:
+        ordering = ["client", "schedule"]
+        verbose_name = "Reserva fija"
+        verbose_name_plural = "Reservas fijas"
+        indexes = [models.Index(fields=["is_active", "materialized_until"])]
+
+    def save(self, *args, **kwargs):
+        if not self.sede_id and self.schedule_id:
+            self.sede_id = self.schedule.sede_id
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.client} - {self.schedule} (desde {self.start_date})"
+
+
+class WaitlistEntry(models.Model):
+    """
+    Lista de espera de una clase llena (schedule, class_date). Al liberarse un
+    cupo se promueve al primero en espera (ver ``studio/waitlist.py``).
+    """
+
+    STATUS_CHOICES = [
+        ("waiting", "En espera"),
+        ("promoted", "Promovido"),
+        ("skipped", "Omitido"),
+        ("left", "Salió de la lista"),
+    ]
+
+    client = models.ForeignKey(
+        Client, on_delete=models.CASCADE, related_name="waitlist_entries"
+    )
+    schedule = models.ForeignKey(
+        Schedule, on_delete=models.CASCADE, related_name="waitlist_entries"
+    )
+    class_date = models.DateField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="waiting")
+    booking = models.OneToOneField(
+        "Booking",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="waitlist_entry",
+        help_text="Reserva creada al promover",
+    )
+    notes = models.CharField(max_length=255, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Multisite support
+    sede = models.ForeignKey(
+        Sede,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        help_text="Sede del horario",
+    )
+
+    class Meta:
+        ordering = ["schedule", "class_date", "created_at", "id"]
+        verbose_name = "Lista de espera"
+        verbose_name_plural = "Lista de espera"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["client", "schedule", "class_date"],
+                condition=models.Q(status="waiting"),
+                name="unique_waiting_client_per_class",
+            )
+        ]
+        indexes = [
+            # Posición en la fila y siguiente a promover
+            models.Index(
+                fields=["schedule", "class_date", "status", "created_at"],
+                name="waitlist_queue_idx",
+            )
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.sede_id and self.schedule_id:
+            self.sede_id = self.schedule.sede_id
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.client} - {self.schedule} on {self.class_date} ({self.status})"
+
+
+class ClassOccupancy(models.Model):
+    """
+    Contador de cupos ocupados por ocurrencia de clase (schedule, class_date).
+    Se incrementa con un UPDATE condicional (booked < capacity), de modo que
+    dos reservas simultáneas no pueden tomar el último cupo.
+    """
+
+    schedule = models.ForeignKey(
+        Schedule, on_delete=models.CASCADE, related_name="occupancies"
+    )
+    class_date = models.DateField()
+    booked = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("schedule", "class_date")
+        verbose_name = "Ocupación de clase"
+        verbose_name_plural = "Ocupación de clases"
+
+    def __str__(self):
+        return f"{self.schedule} on {self.class_date}: {self.booked}/{self.schedule.capacity}"
+
+
+class PaymentEntitlement(models.Model):
+    """
+    Libro de clases de un pago: permitidas, usadas y no-shows. Se mantiene al
+    crear, cancelar o cambiar la asistencia de una reserva (ver
+    ``studio/entitlements.py``), así que validar el límite es leer una fila.
+    """
+
+    payment = models.OneToOneField(
+        Payment,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="entitlement",
+    )
+    allowed = models.PositiveIntegerField(
+        default=0,
+        help_text="Clases del plan o promoción más extras. 0 = ilimitado.",
+    )
+    used = models.PositiveIntegerField(
+        default=0,
+        help_text="Reservas activas asistidas o pendientes a futuro.",
+    )
+    no_shows = models.PositiveIntegerField(default=0)
+    # Día del último recálculo completo: las pendientes contadas ese día pueden
+    # haber pasado, así que una fila de un día anterior se recalcula al leerla
+    counted_on = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Clases por pago"
+        verbose_name_plural = "Clases por pago"
+
+    @property
+    def repositions(self):
+        """Una reposición si hubo al menos un no-show."""
+        return 1 if self.no_shows > 0 else 0
+
+    @property
+    def limit(self):
+        """Límite efectivo (0 = ilimitado)."""
+        if not self.allowed:
+            return 0
+        return self.allowed + self.repositions
+
+    @property
+    def remaining(self):
+        if not self.limit:
+            return None
+        return max(self.limit - self.used, 0)
+
+    def has_room(self, extra=0):
+        return not self.limit or self.used + extra < self.limit
+
+    def __str__(self):
+        return f"{self.payment_id}: {self.used}/{self.limit or '∞'}"
+
+
 class PlanIntent(models.Model):
     client = models.ForeignKey(Client, on_delete=models.CASCADE)
     membership = models.ForeignKey("Membership", on_delete=models.CASCADE)
@@ -669,6 +1032,11 @@ class PlanIntent(models.Model):
 
 
 class MonthlyRevenue(models.Model):
+    """
+    Ingresos de un mes por sede y globales (sede NULL). Se mantiene con cada
+    pago o venta (ver ``studio/revenue.py``).
+    """
+
     year = models.PositiveIntegerField()
     month = models.PositiveIntegerField()
     total_amount = models.DecimalField(max_digits=25, decimal_places=2, default=0)
@@ -689,8 +1057,56 @@ class MonthlyRevenue(models.Model):
 
     class Meta:
         unique_together = ["year", "month", "sede"]
+        constraints = [
+            # Postgres no compara NULL en unique_together: una sola fila global por mes
+            models.UniqueConstraint(
+                fields=["year", "month"],
+                condition=models.Q(sede__isnull=True),
+                name="unique_global_monthly_revenue",
+            ),
+        ]
         ordering = ["-year", "-month"]
 
     def __str__(self):
         sede_text = f" - {self.sede.name}" if self.sede else " - Global"
         return f"{self.month}/{self.year}{sede_text} - Q{self.total_amount}"
+
+
+class DailyClosingFact(models.Model):
+    """
+    Totales de cierre de un día por sede (pagos por método, ventas y
+    asistencias). Se recalcula desde las señales de Payment/Venta/Booking;
+    ``rebuild_closing_facts`` lo reconstruye desde cero.
+    """
+
+    date = models.DateField()
+    sede = models.ForeignKey(Sede, on_delete=models.CASCADE, null=True, blank=True)
+    efectivo = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    transferencia = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    visalink = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_pagos = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    paquetes_vendidos = models.PositiveIntegerField(default=0)
+    total_ventas = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    asistencias = models.PositiveIntegerField(default=0)
+    # Asistencias de clientes que ya usaron su clase de prueba
+    pruebas = models.PositiveIntegerField(default=0)
+    no_shows = models.PositiveIntegerField(default=0)
+    clases_individuales = models.PositiveIntegerField(default=0)
+    individuales_asistidas = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["date", "sede"], name="unique_closing_fact_per_sede"),
+            # Postgres no compara NULL en el constraint anterior
+            models.UniqueConstraint(
+                fields=["date"],
+                condition=models.Q(sede__isnull=True),
+                name="unique_closing_fact_without_sede",
+            ),
+        ]
+        ordering = ["date"]
+
+    def __str__(self):
+        sede_text = f" - {self.sede.name}" if self.sede else " - Sin sede"
+        return f"Cierre {self.date}{sede_text} - Q{self.total_pagos + self.total_ventas}"
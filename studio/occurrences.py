@@ -0,0 +1,202 @@
+# studio/occurrences.py
+"""
+Calendario materializado (``ClassOccurrence``).
+
+``Schedule`` es una plantilla semanal (día + hora como texto); aquí se
+expande a una fila por clase concreta con inicio/fin como ``datetime``
+(duración del TimeSlot de la sede, una hora si no hay), capacidad y coach.
+El job diario ``ocurrencias_clases`` mantiene ``OCCURRENCE_WEEKS_AHEAD``
+semanas generadas y las señales de Schedule/TimeSlot regeneran lo que cambia.
+Las clases pasadas no se tocan: quedan como histórico.
+
+``coach_agenda`` arma la agenda de un coach para un rango de fechas con dos
+consultas (clases con sus cupos ocupados y reservas con su cliente).
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .availability import DAY_CODES
+from .models import Booking, ClassOccupancy, ClassOccurrence, Schedule
+from .schedule_overlap import load_slot_ends, schedule_bounds
+
+OCCURRENCE_WEEKS_AHEAD = 8
+
+WEEKDAYS = {code: weekday for weekday, code in DAY_CODES.items()}
+
+
+def _dates_for(day_code, start, end):
+    """Fechas entre ``start`` (incluida) y ``end`` (excluida) que caen en ``day_code``."""
+    current = start + timedelta(days=(WEEKDAYS[day_code] - start.weekday()) % 7)
+    while current < end:
+        yield current
+        current += timedelta(weeks=1)
+
+
+def generate_occurrences(weeks=OCCURRENCE_WEEKS_AHEAD, start=None, schedule_ids=None, sede_ids=None):
+    """
+    Genera o actualiza las clases desde ``start`` (hoy por defecto) hasta
+    ``weeks`` semanas adelante, para todos los horarios o solo los indicados,
+    y borra las de esa ventana que ya no corresponden (horario movido de día).
+    Devuelve el número de clases escritas.
+    """
+    start = start or timezone.localdate()
+    end = start + timedelta(weeks=weeks)
+
+    schedules = Schedule.objects.all()
+    if schedule_ids is not None:
+        schedules = schedules.filter(id__in=schedule_ids)
+    if sede_ids is not None:
+        schedules = schedules.filter(sede_id__in=sede_ids)
+    schedules = list(schedules)
+    slot_ends = load_slot_ends({s.sede_id for s in schedules if s.sede_id})
+
+    rows = []
+    for schedule in schedules:
+        if schedule.day not in WEEKDAYS:
+            continue
+        start_time, end_time = schedule_bounds(schedule, slot_ends)
+        for class_date in _dates_for(schedule.day, start, end):
+            rows.append(
+                ClassOccurrence(
+                    schedule=schedule,
+                    date=class_date,
+                    start=timezone.make_aware(datetime.combine(class_date, start_time)),
+                    end=timezone.make_aware(datetime.combine(class_date, end_time)),
+                    capacity=schedule.capacity,
+                    coach_id=schedule.coach_id,
+                    sede_id=schedule.sede_id,
+                )
+            )
+
+    with transaction.atomic():
+        stale = ClassOccurrence.objects.filter(date__gte=start, date__lt=end)
+        if schedule_ids is not None:
+            stale = stale.filter(schedule_id__in=schedule_ids)
+        if sede_ids is not None:
+            stale = stale.filter(schedule__sede_id__in=sede_ids)
+        wanted = {(row.schedule.id, row.date) for row in rows}
+        stale_ids = [
+            pk
+            for pk, schedule_id, class_date in stale.values_list("id", "schedule_id", "date")
+            if (schedule_id, class_date) not in wanted
+        ]
+        if stale_ids:
+            ClassOccurrence.objects.filter(id__in=stale_ids).delete()
+
+        now = timezone.now()
+        for row in rows:
+            row.updated_at = now
+        ClassOccurrence.objects.bulk_create(
+            rows,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["schedule", "date"],
+            update_fields=["start", "end", "capacity", "coach", "sede", "updated_at"],
+        )
+    return len(rows)
+
+
+def occurrences_between(start, end, sede_ids=None):
+    """
+    Clases que empiezan entre ``start`` y ``end`` (``datetime``), en orden.
+    Es un rango sobre el índice ``(sede, start)``.
+    """
+    occurrences = ClassOccurrence.objects.filter(start__gte=start, start__lt=end)
+    if sede_ids:
+        occurrences = occurrences.filter(sede_id__in=sede_ids)
+    return occurrences.order_by("start")
+
+
+def with_booked(occurrences):
+    """
+    Anota ``booked`` (cupos ocupados según ``ClassOccupancy``) en cada clase.
+    Si la ocurrencia aún no tiene fila de ocupación se cuentan sus reservas
+    activas, como en ``seats_left``.
+    """
+    booked = ClassOccupancy.objects.filter(
+        schedule_id=OuterRef("schedule_id"), class_date=OuterRef("date")
+    ).values("booked")[:1]
+    counted = (
+        Booking.objects.filter(
+            schedule_id=OuterRef("schedule_id"),
+            class_date=OuterRef("date"),
+            status="active",
+        )
+        .exclude(attendance_status="cancelled")
+        .order_by()
+        .values("schedule_id")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    return occurrences.annotate(
+        booked=Coalesce(
+            Subquery(booked),
+            Subquery(counted, output_field=IntegerField()),
+            0,
+        )
+    )
+
+
+def coach_agenda(coach_id, start, end, sede_ids=None):
+    """
+    Clases de ``coach_id`` entre ``start`` y ``end`` (fechas, incluidas) con
+    capacidad, cupos ocupados y asistentes. Dos consultas sin importar el
+    tamaño del rango.
+    """
+    occurrences = ClassOccurrence.objects.filter(
+        coach_id=coach_id, date__gte=start, date__lte=end
+    )
+    if sede_ids:
+        occurrences = occurrences.filter(sede_id__in=sede_ids)
+    occurrences = list(
+        with_booked(occurrences).select_related("schedule__class_type").order_by("start")
+    )
+
+    attendees = defaultdict(list)
+    if occurrences:
+        bookings = (
+            Booking.objects.filter(
+                schedule_id__in={o.schedule_id for o in occurrences},
+                class_date__gte=start,
+                class_date__lte=end,
+                status="active",
+            )
+            .select_related("client")
+            .order_by("id")
+        )
+        for booking in bookings:
+            attendees[(booking.schedule_id, booking.class_date)].append(
+                {
+                    "booking_id": booking.id,
+                    "client_id": booking.client_id,
+                    "name": f"{booking.client.first_name} {booking.client.last_name}",
+                    "attendance_status": booking.attendance_status,
+                }
+            )
+
+    sessions = []
+    for occurrence in occurrences:
+        schedule = occurrence.schedule
+        sessions.append(
+            {
+                "occurrence_id": occurrence.id,
+                "schedule_id": schedule.id,
+                "date": occurrence.date.isoformat(),
+                "start": timezone.localtime(occurrence.start).isoformat(),
+                "end": timezone.localtime(occurrence.end).isoformat(),
+                "time_slot": schedule.time_slot,
+                "class_type": schedule.class_type.name if schedule.class_type else None,
+                "is_individual": schedule.is_individual,
+                "sede_id": occurrence.sede_id,
+                "capacity": occurrence.capacity,
+                "booked": occurrence.booked,
+                "available": max(occurrence.capacity - occurrence.booked, 0),
+                "attendees": attendees[(schedule.id, occurrence.date)],
+            }
+        )
+    return sessions
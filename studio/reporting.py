@@ -0,0 +1,184 @@
+# studio/reporting.py
+"""
+Agregados de los reportes de cierres.
+
+``daily_buckets`` calcula los totales por día de cualquier rango directo de
+las tablas con tres consultas agrupadas (pagos por ``Payment.method``,
+ventas y reservas). ``closing_facts`` lo usa para llenar
+``DailyClosingFact`` y ``closing_days`` lee esa tabla devolviendo la misma
+forma, así que los endpoints trabajan igual con cualquiera de las dos fuentes.
+
+``weekly_rollup`` agrupa los días en semanas de lunes a sábado en memoria,
+indexando cada día por el lunes de su semana (el domingo no cuenta).
+"""
+import calendar
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, F, Q, Sum
+
+from .models import Booking, DailyClosingFact, Payment, Venta, local_date
+
+# Métodos canónicos (Payment.method) con columna propia en los cierres
+METHOD_FIELDS = ("efectivo", "transferencia", "visalink")
+
+AMOUNT_FIELDS = ("efectivo", "transferencia", "visalink", "total_pagos", "total_ventas")
+PAYMENT_COUNT_FIELDS = ("paquetes_vendidos",)
+BOOKING_FIELDS = (
+    "asistencias",
+    "pruebas",
+    "no_shows",
+    "clases_individuales",
+    "individuales_asistidas",
+)
+COUNT_FIELDS = PAYMENT_COUNT_FIELDS + BOOKING_FIELDS
+FACT_FIELDS = AMOUNT_FIELDS + COUNT_FIELDS
+
+SATURDAY = 5
+
+
+def local_day(value):
+    """Fecha local de un ``datetime`` (o la fecha tal cual)."""
+    return local_date(value) if isinstance(value, datetime) else value
+
+
+def empty_totals():
+    totals = {field: Decimal("0") for field in AMOUNT_FIELDS}
+    totals.update({field: 0 for field in COUNT_FIELDS})
+    return totals
+
+
+def add_totals(target, source):
+    for field, value in source.items():
+        target[field] += value or 0
+    return target
+
+
+def daily_buckets(start=None, end=None, days=None, sede_ids=None, by_sede=False):
+    """
+    Totales por día de pagos, ventas y reservas para el rango ``start``-``end``
+    (incluido) o los días ``days``, en tres consultas. Devuelve
+    ``{fecha: totales}`` o, con ``by_sede``, ``{(fecha, sede_id): totales}``;
+    solo aparecen días con movimiento.
+    """
+    if days is not None:
+        payment_filter = Q(paid_on__in=days)
+        venta_filter = Q(sold_on__in=days)
+        booking_filter = Q(class_date__in=days)
+    else:
+        payment_filter = Q(paid_on__gte=start, paid_on__lte=end)
+        venta_filter = Q(sold_on__gte=start, sold_on__lte=end)
+        booking_filter = Q(class_date__gte=start, class_date__lte=end)
+    if sede_ids:
+        payment_filter &= Q(sede_id__in=sede_ids)
+        venta_filter &= Q(sede_id__in=sede_ids)
+        booking_filter &= Q(sede_id__in=sede_ids)
+
+    group = ["day", "sede_id"] if by_sede else ["day"]
+    buckets = defaultdict(empty_totals)
+
+    def bucket(row):
+        return buckets[(row["day"], row["sede_id"]) if by_sede else row["day"]]
+
+    payments = (
+        Payment.objects.filter(payment_filter)
+        .annotate(day=F("paid_on"))
+        .values(*group, "method")
+        .annotate(total=Sum("amount"), count=Count("id"))
+    )
+    for row in payments:
+        totals = {"total_pagos": row["total"], "paquetes_vendidos": row["count"]}
+        if row["method"] in METHOD_FIELDS:
+            totals[row["method"]] = row["total"]
+        add_totals(bucket(row), totals)
+
+    ventas = (
+        Venta.objects.filter(venta_filter)
+        .annotate(day=F("sold_on"))
+        .values(*group)
+        .annotate(total_ventas=Sum("total_amount"))
+    )
+    for row in ventas:
+        add_totals(bucket(row), {"total_ventas": row["total_ventas"]})
+
+    attended = Q(attendance_status="attended")
+    individual = Q(schedule__is_individual=True)
+    bookings = (
+        Booking.objects.filter(booking_filter)
+        .annotate(day=F("class_date"))
+        .values(*group)
+        .annotate(
+            asistencias=Count("id", filter=attended),
+            pruebas=Count("id", filter=attended & Q(client__trial_used=True)),
+            no_shows=Count("id", filter=Q(attendance_status="no_show")),
+            clases_individuales=Count("id", filter=individual),
+            individuales_asistidas=Count("id", filter=attended & individual),
+        )
+    )
+    for row in bookings:
+        add_totals(bucket(row), {f: row[f] for f in BOOKING_FIELDS})
+
+    return dict(buckets)
+
+
+def closing_days(start, end, sede_ids=None):
+    """
+    Como ``daily_buckets`` pero leyendo ``DailyClosingFact`` (sumando sedes)
+    en una sola consulta.
+    """
+    facts = DailyClosingFact.objects.filter(date__gte=start, date__lte=end)
+    if sede_ids:
+        facts = facts.filter(sede_id__in=sede_ids)
+    rows = facts.values("date").annotate(**{field: Sum(field) for field in FACT_FIELDS})
+    return {row.pop("date"): row for row in rows}
+
+
+def range_totals(daily, start, end):
+    """Suma de los días de ``daily`` entre ``start`` y ``end`` (incluido)."""
+    totals = empty_totals()
+    for day, day_totals in daily.items():
+        if start <= day <= end:
+            add_totals(totals, day_totals)
+    return totals
+
+
+def monday_of(day):
+    return day - timedelta(days=day.weekday())
+
+
+def weekly_rollup(daily, start, end):
+    """
+    Semanas de lunes a sábado desde la de ``start`` (la última se recorta en
+    ``end``) con la suma de sus días: lista de ``(lunes, fin, totales)``.
+    """
+    weeks = {}
+    monday = monday_of(start)
+    while monday <= end:
+        weeks[monday] = (min(monday + timedelta(days=SATURDAY), end), empty_totals())
+        monday += timedelta(days=7)
+
+    for day, day_totals in daily.items():
+        week = weeks.get(monday_of(day))
+        if week and day.weekday() <= SATURDAY and day <= week[0]:
+            add_totals(week[1], day_totals)
+    return [(monday, week_end, totals) for monday, (week_end, totals) in weeks.items()]
+
+
+def payment_details(start, end, sede_ids=None):
+    """Pagos del rango agrupados por fecha local, con cliente y membresía (una consulta)."""
+    payments = Payment.objects.filter(paid_on__gte=start, paid_on__lte=end).select_related(
+        "client", "membership"
+    )
+    if sede_ids:
+        payments = payments.filter(sede_id__in=sede_ids)
+    by_day = defaultdict(list)
+    for payment in payments.order_by("date_paid"):
+        by_day[payment.paid_on].append(payment)
+    return by_day
+
+
+def month_bounds(year, month):
+    """(primer día, último día) del mes, para filtrar ``paid_on``/``sold_on`` por rango."""
+    first = date(int(year), int(month), 1)
+    return first, first.replace(day=calendar.monthrange(first.year, first.month)[1])
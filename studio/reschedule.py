@@ -0,0 +1,101 @@
+# studio/reschedule.py
+"""
+Reagendar una reserva de forma atómica.
+
+Dentro de una transacción se bloquean la reserva y las filas de ocupación de
+origen y destino (siempre en orden ``(schedule_id, class_date)``, ver
+``lock_occupancies``), se validan el duplicado y el cupo del destino y ambos
+contadores se mueven en un solo UPDATE. El cupo liberado en el origen se
+ofrece a la lista de espera (``promote_waitlist``) en la misma transacción y
+el correo se envía en segundo plano cuando la transacción se confirma.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, When
+from django.utils import timezone
+
+from .models import Booking, ClassOccupancy, Schedule
+from .seats import lock_occupancies
+from .signals import seats_changed
+from .tasks.background import submit_on_commit
+from .waitlist import promote_waitlist
+
+
+class RescheduleError(ValidationError):
+    """La reserva no se puede mover al horario o fecha solicitados."""
+
+    def __init__(self, message, code):
+        super().__init__(message, code=code)
+
+
+def send_reschedule_notification(booking_id):
+    from .management.mails.mails import send_booking_reschedule_email
+
+    booking = Booking.objects.select_related(
+        "client", "schedule__class_type"
+    ).get(pk=booking_id)
+    send_booking_reschedule_email(booking, booking.client)
+
+
+def move_booking(booking_id, schedule_id, class_date, notify=True):
+    """
+    Mueve la reserva ``booking_id`` a ``(schedule_id, class_date)``. Lanza
+    ``RescheduleError`` si el horario no existe, si el cliente ya tiene esa
+    clase o si no hay cupo (sin contar la propia reserva).
+    """
+    try:
+        schedule_id = int(schedule_id)
+    except (TypeError, ValueError):
+        raise RescheduleError("Nuevo horario no válido.", "schedule_not_found")
+
+    with transaction.atomic():
+        booking = Booking.objects.select_for_update().get(pk=booking_id)
+        schedule = Schedule.objects.filter(pk=schedule_id).first()
+        if schedule is None:
+            raise RescheduleError("Nuevo horario no válido.", "schedule_not_found")
+        if (booking.schedule_id, booking.class_date) == (schedule_id, class_date):
+            return booking
+
+        if (
+            Booking.objects.filter(
+                client_id=booking.client_id, schedule_id=schedule_id, class_date=class_date
+            )
+            .exclude(pk=booking.pk)
+            .exists()
+        ):
+            raise RescheduleError("Ya tienes una reserva para esa clase.", "duplicate")
+
+        source = booking.seat_key()
+        booking.schedule = schedule
+        booking.class_date = class_date
+        booking.sede_id = schedule.sede_id or booking.sede_id
+        target = booking.seat_key()
+
+        occupancies = lock_occupancies({seat for seat in (source, target) if seat})
+        if target is not None and occupancies[target].booked >= schedule.capacity:
+            raise RescheduleError("No hay cupo disponible.", "class_full")
+
+        deltas = []
+        if target is not None:
+            deltas.append(When(pk=occupancies[target].pk, then=F("booked") + 1))
+        if source is not None:
+            deltas.append(When(pk=occupancies[source].pk, booked__gt=0, then=F("booked") - 1))
+        if deltas:
+            ClassOccupancy.objects.filter(
+                pk__in=[occupancies[seat].pk for seat in (source, target) if seat]
+            ).update(
+                booked=Case(*deltas, default=F("booked"), output_field=PositiveIntegerField()),
+                updated_at=timezone.now(),
+            )
+
+        # Los contadores ya se movieron arriba: Booking.save no debe repetirlo
+        booking._loaded_seat = target
+        booking.save(update_fields=["schedule", "class_date", "sede"])
+        seats_changed(released=[source], reserved=[target])
+        if source is not None:
+            # El cupo liberado en el origen es para el primero en espera
+            promote_waitlist(*source)
+
+        if notify:
+            submit_on_commit(send_reschedule_notification, booking.pk)
+    return booking
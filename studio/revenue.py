@@ -0,0 +1,197 @@
+# studio/revenue.py
+"""
+Ingresos mensuales (``MonthlyRevenue``): una fila por (año, mes, sede) y una
+global con sede NULL.
+
+Las señales de Payment/Venta llaman ``move_revenue`` dentro de la misma
+transacción que guarda el pago o la venta: se resta lo que valía antes (monto,
+mes y sede anteriores) y se suma lo nuevo con UPDATE ``F()`` en la fila de la
+sede y en la global. ``reconcile_monthly_revenue`` recalcula los meses con dos
+consultas agrupadas y corrige en bloque las filas que no coinciden (comando
+``reconcile_monthly_revenue``).
+"""
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear, Greatest
+from django.utils import timezone
+
+from .models import MonthlyRevenue, Payment, Venta
+from .reporting import local_day, month_bounds
+
+REVENUE_FIELDS = ("total_amount", "payment_count", "venta_total", "venta_count")
+
+
+def empty_revenue():
+    return {
+        "total_amount": Decimal("0"),
+        "payment_count": 0,
+        "venta_total": Decimal("0"),
+        "venta_count": 0,
+    }
+
+
+def _deltas(is_payment, amount, sign):
+    amount = (amount or 0) * sign
+    if is_payment:
+        return {"total_amount": amount, "payment_count": sign}
+    return {"total_amount": amount, "venta_total": amount, "venta_count": sign}
+
+
+def apply_revenue(day, sede_id, deltas):
+    """
+    Suma ``deltas`` (campo: cantidad) a la fila del mes de ``day`` de la sede y
+    a la global. Si la fila no existe se crea; si otra transacción la creó
+    primero se reintenta el UPDATE. Los conteos no bajan de cero.
+    """
+    day = local_day(day)
+    if day is None:
+        return
+    updates = {}
+    for field, value in deltas.items():
+        updates[field] = F(field) + value
+        if field.endswith("_count"):
+            updates[field] = Greatest(updates[field], 0)
+    updates["last_updated"] = timezone.now()
+    for scope in {sede_id, None}:
+        row = MonthlyRevenue.objects.filter(year=day.year, month=day.month, sede_id=scope)
+        if row.update(**updates):
+            continue
+        try:
+            with transaction.atomic():
+                MonthlyRevenue.objects.create(year=day.year, month=day.month, sede_id=scope)
+        except IntegrityError:
+            pass
+        row.update(**updates)
+
+
+def move_revenue(is_payment, previous=None, current=None):
+    """
+    Mueve un pago (``is_payment``) o venta de ``previous`` a ``current``, cada
+    uno ``(fecha, sede_id, monto)`` o ``None`` (recién creado / borrado).
+    """
+    if previous is not None and current is not None:
+        previous = (local_day(previous[0]),) + tuple(previous[1:])
+        current = (local_day(current[0]),) + tuple(current[1:])
+        if previous == current:
+            return
+    if previous is not None:
+        apply_revenue(previous[0], previous[1], _deltas(is_payment, previous[2], -1))
+    if current is not None:
+        apply_revenue(current[0], current[1], _deltas(is_payment, current[2], 1))
+
+
+def _months_filter(field, months):
+    condition = Q()
+    for year, month in months:
+        first, last = month_bounds(year, month)
+        condition |= Q(**{f"{field}__gte": first, f"{field}__lte": last})
+    return condition
+
+
+def compute_monthly_revenue(months=None):
+    """
+    Totales por ``(año, mes, sede_id)`` desde pagos y ventas (dos consultas
+    agrupadas), incluida la fila global ``(año, mes, None)``. ``months``
+    limita el cálculo a esos ``(año, mes)``.
+    """
+    payments = Payment.objects.filter(paid_on__isnull=False)
+    ventas = Venta.objects.filter(sold_on__isnull=False)
+    if months is not None:
+        payments = payments.filter(_months_filter("paid_on", months))
+        ventas = ventas.filter(_months_filter("sold_on", months))
+
+    totals = defaultdict(empty_revenue)
+    for queryset, field, amount, amount_fields, count_field in (
+        (payments, "paid_on", "amount", ("total_amount",), "payment_count"),
+        (ventas, "sold_on", "total_amount", ("total_amount", "venta_total"), "venta_count"),
+    ):
+        rows = (
+            queryset.order_by()
+            .annotate(year=ExtractYear(field), month=ExtractMonth(field))
+            .values("year", "month", "sede_id")
+            .annotate(total=Sum(amount), count=Count("id"))
+        )
+        for row in rows:
+            for scope in {row["sede_id"], None}:
+                bucket = totals[(row["year"], row["month"], scope)]
+                for total_field in amount_fields:
+                    bucket[total_field] += row["total"] or 0
+                bucket[count_field] += row["count"]
+    return dict(totals)
+
+
+def reconcile_monthly_revenue(months=None, repair=True):
+    """
+    Compara las filas de ``MonthlyRevenue`` con ``compute_monthly_revenue`` y,
+    con ``repair``, corrige las diferencias con un ``bulk_update`` y crea las
+    filas que faltan. Las filas quedan bloqueadas mientras se recalcula para
+    no pisar un pago que se confirme a la vez. Devuelve las diferencias.
+    """
+    existing = MonthlyRevenue.objects.all()
+    if months is not None:
+        condition = Q()
+        for year, month in months:
+            condition |= Q(year=year, month=month)
+        existing = existing.filter(condition)
+
+    with transaction.atomic():
+        rows = list(existing.select_for_update() if repair else existing)
+        expected = compute_monthly_revenue(months)
+
+        drift = []
+        changed = []
+        seen = set()
+        now = timezone.now()
+        for row in rows:
+            key = (row.year, row.month, row.sede_id)
+            seen.add(key)
+            totals = expected.get(key) or empty_revenue()
+            before = {field: getattr(row, field) for field in REVENUE_FIELDS}
+            if before == totals:
+                continue
+            drift.append(
+                {
+                    "year": row.year,
+                    "month": row.month,
+                    "sede_id": row.sede_id,
+                    "before": before,
+                    "after": totals,
+                }
+            )
+            for field, value in totals.items():
+                setattr(row, field, value)
+            row.last_updated = now
+            changed.append(row)
+
+        missing = []
+        for (year, month, sede_id), totals in sorted(
+            expected.items(), key=lambda item: (item[0][0], item[0][1], item[0][2] or 0)
+        ):
+            if (year, month, sede_id) in seen:
+                continue
+            drift.append(
+                {
+                    "year": year,
+                    "month": month,
+                    "sede_id": sede_id,
+                    "before": None,
+                    "after": totals,
+                }
+            )
+            missing.append(MonthlyRevenue(year=year, month=month, sede_id=sede_id, **totals))
+
+        if repair:
+            MonthlyRevenue.objects.bulk_update(
+                changed, [*REVENUE_FIELDS, "last_updated"], batch_size=500
+            )
+            MonthlyRevenue.objects.bulk_create(missing, batch_size=500)
+    return drift
+
+
+def months_of(days):
+    """``(año, mes)`` de las fechas (o datetimes) ``days``."""
+    return {(day.year, day.month) for day in map(local_day, days) if isinstance(day, date)}
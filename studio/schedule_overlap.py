@@ -0,0 +1,169 @@
+# studio/schedule_overlap.py
+"""
+Validación de solapamiento de horarios (Schedule) por sede y día.
+
+``OverlapChecker`` carga de una vez los horarios y los TimeSlot de las
+(sede, día) involucradas (dos consultas) y guarda, por cada par, los
+intervalos ordenados por hora de inicio junto con el fin máximo acumulado;
+cada verificación son dos búsquedas binarias. ``validate_schedules`` valida muchos horarios a la vez (entre sí y
+contra los existentes) para comandos y acciones masivas del admin.
+
+La duración de un horario sale del TimeSlot activo de su sede que empieza a
+esa hora; si no hay TimeSlot se asume una hora.
+"""
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from .models import Schedule, TimeSlot
+
+DEFAULT_DURATION = timedelta(hours=1)
+
+
+def _parse_time(value):
+    if hasattr(value, "hour"):
+        return value
+    return datetime.strptime(value, "%H:%M").time()
+
+
+def load_slot_ends(sede_ids):
+    """``{(sede_id, hora_inicio): hora_fin}`` de los TimeSlot activos."""
+    ends = {}
+    for sede_id, start_time, end_time in TimeSlot.objects.filter(
+        sede_id__in=sede_ids, is_active=True
+    ).values_list("sede_id", "start_time", "end_time"):
+        # Si hay dos TimeSlot con la misma hora de inicio se toma el más largo
+        key = (sede_id, start_time)
+        ends[key] = max(end_time, ends.get(key, end_time))
+    return ends
+
+
+def schedule_bounds(schedule, slot_ends):
+    """(inicio, fin) del horario como ``time``, según ``load_slot_ends``."""
+    start = _parse_time(schedule.time_slot)
+    end = slot_ends.get((schedule.sede_id, start))
+    if end is None:
+        end = (datetime.combine(datetime.today(), start) + DEFAULT_DURATION).time()
+    return start, end
+
+
+class OverlapChecker:
+    """Intervalos ordenados de los horarios de cada (sede, día)."""
+
+    def __init__(self, schedules, slot_ends):
+        self.slot_ends = slot_ends
+        # (sede_id, day) -> lista ordenada de (inicio, fin, id, id(schedule), schedule)
+        self.intervals = defaultdict(list)
+        # (sede_id, day) -> max_ends[i] = mayor fin de intervals[key][:i + 1]
+        self.max_ends = defaultdict(list)
+        for schedule in schedules:
+            self.add(schedule)
+
+    @classmethod
+    def for_schedules(cls, schedules):
+        """Checker con los horarios existentes de las (sede, día) de ``schedules``."""
+        keys = {(s.sede_id, s.day) for s in schedules if s.sede_id and s.day}
+        if not keys:
+            return cls([], {})
+        condition = Q()
+        for sede_id, day in keys:
+            condition |= Q(sede_id=sede_id, day=day)
+        existing = Schedule.objects.filter(condition).select_related("class_type")
+        return cls(existing, load_slot_ends({sede_id for sede_id, _ in keys}))
+
+    def bounds(self, schedule):
+        return schedule_bounds(schedule, self.slot_ends)
+
+    def _key(self, schedule):
+        if not schedule.sede_id or not schedule.day or not schedule.time_slot:
+            return None
+        return (schedule.sede_id, schedule.day)
+
+    def add(self, schedule):
+        key = self._key(schedule)
+        if key is None:
+            return
+        start, end = self.bounds(schedule)
+        # id(schedule) desempata horarios nuevos sin pk
+        interval = (start, end, schedule.pk or 0, id(schedule), schedule)
+        index = bisect_left(self.intervals[key], interval)
+        self.intervals[key].insert(index, interval)
+        self._refresh_max_ends(key, index)
+
+    def remove(self, schedule):
+        """Quita la versión guardada de ``schedule`` (al editarlo)."""
+        key = self._key(schedule)
+        if key is None or schedule.pk is None:
+            return
+        self.intervals[key] = [i for i in self.intervals[key] if i[2] != schedule.pk]
+        self._refresh_max_ends(key, 0)
+
+    def _refresh_max_ends(self, key, index):
+        """Recalcula el fin máximo acumulado desde la posición ``index``."""
+        intervals = self.intervals[key]
+        max_ends = self.max_ends[key][:index]
+        running = max_ends[-1] if max_ends else None
+        for interval in intervals[index:]:
+            running = interval[1] if running is None else max(running, interval[1])
+            max_ends.append(running)
+        self.max_ends[key] = max_ends
+
+    def find_overlap(self, schedule):
+        """Primer horario que se solapa con ``schedule`` (sin contarse a sí mismo), o None."""
+        key = self._key(schedule)
+        if key is None:
+            return None
+        start, end = self.bounds(schedule)
+        intervals = self.intervals[key]
+        max_ends = self.max_ends[key]
+
+        # Solo pueden solaparse los que empiezan antes de que este termine
+        # (intervals[:index]) y terminan después de que empieza. Como max_ends
+        # no decrece, el primero con fin máximo > start es el primero cuyo fin
+        # supera start: desde ahí solo se salta al propio horario.
+        index = bisect_left(intervals, (end,))
+        first = bisect_right(max_ends, start, 0, index)
+        for other_start, other_end, other_pk, _, other in intervals[first:index]:
+            if other is schedule or (schedule.pk and other_pk == schedule.pk):
+                continue
+            if other_end > start:
+                return other
+        return None
+
+    def check(self, schedule):
+        """Lanza ``ValidationError`` si ``schedule`` se solapa con otro horario."""
+        other = self.find_overlap(schedule)
+        if other is not None:
+            raise ValidationError(overlap_message(other))
+
+
+def overlap_message(other):
+    return (
+        f"El horario se solapa con otro schedule existente: "
+        f"{other.get_day_display()} {other.time_slot} "
+        f"({other.class_type.name if other.class_type else 'Sin tipo'})"
+    )
+
+
+def validate_schedules(schedules):
+    """
+    Valida muchos horarios (nuevos o editados) a la vez, entre sí y contra
+    los guardados, con dos consultas en total. Devuelve una lista de
+    ``(schedule, mensaje)`` con los que se solapan; vacía si todo es válido.
+    """
+    schedules = list(schedules)
+    checker = OverlapChecker.for_schedules(schedules)
+    for schedule in schedules:
+        checker.remove(schedule)
+
+    errors = []
+    for schedule in schedules:
+        other = checker.find_overlap(schedule)
+        if other is not None:
+            errors.append((schedule, overlap_message(other)))
+        else:
+            checker.add(schedule)
+    return errors
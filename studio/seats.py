@@ -0,0 +1,269 @@
+# studio/seats.py
+"""
+Control de cupos por ocurrencia de clase.
+
+Cada (schedule, class_date) tiene una fila ``ClassOccupancy`` con el número de
+cupos ocupados. Reservar un cupo es un único UPDATE condicional::
+
+    UPDATE studio_classoccupancy SET booked = booked + 1
+     WHERE schedule_id = %s AND class_date = %s AND booked < capacity
+
+Si no se actualiza ninguna fila la clase está llena. La base de datos
+serializa los UPDATE concurrentes sobre la misma fila, así que dos clientes
+que reservan al mismo tiempo nunca obtienen el último cupo a la vez.
+
+Las filas se crean bajo demanda a partir del conteo real de reservas, por lo
+que no es necesario precalcularlas (ver ``rebuild_class_occupancy``).
+"""
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Booking, ClassOccupancy, Schedule
+
+
+class ClassFullError(ValidationError):
+    """No quedan cupos en la ocurrencia solicitada."""
+
+    def __init__(self, message="No hay cupo disponible para este horario."):
+        super().__init__(message, code="class_full")
+
+
+def count_booked(schedule_id, class_date):
+    """Conteo real de reservas que ocupan cupo (fuente de verdad)."""
+    return (
+        Booking.objects.filter(
+            schedule_id=schedule_id, class_date=class_date, status="active"
+        )
+        .exclude(attendance_status="cancelled")
+        .count()
+    )
+
+
+def ensure_occupancy(schedule_id, class_date):
+    """Crea la fila de ocupación si no existe, inicializada con el conteo real."""
+    ClassOccupancy.objects.bulk_create(
+        [
+            ClassOccupancy(
+                schedule_id=schedule_id,
+                class_date=class_date,
+                booked=count_booked(schedule_id, class_date),
+            )
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def reserve_seat(schedule, class_date):
+    """
+    Ocupa un cupo de forma atómica. Lanza ``ClassFullError`` si no hay cupo.
+    Debe llamarse dentro de la misma transacción que crea la reserva.
+    """
+    for _ in range(2):
+        updated = ClassOccupancy.objects.filter(
+            schedule_id=schedule.id,
+            class_date=class_date,
+            booked__lt=schedule.capacity,
+        ).update(booked=F("booked") + 1, updated_at=timezone.now())
+        if updated:
+            return
+
+        if ClassOccupancy.objects.filter(
+            schedule_id=schedule.id, class_date=class_date
+        ).exists():
+            raise ClassFullError()
+        ensure_occupancy(schedule.id, class_date)
+
+    raise ClassFullError()
+
+
+def release_seat(schedule_id, class_date):
+    """
+    Libera un cupo previamente ocupado. Si la fila aún no existe no hay nada
+    que liberar: se inicializará con el conteo real cuando se necesite.
+    """
+    ClassOccupancy.objects.filter(
+        schedule_id=schedule_id, class_date=class_date, booked__gt=0
+    ).update(booked=F("booked") - 1, updated_at=timezone.now())
+
+
+def move_seat(previous_seat, current_seat, schedule=None):
+    """
+    Ajusta los contadores cuando una reserva cambia de cupo. Cada cupo es
+    ``(schedule_id, class_date)`` o ``None`` si la reserva no ocupa cupo.
+    ``schedule`` es el horario del cupo nuevo, si ya está cargado.
+    """
+    if previous_seat == current_seat:
+        return
+    if current_seat is not None:
+        schedule_id, class_date = current_seat
+        if schedule is None or schedule.id != schedule_id:
+            schedule = Schedule.objects.only("capacity").get(pk=schedule_id)
+        reserve_seat(schedule, class_date)
+    if previous_seat is not None:
+        release_seat(*previous_seat)
+
+
+def _seats_filter(seats):
+    return reduce(
+        or_,
+        (
+            Q(schedule_id=schedule_id, class_date=class_date)
+            for schedule_id, class_date in seats
+        ),
+    )
+
+
+def _booked_counts(seats):
+    """Conteo real de reservas de varias ocurrencias en una consulta agrupada."""
+    return {
+        (row["schedule_id"], row["class_date"]): row["booked"]
+        for row in Booking.objects.filter(_seats_filter(seats), status="active")
+        .exclude(attendance_status="cancelled")
+        .values("schedule_id", "class_date")
+        .annotate(booked=Count("id"))
+        .order_by()
+    }
+
+
+def lock_occupancies(seats):
+    """
+    Filas de ocupación de varias ocurrencias bloqueadas con SELECT ... FOR UPDATE,
+    creando las que falten. Devuelve ``{(schedule_id, class_date): ClassOccupancy}``.
+
+    Debe llamarse dentro de una transacción; las filas se bloquean siempre en
+    el mismo orden para evitar deadlocks entre procesos concurrentes.
+    """
+    seats = set(seats)
+    if not seats:
+        return {}
+
+    seats_filter = _seats_filter(seats)
+
+    def locked_rows():
+        rows = (
+            ClassOccupancy.objects.select_for_update()
+            .filter(seats_filter)
+            .order_by("schedule_id", "class_date")
+        )
+        return {(row.schedule_id, row.class_date): row for row in rows}
+
+    occupancies = locked_rows()
+    missing = seats - set(occupancies)
+    if not missing:
+        return occupancies
+
+    counts = _booked_counts(missing)
+    ClassOccupancy.objects.bulk_create(
+        [
+            ClassOccupancy(
+                schedule_id=schedule_id,
+                class_date=class_date,
+                booked=counts.get((schedule_id, class_date), 0),
+            )
+            for schedule_id, class_date in missing
+        ],
+        ignore_conflicts=True,
+    )
+    return locked_rows()
+
+
+def recount_occupancies(seats):
+    """
+    Ajusta los contadores de ``seats`` al conteo real de reservas, con las filas
+    bloqueadas. Para los flujos que insertan reservas sin ``reserve_seat``
+    (importación desde Excel). Devuelve las filas corregidas.
+    """
+    occupancies = lock_occupancies(seats)
+    if not occupancies:
+        return []
+
+    counts = _booked_counts(occupancies)
+    changed = []
+    for key, occupancy in occupancies.items():
+        booked = counts.get(key, 0)
+        if occupancy.booked != booked:
+            occupancy.booked = booked
+            occupancy.updated_at = timezone.now()
+            changed.append(occupancy)
+    ClassOccupancy.objects.bulk_update(changed, ["booked", "updated_at"])
+    return changed
+
+
+def seats_left(schedule, class_date):
+    """Cupos libres (lectura, sin reservar)."""
+    booked = (
+        ClassOccupancy.objects.filter(schedule_id=schedule.id, class_date=class_date)
+        .values_list("booked", flat=True)
+        .first()
+    )
+    if booked is None:
+        booked = count_booked(schedule.id, class_date)
+    return max(0, schedule.capacity - booked)
+
+
+def seat_snapshot(schedule_id, class_date):
+    """Estado actual de cupos de una ocurrencia (para notificar cambios)."""
+    row = (
+        ClassOccupancy.objects.filter(schedule_id=schedule_id, class_date=class_date)
+        .values("booked", "schedule__capacity")
+        .first()
+    )
+    if row is None:
+        capacity = Schedule.objects.filter(pk=schedule_id).values_list(
+            "capacity", flat=True
+        ).first() or 0
+        row = {
+            "booked": count_booked(schedule_id, class_date),
+            "schedule__capacity": capacity,
+        }
+
+    return {
+        "schedule_id": schedule_id,
+        "class_date": class_date.isoformat(),
+        "booked": row["booked"],
+        "capacity": row["schedule__capacity"],
+        "available_slots": max(0, row["schedule__capacity"] - row["booked"]),
+    }
+
+
+def rebuild_occupancy(from_date=None):
+    """
+    Recalcula todos los contadores a partir de las reservas. Devuelve el
+    número de filas corregidas.
+    """
+    bookings = Booking.objects.filter(status="active").exclude(
+        attendance_status="cancelled"
+    )
+    occupancies = ClassOccupancy.objects.all()
+    if from_date:
+        bookings = bookings.filter(class_date__gte=from_date)
+        occupancies = occupancies.filter(class_date__gte=from_date)
+
+    actual = {
+        (row["schedule_id"], row["class_date"]): row["booked"]
+        for row in bookings.values("schedule_id", "class_date")
+        .annotate(booked=Count("id"))
+        .order_by()
+    }
+
+    to_update = []
+    for occupancy in occupancies:
+        booked = actual.pop((occupancy.schedule_id, occupancy.class_date), 0)
+        if occupancy.booked != booked:
+            occupancy.booked = booked
+            to_update.append(occupancy)
+
+    to_create = [
+        ClassOccupancy(schedule_id=schedule_id, class_date=class_date, booked=booked)
+        for (schedule_id, class_date), booked in actual.items()
+    ]
+
+    ClassOccupancy.objects.bulk_update(to_update, ["booked"], batch_size=500)
+    ClassOccupancy.objects.bulk_create(
+        to_create, batch_size=500, ignore_conflicts=True
+    )
+    return len(to_update) + len(to_create)
@@ -4,6 +4,7 @@ from rest_framework import serializers
 from .models import (
     Booking,
     BulkBooking,
+    ClassOccurrence,
     ClassType,
     Membership,
     MonthlyRevenue,
@@ -13,8 +14,10 @@ from .models import (
     PromotionInstance,
     Schedule,
     Sede,
+    StandingReservation,
     TimeSlot,
     Venta,
+    WaitlistEntry,
 )
 from .validators import (
     validate_booking_consistency,
@@ -161,10 +164,12 @@ class ScheduleWithBookingsSerializer(serializers.ModelSerializer):
         ]
 
     def get_bookings(self, obj):
-        today = self.context.get("today")
-        bookings = Booking.objects.filter(
-            schedule=obj, class_date=today, status="active"
-        )
+        # ``get_today_classes`` precarga las reservas del día en ``day_bookings``
+        bookings = getattr(obj, "day_bookings", None)
+        if bookings is None:
+            bookings = Booking.objects.filter(
+                schedule=obj, class_date=self.context.get("today"), status="active"
+            ).select_related("client")
         return BookingAttendanceInlineSerializer(bookings, many=True).data
 
 
@@ -246,6 +251,7 @@ class PaymentSerializer(serializers.ModelSerializer):
             "promotion_id",
             "promotion_instance",
             "payment_method",
+            "method",
             "promotion_instance_id",
             "amount",
             "date_paid",
@@ -545,6 +551,7 @@ class VentaSerializer(serializers.ModelSerializer):
             "price_per_unit",
             "total_amount",
             "payment_method",
+            "method",
             "notes",
             "date_sold",
             "sede",
@@ -644,6 +651,16 @@ class BulkBookingRequestSerializer(serializers.Serializer):
         return value
 
 
+class AsyncBulkBookingRequestSerializer(BulkBookingRequestSerializer):
+    """Bulk booking request processed in the background (allows larger batches)"""
+
+    bookings = serializers.ListField(
+        child=serializers.DictField(),
+        min_length=1,
+        max_length=200,
+    )
+
+
 class BulkBookingSerializer(serializers.ModelSerializer):
     """Serializer for bulk booking model"""
 
@@ -674,6 +691,7 @@ class BulkBookingSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
             "notes",
+            "failed_items",
             "sede",
             "sede_id",
             "bookings",
@@ -683,6 +701,7 @@ class BulkBookingSerializer(serializers.ModelSerializer):
             "total_bookings",
             "successful_bookings",
             "failed_bookings",
+            "failed_items",
             "created_at",
             "updated_at",
         ]
@@ -703,3 +722,115 @@ class BulkBookingResultSerializer(serializers.Serializer):
     successful_bookings = serializers.ListField(child=serializers.DictField())
     failed_bookings = serializers.ListField(child=serializers.DictField())
     errors = serializers.ListField(child=serializers.CharField(), required=False)
+
+
+class StandingReservationSerializer(serializers.ModelSerializer):
+    """Reserva fija semanal de un cliente"""
+
+    client = serializers.StringRelatedField(read_only=True)
+    client_id = serializers.PrimaryKeyRelatedField(
+        source="client", queryset=Client.objects.all(), write_only=True
+    )
+    schedule = serializers.StringRelatedField(read_only=True)
+    schedule_id = serializers.PrimaryKeyRelatedField(
+        source="schedule", queryset=Schedule.objects.all(), write_only=True
+    )
+
+    class Meta:
+        model = StandingReservation
+        fields = [
+            "id",
+            "client",
+            "client_id",
+            "schedule",
+            "schedule_id",
+            "start_date",
+            "end_date",
+            "is_active",
+            "materialized_until",
+            "last_conflict",
+            "sede",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = [
+            "materialized_until",
+            "last_conflict",
+            "sede",
+            "created_at",
+            "updated_at",
+        ]
+
+    def validate(self, data):
+        start_date = data.get("start_date", getattr(self.instance, "start_date", None))
+        end_date = data.get("end_date", getattr(self.instance, "end_date", None))
+        if start_date and end_date and end_date < start_date:
+            raise serializers.ValidationError(
+                {"end_date": "La fecha de fin no puede ser anterior a la de inicio."}
+            )
+        return data
+
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    """Lugar de un cliente en la lista de espera de una clase"""
+
+    client = serializers.StringRelatedField(read_only=True)
+    client_id = serializers.PrimaryKeyRelatedField(
+        source="client", queryset=Client.objects.all(), write_only=True, required=False
+    )
+    schedule = serializers.StringRelatedField(read_only=True)
+    schedule_id = serializers.PrimaryKeyRelatedField(
+        source="schedule", queryset=Schedule.objects.all(), write_only=True
+    )
+
+    class Meta:
+        model = WaitlistEntry
+        fields = [
+            "id",
+            "client",
+            "client_id",
+            "schedule",
+            "schedule_id",
+            "class_date",
+            "status",
+            "booking",
+            "notes",
+            "sede",
+            "created_at",
+        ]
+        read_only_fields = ["status", "booking", "notes", "sede", "created_at"]
+
+
+class ClassOccurrenceSerializer(serializers.ModelSerializer):
+    """Clase concreta del calendario con sus cupos ocupados"""
+
+    time_slot = serializers.CharField(source="schedule.time_slot", read_only=True)
+    is_individual = serializers.BooleanField(source="schedule.is_individual", read_only=True)
+    class_type = serializers.CharField(
+        source="schedule.class_type.name", read_only=True, default=None
+    )
+    coach_username = serializers.CharField(source="coach.username", read_only=True, default=None)
+    booked = serializers.IntegerField(read_only=True)
+    available = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ClassOccurrence
+        fields = [
+            "id",
+            "schedule",
+            "date",
+            "start",
+            "end",
+            "time_slot",
+            "is_individual",
+            "class_type",
+            "capacity",
+            "booked",
+            "available",
+            "coach",
+            "coach_username",
+            "sede",
+        ]
+
+    def get_available(self, obj):
+        return max(obj.capacity - obj.booked, 0)
@@ -0,0 +1,239 @@
+# studio/signals.py
+"""
+Receivers de señales del estudio. Se conectan en ``StudioConfig.ready``.
+"""
+from functools import partial
+
+from accounts.models import Client
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .availability import invalidate_sede, invalidate_slots
+from .broadcast import availability_channel, get_broadcaster
+from .closing_facts import mark_dirty, mark_trial_days_dirty
+from .dashboard import BOOKINGS, CLIENTS, PAYMENTS, invalidate_dashboard
+from .entitlements import change_entitlements, refresh_entitlements
+from .middleware import invalidate_active_sede_ids
+from .occurrences import generate_occurrences
+from .revenue import move_revenue
+from .models import (
+    Booking,
+    Membership,
+    Payment,
+    Promotion,
+    Schedule,
+    Sede,
+    TimeSlot,
+    Venta,
+)
+from .seats import release_seat, seat_snapshot
+
+
+def run_now_and_on_commit(func, *args):
+    """
+    Ejecuta ``func`` de inmediato y otra vez al confirmar la transacción, para
+    que una lectura concurrente no vuelva a guardar en cache datos sin confirmar.
+    """
+    func(*args)
+    transaction.on_commit(partial(func, *args))
+
+
+def publish_seat_change(sede_id, schedule_id, class_date, delta):
+    """
+    Envía el nuevo conteo de cupos a los clientes del stream SSE. Sin nadie
+    suscrito a esa sede y fecha no se consulta el conteo.
+    """
+    broadcaster = get_broadcaster()
+    channel = availability_channel(sede_id, class_date)
+    if not broadcaster.has_subscribers(channel):
+        return
+    message = seat_snapshot(schedule_id, class_date)
+    message["delta"] = delta
+    broadcaster.publish(channel, message)
+
+
+def seats_changed(released=(), reserved=()):
+    """
+    Invalida el cache y notifica el stream SSE para cada cupo que cambió.
+    Recibe listas de ``(schedule_id, class_date)``; se usa también desde los
+    flujos que crean reservas con ``bulk_create`` (sin señales).
+    """
+    changes = [(seat, -1) for seat in released if seat is not None] + [
+        (seat, 1) for seat in reserved if seat is not None
+    ]
+    if not changes:
+        return
+
+    sede_by_schedule = dict(
+        Schedule.objects.filter(
+            id__in={schedule_id for (schedule_id, _), _ in changes}
+        ).values_list("id", "sede_id")
+    )
+    for (schedule_id, class_date), delta in changes:
+        sede_id = sede_by_schedule.get(schedule_id)
+        run_now_and_on_commit(invalidate_slots, sede_id, class_date)
+        # robust: un fallo al notificar no debe afectar la reserva ya confirmada
+        transaction.on_commit(
+            partial(publish_seat_change, sede_id, schedule_id, class_date, delta),
+            robust=True,
+        )
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, **kwargs):
+    previous_seat = getattr(instance, "_previous_seat", None)
+    current_seat = instance.seat_key()
+    if previous_seat != current_seat:
+        seats_changed(released=[previous_seat], reserved=[current_seat])
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    # También cubre los borrados en cascada (cliente, horario) y queryset.delete()
+    seat = getattr(instance, "_loaded_seat", None)
+    if seat is not None:
+        release_seat(*seat)
+        seats_changed(released=[seat])
+    change_entitlements(removed=[getattr(instance, "_loaded_entitlement", None)])
+
+
+@receiver(post_save, sender=Payment)
+def payment_saved(sender, instance, **kwargs):
+    # Plan, promoción o extras pueden cambiar las clases permitidas
+    refresh_entitlements([instance.pk])
+
+
+def sale_fields(sender):
+    """(fecha local, monto) del pago o la venta."""
+    return ("paid_on", "amount") if sender is Payment else ("sold_on", "total_amount")
+
+
+@receiver(pre_save, sender=Payment)
+@receiver(pre_save, sender=Venta)
+def remember_previous_day(sender, instance, **kwargs):
+    day_field, amount_field = sale_fields(sender)
+    instance._previous_day = instance._previous_sede_id = instance._previous_amount = None
+    if instance.pk:
+        instance._previous_day, instance._previous_sede_id, instance._previous_amount = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list(day_field, "sede_id", amount_field)
+            .first()
+            or (None, None, None)
+        )
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+@receiver(post_save, sender=Venta)
+@receiver(post_delete, sender=Venta)
+def sale_changed(sender, instance, **kwargs):
+    day_field, amount_field = sale_fields(sender)
+    day = getattr(instance, day_field)
+    # Cierre diario del día del pago/venta (y del anterior si cambió la fecha)
+    mark_dirty([day, getattr(instance, "_previous_day", None)])
+
+    # Ingresos mensuales: se quita lo anterior y se suma lo actual
+    current = (day, instance.sede_id, getattr(instance, amount_field))
+    previous = None
+    if kwargs["signal"] is post_delete:
+        previous, current = current, None
+    elif getattr(instance, "_previous_day", None) is not None:
+        previous = (
+            instance._previous_day,
+            instance._previous_sede_id,
+            instance._previous_amount,
+        )
+    move_revenue(sender is Payment, previous, current)
+
+    if sender is Payment:
+        run_now_and_on_commit(
+            invalidate_dashboard,
+            {instance.sede_id, getattr(instance, "_previous_sede_id", None)},
+            PAYMENTS,
+        )
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def booking_day_changed(sender, instance, **kwargs):
+    mark_dirty([instance.class_date, getattr(instance, "_loaded_class_date", None)])
+    run_now_and_on_commit(invalidate_dashboard, {instance.sede_id}, BOOKINGS)
+
+
+@receiver(pre_save, sender=Client)
+def remember_previous_trial(sender, instance, **kwargs):
+    instance._previous_trial_used = None
+    if instance.pk:
+        instance._previous_trial_used = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list("trial_used", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+def client_changed(sender, instance, **kwargs):
+    run_now_and_on_commit(invalidate_dashboard, {instance.sede_id}, CLIENTS)
+    # Las "pruebas" de los cierres cuentan asistencias con trial_used
+    previous = getattr(instance, "_previous_trial_used", None)
+    if previous is not None and previous != instance.trial_used:
+        mark_trial_days_dirty([instance.pk])
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_save, sender=Promotion)
+def plan_saved(sender, instance, created, **kwargs):
+    if created:
+        return
+    field = "membership" if sender is Membership else "promotion"
+    payment_ids = Payment.objects.filter(
+        **{field: instance}, valid_until__gte=timezone.localdate()
+    ).values_list("id", flat=True)
+    refresh_entitlements(payment_ids)
+
+
+@receiver(pre_save, sender=Schedule)
+@receiver(pre_save, sender=TimeSlot)
+def remember_previous_sede(sender, instance, **kwargs):
+    instance._previous_sede_id = None
+    if instance.pk:
+        instance._previous_sede_id = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list("sede_id", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Schedule)
+@receiver(post_save, sender=TimeSlot)
+@receiver(post_delete, sender=TimeSlot)
+def schedule_changed(sender, instance, **kwargs):
+    sede_ids = {instance.sede_id, getattr(instance, "_previous_sede_id", None)}
+    for sede_id in sede_ids:
+        run_now_and_on_commit(invalidate_sede, sede_id)
+    # La ocupación por horario del dashboard sale de Schedule y TimeSlot
+    run_now_and_on_commit(invalidate_dashboard, sede_ids, BOOKINGS)
+
+
+@receiver(post_save, sender=Schedule)
+def schedule_saved(sender, instance, **kwargs):
+    # Regenera sus próximas clases (día, hora, capacidad o coach pudieron cambiar)
+    transaction.on_commit(partial(generate_occurrences, schedule_ids=[instance.pk]))
+
+
+@receiver(post_save, sender=TimeSlot)
+@receiver(post_delete, sender=TimeSlot)
+def time_slot_changed(sender, instance, **kwargs):
+    # La duración de las clases de la sede sale de sus TimeSlot
+    sede_ids = {instance.sede_id, getattr(instance, "_previous_sede_id", None)} - {None}
+    transaction.on_commit(partial(generate_occurrences, sede_ids=sede_ids))
+
+
+@receiver(post_save, sender=Sede)
+@receiver(post_delete, sender=Sede)
+def sede_changed(sender, instance, **kwargs):
+    run_now_and_on_commit(invalidate_active_sede_ids)
@@ -0,0 +1,114 @@
+# studio/standing.py
+"""
+Reservas fijas (``StandingReservation``): el mismo horario cada semana.
+
+``materialize_standing_reservations`` genera en una sola pasada las reservas
+de las próximas semanas para todas las reservas fijas activas: las reglas de
+cupo y de límite de clases se evalúan con ``load_contexts``/``decide`` de
+``studio/booking_policy.py`` y todas las reservas aceptadas se insertan con un
+único ``bulk_create``. Las que no se pueden crear se devuelven como conflictos
+y quedan en ``last_conflict`` para que recepción las revise.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .availability import DAY_CODES
+from .booking_policy import BookingRequest, decide, load_contexts, save_decisions
+from .models import StandingReservation
+
+STANDING_WEEKS_AHEAD = 2
+
+WEEKDAYS = {code: weekday for weekday, code in DAY_CODES.items()}
+
+
+def standing_dates(standing, start, end):
+    """Fechas de clase de ``standing`` aún no generadas entre ``start`` y ``end``."""
+    first = max(start, standing.start_date)
+    if standing.materialized_until:
+        first = max(first, standing.materialized_until + timedelta(days=1))
+    last = min(end, standing.end_date or end)
+
+    first += timedelta(days=(WEEKDAYS[standing.schedule.day] - first.weekday()) % 7)
+    dates = []
+    while first <= last:
+        dates.append(first)
+        first += timedelta(weeks=1)
+    return dates
+
+
+def materialize_standing_reservations(weeks=STANDING_WEEKS_AHEAD, today=None, dry_run=False):
+    """
+    Genera las reservas de las reservas fijas activas hasta ``weeks`` semanas
+    adelante. Devuelve ``{"standings", "created", "conflicts"}``; cada
+    conflicto indica reserva fija, cliente, horario, fecha y motivo. Con
+    ``dry_run`` se revierte todo al final.
+    """
+    today = today or timezone.localdate()
+    until = today + timedelta(weeks=weeks)
+
+    with transaction.atomic():
+        # El bloqueo evita que dos corridas simultáneas generen lo mismo
+        standings = list(
+            StandingReservation.objects.select_for_update(of=("self",))
+            .filter(is_active=True, start_date__lte=until)
+            .filter(Q(end_date__isnull=True) | Q(end_date__gte=today))
+            .filter(Q(materialized_until__isnull=True) | Q(materialized_until__lt=until))
+            .select_related("client", "schedule")
+        )
+
+        requests_by_client = defaultdict(list)
+        for standing in standings:
+            for class_date in standing_dates(standing, today, until):
+                requests_by_client[standing.client].append(
+                    BookingRequest(standing.schedule_id, class_date, data={"standing": standing})
+                )
+
+        decisions = []
+        if requests_by_client:
+            contexts = load_contexts(requests_by_client)
+            for client, requests in requests_by_client.items():
+                # En orden de fecha, para descontar primero las clases más próximas
+                requests.sort(key=lambda r: (r.class_date, r.data["standing"].schedule.time_slot))
+                decisions += decide(contexts[client.pk], requests, reject_past=True)
+            created = save_decisions(decisions, next(iter(contexts.values())).occupancies)
+        else:
+            created = []
+
+        conflicts = []
+        last_conflict = {}
+        for decision in decisions:
+            # Si el cliente ya tenía la clase reservada no hay nada que reportar
+            if decision.ok or decision.code == "duplicate":
+                continue
+            standing = decision.request.data["standing"]
+            conflicts.append(
+                {
+                    "standing_id": standing.id,
+                    "client": str(standing.client),
+                    "schedule_id": standing.schedule_id,
+                    "class_date": decision.request.class_date.isoformat(),
+                    "code": decision.code,
+                    "error": decision.message,
+                }
+            )
+            last_conflict[standing.id] = (
+                f"{decision.request.class_date.isoformat()}: {decision.message}"
+            )
+
+        now = timezone.now()
+        for standing in standings:
+            standing.materialized_until = until
+            standing.last_conflict = last_conflict.get(standing.id, "")[:255]
+            standing.updated_at = now
+        StandingReservation.objects.bulk_update(
+            standings, ["materialized_until", "last_conflict", "updated_at"]
+        )
+
+        if dry_run:
+            transaction.set_rollback(True)
+
+    return {"standings": len(standings), "created": len(created), "conflicts": conflicts}
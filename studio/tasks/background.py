@@ -0,0 +1,49 @@
+# studio/tasks/background.py
+"""
+Pool de hilos del proceso para trabajo que no debe bloquear la respuesta
+HTTP (reservas múltiples asíncronas, correos de notificación).
+
+``submit_on_commit`` encola la tarea solo si la transacción actual se
+confirma, así una notificación nunca sale por un cambio revertido.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Pool de hilos compartido por el proceso."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "BACKGROUND_TASK_WORKERS", 2),
+                    thread_name_prefix="studio-task",
+                )
+    return _executor
+
+
+def run_task(func, *args):
+    try:
+        func(*args)
+    except Exception as e:
+        print(f"❌ Error en tarea en segundo plano {func.__name__}: {e}")
+    finally:
+        # Cada hilo del pool abre sus propias conexiones
+        connections.close_all()
+
+
+def submit(func, *args):
+    """Ejecuta ``func(*args)`` en el pool."""
+    return get_executor().submit(run_task, func, *args)
+
+
+def submit_on_commit(func, *args):
+    """Ejecuta ``func(*args)`` en el pool cuando se confirme la transacción."""
+    transaction.on_commit(lambda: submit(func, *args))
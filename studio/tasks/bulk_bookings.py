@@ -0,0 +1,123 @@
+# studio/tasks/bulk_bookings.py
+"""
+Procesamiento en segundo plano de reservas múltiples (``create-multiple?async=1``).
+
+La vista guarda la solicitud en ``BulkBooking.request_data`` con estado
+``pending`` y encola el id al confirmar la transacción. El pool de hilos del
+proceso (``studio/tasks/background.py``) procesa las reservas por bloques,
+actualizando los contadores tras cada bloque para que ``summary`` muestre el
+avance. Si el proceso se congela o reinicia antes de terminar (en Vercel la
+función puede detenerse al enviar la respuesta), la tarea
+``reservas_multiples_pendientes`` (scheduler o Vercel Cron, ver
+studio/tasks/jobs.py) retoma los pendientes desde la última reserva
+procesada.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from studio.bulk_booking import create_bulk_bookings
+from studio.models import BulkBooking
+from studio.tasks.background import submit_on_commit
+
+# Reservas por bloque; los contadores se guardan al terminar cada bloque
+CHUNK_SIZE = 10
+
+# Tiempo sin avances tras el cual un job "processing" se considera abandonado
+STALE_AFTER = timedelta(minutes=10)
+
+
+def enqueue_bulk_booking(bulk_booking_id):
+    """Encola el procesamiento cuando se confirme la transacción actual."""
+    submit_on_commit(process_bulk_booking, bulk_booking_id)
+
+
+def claim_bulk_booking(bulk_booking_id):
+    """
+    Marca el job como ``processing`` si está pendiente o abandonado. Devuelve
+    False si otro worker ya lo tomó o ya terminó.
+    """
+    stale_before = timezone.now() - STALE_AFTER
+    claimed = (
+        BulkBooking.objects.filter(pk=bulk_booking_id, request_data__isnull=False)
+        .filter(
+            Q(status="pending") | Q(status="processing", updated_at__lt=stale_before)
+        )
+        .update(status="processing", updated_at=timezone.now())
+    )
+    return claimed == 1
+
+
+def process_bulk_booking(bulk_booking_id):
+    """
+    Procesa las reservas pendientes de un BulkBooking. Retoma desde
+    ``successful_bookings + failed_bookings`` si un proceso anterior se cortó.
+    """
+    if not claim_bulk_booking(bulk_booking_id):
+        return
+
+    bulk_booking = BulkBooking.objects.select_related("client").get(pk=bulk_booking_id)
+    client = bulk_booking.client
+    request_data = bulk_booking.request_data
+    bookings_data = request_data["bookings"]
+    created = []
+
+    for start in range(bulk_booking.processed_bookings, len(bookings_data), CHUNK_SIZE):
+        chunk = bookings_data[start : start + CHUNK_SIZE]
+        with transaction.atomic():
+            successful, failed, errors, chunk_created = create_bulk_bookings(
+                client,
+                bulk_booking,
+                chunk,
+                number_of_slots=request_data.get("number_of_slots", 1),
+                membership_id=request_data.get("membership_id"),
+            )
+            # El avance se confirma junto con las reservas del bloque
+            BulkBooking.objects.filter(pk=bulk_booking.pk).update(
+                successful_bookings=F("successful_bookings") + len(successful),
+                failed_bookings=F("failed_bookings") + len(failed),
+                updated_at=timezone.now(),
+            )
+            if failed:
+                bulk_booking.failed_items = bulk_booking.failed_items + failed
+                bulk_booking.save(update_fields=["failed_items"])
+        created.extend(chunk_created)
+
+    bulk_booking.refresh_from_db(
+        fields=["successful_bookings", "failed_bookings", "failed_items"]
+    )
+    bulk_booking.update_status()
+
+    if created:
+        try:
+            from studio.management.mails.mails import (
+                send_bulk_booking_confirmation_email,
+            )
+
+            send_bulk_booking_confirmation_email(client, created)
+            print(f"Bulk confirmation email sent for {len(created)} bookings")
+        except Exception as e:
+            print(f"Error sending bulk confirmation email: {e}")
+
+
+def run_pending_bulk_bookings_task():
+    """
+    Procesa en el hilo actual los jobs pendientes o abandonados (p. ej. tras
+    un reinicio), así el cron no depende del pool del proceso. Un job que
+    lanza una excepción queda ``failed`` para no bloquear a los siguientes.
+    """
+    stale_before = timezone.now() - STALE_AFTER
+    pending_ids = BulkBooking.objects.filter(request_data__isnull=False).filter(
+        Q(status="pending", created_at__lt=timezone.now() - timedelta(minutes=1))
+        | Q(status="processing", updated_at__lt=stale_before)
+    ).order_by("id").values_list("id", flat=True)
+    for bulk_booking_id in list(pending_ids):
+        try:
+            process_bulk_booking(bulk_booking_id)
+        except Exception as e:
+            print(f"❌ Error procesando Bulk Booking #{bulk_booking_id}: {e}")
+            BulkBooking.objects.filter(pk=bulk_booking_id).update(
+                status="failed", updated_at=timezone.now()
+            )
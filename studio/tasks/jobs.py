@@ -0,0 +1,56 @@
+# studio/tasks/jobs.py
+"""
+Tareas periódicas del estudio, por id.
+
+``scheduler.start`` las programa dentro del proceso (servidor propio). En
+Vercel el proceso no queda vivo entre peticiones: las ejecuta Vercel Cron con
+``/api/studio/cron/<id>/`` (ver vercel.json) y en cualquier servidor se puede
+usar el comando ``run_scheduled_task``.
+"""
+from studio.dashboard import refresh_dashboard_snapshots
+from studio.entitlements import refresh_recent_entitlements
+from studio.middleware import get_active_sede_ids
+from studio.occurrences import generate_occurrences
+from studio.standing import materialize_standing_reservations
+from studio.tasks.bulk_bookings import run_pending_bulk_bookings_task
+
+
+def run_entitlement_refresh_task():
+    # Las reservas pendientes de ayer dejan de contar como clases usadas
+    total = refresh_recent_entitlements()
+    print(f"✔️ Libro de clases recalculado para {total} pagos")
+
+
+def run_class_occurrences_task():
+    total = generate_occurrences()
+    print(f"✔️ Calendario de clases generado: {total} clases")
+
+
+def run_standing_reservations_task():
+    result = materialize_standing_reservations()
+    for conflict in result["conflicts"]:
+        print(
+            f"⚠️ Reserva fija {conflict['standing_id']} ({conflict['client']}) "
+            f"{conflict['class_date']}: {conflict['error']}"
+        )
+    print(f"✔️ Reservas fijas: {result['created']} reservas creadas")
+
+
+def run_dashboard_snapshot_task():
+    # Cada sede activa por separado y todas juntas (vista sin sede elegida)
+    total = refresh_dashboard_snapshots(get_active_sede_ids())
+    print(f"✔️ Dashboard refrescado para {total} combinaciones de sedes")
+
+
+TASKS = {
+    "clases_por_pago": run_entitlement_refresh_task,
+    "ocurrencias_clases": run_class_occurrences_task,
+    "reservas_fijas": run_standing_reservations_task,
+    "reservas_multiples_pendientes": run_pending_bulk_bookings_task,
+    "dashboard_snapshots": run_dashboard_snapshot_task,
+}
+
+
+def run_scheduled_task(task_id):
+    """Ejecuta la tarea ``task_id`` en el hilo actual."""
+    TASKS[task_id]()
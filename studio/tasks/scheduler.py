@@ -10,6 +10,13 @@ from studio.management.mails.mails import (
     send_subscription_expired_email,
 )
 from studio.models import Payment
+from studio.tasks.bulk_bookings import run_pending_bulk_bookings_task
+from studio.tasks.jobs import (
+    run_class_occurrences_task,
+    run_dashboard_snapshot_task,
+    run_entitlement_refresh_task,
+    run_standing_reservations_task,
+)
 
 
 def run_reminder_task():
@@ -78,5 +85,52 @@ def start():
         replace_existing=True,
     )
 
-    print("🔁 Tareas programadas: recordatorio_renovacion, aviso_vencimiento")
+    scheduler.add_job(
+        run_entitlement_refresh_task,
+        trigger="cron",
+        hour=0,
+        minute=10,
+        id="clases_por_pago",
+        replace_existing=True,
+    )
+
+    scheduler.add_job(
+        run_class_occurrences_task,
+        trigger="cron",
+        hour=0,
+        minute=5,
+        id="ocurrencias_clases",
+        replace_existing=True,
+    )
+
+    scheduler.add_job(
+        run_standing_reservations_task,
+        trigger="cron",
+        hour=0,
+        minute=20,
+        id="reservas_fijas",
+        replace_existing=True,
+    )
+
+    scheduler.add_job(
+        run_pending_bulk_bookings_task,
+        trigger="interval",
+        minutes=5,
+        id="reservas_multiples_pendientes",
+        replace_existing=True,
+    )
+
+    scheduler.add_job(
+        run_dashboard_snapshot_task,
+        trigger="interval",
+        minutes=10,
+        id="dashboard_snapshots",
+        replace_existing=True,
+    )
+
+    print(
+        "🔁 Tareas programadas: recordatorio_renovacion, aviso_vencimiento, "
+        "clases_por_pago, ocurrencias_clases, reservas_fijas, "
+        "reservas_multiples_pendientes, dashboard_snapshots"
+    )
     scheduler.start()
@@ -0,0 +1,269 @@
+from datetime import date, time
+
+from accounts.models import Client
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+from studio.availability import get_reschedule_options, get_slots
+from studio.models import Booking, ClassType, Schedule, Sede, TimeSlot
+
+User = get_user_model()
+
+# Lunes
+CLASS_DATE = date(2030, 1, 7)
+
+
+class AvailabilityFixturesMixin:
+    def setUp(self):
+        cache.clear()
+        self.sede = Sede.objects.create(name="Sede 1", slug="sede1", status=True)
+        self.other_sede = Sede.objects.create(name="Sede 2", slug="sede2", status=True)
+        self.coach = User.objects.create_user(
+            username="coach", first_name="Ana", last_name="López", password="x"
+        )
+        self.class_type = ClassType.objects.create(name="Reformer")
+        TimeSlot.objects.create(
+            sede=self.sede, start_time=time(7, 0), end_time=time(7, 50)
+        )
+
+        self.schedules = [
+            Schedule.objects.create(
+                day="MON",
+                time_slot=f"{hour:02d}:00",
+                class_type=self.class_type,
+                coach=self.coach,
+                capacity=2,
+                sede=self.sede,
+            )
+            for hour in range(7, 12)
+        ]
+        self.other_schedule = Schedule.objects.create(
+            day="MON", time_slot="07:00", capacity=3, sede=self.other_sede
+        )
+
+        self.clients = [
+            Client.objects.create(
+                first_name=f"Cliente{i}",
+                last_name="Test",
+                email=f"c{i}@example.com",
+                sede=self.sede,
+            )
+            for i in range(3)
+        ]
+        for client in self.clients[:2]:
+            Booking.objects.create(
+                client=client,
+                schedule=self.schedules[0],
+                class_date=CLASS_DATE,
+                status="active",
+                sede=self.sede,
+            )
+        Booking.objects.create(
+            client=self.clients[2],
+            schedule=self.schedules[1],
+            class_date=CLASS_DATE,
+            status="active",
+            attendance_status="cancelled",
+            sede=self.sede,
+        )
+
+
+class AvailabilityServiceTest(AvailabilityFixturesMixin, TestCase):
+    def test_slots_use_constant_queries(self):
+        # schedules + ocupación + time slots + reservas del cliente
+        with self.assertNumQueries(4):
+            slots = get_slots(CLASS_DATE, client_id=self.clients[0].id)
+        self.assertEqual(len(slots), 6)
+
+    def test_occupancy_and_time_slot_duration(self):
+        slots = {
+            s["schedule_id"]: s
+            for s in get_slots(CLASS_DATE, client_id=self.clients[0].id)
+        }
+
+        full = slots[self.schedules[0].id]
+        self.assertEqual(full["booked"], 2)
+        self.assertFalse(full["available"])
+        self.assertTrue(full["client_has_booking"])
+        self.assertEqual(full["end"], "2030-01-07T07:50:00")
+        self.assertEqual(full["coach"], "Ana López")
+
+        # Las reservas con asistencia cancelada no ocupan cupo
+        self.assertEqual(slots[self.schedules[1].id]["booked"], 0)
+        # Sin TimeSlot configurado se asume una hora
+        self.assertEqual(slots[self.schedules[1].id]["end"], "2030-01-07T09:00:00")
+
+    def test_sede_filter(self):
+        slots = get_slots(CLASS_DATE, sede_ids=[self.other_sede.id])
+        self.assertEqual([s["schedule_id"] for s in slots], [self.other_schedule.id])
+
+    def test_availability_endpoints(self):
+        api = APIClient()
+
+        response = api.get(
+            "/api/studio/availability/",
+            {"date": CLASS_DATE.isoformat()},
+            HTTP_X_SEDE_ID=str(self.sede.id),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["slots"]), 5)
+
+        response = api.post(
+            "/api/studio/availability/",
+            {"date": CLASS_DATE.isoformat(), "client_id": self.clients[2].id},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["total_schedules"], 6)
+        first = response.data["slots"][0]
+        self.assertFalse(first["client_has_booking"])
+        self.assertFalse(first["can_book_multiple"])
+
+    def test_reschedule_slots_allow_current_booking(self):
+        current = Booking.objects.get(client=self.clients[0])
+        api = APIClient()
+        api.force_authenticate(user=self.coach)
+
+        response = api.get(
+            "/api/studio/bookings/available-slots-for-reschedule/",
+            {"date": CLASS_DATE.isoformat(), "current_booking_id": current.id},
+        )
+        self.assertEqual(response.status_code, 200)
+        slot = next(
+            s for s in response.data["slots"] if s["schedule_id"] == self.schedules[0].id
+        )
+        self.assertTrue(slot["is_current_booking"])
+        self.assertTrue(slot["client_has_booking"])
+
+
+    def test_reschedule_options_for_several_days(self):
+        current = Booking.objects.get(client=self.clients[0])
+        with self.assertNumQueries(4):
+            options = get_reschedule_options(
+                CLASS_DATE, 14, self.clients[0].id, sede_ids=[self.sede.id]
+            )
+        self.assertEqual(len(options), 14)
+
+        api = APIClient()
+        api.force_authenticate(user=self.coach)
+        response = api.get(
+            "/api/studio/bookings/available-slots-for-reschedule/",
+            {"date": CLASS_DATE.isoformat(), "current_booking_id": current.id, "days": 8},
+        )
+        self.assertEqual(response.status_code, 200)
+        days = response.data["days"]
+        self.assertEqual([d["date"] for d in days][::7], ["2030-01-07", "2030-01-14"])
+        # Sin sede en la solicitud se usa la sede de la reserva
+        self.assertEqual(days[7]["total_schedules"], 5)
+        self.assertTrue(all(s["can_reschedule_to"] for s in days[7]["slots"]))
+        self.assertEqual(response.data["slots"], days[0]["slots"])
+
+        response = api.get(
+            "/api/studio/bookings/available-slots-for-reschedule/",
+            {"date": CLASS_DATE.isoformat(), "current_booking_id": current.id, "days": 30},
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class AvailabilityRangeTest(AvailabilityFixturesMixin, TestCase):
+    def test_week_matrix_uses_constant_queries(self):
+        api = APIClient()
+        # schedules + ocupación + time slots + reservas del cliente
+        with self.assertNumQueries(4):
+            response = api.get(
+                "/api/studio/availability/range/",
+                {
+                    "start": "2030-01-07",
+                    "end": "2030-01-13",
+                    "client_id": self.clients[0].id,
+                },
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["days"]), 7)
+        self.assertEqual(len(response.data["schedules"]), 6)
+
+        monday = response.data["days"][0]
+        self.assertEqual(monday["date"], "2030-01-07")
+        slot = monday["slots"][0]
+        self.assertEqual(slot["schedule_id"], self.schedules[0].id)
+        self.assertEqual(slot["booked"], 2)
+        self.assertTrue(slot["client_has_booking"])
+        # Solo hay horarios los lunes
+        self.assertEqual(response.data["days"][1]["slots"], [])
+
+    def test_range_validation(self):
+        api = APIClient()
+        response = api.get(
+            "/api/studio/availability/range/",
+            {"start": "2030-01-07", "end": "2030-03-07"},
+        )
+        self.assertEqual(response.status_code, 400)
+        response = api.get(
+            "/api/studio/availability/range/",
+            {"start": "2030-01-07", "end": "2030-01-01"},
+        )
+        self.assertEqual(response.status_code, 400)
+        response = api.get(
+            "/api/studio/availability/range/",
+            {"start": "2030-02-01", "end": "2030-02-30"},
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class AvailabilityCacheTest(AvailabilityFixturesMixin, TestCase):
+    def get(self, **headers):
+        return APIClient().get(
+            "/api/studio/availability/",
+            {"date": CLASS_DATE.isoformat(), "sede_ids": str(self.sede.id)},
+            **headers,
+        )
+
+    def test_repeat_poll_returns_304_without_queries(self):
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        etag = first["ETag"]
+        self.assertTrue(first["Last-Modified"])
+
+        with self.assertNumQueries(0):
+            cached = self.get()
+        self.assertEqual(cached.data, first.data)
+
+        with self.assertNumQueries(0):
+            response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_booking_changes_invalidate_the_date(self):
+        etag = self.get()["ETag"]
+
+        booking = Booking.objects.create(
+            client=self.clients[2],
+            schedule=self.schedules[2],
+            class_date=CLASS_DATE,
+            sede=self.sede,
+        )
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        slot = next(
+            s for s in response.data["slots"] if s["schedule_id"] == self.schedules[2].id
+        )
+        self.assertEqual(slot["booked"], 1)
+
+        booking.delete()
+        response = self.get()
+        slot = next(
+            s for s in response.data["slots"] if s["schedule_id"] == self.schedules[2].id
+        )
+        self.assertEqual(slot["booked"], 0)
+
+    def test_schedule_changes_invalidate_the_sede(self):
+        self.get()
+        schedule = self.schedules[3]
+        schedule.capacity = 5
+        schedule.save()
+
+        response = self.get()
+        slot = next(
+            s for s in response.data["slots"] if s["schedule_id"] == schedule.id
+        )
+        self.assertEqual(slot["capacity"], 5)
@@ -0,0 +1,216 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from accounts.models import Client
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from studio.booking_policy import BookingDecision, BookingRequest, decide, load_context
+from studio.models import (
+    Booking,
+    Membership,
+    Payment,
+    Promotion,
+    PromotionInstance,
+    Schedule,
+    Sede,
+)
+
+User = get_user_model()
+
+
+def upcoming_mondays(count):
+    today = timezone.localdate()
+    first = today + timedelta(days=(7 - today.weekday()) % 7 or 7)
+    return [first + timedelta(weeks=i) for i in range(count)]
+
+
+class BookingPolicyTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sede = Sede.objects.create(name="Sede 1", slug="sede1", status=True)
+        self.schedule = Schedule.objects.create(
+            day="MON", time_slot="07:00", capacity=3, sede=self.sede
+        )
+        self.client_obj = Client.objects.create(
+            first_name="Test", last_name="Client", email="client@example.com"
+        )
+        self.membership = Membership.objects.create(
+            name="4 clases", price=Decimal("250.00"), classes_per_month=4
+        )
+        self.individual = Membership.objects.create(
+            name="Clase individual", price=Decimal("90.00"), classes_per_month=1
+        )
+
+    def pay(self, **kwargs):
+        return Payment.objects.create(
+            client=self.client_obj,
+            membership=self.membership,
+            amount=Decimal("250.00"),
+            valid_from=timezone.localdate() - timedelta(days=1),
+            valid_until=timezone.localdate() + timedelta(days=90),
+            **kwargs,
+        )
+
+    def requests(self, dates):
+        return [BookingRequest(self.schedule.id, d) for d in dates]
+
+    def decide(self, dates, **rules):
+        with transaction.atomic():
+            context = load_context(self.client_obj, self.requests(dates))
+            return decide(context, self.requests(dates), **rules)
+
+    def test_query_count_is_bounded(self):
+        self.pay()
+        dates = upcoming_mondays(12)
+
+        def count(batch):
+            with CaptureQueriesContext(connection) as queries:
+                self.decide(batch)
+            return len(queries)
+
+        self.assertEqual(count(dates[:2]), count(dates[2:12]))
+
+    def test_trial_then_membership_then_limit(self):
+        payment = self.pay()
+        decisions = self.decide(upcoming_mondays(6))
+
+        self.assertEqual(
+            [d.kind for d in decisions[:5]],
+            [BookingDecision.TRIAL] + [BookingDecision.MEMBERSHIP] * 4,
+        )
+        self.assertIsNone(decisions[0].booking.payment)
+        self.assertEqual(decisions[1].booking.payment, payment)
+        self.assertEqual(decisions[5].code, "limit_reached")
+        self.assertEqual(decisions[5].message, "Has alcanzado tu límite de clases (4).")
+
+    def test_no_payment_is_allowed_only_for_manual_checkin(self):
+        self.client_obj.trial_used = True
+        self.client_obj.save()
+        date = upcoming_mondays(1)
+
+        self.assertEqual(self.decide(date)[0].code, "no_membership")
+        decision = self.decide(date, allow_without_payment=True)[0]
+        self.assertTrue(decision.ok)
+        self.assertIsNone(decision.booking.payment)
+
+    def test_inactive_promotion_is_rejected(self):
+        self.client_obj.trial_used = True
+        self.client_obj.save()
+        today = timezone.localdate()
+        promotion = Promotion.objects.create(
+            name="Promo",
+            start_date=today - timedelta(days=30),
+            end_date=today - timedelta(days=1),
+            price=Decimal("100.00"),
+            membership=self.membership,
+        )
+        self.pay(promotion=promotion)
+
+        self.assertEqual(self.decide(upcoming_mondays(1))[0].code, "promotion_not_linked")
+        PromotionInstance.objects.create(promotion=promotion).clients.add(self.client_obj)
+        self.assertEqual(self.decide(upcoming_mondays(1))[0].code, "promotion_inactive")
+
+
+class BookingEntryPointsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sede = Sede.objects.create(name="Sede 1", slug="sede1", status=True)
+        self.schedule = Schedule.objects.create(
+            day="MON", time_slot="07:00", capacity=1, sede=self.sede
+        )
+        self.user = User.objects.create_user(
+            username="cliente", email="client@example.com", password="x"
+        )
+        self.client_obj = Client.objects.create(
+            first_name="Test",
+            last_name="Client",
+            email="client@example.com",
+            trial_used=True,
+        )
+        self.individual = Membership.objects.create(
+            name="Clase individual", price=Decimal("90.00"), classes_per_month=1
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.user)
+
+    def test_authenticated_booking_individual_is_pending_without_seat(self):
+        date = upcoming_mondays(1)[0]
+        response = self.api.post(
+            "/api/studio/me/bookings/create/",
+            {
+                "schedule_id": self.schedule.id,
+                "class_date": date.isoformat(),
+                "membership_id": self.individual.id,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        booking = Booking.objects.get(pk=response.data["booking_id"])
+        self.assertEqual(booking.status, "pending")
+        self.assertEqual(booking.sede, self.sede)
+
+        response = self.api.post(
+            "/api/studio/me/bookings/create/",
+            {"schedule_id": self.schedule.id, "class_date": date.isoformat()},
+            format="json",
+        )
+        self.assertEqual(
+            response.data["detail"],
+            "Ya tienes una reserva para este horario en esta fecha.",
+        )
+
+    def test_authenticated_booking_rejects_past_and_unknown(self):
+        past = timezone.localdate() - timedelta(days=7)
+        response = self.api.post(
+            "/api/studio/me/bookings/create/",
+            {"schedule_id": self.schedule.id, "class_date": past.isoformat()},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data["detail"], "No se pueden hacer reservas para fechas pasadas."
+        )
+
+        response = self.api.post(
+            "/api/studio/me/bookings/create/",
+            {"schedule_id": 999999, "class_date": upcoming_mondays(1)[0].isoformat()},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 404)
+
+        for sede_header in ("abc", "999999"):
+            response = self.api.post(
+                "/api/studio/me/bookings/create/",
+                {"schedule_id": self.schedule.id, "class_date": upcoming_mondays(1)[0].isoformat()},
+                format="json",
+                HTTP_X_SEDE_ID=sede_header,
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data["detail"], "Sede inválida.")
+        self.assertFalse(Booking.objects.exists())
+
+    def test_front_desk_checkin_without_payment(self):
+        staff = User.objects.create_user(username="recepcion", password="x")
+        staff.groups.add(Group.objects.create(name="secretaria"))
+        self.api.force_authenticate(user=staff)
+
+        response = self.api.post(
+            "/api/studio/bookings/",
+            {
+                "client_id": self.client_obj.id,
+                "schedule_id": self.schedule.id,
+                "class_date": timezone.localdate().isoformat(),
+                "attendance_status": "attended",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        booking = Booking.objects.get(pk=response.data["id"])
+        self.assertEqual(booking.attendance_status, "attended")
+        self.assertEqual(booking.sede, self.sede)
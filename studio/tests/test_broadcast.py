@@ -0,0 +1,138 @@
+import asyncio
+import json
+import threading
+from datetime import date
+from unittest import mock
+
+from accounts.models import Client
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from studio.broadcast import InProcessBroadcaster, availability_channel
+from studio.models import Booking, Schedule, Sede
+
+CLASS_DATE = date(2030, 1, 7)
+
+
+class RecordingBroadcaster:
+    def __init__(self, channels=()):
+        self.channels = set(channels)
+        self.messages = []
+
+    def has_subscribers(self, channel):
+        return channel in self.channels
+
+    def publish(self, channel, message):
+        self.messages.append((channel, message))
+
+
+class InProcessBroadcasterTest(TestCase):
+    async def test_publish_from_another_thread(self):
+        broadcaster = InProcessBroadcaster()
+        subscription = broadcaster.subscribe("availability:1:2030-01-07")
+        other = broadcaster.subscribe("availability:2:2030-01-07")
+
+        thread = threading.Thread(
+            target=broadcaster.publish,
+            args=("availability:1:2030-01-07", {"booked": 1}),
+        )
+        thread.start()
+        thread.join()
+
+        self.assertEqual(await subscription.get(timeout=1), {"booked": 1})
+        self.assertIsNone(await other.get(timeout=0.05))
+
+        subscription.close()
+        other.close()
+        self.assertEqual(broadcaster._subscriptions, {})
+
+
+class SeatChangeBroadcastTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sede = Sede.objects.create(name="Sede 1", slug="sede1", status=True)
+        self.schedule = Schedule.objects.create(
+            day="MON", time_slot="07:00", capacity=3, sede=self.sede
+        )
+        self.client_obj = Client.objects.create(
+            first_name="Test", last_name="Client", email="c@example.com"
+        )
+        self.broadcaster = RecordingBroadcaster(
+            [availability_channel(self.sede.id, CLASS_DATE)]
+        )
+        patcher = mock.patch("studio.broadcast._broadcaster", self.broadcaster)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_booking_and_cancellation_publish_deltas_after_commit(self):
+        channel = availability_channel(self.sede.id, CLASS_DATE)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(
+                client=self.client_obj,
+                schedule=self.schedule,
+                class_date=CLASS_DATE,
+                sede=self.sede,
+            )
+            self.assertEqual(self.broadcaster.messages, [])
+
+        self.assertEqual(len(self.broadcaster.messages), 1)
+        published_channel, message = self.broadcaster.messages[0]
+        self.assertEqual(published_channel, channel)
+        self.assertEqual(message["delta"], 1)
+        self.assertEqual(message["booked"], 1)
+        self.assertEqual(message["available_slots"], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.status = "cancelled"
+            booking.save()
+
+        _, message = self.broadcaster.messages[-1]
+        self.assertEqual(message["delta"], -1)
+        self.assertEqual(message["booked"], 0)
+
+    def test_no_snapshot_without_subscribers(self):
+        other_date = date(2030, 1, 14)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Booking.objects.create(
+                client=self.client_obj,
+                schedule=self.schedule,
+                class_date=other_date,
+                sede=self.sede,
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            for callback in callbacks:
+                callback()
+        self.assertEqual(self.broadcaster.messages, [])
+        self.assertFalse(
+            [q for q in queries if "classoccupancy" in q["sql"].lower()]
+        )
+
+    async def test_stream_sends_snapshot_then_seat_events(self):
+        broadcaster = InProcessBroadcaster()
+        with mock.patch("studio.broadcast._broadcaster", broadcaster):
+            response = await self.async_client.get(
+                "/api/studio/availability/stream/",
+                {"sede_id": self.sede.id, "date": CLASS_DATE.isoformat()},
+            )
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            events = aiter(response.streaming_content)
+
+            self.assertEqual(await anext(events), b"retry: 15000\n")
+            snapshot = await anext(events)
+            self.assertTrue(snapshot.startswith(b"event: snapshot"))
+            payload = json.loads(snapshot.split(b"data: ")[1])
+            self.assertEqual(payload["slots"][0]["schedule_id"], self.schedule.id)
+
+            broadcaster.publish(
+                availability_channel(self.sede.id, CLASS_DATE), {"booked": 1}
+            )
+            seats = await asyncio.wait_for(anext(events), timeout=1)
+            self.assertEqual(seats, b'event: seats\ndata: {"booked": 1}\n\n')
+            await events.aclose()
+
+    async def test_stream_requires_sede_and_date(self):
+        response = await self.async_client.get("/api/studio/availability/stream/")
+        self.assertEqual(response.status_code, 400)
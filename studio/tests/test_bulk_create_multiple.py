@@ -0,0 +1,300 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from accounts.models import Client
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from studio.models import (
+    Booking,
+    BulkBooking,
+    ClassOccupancy,
+    Membership,
+    Payment,
+    Schedule,
+    Sede,
+)
+from studio.tasks.bulk_bookings import (
+    process_bulk_booking,
+    run_pending_bulk_bookings_task,
+)
+
+User = get_user_model()
+
+URL = "/api/studio/bulk-bookings/create-multiple/"
+
+
+def upcoming_mondays(count):
+    today = timezone.localdate()
+    first = today + timedelta(days=(7 - today.weekday()) % 7 or 7)
+    return [first + timedelta(weeks=i) for i in range(count)]
+
+
+class BulkBookingFixturesMixin:
+    def setUp(self):
+        cache.clear()
+        self.sede = Sede.objects.create(name="Sede 1", slug="sede1", status=True)
+        self.user = User.objects.create_user(username="admin", password="x")
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.user)
+
+        self.schedule = Schedule.objects.create(
+            day="MON", time_slot="07:00", capacity=2, sede=self.sede
+        )
+        self.client_obj = Client.objects.create(
+            first_name="Test",
+            last_name="Client",
+            email="client@example.com",
+            sede=self.sede,
+            trial_used=True,
+        )
+        self.membership = Membership.objects.create(
+            name="8 clases", price=Decimal("400.00"), classes_per_month=8
+        )
+        self.payment = Payment.objects.create(
+            client=self.client_obj,
+            membership=self.membership,
+            amount=Decimal("400.00"),
+            valid_from=timezone.localdate() - timedelta(days=1),
+            valid_until=timezone.localdate() + timedelta(days=120),
+        )
+
+    def post(self, dates, schedule=None, url=URL):
+        schedule = schedule or self.schedule
+        return self.api.post(
+            url,
+            {
+                "client_id": self.client_obj.id,
+                "bookings": [
+                    {"schedule_id": schedule.id, "class_date": d.isoformat()}
+                    for d in dates
+                ],
+            },
+            format="json",
+        )
+
+
+
+class CreateMultipleTest(BulkBookingFixturesMixin, TestCase):
+    def count_queries(self, dates):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(dates)
+        self.assertEqual(response.status_code, 201)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_items(self):
+        dates = upcoming_mondays(14)
+        small = self.count_queries(dates[:2])
+        Booking.objects.all().delete()
+        large = self.count_queries(dates[2:14])
+        self.assertEqual(small, large)
+
+    def test_limit_duplicates_and_counters(self):
+        dates = upcoming_mondays(10)
+        Booking.objects.create(
+            client=self.client_obj,
+            schedule=self.schedule,
+            class_date=dates[0],
+            sede=self.sede,
+        )
+
+        response = self.post(dates + [dates[1]])
+        self.assertEqual(response.status_code, 201)
+        data = response.data
+
+        # 1 duplicada con la reserva previa (sin pago, no cuenta para el límite),
+        # 8 aceptadas, 1 por límite y 1 duplicada dentro del mismo lote
+        self.assertEqual(data["total_requested"], 11)
+        self.assertEqual(data["successful"], 8)
+        self.assertEqual(data["failed"], 3)
+        errors = [item["error"] for item in data["failed_bookings"]]
+        self.assertEqual(errors.count("Ya tienes una reserva para este horario en esta fecha."), 2)
+        self.assertEqual(errors.count("Has alcanzado tu límite de clases (8)."), 1)
+        self.assertEqual(set(data["successful_bookings"][0]), {"id", "schedule", "class_date", "status"})
+
+        bulk_booking = BulkBooking.objects.get(pk=data["bulk_booking_id"])
+        self.assertEqual(bulk_booking.successful_bookings, 8)
+        self.assertEqual(bulk_booking.failed_bookings, 3)
+        self.assertEqual(bulk_booking.status, "partial")
+        self.assertEqual(
+            Booking.objects.filter(bulk_booking=bulk_booking, payment=self.payment).count(),
+            8,
+        )
+        self.assertEqual(
+            ClassOccupancy.objects.get(schedule=self.schedule, class_date=dates[1]).booked,
+            1,
+        )
+
+    def test_full_class_and_unknown_schedule(self):
+        date = upcoming_mondays(1)[0]
+        for i in range(2):
+            other = Client.objects.create(
+                first_name=f"Otro{i}", last_name="Client", email=f"o{i}@example.com"
+            )
+            Booking.objects.create(
+                client=other, schedule=self.schedule, class_date=date, sede=self.sede
+            )
+
+        response = self.api.post(
+            URL,
+            {
+                "client_id": self.client_obj.id,
+                "bookings": [
+                    {"schedule_id": self.schedule.id, "class_date": date.isoformat()},
+                    {"schedule_id": 999999, "class_date": date.isoformat()},
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["status"], "failed")
+        self.assertEqual(
+            [item["error"] for item in response.data["failed_bookings"]],
+            ["No hay cupo disponible para este horario.", "Horario no encontrado."],
+        )
+
+
+class ImmediateExecutor:
+    def submit(self, run_task, func, *args):
+        # Ejecuta en el mismo hilo (sin cerrar la conexión del test)
+        func(*args)
+
+
+class AsyncCreateMultipleTest(BulkBookingFixturesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch(
+            "studio.tasks.background.get_executor", return_value=ImmediateExecutor()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_returns_immediately_and_processes_after_commit(self):
+        dates = upcoming_mondays(25)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.post(dates, url=URL + "?async=1")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], "pending")
+        self.assertEqual(response.data["total_requested"], 25)
+        self.assertFalse(Booking.objects.exists())
+
+        bulk_booking_id = response.data["bulk_booking_id"]
+        summary_url = f"/api/studio/bulk-bookings/{bulk_booking_id}/summary/"
+        self.assertEqual(self.api.get(summary_url).data["progress"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for callback in callbacks:
+                callback()
+
+        summary = self.api.get(summary_url).data
+        self.assertEqual(summary["status"], "partial")
+        self.assertEqual(summary["progress"], 100)
+        self.assertEqual(summary["successful_bookings"], 8)
+        self.assertEqual(summary["failed_bookings"], 17)
+        self.assertEqual(
+            summary["failed_items"][0]["error"], "Has alcanzado tu límite de clases (8)."
+        )
+        self.assertEqual(len(summary["bookings"]), 8)
+
+    def test_resumes_interrupted_job(self):
+        dates = upcoming_mondays(12)
+        bulk_booking = BulkBooking.objects.create(
+            client=self.client_obj,
+            total_bookings=12,
+            status="pending",
+            successful_bookings=10,
+            request_data={
+                "bookings": [
+                    {"schedule_id": self.schedule.id, "class_date": d.isoformat()}
+                    for d in dates
+                ]
+            },
+        )
+
+        process_bulk_booking(bulk_booking.id)
+
+        bulk_booking.refresh_from_db()
+        self.assertEqual(bulk_booking.status, "completed")
+        self.assertEqual(bulk_booking.successful_bookings, 12)
+        self.assertEqual(
+            sorted(bulk_booking.bookings.values_list("class_date", flat=True)),
+            dates[10:],
+        )
+
+        # Un job ya terminado no se vuelve a procesar
+        process_bulk_booking(bulk_booking.id)
+        self.assertEqual(bulk_booking.bookings.count(), 2)
+
+    @override_settings(CRON_SECRET="cron-secret")
+    def test_cron_endpoint_finishes_pending_jobs(self):
+        dates = upcoming_mondays(2)
+        bulk_booking = BulkBooking.objects.create(
+            client=self.client_obj,
+            total_bookings=2,
+            status="pending",
+            request_data={
+                "bookings": [
+                    {"schedule_id": self.schedule.id, "class_date": d.isoformat()}
+                    for d in dates
+                ]
+            },
+        )
+        # El proceso que lo encoló se detuvo hace unos minutos
+        BulkBooking.objects.filter(pk=bulk_booking.pk).update(
+            created_at=timezone.now() - timedelta(minutes=5)
+        )
+
+        url = "/api/studio/cron/reservas_multiples_pendientes/"
+        api = APIClient()
+        self.assertEqual(api.get(url).status_code, 403)
+        self.assertEqual(
+            api.get(url, HTTP_AUTHORIZATION="Bearer otro").status_code, 403
+        )
+        self.assertEqual(
+            api.get("/api/studio/cron/otra/", HTTP_AUTHORIZATION="Bearer cron-secret").status_code,
+            404,
+        )
+
+        response = api.get(url, HTTP_AUTHORIZATION="Bearer cron-secret")
+        self.assertEqual(response.status_code, 200)
+        bulk_booking.refresh_from_db()
+        self.assertEqual(bulk_booking.status, "completed")
+        self.assertEqual(bulk_booking.bookings.count(), 2)
+
+    def test_failing_job_does_not_block_the_queue(self):
+        dates = upcoming_mondays(2)
+        bad = BulkBooking.objects.create(
+            client=self.client_obj, total_bookings=1, status="pending", request_data={}
+        )
+        good = BulkBooking.objects.create(
+            client=self.client_obj,
+            total_bookings=2,
+            status="pending",
+            request_data={
+                "bookings": [
+                    {"schedule_id": self.schedule.id, "class_date": d.isoformat()}
+                    for d in dates
+                ]
+            },
+        )
+        BulkBooking.objects.filter(pk__in=[bad.pk, good.pk]).update(
+            created_at=timezone.now() - timedelta(minutes=5)
+        )
+
+        run_pending_bulk_bookings_task()
+
+        bad.refresh_from_db()
+        good.refresh_from_db()
+        self.assertEqual(bad.status, "failed")
+        self.assertEqual(good.status, "completed")
+        self.assertEqual(good.bookings.count(), 2)
+
+        # El job fallido no se vuelve a tomar en la siguiente corrida
+        with mock.patch("studio.tasks.bulk_bookings.process_bulk_booking") as process:
+            run_pending_bulk_bookings_task()
+        process.assert_not_called()
@@ -0,0 +1,178 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+
+from accounts.models import Client
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from studio.models import Booking, DailyClosingFact, Membership, Payment, Schedule, Sede, Venta
+
+User = get_user_model()
+
+MONDAY = date(2030, 1, 7)
+
+
+def at(day, hour=10):
+    return timezone.make_aware(datetime.combine(day, time(hour)))
+
+
+class ClosingFixturesMixin:
+    def setUp(self):
+        cache.clear()
+        self.sede = Sede.objects.create(name="Sede 1", slug="sede1", status=True)
+        self.schedule = Schedule.objects.create(
+            day="MON", time_slot="07:00", capacity=5, sede=self.sede
+        )
+        self.individual = Schedule.objects.create(
+            day="MON", time_slot="09:00", capacity=1, sede=self.sede, is_individual=True
+        )
+        self.client_obj = Client.objects.create(
+            first_name="Ana", last_name="López", email="ana@example.com", trial_used=True
+        )
+        self.membership = Membership.objects.create(
+            name="8 clases", price=Decimal("300.00"), classes_per_month=8
+        )
+
+    def pay(self, amount, method, day=MONDAY, hour=10):
+        return Payment.objects.create(
+            client=self.client_obj,
+            membership=self.membership,
+            amount=Decimal(amount),
+            payment_method=method,
+            date_paid=at(day, hour),
+            sede=self.sede,
+        )
+
+    def fill_day(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pay("100.00", "Efectivo")
+            self.pay("200.00", "card")
+            # 23:00 hora local (ya es el día siguiente en UTC)
+            self.pay("50.00", "Depósito", hour=23)
+            Venta.objects.create(
+                client=self.client_obj,
+                product_name="Agua",
+                quantity=2,
+                price_per_unit=Decimal("5.00"),
+                total_amount=0,
+                date_sold=at(MONDAY),
+                sede=self.sede,
+            )
+            for schedule, attendance in (
+                (self.schedule, "attended"),
+                (self.schedule, "no_show"),
+                (self.individual, "attended"),
+            ):
+                client = Client.objects.create(
+                    first_name="C", last_name=attendance, email=f"{schedule.pk}{attendance}@x.com"
+                )
+                Booking.objects.create(
+                    client=client,
+                    schedule=schedule,
+                    class_date=MONDAY,
+                    sede=self.sede,
+                    attendance_status=attendance,
+                )
+
+
+class ClosingFactTest(ClosingFixturesMixin, TestCase):
+    def test_signals_keep_daily_fact_up_to_date(self):
+        self.fill_day()
+
+        fact = DailyClosingFact.objects.get(date=MONDAY, sede=self.sede)
+        self.assertEqual(
+            (fact.efectivo, fact.visalink, fact.transferencia, fact.total_pagos),
+            (Decimal("100"), Decimal("200"), Decimal("50"), Decimal("350")),
+        )
+        self.assertEqual(fact.total_ventas, Decimal("10"))
+        self.assertEqual(
+            (fact.paquetes_vendidos, fact.asistencias, fact.no_shows, fact.clases_individuales),
+            (3, 2, 1, 1),
+        )
+
+        # Mover un pago de día recalcula los dos días
+        payment = Payment.objects.get(payment_method="card")
+        with self.captureOnCommitCallbacks(execute=True):
+            payment.date_paid = at(MONDAY + timedelta(days=1))
+            payment.save()
+        self.assertEqual(
+            DailyClosingFact.objects.get(date=MONDAY).total_pagos, Decimal("150")
+        )
+        self.assertEqual(
+            DailyClosingFact.objects.get(date=MONDAY + timedelta(days=1)).visalink,
+            Decimal("200"),
+        )
+
+    def test_trial_used_change_refreshes_pruebas(self):
+        self.fill_day()
+        self.assertEqual(DailyClosingFact.objects.get(date=MONDAY).pruebas, 0)
+
+        client = Client.objects.get(last_name="attended", email__startswith=str(self.schedule.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            client.trial_used = True
+            client.save()
+        self.assertEqual(DailyClosingFact.objects.get(date=MONDAY).pruebas, 1)
+
+    def test_rebuild_command_matches_incremental(self):
+        self.fill_day()
+        expected = list(DailyClosingFact.objects.values(*self.fact_fields()))
+
+        DailyClosingFact.objects.all().delete()
+        call_command("rebuild_closing_facts", stdout=StringIO())
+        self.assertEqual(list(DailyClosingFact.objects.values(*self.fact_fields())), expected)
+
+    def test_migration_backfill_matches_incremental(self):
+        self.fill_day()
+        expected = list(DailyClosingFact.objects.values(*self.fact_fields()))
+
+        DailyClosingFact.objects.all().delete()
+        backfill = import_module("studio.migrations.0018_backfill_daily_closing_facts")
+        backfill.backfill_closing_facts(apps, None)
+        self.assertEqual(list(DailyClosingFact.objects.values(*self.fact_fields())), expected)
+
+    def fact_fields(self):
+        return [f.name for f in DailyClosingFact._meta.fields if f.name not in ("id", "updated_at")]
+
+    def test_closing_endpoints_read_facts_with_bounded_queries(self):
+        self.fill_day()
+        api = APIClient()
+        api.force_authenticate(user=User.objects.create_superuser(username="admin", password="x"))
+
+        def closing(days):
+            with CaptureQueriesContext(connection) as queries:
+                response = api.get(
+                    "/api/studio/cierres-completos/",
+                    {
+                        "start_date": MONDAY.isoformat(),
+                        "end_date": (MONDAY + timedelta(days=days - 1)).isoformat(),
+                    },
+                )
+            self.assertEqual(response.status_code, 200)
+            return response.data, len(queries)
+
+        week, week_queries = closing(7)
+        quarter, quarter_queries = closing(90)
+        self.assertEqual(week_queries, quarter_queries)
+
+        self.assertEqual(week["resumen_periodo"]["total_general"], 360.0)
+        monday = week["cierres_diarios"][0]
+        self.assertEqual((monday["efectivo"], monday["visalink"]), (100.0, 200.0))
+        self.assertEqual(len(monday["detalle_pagos"]), 3)
+        self.assertEqual(week["cierres_semanales"][0]["total_semana"], 360.0)
+        self.assertEqual(quarter["resumen_periodo"]["total_general"], 360.0)
+
+        response = api.get("/api/studio/payments/closure-full-summary/", {"month": "2030-01"})
+        self.assertEqual(response.status_code, 200)
+        day = next(d for d in response.data["daily"] if d["fecha"] == MONDAY.isoformat())
+        self.assertEqual(
+            (day["asistencias"], day["clases_individuales"], day["transferencia"], day["total"]),
+            (2, 1, Decimal("50"), Decimal("360")),
+        )
@@ -0,0 +1,101 @@
+from datetime import date, timedelta
+
+from accounts.models import Client
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from studio.models import Booking, ClassOccupancy, Schedule, Sede
+from studio.occurrences import generate_occurrences
+
+User = get_user_model()
+
+MONDAY = date(2030, 1, 7)
+
+
+class CoachAgendaTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sede = Sede.objects.create(name="Sede 1", slug="sede1", status=True)
+        self.coach = User.objects.create_user(username="coach", password="x")
+        other = User.objects.create_user(username="otro", password="x")
+        self.monday = Schedule.objects.create(
+            day="MON", time_slot="07:00", capacity=4, sede=self.sede, coach=self.coach
+        )
+        self.wednesday = Schedule.objects.create(
+            day="WED", time_slot="18:00", capacity=6, sede=self.sede, coach=self.coach
+        )
+        Schedule.objects.create(day="MON", time_slot="09:00", capacity=4, sede=self.sede, coach=other)
+        generate_occurrences(weeks=4, start=MONDAY)
+
+        for week in range(4):
+            class_date = MONDAY + timedelta(weeks=week)
+            for i in range(2):
+                client = Client.objects.create(
+                    first_name=f"C{week}{i}", last_name="T", email=f"c{week}{i}@example.com"
+                )
+                Booking.objects.create(
+                    client=client, schedule=self.monday, class_date=class_date, sede=self.sede
+                )
+            ClassOccupancy.objects.update_or_create(
+                schedule=self.monday, class_date=class_date, defaults={"booked": 2}
+            )
+
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.coach)
+
+    def agenda(self, days, **params):
+        end = MONDAY + timedelta(days=days - 1)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.get(
+                "/api/studio/schedules/coach-agenda/",
+                {"start": MONDAY.isoformat(), "end": end.isoformat(), **params},
+            )
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(queries)
+
+    def test_query_count_does_not_grow_with_range(self):
+        week, week_queries = self.agenda(7)
+        month, month_queries = self.agenda(28)
+
+        self.assertEqual(len(week["sessions"]), 2)
+        self.assertEqual(len(month["sessions"]), 8)
+        self.assertEqual(week_queries, month_queries)
+
+        first = week["sessions"][0]
+        self.assertEqual(first["schedule_id"], self.monday.id)
+        self.assertEqual((first["capacity"], first["booked"], first["available"]), (4, 2, 2))
+        self.assertEqual([a["name"] for a in first["attendees"]], ["C00 T", "C01 T"])
+        self.assertEqual(week["sessions"][1]["attendees"], [])
+
+    def test_booked_falls_back_to_bookings_without_occupancy_row(self):
+        # Reservas anteriores a ClassOccupancy: la fila aún no existe
+        ClassOccupancy.objects.filter(schedule=self.monday, class_date=MONDAY).delete()
+        data, _ = self.agenda(7)
+        first = data["sessions"][0]
+        self.assertEqual((first["booked"], len(first["attendees"])), (2, 2))
+
+    def test_coach_only_sees_own_agenda(self):
+        other = User.objects.get(username="otro")
+        data, _ = self.agenda(7, coach_id=other.id)
+        self.assertEqual(data["coach_id"], self.coach.id)
+
+    def test_invalid_range(self):
+        response = self.api.get(
+            "/api/studio/schedules/coach-agenda/",
+            {"start": MONDAY.isoformat(), "end": (MONDAY + timedelta(days=40)).isoformat()},
+        )
+        self.assertEqual(response.status_code, 400)
+
+        # Fechas con formato válido pero inexistentes
+        for url in ("/api/studio/schedules/coach-agenda/", "/api/studio/class-occurrences/"):
+            response = self.api.get(url, {"start": "2030-02-30"})
+            self.assertEqual(response.status_code, 400)
+
+        self.api.force_authenticate(
+            user=User.objects.create_superuser(username="admin", password="x")
+        )
+        response = self.api.get("/api/studio/schedules/coach-agenda/", {"coach_id": "abc"})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,192 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from accounts.models import Client
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from studio.dashboard import SECTIONS, build_dashboard, get_dashboard, refresh_dashboard_snapshots
+from studio.models import Booking, Membership, Payment, Schedule, Sede, TimeSlot
+from studio.tests.test_closing_facts import MONDAY, at
+
+User = get_user_model()
+
+QUERY_BUDGET = 15
+
+
+class DashboardTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sede = Sede.objects.create(name="Sede 1", slug="sede1", status=True)
+        self.schedule = Schedule.objects.create(
+            day="MON", time_slot="07:00", capacity=20, sede=self.sede
+        )
+        TimeSlot.objects.create(sede=self.sede, start_time=time(7), end_time=time(8))
+        self.membership = Membership.objects.create(
+            name="8 clases", price=Decimal("300.00"), classes_per_month=8
+        )
+        self.clients = 0
+
+    def add_client(self, visit_day, paid_day):
+        self.clients += 1
+        client = Client.objects.create(
+            first_name="Cliente",
+            last_name=str(self.clients),
+            email=f"c{self.clients}@example.com",
+            sede=self.sede,
+            status="A",
+            current_membership=self.membership,
+        )
+        Booking.objects.create(
+            client=client,
+            schedule=self.schedule,
+            class_date=visit_day,
+            sede=self.sede,
+            attendance_status="attended",
+        )
+        Payment.objects.create(
+            client=client,
+            membership=self.membership,
+            amount=Decimal("300.00"),
+            payment_method="Efectivo",
+            date_paid=at(paid_day),
+            valid_until=paid_day + timedelta(days=30),
+            sede=self.sede,
+        )
+        return client
+
+    def dashboard(self, today=MONDAY):
+        with CaptureQueriesContext(connection) as queries:
+            data = build_dashboard([self.sede.pk], today=today)
+        return data, len(queries)
+
+    def test_query_budget_does_not_grow_with_data(self):
+        self.add_client(MONDAY, MONDAY)
+        _, few_queries = self.dashboard()
+
+        for i in range(1, 25):
+            self.add_client(MONDAY - timedelta(days=i), MONDAY - timedelta(days=15 * i))
+        Membership.objects.create(name="Ilimitado", price=Decimal("500.00"))
+        _, many_queries = self.dashboard()
+
+        self.assertLessEqual(few_queries, QUERY_BUDGET)
+        self.assertEqual(few_queries, many_queries)
+
+    def test_values(self):
+        self.add_client(MONDAY, MONDAY)
+        self.add_client(MONDAY - timedelta(days=20), MONDAY - timedelta(days=40))
+
+        data, _ = self.dashboard()
+
+        self.assertEqual(data["todayBookings"], 1)
+        self.assertEqual(data["todayRevenue"], 300.0)
+        self.assertEqual(data["totalRevenue"], 600.0)
+        self.assertEqual(data["activeClients"], 2)
+        self.assertEqual(data["dailyBookings"][-1], {"date": MONDAY.strftime("%d/%m"), "count": 1})
+        self.assertEqual(len(data["dailyRevenue"]), 30)
+        self.assertEqual(data["attendanceStats"]["attended"], 2)
+        slot = next(s for s in data["timeSlotStats"] if s["time_slot"] == "07:00-08:00")
+        self.assertEqual(slot["count"], 2)
+        self.assertEqual(data["paymentMethods"], [{"method": "Efectivo", "count": 2}])
+
+        # MONDAY es 2030-01-07: el pago de hace 40 días cae en noviembre de 2029
+        december = next(
+            m for m in data["monthlyRevenue"] if (m["year"], m["month"]) == (2029, 12)
+        )
+        self.assertEqual((december["total_amount"], december["growth"]), (0.0, -100))
+        self.assertEqual(data["renewalStats"][0]["count"], 1)
+
+        top = {c["name"]: c for c in data["topClients"]}
+        self.assertEqual(top["Cliente 2"]["classes_taken"], 1)
+        self.assertEqual(top["Cliente 2"]["total_value"], Decimal("300"))
+        self.assertEqual(
+            [(c["name"], c["days_since_visit"]) for c in data["clientsAtRisk"]],
+            [("Cliente 2", 20)],
+        )
+
+        detail = next(m for m in data["membershipDetails"] if m["name"] == "8 clases")
+        self.assertEqual((detail["active_clients"], detail["percentage"]), (2, 100.0))
+        self.assertEqual(detail["monthly_revenue"], Decimal("300"))
+
+    def test_endpoint_uses_sede_header(self):
+        api = APIClient()
+        api.force_authenticate(user=User.objects.create_superuser(username="admin", password="x"))
+        self.add_client(timezone.localdate(), timezone.localdate())
+
+        response = api.get("/api/studio/dashboard-data/", HTTP_X_SEDE_ID=str(self.sede.pk))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["todayBookings"], 1)
+        self.assertIn("as_of", response.data)
+        response = api.get(
+            "/api/studio/dashboard-data/", {"fresh": "1"}, HTTP_X_SEDE_ID=str(self.sede.pk)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(api.get("/api/studio/dashboard-data/", {"sede_ids[]": "x"}).status_code, 400)
+
+    def cached(self, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            data = get_dashboard([self.sede.pk], **kwargs)
+        return data, len(queries)
+
+    def test_snapshot_cache_and_partial_invalidation(self):
+        today = timezone.localdate()
+        client = self.add_client(today, today)
+        other_client = Client.objects.create(first_name="Otra", email="otra@example.com")
+        _, first_queries = self.cached()
+        data, cached_queries = self.cached()
+        self.assertEqual(cached_queries, 0)
+        self.assertEqual(data["todayBookings"], 1)
+
+        # Una reserva solo recalcula reservas y clientes; pagos sale del cache
+        written = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(
+                client=other_client, schedule=self.schedule, class_date=today, sede=self.sede
+            )
+        data, booking_queries = self.cached()
+        self.assertEqual(data["todayBookings"], 2)
+        # as_of es la sección más antigua (pagos, que no se recalculó)
+        self.assertLess(datetime.fromisoformat(data["as_of"]), written)
+        self.assertLess(booking_queries, first_queries)
+
+        # Un pago de otra sede no toca este dashboard
+        other = Sede.objects.create(name="Sede 2", slug="sede2", status=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            Payment.objects.create(
+                client=client,
+                membership=self.membership,
+                amount=Decimal("50.00"),
+                date_paid=timezone.now(),
+                sede=other,
+            )
+        self.assertEqual(self.cached()[1], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Payment.objects.create(
+                client=client,
+                membership=self.membership,
+                amount=Decimal("50.00"),
+                date_paid=timezone.now(),
+                sede=self.sede,
+            )
+        data, _ = self.cached()
+        self.assertEqual(data["todayRevenue"], 350.0)
+
+        # fresh recalcula todo aunque esté en cache
+        _, fresh_queries = self.cached(fresh=True)
+        self.assertEqual(fresh_queries, first_queries)
+
+    def test_refresh_snapshots_fills_each_sede_and_the_full_set(self):
+        other = Sede.objects.create(name="Sede 2", slug="sede2", status=True)
+        self.assertEqual(refresh_dashboard_snapshots([self.sede.pk, other.pk]), 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            get_dashboard([other.pk])
+            get_dashboard([other.pk, self.sede.pk])
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(len(SECTIONS), 3)
@@ -0,0 +1,185 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from accounts.models import Client
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from studio.entitlements import get_entitlement
+from studio.models import Booking, Membership, Payment, PaymentEntitlement, Schedule, Sede
+from studio.utils import count_valid_bookings_by_payment
+
+User = get_user_model()
+
+
+def upcoming(weekday, count):
+    today = timezone.localdate()
+    first = today + timedelta(days=(weekday - today.weekday()) % 7 or 7)
+    return [first + timedelta(weeks=i) for i in range(count)]
+
+
+class EntitlementFixturesMixin:
+    def setUp(self):
+        cache.clear()
+        self.sede = Sede.objects.create(name="Sede 1", slug="sede1", status=True)
+        self.schedule = Schedule.objects.create(
+            day="MON", time_slot="07:00", capacity=5, sede=self.sede
+        )
+        self.client_obj = Client.objects.create(
+            first_name="Test",
+            last_name="Client",
+            email="client@example.com",
+            sede=self.sede,
+            trial_used=True,
+        )
+        self.membership = Membership.objects.create(
+            name="2 clases", price=Decimal("150.00"), classes_per_month=2
+        )
+        self.payment = Payment.objects.create(
+            client=self.client_obj,
+            membership=self.membership,
+            amount=Decimal("150.00"),
+            valid_from=timezone.localdate() - timedelta(days=1),
+            valid_until=timezone.localdate() + timedelta(days=60),
+        )
+
+    def book(self, class_date, **kwargs):
+        return Booking.objects.create(
+            client=self.client_obj,
+            schedule=self.schedule,
+            class_date=class_date,
+            payment=self.payment,
+            sede=self.sede,
+            **kwargs,
+        )
+
+
+class PaymentEntitlementLedgerTest(EntitlementFixturesMixin, TestCase):
+    def ledger(self):
+        return PaymentEntitlement.objects.get(payment=self.payment)
+
+    def test_payment_creates_row_with_allowed_classes(self):
+        self.assertEqual(self.ledger().allowed, 2)
+        self.payment.extra_classes = 1
+        self.payment.save()
+        self.assertEqual(self.ledger().allowed, 3)
+
+        self.membership.classes_per_month = 4
+        self.membership.save()
+        self.assertEqual(self.ledger().allowed, 5)
+
+    def test_booking_lifecycle_updates_counters(self):
+        future, other = upcoming(0, 2)
+        booking = self.book(future)
+        self.assertEqual(self.ledger().used, 1)
+
+        booking.attendance_status = "no_show"
+        booking.save()
+        ledger = self.ledger()
+        self.assertEqual((ledger.used, ledger.no_shows), (0, 1))
+        self.assertEqual(ledger.repositions, 1)
+        self.assertEqual(ledger.limit, 3)
+
+        booking.attendance_status = "attended"
+        booking.save()
+        self.assertEqual((self.ledger().used, self.ledger().no_shows), (1, 0))
+
+        booking.status = "cancelled"
+        booking.save()
+        self.assertEqual(self.ledger().used, 0)
+
+        self.book(other).delete()
+        self.assertEqual(self.ledger().used, 0)
+
+    def test_past_pending_booking_does_not_count(self):
+        past = timezone.localdate() - timedelta(days=3)
+        self.book(past)
+        self.book(past - timedelta(days=7), attendance_status="attended")
+        self.assertEqual(self.ledger().used, 1)
+        self.assertEqual(count_valid_bookings_by_payment(self.client_obj, self.payment), 1)
+
+    def test_pending_booking_stops_counting_without_daily_job(self):
+        booking = self.book(upcoming(0, 1)[0])
+        self.assertEqual(self.ledger().used, 1)
+
+        # Pasó la clase y no corrió refresh_recent_entitlements
+        yesterday = timezone.localdate() - timedelta(days=1)
+        Booking.objects.filter(pk=booking.pk).update(class_date=yesterday)
+        PaymentEntitlement.objects.update(counted_on=yesterday)
+
+        self.assertEqual(get_entitlement(self.payment, lock=True).used, 0)
+        self.assertEqual(self.ledger().counted_on, timezone.localdate())
+
+    def test_missing_row_is_created_from_bookings(self):
+        self.book(upcoming(0, 1)[0])
+        PaymentEntitlement.objects.all().delete()
+
+        self.assertEqual(get_entitlement(self.payment).used, 1)
+
+    def test_rebuild_command_repairs_drift(self):
+        self.book(upcoming(0, 1)[0])
+        PaymentEntitlement.objects.update(used=7, no_shows=3)
+
+        out = StringIO()
+        call_command("rebuild_payment_entitlements", stdout=out)
+
+        ledger = self.ledger()
+        self.assertEqual((ledger.used, ledger.no_shows), (1, 0))
+        self.assertIn("1 pagos", out.getvalue())
+
+
+class EntitlementLimitTest(EntitlementFixturesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(
+            user=User.objects.create_user(username="admin", password="x")
+        )
+
+    def test_booking_endpoint_reads_limit_from_ledger(self):
+        dates = upcoming(0, 3)
+        for class_date in dates[:2]:
+            response = self.api.post(
+                "/api/studio/bookings/",
+                {
+                    "client_id": self.client_obj.id,
+                    "schedule_id": self.schedule.id,
+                    "class_date": class_date.isoformat(),
+                },
+                format="json",
+            )
+            self.assertEqual(response.status_code, 201, response.data)
+
+        response = self.api.post(
+            "/api/studio/bookings/",
+            {
+                "client_id": self.client_obj.id,
+                "schedule_id": self.schedule.id,
+                "class_date": dates[2].isoformat(),
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["detail"], "Has alcanzado tu límite de clases (2).")
+
+    def test_create_multiple_shares_the_same_ledger(self):
+        self.book(upcoming(0, 1)[0])
+
+        response = self.api.post(
+            "/api/studio/bulk-bookings/create-multiple/",
+            {
+                "client_id": self.client_obj.id,
+                "bookings": [
+                    {"schedule_id": self.schedule.id, "class_date": d.isoformat()}
+                    for d in upcoming(0, 4)[1:]
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.data["successful"], 1)
+        self.assertEqual(response.data["failed"], 2)
+        self.assertEqual(get_entitlement(self.payment).used, 2)
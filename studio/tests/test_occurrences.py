@@ -0,0 +1,92 @@
+from datetime import date, datetime, time, timedelta
+
+from accounts.models import Client
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from studio.models import Booking, ClassOccurrence, Schedule, Sede, TimeSlot
+from studio.occurrences import generate_occurrences, occurrences_between
+
+User = get_user_model()
+
+MONDAY = date(2030, 1, 7)
+
+
+class ClassOccurrenceTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sede = Sede.objects.create(name="Sede 1", slug="sede1", status=True)
+        TimeSlot.objects.create(sede=self.sede, start_time=time(7), end_time=time(7, 50))
+        self.monday = Schedule.objects.create(
+            day="MON", time_slot="07:00", capacity=4, sede=self.sede
+        )
+        self.friday = Schedule.objects.create(
+            day="FRI", time_slot="18:00", capacity=6, sede=self.sede
+        )
+
+    def local(self, day, hour, minute=0):
+        return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+    def test_generates_rolling_weeks_with_time_slot_duration(self):
+        self.assertEqual(generate_occurrences(weeks=3, start=MONDAY), 6)
+        self.assertEqual(generate_occurrences(weeks=3, start=MONDAY), 6)
+        self.assertEqual(ClassOccurrence.objects.count(), 6)
+
+        first = ClassOccurrence.objects.get(schedule=self.monday, date=MONDAY)
+        self.assertEqual((first.start, first.end), (self.local(MONDAY, 7), self.local(MONDAY, 7, 50)))
+        self.assertEqual(first.capacity, 4)
+        self.assertEqual(first.sede, self.sede)
+
+        friday = MONDAY + timedelta(days=4)
+        evening = ClassOccurrence.objects.get(schedule=self.friday, date=friday)
+        self.assertEqual(evening.end - evening.start, timedelta(hours=1))
+
+        found = list(occurrences_between(self.local(MONDAY, 0), self.local(friday, 23)))
+        self.assertEqual(found, [first, evening])
+
+    def test_moving_a_schedule_replaces_only_upcoming_rows(self):
+        generate_occurrences(weeks=2, start=MONDAY)
+        self.monday.day = "TUE"
+        self.monday.capacity = 2
+        self.monday.save()
+
+        generate_occurrences(weeks=2, start=MONDAY + timedelta(weeks=1), schedule_ids=[self.monday.id])
+
+        dates = list(
+            ClassOccurrence.objects.filter(schedule=self.monday).values_list("date", flat=True)
+        )
+        # La clase de la primera semana ya pasó y queda como histórico
+        self.assertEqual(
+            dates,
+            [MONDAY, MONDAY + timedelta(weeks=1, days=1), MONDAY + timedelta(weeks=2, days=1)],
+        )
+
+    def test_schedule_save_regenerates_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.friday.capacity = 3
+            self.friday.save()
+        capacities = ClassOccurrence.objects.filter(schedule=self.friday).values_list(
+            "capacity", flat=True
+        )
+        self.assertTrue(capacities)
+        self.assertEqual(set(capacities), {3})
+
+    def test_endpoint_includes_booked_seats(self):
+        generate_occurrences(weeks=1, start=MONDAY)
+        client = Client.objects.create(first_name="A", last_name="B", email="a@example.com")
+        Booking.objects.create(client=client, schedule=self.monday, class_date=MONDAY, sede=self.sede)
+
+        api = APIClient()
+        api.force_authenticate(user=User.objects.create_user(username="staff", password="x"))
+        response = api.get(
+            "/api/studio/class-occurrences/",
+            {"start": MONDAY.isoformat(), "end": (MONDAY + timedelta(days=6)).isoformat()},
+        )
+        self.assertEqual(response.status_code, 200)
+        rows = response.data["results"] if isinstance(response.data, dict) else response.data
+        self.assertEqual(
+            [(r["schedule"], r["booked"], r["available"]) for r in rows],
+            [(self.monday.id, 1, 3), (self.friday.id, 0, 6)],
+        )
@@ -0,0 +1,88 @@
+from datetime import timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from studio.models import Payment, Venta
+from studio.reporting import (
+    closing_days,
+    daily_buckets,
+    month_bounds,
+    range_totals,
+    weekly_rollup,
+)
+from studio.tests.test_closing_facts import MONDAY, ClosingFixturesMixin, at
+
+
+class ReportingTest(ClosingFixturesMixin, TestCase):
+    def test_daily_buckets_use_three_queries_for_any_range(self):
+        self.fill_day()
+        # El domingo no entra en la semana de lunes a sábado
+        self.pay("40.00", "efectivo", day=MONDAY + timedelta(days=6))
+        self.pay("25.00", "efectivo", day=MONDAY + timedelta(days=7))
+
+        for days in (7, 365):
+            with CaptureQueriesContext(connection) as queries:
+                daily = daily_buckets(MONDAY, MONDAY + timedelta(days=days))
+            self.assertEqual(len(queries), 3)
+
+        monday = daily[MONDAY]
+        self.assertEqual(monday["total_pagos"], Decimal("350"))
+        self.assertEqual((monday["asistencias"], monday["individuales_asistidas"]), (2, 1))
+        self.assertEqual(
+            range_totals(daily, MONDAY, MONDAY + timedelta(days=7))["efectivo"], Decimal("165")
+        )
+
+        weeks = weekly_rollup(daily, MONDAY + timedelta(days=2), MONDAY + timedelta(days=9))
+        self.assertEqual(
+            [(start, end, totals["efectivo"]) for start, end, totals in weeks],
+            [
+                (MONDAY, MONDAY + timedelta(days=5), Decimal("100")),
+                (MONDAY + timedelta(days=7), MONDAY + timedelta(days=9), Decimal("25")),
+            ],
+        )
+
+    def test_facts_match_live_buckets(self):
+        self.fill_day()
+        end = MONDAY + timedelta(days=6)
+        self.assertEqual(closing_days(MONDAY, end), daily_buckets(MONDAY, end))
+
+    def test_payment_method_is_normalized_on_save(self):
+        for raw, expected in (
+            ("VisaLink ", "visalink"),
+            ("DEPÓSITO", "transferencia"),
+            ("cash", "efectivo"),
+            ("cheque", "otro"),
+            (None, "otro"),
+        ):
+            self.assertEqual(self.pay("10.00", raw).method, expected)
+
+        payment = self.pay("10.00", "efectivo")
+        payment.payment_method = "card"
+        payment.save(update_fields=["payment_method"])
+        payment.refresh_from_db()
+        self.assertEqual(payment.method, "visalink")
+
+    def test_local_date_columns_follow_studio_timezone(self):
+        # 23:00 en Guatemala ya es el día siguiente en UTC
+        late = self.pay("10.00", "efectivo", hour=23)
+        self.assertEqual(late.date_paid.astimezone(dt_timezone.utc).date(), MONDAY + timedelta(days=1))
+        self.assertEqual(late.paid_on, MONDAY)
+
+        late.date_paid = at(MONDAY + timedelta(days=2), 23)
+        late.save(update_fields=["date_paid"])
+        late.refresh_from_db()
+        self.assertEqual(late.paid_on, MONDAY + timedelta(days=2))
+
+        venta = Venta.objects.create(
+            client=self.client_obj,
+            product_name="Agua",
+            price_per_unit=Decimal("5.00"),
+            total_amount=0,
+            date_sold=at(MONDAY, 23),
+        )
+        self.assertEqual(venta.sold_on, MONDAY)
+        self.assertEqual(
+            list(Payment.objects.filter(paid_on__range=month_bounds(2030, 1))), [late]
+        )
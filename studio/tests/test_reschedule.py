@@ -0,0 +1,124 @@
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from rest_framework.test import APIClient
+from studio.models import Booking, Schedule, Sede
+from studio.reschedule import RescheduleError, move_booking
+from studio.tests.test_bulk_create_multiple import ImmediateExecutor
+from studio.tests.test_seats import CLASS_DATE, booked, make_clients
+
+User = get_user_model()
+
+NEXT_WEEK = CLASS_DATE + timedelta(weeks=1)
+
+
+class RescheduleTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sede = Sede.objects.create(name="Sede 1", slug="sede1", status=True)
+        self.schedule = Schedule.objects.create(
+            day="MON", time_slot="07:00", capacity=2, sede=self.sede
+        )
+        self.other = Schedule.objects.create(
+            day="MON", time_slot="08:00", capacity=1, sede=self.sede
+        )
+        self.clients = make_clients(self.sede, 3)
+        self.booking = self.book(self.clients[0], self.schedule, CLASS_DATE)
+
+        patcher = mock.patch(
+            "studio.tasks.background.get_executor", return_value=ImmediateExecutor()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def book(self, client, schedule, class_date):
+        return Booking.objects.create(
+            client=client, schedule=schedule, class_date=class_date, sede=self.sede
+        )
+
+    @mock.patch("studio.management.mails.mails.send_booking_reschedule_email")
+    def test_moves_counters_and_notifies_on_commit(self, send_email):
+        with self.captureOnCommitCallbacks(execute=True):
+            move_booking(self.booking.pk, self.other.pk, NEXT_WEEK)
+
+        self.booking.refresh_from_db()
+        self.assertEqual(
+            (self.booking.schedule_id, self.booking.class_date), (self.other.pk, NEXT_WEEK)
+        )
+        self.assertEqual(booked(self.schedule), 0)
+        self.assertEqual(booked(self.other, NEXT_WEEK), 1)
+        send_email.assert_called_once()
+        self.assertEqual(send_email.call_args.args[1], self.clients[0])
+
+    def test_full_target_and_duplicate_are_rejected(self):
+        self.book(self.clients[1], self.other, CLASS_DATE)
+        with self.assertRaises(RescheduleError) as ctx:
+            move_booking(self.booking.pk, self.other.pk, CLASS_DATE)
+        self.assertEqual(ctx.exception.code, "class_full")
+
+        self.book(self.clients[0], self.schedule, NEXT_WEEK)
+        with self.assertRaises(RescheduleError) as ctx:
+            move_booking(self.booking.pk, self.schedule.pk, NEXT_WEEK)
+        self.assertEqual(ctx.exception.code, "duplicate")
+
+        self.assertEqual(booked(self.schedule), 1)
+        self.assertEqual(booked(self.other), 1)
+
+    def test_endpoint_validates_input(self):
+        api = APIClient()
+        api.force_authenticate(user=User.objects.create_superuser(username="admin", password="x"))
+        url = f"/api/studio/bookings/{self.booking.pk}/reschedule/"
+
+        response = api.put(url, {"schedule_id": self.other.pk, "class_date": "x"}, format="json")
+        self.assertEqual(response.data["error"], "Fecha inválida.")
+        response = api.put(
+            url, {"schedule_id": 999999, "class_date": NEXT_WEEK.isoformat()}, format="json"
+        )
+        self.assertEqual(response.data["error"], "Nuevo horario no válido.")
+
+        response = api.put(
+            url, {"schedule_id": self.other.pk, "class_date": NEXT_WEEK.isoformat()}, format="json"
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(booked(self.other, NEXT_WEEK), 1)
+
+
+@skipUnlessDBFeature("has_select_for_update")
+class RescheduleConcurrencyTest(TransactionTestCase):
+    def test_parallel_reschedules_for_last_seat(self):
+        sede = Sede.objects.create(name="Sede 1", slug="sede1", status=True)
+        source = Schedule.objects.create(day="MON", time_slot="07:00", capacity=10, sede=sede)
+        target = Schedule.objects.create(day="MON", time_slot="08:00", capacity=1, sede=sede)
+        bookings = [
+            Booking.objects.create(client=c, schedule=source, class_date=CLASS_DATE, sede=sede)
+            for c in make_clients(sede, 6)
+        ]
+
+        barrier = threading.Barrier(len(bookings))
+        results = []
+
+        def attempt(booking):
+            try:
+                barrier.wait()
+                move_booking(booking.pk, target.pk, CLASS_DATE, notify=False)
+                results.append("ok")
+            except RescheduleError:
+                results.append("full")
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt, args=(b,)) for b in bookings]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count("ok"), 1)
+        self.assertEqual(booked(target), 1)
+        self.assertEqual(booked(source), len(bookings) - 1)
+        self.assertEqual(Booking.objects.filter(schedule=target).count(), 1)
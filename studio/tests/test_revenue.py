@@ -0,0 +1,108 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from studio.models import MonthlyRevenue, Sede, Venta
+from studio.revenue import reconcile_monthly_revenue
+from studio.tests.test_closing_facts import MONDAY, ClosingFixturesMixin, at
+
+User = get_user_model()
+
+FEBRUARY = MONDAY + timedelta(days=31)
+
+
+def revenue(sede=None, year=2030, month=1):
+    return MonthlyRevenue.objects.filter(year=year, month=month, sede=sede).values_list(
+        "total_amount", "payment_count", "venta_total", "venta_count"
+    ).get()
+
+
+class MonthlyRevenueTest(ClosingFixturesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = Sede.objects.create(name="Sede 2", slug="sede2", status=True)
+
+    def sell(self, sede, day=MONDAY):
+        return Venta.objects.create(
+            client=self.client_obj,
+            product_name="Agua",
+            quantity=2,
+            price_per_unit=Decimal("5.00"),
+            total_amount=0,
+            date_sold=at(day),
+            sede=sede,
+        )
+
+    def test_payments_and_sales_update_sede_and_global_rows(self):
+        payment = self.pay("100.00", "efectivo")
+        moved = self.pay("200.00", "efectivo")
+        moved.sede = self.other
+        moved.save()
+        self.sell(self.sede)
+
+        self.assertEqual(revenue(self.sede), (Decimal("110"), 1, Decimal("10"), 1))
+        self.assertEqual(revenue(self.other), (Decimal("200"), 1, Decimal("0"), 0))
+        self.assertEqual(revenue(), (Decimal("310"), 2, Decimal("10"), 1))
+
+        # Cambiar monto y mover al mes siguiente en la otra sede
+        payment.amount = Decimal("150.00")
+        payment.date_paid = at(FEBRUARY)
+        payment.sede = self.other
+        payment.save()
+        self.assertEqual(revenue(self.sede), (Decimal("10"), 0, Decimal("10"), 1))
+        self.assertEqual(revenue(self.other, month=2), (Decimal("150"), 1, Decimal("0"), 0))
+        self.assertEqual(revenue(month=2), (Decimal("150"), 1, Decimal("0"), 0))
+
+        payment.delete()
+        self.assertEqual(revenue(month=2), (Decimal("0"), 0, Decimal("0"), 0))
+        self.assertEqual(reconcile_monthly_revenue(repair=False), [])
+
+    def test_reconcile_repairs_drift_in_bulk(self):
+        self.pay("100.00", "efectivo")
+        self.pay("50.00", "efectivo", day=FEBRUARY)
+        self.sell(self.other)
+        MonthlyRevenue.objects.filter(sede__isnull=True).update(total_amount=1, payment_count=9)
+        MonthlyRevenue.objects.filter(sede=self.other).delete()
+
+        drift = reconcile_monthly_revenue(repair=False)
+        self.assertEqual(len(drift), 3)
+        self.assertEqual(revenue(month=2)[0], Decimal("1"))
+
+        with CaptureQueriesContext(connection) as queries:
+            out = StringIO()
+            call_command("reconcile_monthly_revenue", stdout=out)
+        self.assertIn("3 filas corregidas", out.getvalue())
+        # Bloqueo, dos agrupadas, bulk_update, bulk_create (más savepoints)
+        self.assertLessEqual(len(queries), 8)
+
+        self.assertEqual(revenue(), (Decimal("110"), 1, Decimal("10"), 1))
+        self.assertEqual(revenue(month=2), (Decimal("50"), 1, Decimal("0"), 0))
+        self.assertEqual(revenue(self.other), (Decimal("10"), 0, Decimal("10"), 1))
+        self.assertEqual(reconcile_monthly_revenue(repair=False), [])
+
+    def test_endpoint_reads_global_or_selected_sede_rows(self):
+        self.pay("100.00", "efectivo")
+        api = APIClient()
+        admin = User.objects.create_superuser(username="admin", password="x")
+        api.force_authenticate(user=admin)
+
+        response = api.get("/api/studio/monthly-revenue/")
+        self.assertEqual([row["sede"] for row in response.data], [None])
+        response = api.get("/api/studio/monthly-revenue/total/")
+        self.assertEqual(response.data["total_revenue"], 100.0)
+
+        # SedeAccessPermission busca el grupo admin al filtrar por sede
+        admin.groups.add(Group.objects.create(name="admin"))
+        response = api.get("/api/studio/monthly-revenue/", HTTP_X_SEDE_ID=str(self.sede.pk))
+        self.assertEqual(
+            [row["sede"]["id"] for row in response.data], [self.sede.pk]
+        )
+        response = api.post("/api/studio/monthly-revenue/recalculate/", {"year": 2030, "month": 1})
+        self.assertEqual(response.data["data"]["total"], Decimal("100"))
@@ -0,0 +1,101 @@
+from datetime import time
+from io import StringIO
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from studio.models import ClassOccurrence, Schedule, Sede, TimeSlot
+from studio.schedule_overlap import OverlapChecker, validate_schedules
+
+
+class ScheduleOverlapTest(TestCase):
+    def setUp(self):
+        self.sede = Sede.objects.create(name="Sede 1", slug="sede1", status=True)
+        self.other_sede = Sede.objects.create(name="Sede 2", slug="sede2", status=True)
+        # 07:00-07:50 y 08:00-09:30; 09:00 no tiene TimeSlot (dura una hora)
+        TimeSlot.objects.create(sede=self.sede, start_time=time(7), end_time=time(7, 50))
+        TimeSlot.objects.create(sede=self.sede, start_time=time(8), end_time=time(9, 30))
+
+    def schedule(self, time_slot, day="MON", sede=None, **kwargs):
+        return Schedule(day=day, time_slot=time_slot, sede=sede or self.sede, **kwargs)
+
+    def test_save_uses_time_slot_duration(self):
+        self.schedule("07:00").save()
+        self.schedule("08:00").save()
+        self.schedule("08:00", day="TUE").save()
+        self.schedule("08:00", sede=self.other_sede).save()
+
+        with self.assertRaisesMessage(ValidationError, "Lunes 08:00"):
+            self.schedule("09:00").save()
+
+        # Editar un horario no choca consigo mismo
+        existing = Schedule.objects.get(day="MON", time_slot="07:00")
+        existing.capacity = 5
+        existing.save()
+
+    def test_save_query_count_does_not_grow_with_siblings(self):
+        for slot in ("05:00", "06:00", "07:00", "10:00", "11:00", "12:00"):
+            self.schedule(slot).save()
+
+        schedule = Schedule.objects.get(day="MON", time_slot="12:00")
+        with CaptureQueriesContext(connection) as queries:
+            schedule.validate_no_overlap()
+        self.assertEqual(len(queries), 2)
+
+    def test_validate_schedules_checks_batch_and_existing(self):
+        self.schedule("07:00").save()
+        existing_8 = self.schedule("08:00")
+        existing_8.save()
+
+        # Mover el de las 08:00 a las 10:00 libera su intervalo para otro nuevo
+        existing_8.time_slot = "10:00"
+        batch = [
+            existing_8,
+            self.schedule("08:30"),
+            self.schedule("10:30"),
+            self.schedule("07:30", day="WED"),
+            self.schedule("07:30", day="WED"),
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            errors = validate_schedules(batch)
+        self.assertEqual(len(queries), 2)
+        self.assertEqual([s for s, _ in errors], [batch[2], batch[4]])
+
+    def test_migrate_command_regenerates_occurrences(self):
+        schedule = self.schedule("06:00")
+        schedule.save()
+        # 06:00 no tiene TimeSlot: el comando lo mueve al primero (07:00)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("migrate_schedules_to_time_slots", stdout=StringIO())
+
+        schedule.refresh_from_db()
+        self.assertEqual(schedule.time_slot, "07:00")
+        starts = {
+            timezone.localtime(start).time()
+            for start in ClassOccurrence.objects.filter(schedule=schedule).values_list(
+                "start", flat=True
+            )
+        }
+        self.assertEqual(starts, {time(7)})
+
+    def test_checker_finds_long_interval_behind_short_ones(self):
+        # 06:00-10:00 seguido de bloques de 15 minutos que terminan antes de las 09:00
+        slot_ends = {(self.sede.id, time(6)): time(10)}
+        existing = [self.schedule("06:00", pk=1)]
+        for hour in (6, 7, 8):
+            for minute in (20, 40):
+                schedule = self.schedule(f"{hour:02d}:{minute}", pk=len(existing) + 1)
+                slot_ends[(self.sede.id, time(hour, minute))] = time(hour, minute + 15)
+                existing.append(schedule)
+        checker = OverlapChecker(existing, slot_ends)
+
+        self.assertEqual(checker.find_overlap(self.schedule("09:40")).pk, 1)
+        self.assertIsNone(checker.find_overlap(self.schedule("10:00")))
+
+        # Sin el horario largo solo chocan los bloques cortos
+        checker.remove(existing[0])
+        self.assertIsNone(checker.find_overlap(self.schedule("09:40")))
+        self.assertEqual(checker.find_overlap(self.schedule("08:45")).pk, 7)
@@ -0,0 +1,175 @@
+import threading
+from datetime import date
+
+from accounts.models import Client
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from rest_framework.test import APIClient
+from studio.models import Booking, ClassOccupancy, Schedule, Sede
+from studio.seats import ClassFullError, rebuild_occupancy
+
+CLASS_DATE = date(2030, 1, 7)
+
+
+def make_clients(sede, count, prefix="c"):
+    return [
+        Client.objects.create(
+            first_name=f"Cliente{i}",
+            last_name="Test",
+            email=f"{prefix}{i}@example.com",
+            sede=sede,
+        )
+        for i in range(count)
+    ]
+
+
+def booked(schedule, class_date=CLASS_DATE):
+    return ClassOccupancy.objects.get(schedule=schedule, class_date=class_date).booked
+
+
+class ClassOccupancyTest(TestCase):
+    def setUp(self):
+        self.sede = Sede.objects.create(name="Sede 1", slug="sede1", status=True)
+        self.schedule = Schedule.objects.create(
+            day="MON", time_slot="07:00", capacity=2, sede=self.sede
+        )
+        self.other_schedule = Schedule.objects.create(
+            day="MON", time_slot="08:00", capacity=2, sede=self.sede
+        )
+        self.clients = make_clients(self.sede, 3)
+
+    def book(self, client, schedule=None, **kwargs):
+        return Booking.objects.create(
+            client=client,
+            schedule=schedule or self.schedule,
+            class_date=CLASS_DATE,
+            sede=self.sede,
+            **kwargs,
+        )
+
+    def test_counter_follows_booking_lifecycle(self):
+        first = self.book(self.clients[0])
+        self.book(self.clients[1])
+        self.assertEqual(booked(self.schedule), 2)
+
+        with self.assertRaises(ClassFullError):
+            self.book(self.clients[2])
+        self.assertEqual(booked(self.schedule), 2)
+        self.assertFalse(Booking.objects.filter(client=self.clients[2]).exists())
+
+        first = Booking.objects.get(pk=first.pk)
+        first.status = "cancelled"
+        first.save()
+        self.assertEqual(booked(self.schedule), 1)
+
+        third = self.book(self.clients[2])
+        self.assertEqual(booked(self.schedule), 2)
+
+        # Reagendar mueve el cupo de una ocurrencia a otra
+        third.schedule = self.other_schedule
+        third.save()
+        self.assertEqual(booked(self.schedule), 1)
+        self.assertEqual(booked(self.other_schedule), 1)
+
+        third.delete()
+        self.assertEqual(booked(self.other_schedule), 0)
+
+    def test_cascade_deletes_release_the_seat(self):
+        self.book(self.clients[0])
+        self.book(self.clients[1])
+        self.clients[0].delete()
+        self.assertEqual(booked(self.schedule), 1)
+
+        self.schedule.delete()
+        self.assertFalse(
+            ClassOccupancy.objects.filter(schedule_id=self.schedule.id).exists()
+        )
+
+    def test_pending_bookings_do_not_take_a_seat(self):
+        pending = self.book(self.clients[0], status="pending")
+        self.assertFalse(ClassOccupancy.objects.exists())
+
+        pending.status = "active"
+        pending.save()
+        self.assertEqual(booked(self.schedule), 1)
+
+    def test_rebuild_repairs_drift(self):
+        self.book(self.clients[0])
+        self.book(self.clients[1], schedule=self.other_schedule)
+        ClassOccupancy.objects.filter(schedule=self.schedule).update(booked=5)
+        ClassOccupancy.objects.filter(schedule=self.other_schedule).delete()
+
+        self.assertEqual(rebuild_occupancy(), 2)
+        self.assertEqual(booked(self.schedule), 1)
+        self.assertEqual(booked(self.other_schedule), 1)
+
+    def test_excel_import_counts_against_capacity(self):
+        self.book(self.clients[0])
+        csv = (
+            "first_name,last_name,email,phone,class_date,time_slot,day,attendance_status\n"
+            f"Ana,Import,ana@example.com,,{CLASS_DATE},07:00,MON,attended\n"
+            f"Luis,Import,luis@example.com,,{CLASS_DATE},08:00,MON,cancelled\n"
+        )
+        api = APIClient()
+        api.force_authenticate(
+            user=get_user_model().objects.create_superuser(username="admin", password="x")
+        )
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = api.post(
+                "/api/studio/bookings/import/",
+                {"file": SimpleUploadedFile("reservas.csv", csv.encode())},
+                format="multipart",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(booked(self.schedule), 2)
+        self.assertFalse(ClassOccupancy.objects.filter(schedule=self.other_schedule).exists())
+        self.assertTrue(callbacks)
+        with self.assertRaises(ClassFullError):
+            self.book(self.clients[1])
+
+
+@skipUnlessDBFeature("has_select_for_update")
+class LastSeatConcurrencyTest(TransactionTestCase):
+    def test_parallel_bookings_for_last_seat(self):
+        sede = Sede.objects.create(name="Sede 1", slug="sede1", status=True)
+        schedule = Schedule.objects.create(
+            day="MON", time_slot="07:00", capacity=3, sede=sede
+        )
+        clients = make_clients(sede, 10)
+        for client in clients[:2]:
+            Booking.objects.create(
+                client=client, schedule=schedule, class_date=CLASS_DATE, sede=sede
+            )
+
+        contenders = clients[2:]
+        barrier = threading.Barrier(len(contenders))
+        results = []
+
+        def attempt(client):
+            try:
+                barrier.wait()
+                Booking.objects.create(
+                    client=client, schedule=schedule, class_date=CLASS_DATE, sede=sede
+                )
+                results.append("ok")
+            except ClassFullError:
+                results.append("full")
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt, args=(c,)) for c in contenders]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count("ok"), 1)
+        self.assertEqual(results.count("full"), len(contenders) - 1)
+        self.assertEqual(
+            Booking.objects.filter(schedule=schedule, class_date=CLASS_DATE).count(), 3
+        )
+        self.assertEqual(booked(schedule), 3)
@@ -0,0 +1,155 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from accounts.models import Client
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from studio.entitlements import get_entitlement
+from studio.models import (
+    Booking,
+    ClassOccupancy,
+    Membership,
+    Payment,
+    Schedule,
+    Sede,
+    StandingReservation,
+)
+from studio.standing import materialize_standing_reservations
+
+User = get_user_model()
+
+
+class StandingReservationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.sede = Sede.objects.create(name="Sede 1", slug="sede1", status=True)
+        self.monday = Schedule.objects.create(
+            day="MON", time_slot="07:00", capacity=2, sede=self.sede
+        )
+        self.wednesday = Schedule.objects.create(
+            day="WED", time_slot="07:00", capacity=2, sede=self.sede
+        )
+        self.membership = Membership.objects.create(
+            name="8 clases", price=Decimal("400.00"), classes_per_month=8
+        )
+
+    def member(self, name, membership=None):
+        client = Client.objects.create(
+            first_name=name,
+            last_name="Test",
+            email=f"{name}@example.com",
+            sede=self.sede,
+            trial_used=True,
+        )
+        payment = Payment.objects.create(
+            client=client,
+            membership=membership or self.membership,
+            amount=Decimal("400.00"),
+            valid_from=self.today - timedelta(days=1),
+            valid_until=self.today + timedelta(days=60),
+        )
+        return client, payment
+
+    def stand(self, client, schedule, **kwargs):
+        return StandingReservation.objects.create(
+            client=client, schedule=schedule, start_date=self.today, **kwargs
+        )
+
+    def test_materializes_upcoming_weeks_with_bounded_queries(self):
+        def run(count):
+            StandingReservation.objects.all().delete()
+            Booking.objects.all().delete()
+            ClassOccupancy.objects.all().delete()
+            for i in range(count):
+                client, _ = self.member(f"m{count}x{i}")
+                self.stand(client, self.monday if i % 2 else self.wednesday)
+            with CaptureQueriesContext(connection) as queries:
+                result = materialize_standing_reservations(weeks=3)
+            return result, len(queries)
+
+        small, small_queries = run(2)
+        large, large_queries = run(4)
+
+        self.assertEqual(small["created"], 6)
+        self.assertEqual(large["created"], 12)
+        self.assertEqual(large["conflicts"], [])
+        self.assertEqual(small_queries, large_queries)
+
+        booking = Booking.objects.filter(schedule=self.monday).order_by("class_date").first()
+        self.assertEqual(booking.class_date.weekday(), 0)
+        self.assertEqual(booking.sede, self.sede)
+        occupancy = ClassOccupancy.objects.get(
+            schedule=self.monday, class_date=booking.class_date
+        )
+        self.assertEqual(occupancy.booked, 2)
+
+    def test_reports_capacity_and_limit_conflicts(self):
+        first, _ = self.member("uno")
+        second, _ = self.member("dos")
+        single = Membership.objects.create(
+            name="1 clase", price=Decimal("100.00"), classes_per_month=1
+        )
+        limited, payment = self.member("tres", single)
+        for client in (first, second):
+            self.stand(client, self.monday)
+        full = self.stand(limited, self.monday)
+        limit = self.stand(limited, self.wednesday)
+
+        result = materialize_standing_reservations(weeks=2)
+
+        codes = {(c["standing_id"], c["code"]) for c in result["conflicts"]}
+        self.assertIn((full.id, "class_full"), codes)
+        self.assertIn((limit.id, "limit_reached"), codes)
+        self.assertEqual(get_entitlement(payment).used, 1)
+        full.refresh_from_db()
+        self.assertIn("No hay cupo disponible", full.last_conflict)
+
+    def test_runs_are_incremental_and_respect_end_date(self):
+        client, _ = self.member("uno")
+        standing = self.stand(client, self.monday, end_date=self.today + timedelta(days=13))
+
+        materialize_standing_reservations(weeks=1)
+        materialize_standing_reservations(weeks=1)
+        self.assertEqual(Booking.objects.count(), 1)
+
+        # Una reserva cancelada no se vuelve a crear en la siguiente corrida
+        Booking.objects.update(status="cancelled")
+        result = materialize_standing_reservations(weeks=4)
+        self.assertEqual(result["created"], 1)
+        self.assertEqual(Booking.objects.filter(status="active").count(), 1)
+        standing.refresh_from_db()
+        self.assertEqual(standing.materialized_until, self.today + timedelta(weeks=4))
+
+    def test_command_and_endpoint(self):
+        client, _ = self.member("uno")
+        self.stand(client, self.monday)
+
+        out = StringIO()
+        call_command("materialize_standing_reservations", "--dry-run", stdout=out)
+        self.assertIn("(simulación) 2 reservas creadas", out.getvalue())
+        self.assertFalse(Booking.objects.exists())
+
+        api = APIClient()
+        api.force_authenticate(user=User.objects.create_superuser(username="admin", password="x"))
+        response = api.post(
+            "/api/studio/standing-reservations/",
+            {
+                "client_id": client.id,
+                "schedule_id": self.wednesday.id,
+                "start_date": self.today.isoformat(),
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data["sede"], self.sede.id)
+
+        response = api.post("/api/studio/standing-reservations/materialize/?weeks=1")
+        self.assertEqual(response.data["created"], 2)
@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from accounts.models import Client
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from studio.availability import day_code_for
+from studio.models import Booking, Schedule, Sede
+
+User = get_user_model()
+
+
+class TodayClassesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sede = Sede.objects.create(name="Sede 1", slug="sede1", status=True)
+        self.tomorrow = timezone.localdate() + timedelta(days=1)
+        self.api = APIClient()
+        self.api.force_authenticate(
+            user=User.objects.create_superuser(username="admin", password="x")
+        )
+
+    def fill_board(self, first_hour, schedules):
+        for hour in range(first_hour, first_hour + schedules):
+            schedule = Schedule.objects.create(
+                day=day_code_for(self.tomorrow),
+                time_slot=f"{hour:02d}:00",
+                capacity=5,
+                sede=self.sede,
+            )
+            for i in range(3):
+                client = Client.objects.create(
+                    first_name=f"C{hour}{i}", last_name="T", email=f"c{hour}{i}@example.com"
+                )
+                Booking.objects.create(
+                    client=client,
+                    schedule=schedule,
+                    class_date=self.tomorrow,
+                    sede=self.sede,
+                    status="cancelled" if i == 2 else "active",
+                )
+
+    def board(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.get(
+                "/api/studio/schedules/today/", {"date": self.tomorrow.isoformat()}
+            )
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(queries)
+
+    def test_board_for_date_has_bounded_queries(self):
+        self.fill_board(6, 2)
+        small, small_queries = self.board()
+        self.fill_board(8, 4)
+        large, large_queries = self.board()
+
+        self.assertEqual(len(small), 2)
+        self.assertEqual(len(large), 6)
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual([len(s["bookings"]) for s in large], [2] * 6)
+        self.assertEqual(large[0]["bookings"][0]["client"]["first_name"], "C60")
+
+    def test_invalid_date(self):
+        response = self.api.get("/api/studio/schedules/today/", {"date": "mañana"})
+        self.assertEqual(response.status_code, 400)
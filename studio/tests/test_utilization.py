@@ -0,0 +1,103 @@
+from datetime import time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from studio.models import Booking, Schedule, Sede, TimeSlot
+from studio.tests.test_seats import CLASS_DATE as MONDAY, make_clients
+from studio.utilization import time_slot_utilization
+
+User = get_user_model()
+
+
+class TimeSlotUtilizationTest(TestCase):
+    def setUp(self):
+        self.sede = Sede.objects.create(name="Sede 1", slug="sede1", status=True)
+        self.other = Sede.objects.create(name="Sede 2", slug="sede2", status=True)
+        for sede, start, end, active in (
+            (self.sede, time(7), time(8), True),
+            (self.sede, time(16, 30), time(17, 30), True),
+            (self.sede, time(18), time(19), False),
+            (self.other, time(9), time(10), True),
+        ):
+            TimeSlot.objects.create(sede=sede, start_time=start, end_time=end, is_active=active)
+
+        self.early = Schedule.objects.create(
+            day="MON", time_slot="07:00", capacity=2, sede=self.sede
+        )
+        self.late = Schedule.objects.create(
+            day="WED", time_slot="16:30", capacity=3, sede=self.sede
+        )
+        # Su TimeSlot está inactivo: no aparece
+        self.inactive = Schedule.objects.create(
+            day="MON", time_slot="18:00", capacity=5, sede=self.sede
+        )
+        self.clients = make_clients(self.sede, 3)
+
+    def book(self, schedule, class_date, count=1):
+        for client in self.clients[:count]:
+            Booking.objects.create(
+                client=client, schedule=schedule, class_date=class_date, sede=self.sede
+            )
+
+    def test_heatmap_from_active_time_slots(self):
+        self.book(self.early, MONDAY, count=2)
+        self.book(self.early, MONDAY + timedelta(days=7))
+        self.book(self.early, MONDAY + timedelta(days=14))  # fuera del rango
+        self.book(self.late, MONDAY + timedelta(days=2))
+        self.book(self.inactive, MONDAY)
+
+        with CaptureQueriesContext(connection) as queries:
+            data = time_slot_utilization(
+                MONDAY, MONDAY + timedelta(days=13), sede_ids=[self.sede.pk]
+            )
+        self.assertEqual(len(queries), 2)
+
+        self.assertEqual(data["days"][0], "MON")
+        self.assertEqual(
+            [slot["time_slot"] for slot in data["slots"]], ["07:00-08:00", "16:30-17:30"]
+        )
+        early, late = data["slots"]
+        # Dos lunes en el rango: capacidad 2 x 2
+        self.assertEqual(early["days"][0], {"booked": 3, "capacity": 4, "utilization": 75.0})
+        self.assertEqual(late["days"][2], {"booked": 1, "capacity": 6, "utilization": 16.7})
+        self.assertEqual(early["days"][1], {"booked": 0, "capacity": 0, "utilization": 0})
+        self.assertEqual((late["booked"], late["capacity"]), (1, 6))
+        self.assertEqual(data["totals"][0]["booked"], 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            everywhere = time_slot_utilization(MONDAY, MONDAY + timedelta(days=13))
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(
+            [slot["time_slot"] for slot in everywhere["slots"]],
+            ["07:00-08:00", "09:00-10:00", "16:30-17:30"],
+        )
+
+    def test_endpoint(self):
+        api = APIClient()
+        api.force_authenticate(user=User.objects.create_superuser(username="admin", password="x"))
+        self.book(self.late, MONDAY + timedelta(days=2))
+
+        response = api.get(
+            "/api/studio/time-slots/utilization/",
+            {"start": MONDAY.isoformat(), "end": (MONDAY + timedelta(days=6)).isoformat()},
+            HTTP_X_SEDE_ID=str(self.sede.pk),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["slots"]), 2)
+        self.assertEqual(response.data["slots"][1]["days"][2]["utilization"], 33.3)
+
+        response = api.get(
+            "/api/studio/time-slots/utilization/",
+            {"start": MONDAY.isoformat(), "end": (MONDAY - timedelta(days=1)).isoformat()},
+        )
+        self.assertEqual(response.status_code, 400)
+        response = api.get(
+            "/api/studio/time-slots/utilization/",
+            {"start": MONDAY.isoformat(), "end": (MONDAY + timedelta(days=400)).isoformat()},
+        )
+        self.assertEqual(response.status_code, 400)
+        response = api.get("/api/studio/time-slots/utilization/", {"end": "2030-02-30"})
+        self.assertEqual(response.status_code, 400)
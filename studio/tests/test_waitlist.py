@@ -0,0 +1,167 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from accounts.models import Client
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from studio.models import Booking, ClassOccupancy, Membership, Payment, Schedule, Sede
+from studio.tests.test_bulk_create_multiple import ImmediateExecutor
+from studio.reschedule import move_booking
+from studio.waitlist import WaitlistError, join_waitlist, waitlist_position
+
+User = get_user_model()
+
+
+class WaitlistTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        today = timezone.localdate()
+        self.class_date = today + timedelta(days=(7 - today.weekday()) % 7 or 7)
+        self.sede = Sede.objects.create(name="Sede 1", slug="sede1", status=True)
+        self.schedule = Schedule.objects.create(
+            day="MON", time_slot="07:00", capacity=1, sede=self.sede
+        )
+        self.membership = Membership.objects.create(
+            name="4 clases", price=Decimal("250.00"), classes_per_month=4
+        )
+        self.holder = self.member("holder")
+        self.booking = Booking.objects.create(
+            client=self.holder,
+            schedule=self.schedule,
+            class_date=self.class_date,
+            sede=self.sede,
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(
+            user=User.objects.create_superuser(username="admin", password="x")
+        )
+
+        patcher = mock.patch(
+            "studio.tasks.background.get_executor", return_value=ImmediateExecutor()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def member(self, name, paid=True):
+        client = Client.objects.create(
+            first_name=name,
+            last_name="Test",
+            email=f"{name}@example.com",
+            sede=self.sede,
+            trial_used=True,
+        )
+        if paid:
+            Payment.objects.create(
+                client=client,
+                membership=self.membership,
+                amount=Decimal("250.00"),
+                valid_from=timezone.localdate() - timedelta(days=1),
+                valid_until=timezone.localdate() + timedelta(days=60),
+            )
+        return client
+
+    def test_join_only_when_full_and_position_is_one_query(self):
+        first, second = self.member("uno"), self.member("dos")
+        join_waitlist(first, self.schedule.id, self.class_date)
+        join_waitlist(second, self.schedule.id, self.class_date)
+        join_waitlist(second, self.schedule.id, self.class_date)
+
+        with CaptureQueriesContext(connection) as queries:
+            position = waitlist_position(second.id, self.schedule.id, self.class_date)
+        self.assertEqual(position, 2)
+        self.assertEqual(len(queries), 1)
+
+        with self.assertRaises(WaitlistError) as ctx:
+            join_waitlist(self.holder, self.schedule.id, self.class_date)
+        self.assertEqual(ctx.exception.code, "duplicate")
+
+        other = Schedule.objects.create(
+            day="MON", time_slot="08:00", capacity=1, sede=self.sede
+        )
+        with self.assertRaises(WaitlistError) as ctx:
+            join_waitlist(first, other.id, self.class_date)
+        self.assertEqual(ctx.exception.code, "has_seats")
+
+    @mock.patch("studio.management.mails.mails.send_waitlist_promotion_email")
+    def test_reschedule_promotes_waiter_into_released_seat(self, promotion_email):
+        waiter = self.member("espera")
+        join_waitlist(waiter, self.schedule.id, self.class_date)
+        other = Schedule.objects.create(
+            day="MON", time_slot="08:00", capacity=1, sede=self.sede
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            move_booking(self.booking.id, other.id, self.class_date, notify=False)
+
+        entry = waiter.waitlist_entries.get()
+        self.assertEqual(entry.status, "promoted")
+        self.assertEqual(
+            (entry.booking.schedule_id, entry.booking.class_date),
+            (self.schedule.id, self.class_date),
+        )
+        self.assertEqual(
+            ClassOccupancy.objects.get(schedule=self.schedule, class_date=self.class_date).booked,
+            1,
+        )
+        promotion_email.assert_called_once()
+
+    @mock.patch("studio.management.mails.mails.send_waitlist_promotion_email")
+    @mock.patch("studio.management.mails.mails.send_booking_cancellation_email")
+    def test_cancel_promotes_first_eligible_waiter(self, _cancel_email, promotion_email):
+        unpaid = self.member("sinpago", paid=False)
+        paid, later = self.member("pago"), self.member("tarde")
+        for client in (unpaid, paid, later):
+            join_waitlist(client, self.schedule.id, self.class_date)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.api.put(
+                f"/api/studio/bookings/{self.booking.id}/cancel/", {"reason": "x"}, format="json"
+            )
+        self.assertEqual(response.status_code, 200)
+
+        skipped = unpaid.waitlist_entries.get()
+        self.assertEqual(skipped.status, "skipped")
+        self.assertTrue(skipped.notes)
+        entry = paid.waitlist_entries.get()
+        self.assertEqual(entry.status, "promoted")
+        self.assertEqual(entry.booking.client, paid)
+        self.assertEqual(waitlist_position(later.id, self.schedule.id, self.class_date), 1)
+        self.assertEqual(
+            ClassOccupancy.objects.get(schedule=self.schedule, class_date=self.class_date).booked,
+            1,
+        )
+        promotion_email.assert_called_once()
+
+    def test_endpoints(self):
+        client = self.member("uno")
+        response = self.api.post(
+            "/api/studio/waitlist/",
+            {
+                "client_id": client.id,
+                "schedule_id": self.schedule.id,
+                "class_date": self.class_date.isoformat(),
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data["position"], 1)
+
+        response = self.api.get(
+            "/api/studio/waitlist/position/",
+            {
+                "client_id": client.id,
+                "schedule_id": self.schedule.id,
+                "class_date": self.class_date.isoformat(),
+            },
+        )
+        self.assertEqual(response.data["position"], 1)
+
+        entry_id = client.waitlist_entries.get().id
+        self.assertEqual(self.api.delete(f"/api/studio/waitlist/{entry_id}/").status_code, 204)
+        self.assertIsNone(waitlist_position(client.id, self.schedule.id, self.class_date))
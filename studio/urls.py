@@ -2,9 +2,11 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (
+    AvailabilityRangeView,
     AvailabilityView,
     BookingViewSet,
     BulkBookingViewSet,
+    ClassOccurrenceViewSet,
     ClassTypeViewSet,
     MembershipViewSet,
     MonthlyRevenueViewSet,
@@ -14,9 +16,12 @@ from .views import (
     PromotionViewSet,
     ScheduleViewSet,
     SedeViewSet,
+    StandingReservationViewSet,
     TimeSlotViewSet,
     VentaViewSet,
+    WaitlistEntryViewSet,
     attendance_summary,
+    availability_stream,
     clases_por_mes,
     closure_full_summary,
     create_authenticated_booking,
@@ -26,6 +31,7 @@ from .views import (
     get_today_payments_total,
     get_weekly_closing_summary,
     my_bookings_by_month,
+    run_cron_task,
     summary_by_class_type,
 )
 
@@ -44,7 +50,16 @@ router.register(
 )
 router.register(r"ventas", VentaViewSet)
 router.register(r"sedes", SedeViewSet, basename="sedes")
+router.register(r"waitlist", WaitlistEntryViewSet, basename="waitlist")
+router.register(
+    r"standing-reservations",
+    StandingReservationViewSet,
+    basename="standing-reservations",
+)
 router.register(r"class-types", ClassTypeViewSet, basename="class-types")
+router.register(
+    r"class-occurrences", ClassOccurrenceViewSet, basename="class-occurrences"
+)
 router.register(r"time-slots", TimeSlotViewSet, basename="time-slots")
 
 urlpatterns = [
@@ -57,6 +72,12 @@ urlpatterns = [
         name="cierres-completos",
     ),
     path("availability/", AvailabilityView.as_view(), name="availability"),
+    path(
+        "availability/range/",
+        AvailabilityRangeView.as_view(),
+        name="availability-range",
+    ),
+    path("availability/stream/", availability_stream, name="availability-stream"),
     path("summary-by-class-type/", summary_by_class_type),
     path("attendance-summary/", attendance_summary),
     path("clases-por-mes/", clases_por_mes, name="clases-por-mes"),
@@ -68,6 +89,7 @@ urlpatterns = [
         name="create_authenticated_booking",
     ),
     path("dashboard-data/", get_dashboard_data, name="dashboard-data"),
+    path("cron/<str:task_id>/", run_cron_task, name="cron-task"),
     # Router endpoints (after specific paths)
     path(
         "payments/closure-full-summary/",
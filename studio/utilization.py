@@ -0,0 +1,127 @@
+# studio/utilization.py
+"""
+Ocupación por horario (``TimeSlot``) y día de la semana.
+
+Las filas del mapa de calor salen de los TimeSlot activos de cada sede (así
+aparecen horarios como 16:30); las columnas son los días MON..SUN. Los cupos
+ocupados salen de ``ClassOccupancy`` y la capacidad de ``Schedule.capacity``
+por cada fecha del rango en que cae su día, todo en una consulta agrupada por
+(sede, hora, día). Los horarios cuya hora no es un TimeSlot activo de su sede
+no cuentan.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .availability import DAY_CODES, parse_time_slot
+from .models import ClassOccupancy, Schedule, TimeSlot
+
+DAYS = [DAY_CODES[weekday] for weekday in range(7)]
+
+# Máximo de días del rango del endpoint (un año)
+MAX_UTILIZATION_DAYS = 366
+
+
+def _day_counts(start, end):
+    """Cuántas veces cae cada día (MON..SUN) entre ``start`` y ``end`` (incluido)."""
+    counts = dict.fromkeys(DAYS, 0)
+    for offset in range(min(7, (end - start).days + 1)):
+        day = start + timedelta(days=offset)
+        counts[DAY_CODES[day.weekday()]] = (end - day).days // 7 + 1
+    return counts
+
+
+def _cell(booked, capacity):
+    return {
+        "booked": booked,
+        "capacity": capacity,
+        "utilization": round(booked * 100 / capacity, 1) if capacity else 0,
+    }
+
+
+def time_slot_utilization(start, end, sede_ids=None):
+    """
+    Mapa de calor de ocupación entre ``start`` y ``end`` (incluido), en dos
+    consultas (TimeSlot activos y la agrupada de horarios).
+
+    Devuelve ``slots`` (una fila por hora de inicio con su etiqueta, total y
+    una celda por día en el orden de ``days``) y ``totals`` por día.
+    """
+    time_slots = TimeSlot.objects.filter(is_active=True)
+    schedules = Schedule.objects.all()
+    if sede_ids is not None:
+        time_slots = time_slots.filter(sede_id__in=sede_ids)
+        schedules = schedules.filter(sede_id__in=sede_ids)
+
+    labels = {}
+    active = set()
+    for slot in time_slots.order_by("start_time", "end_time"):
+        active.add((slot.sede_id, slot.start_time))
+        labels.setdefault(
+            slot.start_time,
+            f"{slot.start_time.strftime('%H:%M')}-{slot.end_time.strftime('%H:%M')}",
+        )
+
+    booked = (
+        ClassOccupancy.objects.filter(
+            schedule_id=OuterRef("pk"), class_date__gte=start, class_date__lte=end
+        )
+        .order_by()
+        .values("schedule_id")
+        .annotate(total=Sum("booked"))
+        .values("total")
+    )
+    rows = (
+        schedules.order_by()
+        .values("sede_id", "time_slot", "day")
+        .annotate(
+            capacity=Sum("capacity"),
+            booked=Sum(Coalesce(Subquery(booked, output_field=IntegerField()), 0)),
+        )
+    )
+
+    day_counts = _day_counts(start, end)
+    cells = defaultdict(lambda: [0, 0])
+    for row in rows:
+        if row["day"] not in day_counts:
+            continue
+        try:
+            start_time = parse_time_slot(row["time_slot"])
+        except (TypeError, ValueError):
+            continue
+        if (row["sede_id"], start_time) not in active:
+            continue
+        cell = cells[(start_time, row["day"])]
+        cell[0] += row["booked"]
+        cell[1] += row["capacity"] * day_counts[row["day"]]
+
+    slots = []
+    day_totals = defaultdict(lambda: [0, 0])
+    for start_time in sorted(labels):
+        row_cells = []
+        slot_booked = slot_capacity = 0
+        for day in DAYS:
+            day_booked, day_capacity = cells.get((start_time, day), (0, 0))
+            row_cells.append(_cell(day_booked, day_capacity))
+            slot_booked += day_booked
+            slot_capacity += day_capacity
+            day_totals[day][0] += day_booked
+            day_totals[day][1] += day_capacity
+        slots.append(
+            {
+                "time_slot": labels[start_time],
+                "start_time": start_time.strftime("%H:%M"),
+                "days": row_cells,
+                **_cell(slot_booked, slot_capacity),
+            }
+        )
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "days": DAYS,
+        "slots": slots,
+        "totals": [_cell(*day_totals[day]) for day in DAYS],
+    }
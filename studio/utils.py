@@ -5,134 +5,45 @@ from decimal import Decimal
 import pandas as pd
 from accounts.models import Client
 from django.db import transaction
-from django.db.models import Count, Q, Sum
 
 # from django.db.models.functions import TruncMonth
 from django.utils import timezone
 
-from .models import Booking, Membership, MonthlyRevenue, Payment, Venta
+from .entitlements import get_entitlement
+from .models import Booking, Membership, MonthlyRevenue, Payment
+from .revenue import reconcile_monthly_revenue
 
 # -----------------------------------------------------------------------------
 # Helper utilities
 
 
 def recalculate_monthly_revenue(year, month):
-    from .models import MonthlyRevenue, Payment, Venta
-
-    # Pagos
-    payments = Payment.objects.filter(date_paid__year=year, date_paid__month=month)
-    total_payments = payments.aggregate(Sum("amount"))["amount__sum"] or 0
-    count_payments = payments.count()
-
-    # Ventas
-    ventas = Venta.objects.filter(date_sold__year=year, date_sold__month=month)
-    total_ventas = ventas.aggregate(Sum("total_amount"))["total_amount__sum"] or 0
-    count_ventas = ventas.count()
-
-    total = total_payments + total_ventas
-
-    obj, created = MonthlyRevenue.objects.update_or_create(
-        year=year,
-        month=month,
-        defaults={
-            "total_amount": total,
-            "payment_count": count_payments,
-            "venta_total": total_ventas,
-            "venta_count": count_ventas,
-        },
-    )
+    """Recalcula las filas del mes (por sede y global) y devuelve los totales globales."""
+    reconcile_monthly_revenue(months={(year, month)})
+    totals = MonthlyRevenue.objects.filter(
+        year=year, month=month, sede__isnull=True
+    ).first() or MonthlyRevenue(year=year, month=month)
 
     return {
         "year": year,
         "month": month,
-        "total": total,
-        "from_payments": total_payments,
-        "from_sales": total_ventas,
-        "payments_count": count_payments,
-        "ventas_count": count_ventas,
+        "total": totals.total_amount,
+        "from_payments": totals.total_amount - totals.venta_total,
+        "from_sales": totals.venta_total,
+        "payments_count": totals.payment_count,
+        "ventas_count": totals.venta_count,
     }
 
 
 def recalculate_all_monthly_revenue():
-    from django.db.models.functions import ExtractMonth, ExtractYear
-
-    # Agrupar pagos
-    payment_data = (
-        Payment.objects.annotate(
-            year=ExtractYear("date_paid"), month=ExtractMonth("date_paid")
+    """Recalcula todas las filas (por sede y globales) y devuelve las globales."""
+    reconcile_monthly_revenue()
+    return list(
+        MonthlyRevenue.objects.filter(sede__isnull=True).values(
+            "year", "month", "total_amount", "payment_count", "venta_total", "venta_count"
         )
-        .values("year", "month")
-        .annotate(total=Sum("amount"), count=Count("id"))
     )
 
-    # Agrupar ventas
-    venta_data = (
-        Venta.objects.annotate(
-            year=ExtractYear("date_sold"), month=ExtractMonth("date_sold")
-        )
-        .values("year", "month")
-        .annotate(total=Sum("total_amount"), count=Count("id"))
-    )
-
-    # Convertir a diccionarios accesibles
-    pagos_map = {(d["year"], d["month"]): d for d in payment_data}
-    ventas_map = {(d["year"], d["month"]): d for d in venta_data}
-
-    # Combinar claves
-    all_keys = set(pagos_map.keys()).union(set(ventas_map.keys()))
-
-    results = []
-
-    for year, month in sorted(all_keys, reverse=True):
-        pagos = pagos_map.get((year, month), {"total": 0, "count": 0})
-        ventas = ventas_map.get((year, month), {"total": 0, "count": 0})
-
-        total = (pagos["total"] or 0) + (ventas["total"] or 0)
-
-        MonthlyRevenue.objects.update_or_create(
-            year=year,
-            month=month,
-            defaults={
-                "total_amount": total,
-                "payment_count": pagos["count"],
-                "venta_total": ventas["total"] or 0,
-                "venta_count": ventas["count"],
-            },
-        )
-
-        results.append(
-            {
-                "year": year,
-                "month": month,
-                "total_amount": total,
-                "payment_count": pagos["count"],
-                "venta_total": ventas["total"] or 0,
-                "venta_count": ventas["count"],
-            }
-        )
-
-    # Resetear meses antiguos sin datos
-    existing = MonthlyRevenue.objects.all()
-    for entry in existing:
-        if (entry.year, entry.month) not in all_keys:
-            entry.total_amount = 0
-            entry.payment_count = 0
-            entry.venta_total = 0
-            entry.venta_count = 0
-            entry.save()
-            results.append(
-                {
-                    "year": entry.year,
-                    "month": entry.month,
-                    "total_amount": 0,
-                    "payment_count": 0,
-                    "venta_total": 0,
-                    "venta_count": 0,
-                }
-            )
-
-    return results
-
 
 def count_valid_monthly_bookings(client, reference_date=None):
     """Return number of bookings for the client in the month excluding no-shows."""
@@ -154,19 +65,7 @@ def count_valid_monthly_bookings(client, reference_date=None):
 
 def count_valid_bookings_by_payment(client, payment: Payment):
     """Conteo válido ligado a un Payment (attended + pending futuras)."""
-    today = timezone.now().date()
-    return (
-        Booking.objects.filter(
-            client=client,
-            status="active",
-            payment=payment,
-        )
-        .filter(
-            Q(attendance_status="attended")
-            | Q(attendance_status="pending", class_date__gte=today)
-        )
-        .count()
-    )
+    return get_entitlement(payment).used
 
 
 def import_payments_from_excel(file_obj) -> dict:
@@ -1,6 +1,8 @@
 # studio/views.py
 # from math import ceil
+import asyncio
 import calendar
+import json
 import re
 import secrets
 import time as pytime
@@ -16,33 +18,85 @@ import pandas as pd
 import pytz
 from accounts.models import Client
 from accounts.serializers import ClientSerializer
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.db import transaction
-from django.db.models import Count, F, Q, Sum
+from django.db.models import Count, Min, Prefetch, Q, Sum
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.utils.dateparse import parse_date
+from django.utils.http import http_date
 from django.utils.timezone import localtime
 from django.utils.timezone import now
 from django.utils.timezone import now as tz_now
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, permissions, status, viewsets
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import (
+    action,
+    api_view,
+    authentication_classes,
+    permission_classes,
+)
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from studio.alerts import get_clients_with_consecutive_no_shows
 
+from .availability import (
+    MAX_RANGE_DAYS,
+    MAX_RESCHEDULE_DAYS,
+    day_code_for,
+    get_availability_matrix,
+    get_cached_slots,
+    get_reschedule_options,
+    get_slots,
+)
+from .broadcast import availability_channel, get_broadcaster
+from .booking_policy import BookingDecision, BookingRequest, book
+from .bulk_booking import create_bulk_bookings
 from .management.mails.mails import (
     send_booking_confirmation_email,
     send_individual_booking_pending_email,
     send_subscription_confirmation_email,
 )
+from .middleware import get_active_sede_ids
 from .mixins import SedeFilterMixin
 from .permissions import SedeAccessPermission, IsSedeOwnerOrReadOnly
+from .reschedule import RescheduleError, move_booking
+from .revenue import months_of, reconcile_monthly_revenue
+from .occurrences import coach_agenda, with_booked
+from .closing_facts import mark_dirty, mark_trial_days_dirty
+from .dashboard import (
+    BOOKINGS,
+    PAYMENTS,
+    UTILIZATION_DAYS,
+    get_dashboard,
+    invalidate_dashboard,
+)
+from .reporting import (
+    FACT_FIELDS,
+    closing_days,
+    daily_buckets,
+    empty_totals,
+    monday_of,
+    month_bounds,
+    payment_details,
+    weekly_rollup,
+)
+from .seats import ClassFullError, recount_occupancies
+from .signals import seats_changed
+from .tasks.bulk_bookings import enqueue_bulk_booking
+from .utilization import MAX_UTILIZATION_DAYS, time_slot_utilization
+from .waitlist import WaitlistError, join_waitlist, promote_waitlist, waitlist_position
 
 # from .mixins import SedeFilterMixin, SedeValidationMixin
 from .models import (
     Booking,
     BulkBooking,
+    ClassOccurrence,
+    DailyClosingFact,
     ClassType,
     TimeSlot,
     Membership,
@@ -53,8 +107,11 @@ from .models import (
     PromotionInstance,
     Schedule,
     Sede,
+    StandingReservation,
     TimeSlot,
     Venta,
+    WaitlistEntry,
+    local_date,
 )
 from .serializers import (
     BookingAttendanceUpdateSerializer,
@@ -63,6 +120,7 @@ from .serializers import (
     BookingSerializer,
     BulkBookingResultSerializer,
     BulkBookingSerializer,
+    ClassOccurrenceSerializer,
     ClassTypeSerializer,
     MembershipSerializer,
     MonthlyRevenueSerializer,
@@ -73,12 +131,36 @@ from .serializers import (
     ScheduleSerializer,
     ScheduleWithBookingsSerializer,
     SedeSerializer,
+    StandingReservationSerializer,
     TimeSlotSerializer,
     VentaSerializer,
+    WaitlistEntrySerializer,
 )
 from .utils import recalculate_all_monthly_revenue, recalculate_monthly_revenue
 
 
+def get_requested_sede_ids(request):
+    """
+    Sedes solicitadas vía ``?sede_ids=1,2`` o headers ``X-Sedes-Selected`` /
+    ``X-Sede-ID``. Devuelve ``None`` si no se pidió ninguna (sin filtro).
+    """
+    raw = (
+        request.query_params.get("sede_ids")
+        or request.headers.get("X-Sedes-Selected")
+        or request.headers.get("X-Sede-ID")
+    )
+    if not raw:
+        return None
+
+    sede_ids = []
+    for value in raw.split(","):
+        try:
+            sede_ids.append(int(value.strip()))
+        except ValueError:
+            continue
+    return sede_ids or None
+
+
 # Función que verifica si el cliente tiene una membresía activa
 def has_active_membership(client):
     # Verificamos si el cliente tiene un pago reciente con una membresía activa
@@ -242,376 +324,192 @@ def clases_por_mes(request):
     return Response(full_data)
 
 
-@api_view(["GET"])
-def get_daily_closing_summary(request):
-    """
-    Endpoint para obtener cierres contables diarios.
-    Parámetros opcionales:
-    - start_date: fecha de inicio (YYYY-MM-DD)
-    - end_date: fecha de fin (YYYY-MM-DD)
-    - date: fecha específica (YYYY-MM-DD)
-    """
+def _payment_detail(pago, with_date=False):
+    detail = {
+        "cliente": pago.client.full_name,
+        "membresia": pago.membership.name,
+        "monto": float(pago.amount),
+        "metodo": pago.payment_method or "No especificado",
+        "observaciones": f"Pago #{pago.id}",
+    }
+    if with_date:
+        detail["fecha"] = localtime(pago.date_paid).date().isoformat()
+    return detail
+
+
+def _closing_totals(totals):
+    """Totales de ``reporting`` con los nombres de los cierres."""
+    return {
+        "efectivo": float(totals["efectivo"]),
+        "transferencia": float(totals["transferencia"]),
+        "visalink": float(totals["visalink"]),
+        "total_pagos": float(totals["total_pagos"]),
+        "total_ventas": float(totals["total_ventas"]),
+        "asistencias": totals["asistencias"],
+        "no_shows": totals["no_shows"],
+        "clases_individuales": totals["clases_individuales"],
+        "paquetes_vendidos": totals["paquetes_vendidos"],
+    }
 
-    # Obtener parámetros de fecha
-    date_param = request.query_params.get("date")
-    start_date_param = request.query_params.get("start_date")
-    end_date_param = request.query_params.get("end_date")
 
-    if date_param:
-        try:
-            target_date = datetime.strptime(date_param, "%Y-%m-%d").date()
-            start_date = end_date = target_date
-        except ValueError:
-            return Response(
-                {"error": "Formato de fecha inválido. Use YYYY-MM-DD"}, status=400
-            )
-    elif start_date_param and end_date_param:
-        try:
-            start_date = datetime.strptime(start_date_param, "%Y-%m-%d").date()
-            end_date = datetime.strptime(end_date_param, "%Y-%m-%d").date()
-        except ValueError:
-            return Response(
-                {"error": "Formato de fecha inválido. Use YYYY-MM-DD"}, status=400
-            )
+def _closing_data(request, start_date, end_date):
+    """
+    Totales por día y pagos del rango, desde la semana de ``start_date`` (los
+    cierres semanales empiezan el lunes). Con ``?live=1`` se calculan de las
+    tablas en vez de ``DailyClosingFact``.
+    """
+    first_monday = monday_of(start_date)
+    sede_ids = getattr(request, "sede_ids", None)
+    if request.query_params.get("live") in ("1", "true"):
+        daily = daily_buckets(first_monday, end_date, sede_ids=sede_ids)
     else:
-        # Por defecto, últimos 30 días
-        end_date = localtime(now()).date()
-        start_date = end_date - timedelta(days=30)
-
-    # Generar lista de fechas
-    current_date = start_date
-    daily_closings = []
-
-    while current_date <= end_date:
-        # Obtener pagos del día
-        pagos = Payment.objects.filter(date_paid__date=current_date)
-        ventas = Venta.objects.filter(date_sold__date=current_date)
-        bookings = Booking.objects.filter(class_date=current_date)
-
-        # Calcular totales por método de pago
-        efectivo = (
-            pagos.filter(
-                Q(payment_method__iexact="efectivo") | Q(payment_method__iexact="cash")
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
-
-        transferencia = (
-            pagos.filter(
-                Q(payment_method__iexact="transferencia")
-                | Q(payment_method__iexact="transfer")
-                | Q(payment_method__iexact="deposito")
-                | Q(payment_method__iexact="depósito")
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
-
-        visalink = (
-            pagos.filter(
-                Q(payment_method__iexact="visalink")
-                | Q(payment_method__iexact="visalink")
-                | Q(payment_method__iexact="card")
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
-
-        # Calcular totales
-        total_pagos = pagos.aggregate(Sum("amount"))["amount__sum"] or 0
-        total_ventas = ventas.aggregate(Sum("total_amount"))["total_amount__sum"] or 0
-        total_dia = total_pagos + total_ventas
-
-        # Estadísticas de clases
-        asistencias = bookings.filter(attendance_status="attended").count()
-        no_shows = bookings.filter(attendance_status="no_show").count()
-        clases_individuales = bookings.filter(schedule__is_individual=True).count()
-        paquetes_vendidos = pagos.count()
-
-        daily_closings.append(
-            {
-                "fecha": current_date.isoformat(),
-                "dia_semana": current_date.strftime("%A"),
-                "efectivo": float(efectivo),
-                "transferencia": float(transferencia),
-                "visalink": float(visalink),
-                "total_pagos": float(total_pagos),
-                "total_ventas": float(total_ventas),
-                "total_dia": float(total_dia),
-                "asistencias": asistencias,
-                "no_shows": no_shows,
-                "clases_individuales": clases_individuales,
-                "paquetes_vendidos": paquetes_vendidos,
-                "detalle_pagos": [
-                    {
-                        "cliente": pago.client.full_name,
-                        "membresia": pago.membership.name,
-                        "monto": float(pago.amount),
-                        "metodo": pago.payment_method or "No especificado",
-                        "observaciones": f"Pago #{pago.id}",
-                    }
-                    for pago in pagos.select_related("client", "membership")
-                ],
-            }
-        )
-
-        current_date += timedelta(days=1)
-
-    return Response(
-        {
-            "periodo": {"inicio": start_date.isoformat(), "fin": end_date.isoformat()},
-            "cierres_diarios": daily_closings,
-            "resumen_periodo": {
-                "total_efectivo": sum(c["efectivo"] for c in daily_closings),
-                "total_transferencia": sum(c["transferencia"] for c in daily_closings),
-                "total_visalink": sum(c["visalink"] for c in daily_closings),
-                "total_general": sum(c["total_dia"] for c in daily_closings),
-                "total_asistencias": sum(c["asistencias"] for c in daily_closings),
-                "total_paquetes": sum(c["paquetes_vendidos"] for c in daily_closings),
-            },
-        }
-    )
+        daily = closing_days(first_monday, end_date, sede_ids)
+    return daily, payment_details(first_monday, end_date, sede_ids)
 
 
-@api_view(["GET"])
-def get_comprehensive_closing_summary(request):
+def _parse_closing_range(params):
     """
-    Endpoint completo que devuelve cierres contables diarios y semanales.
-    Parámetros opcionales:
-    - start_date: fecha de inicio (YYYY-MM-DD)
-    - end_date: fecha de fin (YYYY-MM-DD)
-    - date: fecha específica (YYYY-MM-DD)
-    - month: mes específico (YYYY-MM)
-    - year: año específico
+    Rango de ``date``, ``month`` (YYYY-MM), ``year`` o ``start_date``/``end_date``;
+    por defecto los últimos 30 días. Devuelve ``(inicio, fin, error)``.
     """
-
-    # Obtener parámetros de fecha
-    date_param = request.query_params.get("date")
-    start_date_param = request.query_params.get("start_date")
-    end_date_param = request.query_params.get("end_date")
-    month_param = request.query_params.get("month")
-    year_param = request.query_params.get("year")
+    date_param = params.get("date")
+    month_param = params.get("month")
+    year_param = params.get("year")
+    start_date_param = params.get("start_date")
+    end_date_param = params.get("end_date")
 
     if date_param:
         try:
             target_date = datetime.strptime(date_param, "%Y-%m-%d").date()
-            start_date = end_date = target_date
         except ValueError:
-            return Response(
-                {"error": "Formato de fecha inválido. Use YYYY-MM-DD"}, status=400
-            )
-    elif month_param:
+            return None, None, "Formato de fecha inválido. Use YYYY-MM-DD"
+        return target_date, target_date, None
+    if month_param:
         try:
             year, month = map(int, month_param.split("-"))
-            start_date = date(year, month, 1)
-            if month == 12:
-                end_date = date(year + 1, 1, 1) - timedelta(days=1)
-            else:
-                end_date = date(year, month + 1, 1) - timedelta(days=1)
+            last_day = calendar.monthrange(year, month)[1]
         except ValueError:
-            return Response(
-                {"error": "Formato de mes inválido. Use YYYY-MM"}, status=400
-            )
-    elif year_param:
+            return None, None, "Formato de mes inválido. Use YYYY-MM"
+        return date(year, month, 1), date(year, month, last_day), None
+    if year_param:
         try:
             year = int(year_param)
-            start_date = date(year, 1, 1)
-            end_date = date(year, 12, 31)
         except ValueError:
-            return Response({"error": "Año inválido"}, status=400)
-    elif start_date_param and end_date_param:
+            return None, None, "Año inválido"
+        return date(year, 1, 1), date(year, 12, 31), None
+    if start_date_param and end_date_param:
         try:
             start_date = datetime.strptime(start_date_param, "%Y-%m-%d").date()
             end_date = datetime.strptime(end_date_param, "%Y-%m-%d").date()
         except ValueError:
-            return Response(
-                {"error": "Formato de fecha inválido. Use YYYY-MM-DD"}, status=400
-            )
-    else:
-        # Por defecto, últimos 30 días
-        end_date = localtime(now()).date()
-        start_date = end_date - timedelta(days=30)
+            return None, None, "Formato de fecha inválido. Use YYYY-MM-DD"
+        return start_date, end_date, None
 
-    # Función para obtener el lunes de una semana
-    def get_monday_of_week(target_date):
-        days_since_monday = target_date.weekday()
-        return target_date - timedelta(days=days_since_monday)
+    end_date = localtime(now()).date()
+    return end_date - timedelta(days=30), end_date, None
 
-    # Función para obtener el sábado de una semana
-    def get_saturday_of_week(target_date):
-        days_until_saturday = 5 - target_date.weekday()
-        return target_date + timedelta(days=days_until_saturday)
 
-    # Generar datos diarios
+def _daily_closings(start_date, end_date, daily, details):
+    closings = []
     current_date = start_date
-    daily_closings = []
-
     while current_date <= end_date:
-        # Obtener pagos del día
-        pagos = Payment.objects.filter(date_paid__date=current_date)
-        ventas = Venta.objects.filter(date_sold__date=current_date)
-        bookings = Booking.objects.filter(class_date=current_date)
-
-        # Calcular totales por método de pago
-        efectivo = (
-            pagos.filter(
-                Q(payment_method__iexact="efectivo") | Q(payment_method__iexact="cash")
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
-
-        transferencia = (
-            pagos.filter(
-                Q(payment_method__iexact="transferencia")
-                | Q(payment_method__iexact="transfer")
-                | Q(payment_method__iexact="deposito")
-                | Q(payment_method__iexact="depósito")
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
-
-        visalink = (
-            pagos.filter(
-                Q(payment_method__iexact="visalink")
-                | Q(payment_method__iexact="visalink")
-                | Q(payment_method__iexact="card")
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
-
-        # Calcular totales
-        total_pagos = pagos.aggregate(Sum("amount"))["amount__sum"] or 0
-        total_ventas = ventas.aggregate(Sum("total_amount"))["total_amount__sum"] or 0
-        total_dia = total_pagos + total_ventas
-
-        # Estadísticas de clases
-        asistencias = bookings.filter(attendance_status="attended").count()
-        no_shows = bookings.filter(attendance_status="no_show").count()
-        clases_individuales = bookings.filter(schedule__is_individual=True).count()
-        paquetes_vendidos = pagos.count()
-
-        daily_closings.append(
+        totals = _closing_totals(daily.get(current_date) or empty_totals())
+        closings.append(
             {
                 "fecha": current_date.isoformat(),
                 "dia_semana": current_date.strftime("%A"),
-                "efectivo": float(efectivo),
-                "transferencia": float(transferencia),
-                "visalink": float(visalink),
-                "total_pagos": float(total_pagos),
-                "total_ventas": float(total_ventas),
-                "total_dia": float(total_dia),
-                "asistencias": asistencias,
-                "no_shows": no_shows,
-                "clases_individuales": clases_individuales,
-                "paquetes_vendidos": paquetes_vendidos,
+                **totals,
+                "total_dia": totals["total_pagos"] + totals["total_ventas"],
                 "detalle_pagos": [
-                    {
-                        "cliente": pago.client.full_name,
-                        "membresia": pago.membership.name,
-                        "monto": float(pago.amount),
-                        "metodo": pago.payment_method or "No especificado",
-                        "observaciones": f"Pago #{pago.id}",
-                    }
-                    for pago in pagos.select_related("client", "membership")
+                    _payment_detail(pago) for pago in details.get(current_date, [])
                 ],
             }
         )
-
         current_date += timedelta(days=1)
+    return closings
 
-    # Generar datos semanales (Lunes a Sábado)
-    weekly_closings = []
-    current_date = get_monday_of_week(start_date)
-    week_number = 1
 
-    while current_date <= end_date:
-        week_end = get_saturday_of_week(current_date)
+def _weekly_closings(start_date, end_date, daily, details, **extra):
+    closings = []
+    weeks = weekly_rollup(daily, start_date, end_date)
+    for week_number, (week_start, week_end, week_totals) in enumerate(weeks, start=1):
+        totals = _closing_totals(week_totals)
+        week_days = [week_start + timedelta(days=i) for i in range((week_end - week_start).days + 1)]
+        closings.append(
+            {
+                "semana": week_number,
+                **extra,
+                "fecha_inicio": week_start.isoformat(),
+                "fecha_fin": week_end.isoformat(),
+                "rango": f"{week_start.strftime('%d/%m/%Y')} - {week_end.strftime('%d/%m/%Y')}",
+                **totals,
+                "total_semana": totals["total_pagos"] + totals["total_ventas"],
+                "dias_laborables": len(week_days),
+                "detalle_pagos": [
+                    _payment_detail(pago, with_date=True)
+                    for day in week_days
+                    for pago in details.get(day, [])
+                ],
+            }
+        )
+    return closings
 
-        # Ajustar si el sábado excede el rango
-        if week_end > end_date:
-            week_end = end_date
 
-        # Obtener datos de la semana
-        pagos = Payment.objects.filter(
-            date_paid__date__gte=current_date, date_paid__date__lte=week_end
-        )
-        ventas = Venta.objects.filter(
-            date_sold__date__gte=current_date, date_sold__date__lte=week_end
-        )
-        bookings = Booking.objects.filter(
-            class_date__gte=current_date, class_date__lte=week_end
-        )
+def _period_summary(closings, total_key):
+    return {
+        "total_efectivo": sum(c["efectivo"] for c in closings),
+        "total_transferencia": sum(c["transferencia"] for c in closings),
+        "total_visalink": sum(c["visalink"] for c in closings),
+        "total_general": sum(c[total_key] for c in closings),
+        "total_asistencias": sum(c["asistencias"] for c in closings),
+        "total_paquetes": sum(c["paquetes_vendidos"] for c in closings),
+    }
 
-        # Calcular totales por método de pago
-        efectivo = (
-            pagos.filter(
-                Q(payment_method__iexact="efectivo") | Q(payment_method__iexact="cash")
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
 
-        transferencia = (
-            pagos.filter(
-                Q(payment_method__iexact="transferencia")
-                | Q(payment_method__iexact="transfer")
-                | Q(payment_method__iexact="deposito")
-                | Q(payment_method__iexact="depósito")
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
+@api_view(["GET"])
+def get_daily_closing_summary(request):
+    """
+    Endpoint para obtener cierres contables diarios.
+    Parámetros opcionales:
+    - start_date: fecha de inicio (YYYY-MM-DD)
+    - end_date: fecha de fin (YYYY-MM-DD)
+    - date: fecha específica (YYYY-MM-DD)
+    """
+    start_date, end_date, error = _parse_closing_range(request.query_params)
+    if error:
+        return Response({"error": error}, status=400)
 
-        visalink = (
-            pagos.filter(
-                Q(payment_method__iexact="visalink")
-                | Q(payment_method__iexact="visalink")
-                | Q(payment_method__iexact="card")
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
+    daily, details = _closing_data(request, start_date, end_date)
+    daily_closings = _daily_closings(start_date, end_date, daily, details)
 
-        # Calcular totales
-        total_pagos = pagos.aggregate(Sum("amount"))["amount__sum"] or 0
-        total_ventas = ventas.aggregate(Sum("total_amount"))["total_amount__sum"] or 0
-        total_semana = total_pagos + total_ventas
+    return Response(
+        {
+            "periodo": {"inicio": start_date.isoformat(), "fin": end_date.isoformat()},
+            "cierres_diarios": daily_closings,
+            "resumen_periodo": _period_summary(daily_closings, "total_dia"),
+        }
+    )
 
-        # Estadísticas de clases
-        asistencias = bookings.filter(attendance_status="attended").count()
-        no_shows = bookings.filter(attendance_status="no_show").count()
-        clases_individuales = bookings.filter(schedule__is_individual=True).count()
-        paquetes_vendidos = pagos.count()
 
-        weekly_closings.append(
-            {
-                "semana": week_number,
-                "fecha_inicio": current_date.isoformat(),
-                "fecha_fin": week_end.isoformat(),
-                "rango": f"{current_date.strftime('%d/%m/%Y')} - {week_end.strftime('%d/%m/%Y')}",
-                "efectivo": float(efectivo),
-                "transferencia": float(transferencia),
-                "visalink": float(visalink),
-                "total_pagos": float(total_pagos),
-                "total_ventas": float(total_ventas),
-                "total_semana": float(total_semana),
-                "asistencias": asistencias,
-                "no_shows": no_shows,
-                "clases_individuales": clases_individuales,
-                "paquetes_vendidos": paquetes_vendidos,
-                "dias_laborables": (week_end - current_date).days + 1,
-                "detalle_pagos": [
-                    {
-                        "cliente": pago.client.full_name,
-                        "membresia": pago.membership.name,
-                        "monto": float(pago.amount),
-                        "metodo": pago.payment_method or "No especificado",
-                        "fecha": pago.date_paid.date().isoformat(),
-                        "observaciones": f"Pago #{pago.id}",
-                    }
-                    for pago in pagos.select_related("client", "membership")
-                ],
-            }
-        )
+@api_view(["GET"])
+def get_comprehensive_closing_summary(request):
+    """
+    Endpoint completo que devuelve cierres contables diarios y semanales.
+    Parámetros opcionales:
+    - start_date: fecha de inicio (YYYY-MM-DD)
+    - end_date: fecha de fin (YYYY-MM-DD)
+    - date: fecha específica (YYYY-MM-DD)
+    - month: mes específico (YYYY-MM)
+    - year: año específico
+    """
+    start_date, end_date, error = _parse_closing_range(request.query_params)
+    if error:
+        return Response({"error": error}, status=400)
 
-        # Avanzar a la siguiente semana (lunes)
-        current_date += timedelta(days=7)
-        week_number += 1
+    daily, details = _closing_data(request, start_date, end_date)
+    daily_closings = _daily_closings(start_date, end_date, daily, details)
+    # Semanas de lunes a sábado
+    weekly_closings = _weekly_closings(start_date, end_date, daily, details)
 
     return Response(
         {
@@ -619,12 +517,7 @@ def get_comprehensive_closing_summary(request):
             "cierres_diarios": daily_closings,
             "cierres_semanales": weekly_closings,
             "resumen_periodo": {
-                "total_efectivo": sum(c["efectivo"] for c in daily_closings),
-                "total_transferencia": sum(c["transferencia"] for c in daily_closings),
-                "total_visalink": sum(c["visalink"] for c in daily_closings),
-                "total_general": sum(c["total_dia"] for c in daily_closings),
-                "total_asistencias": sum(c["asistencias"] for c in daily_closings),
-                "total_paquetes": sum(c["paquetes_vendidos"] for c in daily_closings),
+                **_period_summary(daily_closings, "total_dia"),
                 "semanas_totales": len(weekly_closings),
                 "dias_totales": len(daily_closings),
             },
@@ -675,112 +568,11 @@ def get_weekly_closing_summary(request):
         start_date = date(year, 1, 1)
         end_date = date(year, 12, 31)
 
-    # Función para obtener el lunes de una semana
-    def get_monday_of_week(target_date):
-        days_since_monday = target_date.weekday()
-        return target_date - timedelta(days=days_since_monday)
-
-    # Función para obtener el sábado de una semana
-    def get_saturday_of_week(target_date):
-        days_until_saturday = 5 - target_date.weekday()
-        return target_date + timedelta(days=days_until_saturday)
-
-    # Generar semanas (Lunes a Sábado)
-    weekly_closings = []
-    current_date = get_monday_of_week(start_date)
-    week_number = 1
-
-    while current_date <= end_date:
-        week_end = get_saturday_of_week(current_date)
-
-        # Ajustar si el sábado excede el rango
-        if week_end > end_date:
-            week_end = end_date
-
-        # Obtener datos de la semana
-        pagos = Payment.objects.filter(
-            date_paid__date__gte=current_date, date_paid__date__lte=week_end
-        )
-        ventas = Venta.objects.filter(
-            date_sold__date__gte=current_date, date_sold__date__lte=week_end
-        )
-        bookings = Booking.objects.filter(
-            class_date__gte=current_date, class_date__lte=week_end
-        )
-
-        # Calcular totales por método de pago
-        efectivo = (
-            pagos.filter(
-                Q(payment_method__iexact="efectivo") | Q(payment_method__iexact="cash")
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
-
-        transferencia = (
-            pagos.filter(
-                Q(payment_method__iexact="transferencia")
-                | Q(payment_method__iexact="transfer")
-                | Q(payment_method__iexact="deposito")
-                | Q(payment_method__iexact="depósito")
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
-
-        visalink = (
-            pagos.filter(
-                Q(payment_method__iexact="visalink")
-                | Q(payment_method__iexact="visalink")
-                | Q(payment_method__iexact="card")
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
-
-        # Calcular totales
-        total_pagos = pagos.aggregate(Sum("amount"))["amount__sum"] or 0
-        total_ventas = ventas.aggregate(Sum("total_amount"))["total_amount__sum"] or 0
-        total_semana = total_pagos + total_ventas
-
-        # Estadísticas de clases
-        asistencias = bookings.filter(attendance_status="attended").count()
-        no_shows = bookings.filter(attendance_status="no_show").count()
-        clases_individuales = bookings.filter(schedule__is_individual=True).count()
-        paquetes_vendidos = pagos.count()
-
-        weekly_closings.append(
-            {
-                "semana": week_number,
-                "año": year,
-                "fecha_inicio": current_date.isoformat(),
-                "fecha_fin": week_end.isoformat(),
-                "rango": f"{current_date.strftime('%d/%m/%Y')} - {week_end.strftime('%d/%m/%Y')}",
-                "efectivo": float(efectivo),
-                "transferencia": float(transferencia),
-                "visalink": float(visalink),
-                "total_pagos": float(total_pagos),
-                "total_ventas": float(total_ventas),
-                "total_semana": float(total_semana),
-                "asistencias": asistencias,
-                "no_shows": no_shows,
-                "clases_individuales": clases_individuales,
-                "paquetes_vendidos": paquetes_vendidos,
-                "dias_laborables": (week_end - current_date).days + 1,
-                "detalle_pagos": [
-                    {
-                        "cliente": pago.client.full_name,
-                        "membresia": pago.membership.name,
-                        "monto": float(pago.amount),
-                        "metodo": pago.payment_method or "No especificado",
-                        "fecha": pago.date_paid.date().isoformat(),
-                        "observaciones": f"Pago #{pago.id}",
-                    }
-                    for pago in pagos.select_related("client", "membership")
-                ],
-            }
-        )
-
-        # Avanzar a la siguiente semana (lunes)
-        current_date += timedelta(days=7)
-        week_number += 1
+    daily, details = _closing_data(request, start_date, end_date)
+    # Semanas de lunes a sábado
+    weekly_closings = _weekly_closings(
+        start_date, end_date, daily, details, **{"año": year}
+    )
 
     return Response(
         {
@@ -791,12 +583,7 @@ def get_weekly_closing_summary(request):
             },
             "cierres_semanales": weekly_closings,
             "resumen_periodo": {
-                "total_efectivo": sum(c["efectivo"] for c in weekly_closings),
-                "total_transferencia": sum(c["transferencia"] for c in weekly_closings),
-                "total_visalink": sum(c["visalink"] for c in weekly_closings),
-                "total_general": sum(c["total_semana"] for c in weekly_closings),
-                "total_asistencias": sum(c["asistencias"] for c in weekly_closings),
-                "total_paquetes": sum(c["paquetes_vendidos"] for c in weekly_closings),
+                **_period_summary(weekly_closings, "total_semana"),
                 "semanas_totales": len(weekly_closings),
             },
         }
@@ -813,6 +600,8 @@ class BookingViewSet(SedeFilterMixin, viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         client = serializer.validated_data["client"]
         schedule = serializer.validated_data["schedule"]
+        class_date = serializer.validated_data.get("class_date") or timezone.localdate()
+        sede = serializer.validated_data.get("sede")
 
         # Verificar si quien crea es admin o secretaria
         is_manual_checkin = (
@@ -821,53 +610,29 @@ class BookingViewSet(SedeFilterMixin, viewsets.ModelViewSet):
             and request.user.groups.filter(name__in=["admin", "secretaria"]).exists()
         )
 
-        # Extraer y convertir el valor de membership_id
-        selected_membership = request.data.get("membership_id", None)
-        try:
-            selected_membership = (
-                int(selected_membership) if selected_membership is not None else None
-            )
-        except ValueError:
-            selected_membership = None
-
         # Verificar asistencia si viene en el request
         attendance_status = "pending"
         if is_manual_checkin and request.data.get("attendance_status") == "attended":
             attendance_status = "attended"
 
-        # 1) Validar cupo en el horario
-        current_bookings = (
-            Booking.objects.filter(
-                schedule=schedule,
-                class_date=request.data.get("class_date"),
-                status="active",
-            )
-            .exclude(attendance_status="cancelled")
-            .count()
-        )
-        if current_bookings >= schedule.capacity:
+        # Reglas compartidas (clase individual, prueba, membresía, promoción y
+        # límite) en studio/booking_policy.py. Recepción puede registrar
+        # clases sin pago vigente.
+        decision = book(
+            client,
+            [BookingRequest(schedule.id, class_date)],
+            membership_id=request.data.get("membership_id"),
+            attendance_status=attendance_status,
+            allow_without_payment=is_manual_checkin,
+            default_sede_id=sede.id if sede else None,
+        )[0]
+        if not decision.ok:
             return Response(
-                {"detail": "No hay cupo disponible para este horario."},
-                status=status.HTTP_400_BAD_REQUEST,
+                {"detail": decision.message}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        # 2) Si seleccionó clase individual
-        if selected_membership == 1:
-            # Buscar la membresía de clase individual más apropiada
-            # Por defecto usar "Clase Individual" (ID 2) si no hay contexto específico
-            individual_membership = Membership.objects.filter(
-                name__icontains="individual"
-            ).first()
-            
-            if not individual_membership:
-                return Response(
-                    {"detail": "No se encontró membresía de clase individual configurada."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            
-            booking = serializer.save(
-                membership=individual_membership, status="pending"
-            )
+        booking = decision.booking
+        if decision.kind == BookingDecision.INDIVIDUAL:
             send_individual_booking_pending_email(booking)
             return Response(
                 {
@@ -877,158 +642,25 @@ class BookingViewSet(SedeFilterMixin, viewsets.ModelViewSet):
                 status=status.HTTP_201_CREATED,
             )
 
-        # 3) Si aún tiene clase de prueba gratuita
-        if not client.trial_used:
-            booking = serializer.save(attendance_status=attendance_status)
-            if attendance_status == "attended":
-                client.trial_used = True
-                client.save(update_fields=["trial_used"])
-            
-            # Enviar email de confirmación (con manejo de errores)
-            try:
-                send_booking_confirmation_email(booking, client)
-            except Exception as e:
-                # Log el error pero no fallar la creación del booking
-                print(f"Error enviando email de confirmación: {e}")
-            
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-        # 4) Si no tiene membresía activa y ya usó su clase de prueba
-        if not client.active_membership and not is_manual_checkin and client.trial_used:
-            return Response(
-                {
-                    "detail": "No tienes una membresía activa y ya usaste tu clase de prueba gratuita. Por favor adquiere un plan para continuar."
-                },
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        # 5) Validar límite de clases según membresía o promoción
-        today = now().date()
-        latest_payment = (
-            Payment.objects.filter(
-                client=client, 
-                valid_from__lte=today, 
-                valid_until__gte=today
-            )
-            .order_by("-valid_until")
-            .first()
-        )
-
-        if latest_payment:
-            today = now().date()
-
-            # 1) Plan del pago vigente
-            membership_plan = latest_payment.membership
-
-            # 2) Calcular total_permitidas (plan + extras, o promo + extras)
-            total_permitidas = 0
-            if latest_payment.promotion_id:
-                promotion = latest_payment.promotion
-
-                promo_instance = (
-                    PromotionInstance.objects.filter(
-                        promotion=promotion, clients=client
-                    )
-                    .order_by("-created_at")
-                    .first()
-                )
-
-                if not promo_instance:
-                    return Response(
-                        {
-                            "detail": "Esta promoción no está asociada correctamente a tu cuenta."
-                        },
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                if not promo_instance.is_active():
-                    return Response(
-                        {"detail": "La promoción que adquiriste ya no está activa."},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                total_permitidas = (promotion.clases_por_cliente or 0) + (
-                    latest_payment.extra_classes or 0
-                )
-
-            elif (
-                membership_plan
-                and membership_plan.classes_per_month
-                and membership_plan.classes_per_month > 0
-            ):
-                total_permitidas = membership_plan.classes_per_month + (
-                    latest_payment.extra_classes or 0
-                )
-
-            # 3) Contar válidas **por payment** (no por fechas)
-            from django.db.models import Q
-
-            monthly_bookings = (
-                Booking.objects.filter(
-                    client=client,
-                    status="active",
-                    payment=latest_payment,
-                )
-                .filter(
-                    Q(attendance_status="attended")
-                    | Q(attendance_status="pending", class_date__gte=today)
-                )
-                .count()
-            )
-
-            # 4) No-shows ligados a ese payment (para reposición)
-            no_shows_in_window = Booking.objects.filter(
-                client=client,
-                status="active",
-                payment=latest_payment,
-                attendance_status="no_show",
-            ).count()
-
-            # 5) Límite efectivo (una reposición si hubo ≥1 no_show; ajusta a gusto)
-            reposiciones_permitidas = 1 if no_shows_in_window > 0 else 0
-            limite_efectivo = (total_permitidas or 0) + reposiciones_permitidas
-
-            # Logs útiles
-            print(f"Último pago: {latest_payment}")
-            print(f"Fecha pago: {latest_payment.date_paid}")
-            print(f"Vigencia hasta: {latest_payment.valid_until}")
-            print(f"Hoy: {today}")
-            print(f"Total permitidas (plan/promoción + extras): {total_permitidas}")
-            print(f"Válidas (por payment): {monthly_bookings}")
-            print(f"No-shows (por payment): {no_shows_in_window}")
-            print(f"Límite efectivo (con reposición): {limite_efectivo}")
-
-            # 6) Validación final de límite
-            if limite_efectivo and monthly_bookings >= limite_efectivo:
-                return Response(
-                    {
-                        "detail": f"Has alcanzado tu límite de clases ({limite_efectivo})."
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-        # 6) Crear reserva normal con membresía activa
-        booking = serializer.save(
-            membership=client.active_membership,
-            attendance_status=attendance_status,
-            payment=latest_payment,
-        )
-        if attendance_status == "attended" and not client.trial_used:
-            client.trial_used = True
-            client.save(update_fields=["trial_used"])
-        
         # Enviar email de confirmación (con manejo de errores)
         try:
             send_booking_confirmation_email(booking, client)
         except Exception as e:
             # Log el error pero no fallar la creación del booking
             print(f"Error enviando email de confirmación: {e}")
-        headers = self.get_success_headers(serializer.data)
-        return Response(
-            serializer.data, status=status.HTTP_201_CREATED, headers=headers
-        )
 
-    @action(detail=False, methods=["get"], url_path="by-client/(?P<client_id>[^/.]+)")
+        data = self.get_serializer(booking).data
+        headers = self.get_success_headers(data)
+        return Response(data, status=status.HTTP_201_CREATED, headers=headers)
+
+    def perform_update(self, serializer):
+        # Activar una reserva pendiente o moverla de horario ocupa un cupo
+        try:
+            serializer.save()
+        except ClassFullError as e:
+            raise ValidationError({"detail": e.messages[0]})
+
+    @action(detail=False, methods=["get"], url_path="by-client/(?P<client_id>[^/.]+)")
     def bookings_by_client(self, request, client_id=None):
         """
         OPTIMIZED VERSION: Uses select_related for better performance without pagination.
@@ -1168,16 +800,19 @@ class BookingViewSet(SedeFilterMixin, viewsets.ModelViewSet):
         print(f"Original schedule: {original_schedule}")
         print(f"Original date: {original_date}")
 
-        booking.status = "cancelled"
-        booking.cancellation_type = cancelled_by
-        booking.cancellation_reason = reason
-        booking.save()
+        # El cupo liberado pasa al primero de la lista de espera en la misma transacción
+        with transaction.atomic():
+            booking.status = "cancelled"
+            booking.cancellation_type = cancelled_by
+            booking.cancellation_reason = reason
+            booking.save()
+            promote_waitlist(booking.schedule_id, booking.class_date)
 
         # Send cancellation email
         try:
             from .management.mails.mails import send_booking_cancellation_email
 
-            send_booking_cancellation_email(booking, reason)
+            send_booking_cancellation_email(booking, booking.client)
         except Exception as e:
             # Log error but don't fail the request
             import traceback
@@ -1192,67 +827,42 @@ class BookingViewSet(SedeFilterMixin, viewsets.ModelViewSet):
     @action(detail=True, methods=["put"], url_path="reschedule")
     def reschedule_booking(self, request, pk=None):
         booking = self.get_object()
-        new_schedule_id = request.data.get("schedule_id")
-        new_date = request.data.get("class_date")
-
         try:
-            new_schedule = Schedule.objects.get(id=new_schedule_id)
-        except Schedule.DoesNotExist:
-            return Response({"error": "Nuevo horario no válido."}, status=400)
-
-        # Validar que no exista una reserva duplicada
-        if Booking.objects.filter(
-            client=booking.client, schedule=new_schedule, class_date=new_date
-        ).exists():
-            return Response(
-                {"error": "Ya tienes una reserva para esa clase."}, status=400
-            )
-
-        # Validar capacidad
-        count = Booking.objects.filter(
-            schedule=new_schedule, class_date=new_date, status="active"
-        ).count()
-        if count >= new_schedule.capacity:
-            return Response({"error": "No hay cupo disponible."}, status=400)
-
-        # Store original data before rescheduling for email
-        old_schedule = booking.schedule
-        old_date = booking.class_date
-
-        # Actualizar
-        booking.schedule = new_schedule
-        booking.class_date = new_date
-        booking.save()
+            new_date = parse_date(str(request.data.get("class_date") or ""))
+        except ValueError:
+            new_date = None
+        if not new_date:
+            return Response({"error": "Fecha inválida."}, status=400)
 
-        # Send reschedule email
+        # Bloquea reserva y cupos de origen/destino; el correo sale al confirmar
         try:
-            from .management.mails.mails import send_booking_reschedule_email
-
-            send_booking_reschedule_email(
-                booking, old_schedule, new_schedule, old_date, new_date
-            )
-        except Exception as e:
-            # Log error but don't fail the request
-
-            print(f"Error sending reschedule email: {e}")
+            move_booking(booking.pk, request.data.get("schedule_id"), new_date)
+        except RescheduleError as e:
+            return Response({"error": e.messages[0]}, status=400)
         return Response({"message": "Clase reagendada correctamente."})
 
     @action(detail=False, methods=["get"], url_path="available-slots-for-reschedule")
     def available_slots_for_reschedule(self, request):
         """
-        Get available slots for rescheduling with detailed information
+        Get available slots for rescheduling with detailed information.
+        ``days`` (opcional, máx. MAX_RESCHEDULE_DAYS) devuelve también los días
+        siguientes en ``days``; sin sede en la solicitud se usa la de la reserva.
         """
         date_str = request.query_params.get("date")
         client_id = request.query_params.get("client_id")
         current_booking_id = request.query_params.get("current_booking_id")
 
-        # Si no se proporciona client_id, intentar obtenerlo del current_booking_id
-        if not client_id and current_booking_id:
-            try:
-                current_booking = Booking.objects.get(id=current_booking_id)
-                client_id = current_booking.client.id
-            except Booking.DoesNotExist:
+        # (schedule_id, class_date) y sede de la reserva que se está reagendando
+        current_booking = None
+        if current_booking_id:
+            current_booking = (
+                Booking.objects.filter(id=current_booking_id)
+                .values("client_id", "schedule_id", "class_date", "sede_id")
+                .first()
+            )
+            if current_booking is None:
                 return Response({"detail": "Reserva actual no encontrada."}, status=404)
+            client_id = client_id or current_booking["client_id"]
 
         if not date_str or not client_id:
             return Response(
@@ -1270,86 +880,31 @@ class BookingViewSet(SedeFilterMixin, viewsets.ModelViewSet):
             print(f"Error al parsear la fecha: {e}")
             return Response({"detail": "Formato de fecha inválido."}, status=400)
 
-        # Mapear weekday (0=Monday) a código de día definido en Schedule.DAY_CHOICES
-        day_code_map = {
-            0: "MON",
-            1: "TUE",
-            2: "WED",
-            3: "THU",
-            4: "FRI",
-            5: "SAT",
-            6: "SUN",
-        }
-        day_code = day_code_map[requested_date.weekday()]
-
-        # Obtener todas las plantillas de horario (Schedule) para ese día
-        schedules = Schedule.objects.filter(day=day_code)
-
-        slots = []
-        for schedule in schedules:
-            # Contar reservas activas para este schedule en la fecha solicitada
-            booking_count = (
-                Booking.objects.filter(
-                    schedule=schedule, class_date=requested_date, status="active"
-                )
-                .exclude(attendance_status="cancelled")
-                .count()
+        try:
+            days = int(request.query_params.get("days", 1))
+        except ValueError:
+            return Response({"detail": "'days' debe ser un número."}, status=400)
+        if not 1 <= days <= MAX_RESCHEDULE_DAYS:
+            return Response(
+                {"detail": f"'days' debe estar entre 1 y {MAX_RESCHEDULE_DAYS}."},
+                status=400,
             )
 
-            available = booking_count < schedule.capacity
-            available_slots = max(0, schedule.capacity - booking_count)
+        sede_ids = get_requested_sede_ids(request)
+        if sede_ids is None and current_booking and current_booking["sede_id"]:
+            sede_ids = [current_booking["sede_id"]]
 
-            # Verificar si el cliente ya tiene una reserva para este horario
-            client_has_booking = Booking.objects.filter(
-                client_id=client_id,
-                schedule=schedule,
-                class_date=requested_date,
-                status="active",
-            ).exists()
-
-            # Si es el mismo horario de la reserva actual, permitir
-            is_current_booking = False
-            if current_booking_id:
-                current_booking = Booking.objects.filter(
-                    id=current_booking_id, schedule=schedule, class_date=requested_date
-                ).first()
-                is_current_booking = bool(current_booking)
-
-            # Convertir el campo time_slot (e.g. '05:00') en un datetime combinando con requested_date
-            start_time = datetime.combine(
-                requested_date, datetime.strptime(schedule.time_slot, "%H:%M").time()
-            )
-            end_time = start_time + timedelta(hours=1)  # Cada slot dura 1 hora
-
-            slot = {
-                "schedule_id": schedule.id,
-                "class_type": schedule.class_type.name if schedule.class_type else None,
-                "is_individual": schedule.is_individual,
-                "capacity": schedule.capacity,
-                "booked": booking_count,
-                "available_slots": available_slots,
-                "coach": (
-                    schedule.coach.first_name + " " + schedule.coach.last_name
-                    if schedule.coach
-                    else "Sin asignar"
-                ),
-                "available": available
-                and (not client_has_booking or is_current_booking),
-                "client_has_booking": client_has_booking,
-                "is_current_booking": is_current_booking,
-                "start": start_time.isoformat(),
-                "end": end_time.isoformat(),
-                "can_reschedule_to": available
-                and (not client_has_booking or is_current_booking),
-            }
-            slots.append(slot)
+        current_key = None
+        if current_booking:
+            current_key = (current_booking["schedule_id"], current_booking["class_date"])
 
-        response_data = {
-            "date": requested_date.isoformat(),
-            "slots": sorted(slots, key=lambda x: x["start"]),
-            "total_available_slots": sum(slot["available_slots"] for slot in slots),
-            "total_schedules": len(slots),
-        }
+        options = get_reschedule_options(
+            requested_date, days, client_id, current_key=current_key, sede_ids=sede_ids
+        )
+        # El primer día va también en la raíz (formato original de un solo día)
+        response_data = dict(options[0])
+        if days > 1:
+            response_data["days"] = options
         return Response(response_data)
 
         # return phone[:10] if phone else None
@@ -1571,6 +1126,7 @@ class BookingViewSet(SedeFilterMixin, viewsets.ModelViewSet):
         # ───────── caches y contenedores bulk ───────────────────────
         bulk_bookings, bulk_payments, bulk_updates = [], [], []
         touched_clients: set[int] = set()
+        trial_clients: set[int] = set()
         failed: list[dict] = []
         success = 0
 
@@ -1738,6 +1294,8 @@ class BookingViewSet(SedeFilterMixin, viewsets.ModelViewSet):
                                 client=cli,
                                 membership=member,
                                 date_paid=pay_dt,
+                                # bulk_create no pasa por Payment.save()
+                                paid_on=local_date(pay_dt),
                                 valid_until=val_until,
                                 amount=amt,
                             )
@@ -1745,6 +1303,7 @@ class BookingViewSet(SedeFilterMixin, viewsets.ModelViewSet):
                     else:
                         if not cli.trial_used and a_status == "attended":
                             cli.trial_used = True
+                            trial_clients.add(cli.id)
                             if cli.id not in touched_clients:
                                 bulk_updates.append(cli)
                                 touched_clients.add(cli.id)
@@ -1780,6 +1339,22 @@ class BookingViewSet(SedeFilterMixin, viewsets.ModelViewSet):
                 Booking.objects.bulk_create(
                     bulk_bookings, ignore_conflicts=True, batch_size=500
                 )
+            # bulk_create no dispara señales: cierres diarios de los días importados
+            mark_dirty(
+                {p.date_paid for p in bulk_payments}
+                | {b.class_date for b in bulk_bookings}
+            )
+            # bulk_update tampoco: pruebas de los clientes que usaron su clase de prueba
+            mark_trial_days_dirty(trial_clients)
+            # ni ingresos mensuales: se recalculan los meses de los pagos importados
+            if bulk_payments:
+                reconcile_monthly_revenue(months_of(p.date_paid for p in bulk_payments))
+            # ni cupos: se recuentan las ocurrencias importadas y se avisa al stream
+            imported_seats = {b.seat_key() for b in bulk_bookings} - {None}
+            recount_occupancies(imported_seats)
+            seats_changed(reserved=imported_seats)
+        invalidate_dashboard({p.sede_id for p in bulk_payments}, PAYMENTS)
+        invalidate_dashboard({b.sede_id for b in bulk_bookings}, BOOKINGS)
 
         return Response(
             {"message": f"Se importaron {success} filas.", "errors": failed},
@@ -1814,101 +1389,26 @@ class AvailabilityView(APIView):
         if not requested_date:
             return Response({"detail": "Formato de fecha inválido."}, status=400)
 
-        # Mapear weekday (0=Monday) a código de día definido en Schedule.DAY_CHOICES
-        day_code_map = {
-            0: "MON",
-            1: "TUE",
-            2: "WED",
-            3: "THU",
-            4: "FRI",
-            5: "SAT",
-            6: "SUN",
-        }
-        day_code = day_code_map[requested_date.weekday()]
-
-        # Filtrar por sede si se proporciona
-        sede_ids = request.query_params.get("sede_ids")
-        if sede_ids:
-            sede_ids_list = [
-                int(id.strip()) for id in sede_ids.split(",") if id.strip()
-            ]
-            schedules = Schedule.objects.filter(day=day_code, sede_id__in=sede_ids_list)
-        else:
-            # Verificar headers de sede
-            sede_header = request.headers.get("X-Sedes-Selected")
-            sede_id_header = request.headers.get("X-Sede-ID")
-            
-            if sede_header:
-                sede_ids_list = [
-                    int(id.strip()) for id in sede_header.split(",") if id.strip()
-                ]
-                schedules = Schedule.objects.filter(
-                    day=day_code, sede_id__in=sede_ids_list
-                )
-            elif sede_id_header:
-                # Nuevo header X-Sede-ID para sede individual
-                try:
-                    sede_id = int(sede_id_header.strip())
-                    schedules = Schedule.objects.filter(day=day_code, sede_id=sede_id)
-                except ValueError:
-                    schedules = Schedule.objects.filter(day=day_code)
-            else:
-                schedules = Schedule.objects.filter(day=day_code)
-
-        slots = []
-        for schedule in schedules:
-            # Contar reservas activas para este schedule en la fecha solicitada
-            booking_count = (
-                Booking.objects.filter(
-                    schedule=schedule, class_date=requested_date, status="active"
-                )
-                .exclude(attendance_status="cancelled")
-                .count()
-            )
-
-            available = booking_count < schedule.capacity
-            available_slots = max(0, schedule.capacity - booking_count)
+        slots, etag, last_modified = get_cached_slots(
+            requested_date, sede_ids=get_requested_sede_ids(request)
+        )
 
-            # Buscar el TimeSlot correspondiente para obtener la duración real
-            try:
-                time_slot_obj = TimeSlot.objects.get(
-                    sede=schedule.sede,
-                    start_time=datetime.strptime(schedule.time_slot, "%H:%M").time(),
-                    is_active=True
-                )
-                # Crear datetime naive para evitar problemas de zona horaria
-                start_time = datetime.combine(requested_date, time_slot_obj.start_time)
-                end_time = datetime.combine(requested_date, time_slot_obj.end_time)
-            except TimeSlot.DoesNotExist:
-                # Fallback: usar duración de 1 hora si no se encuentra el TimeSlot
-                start_time = datetime.combine(
-                    requested_date, datetime.strptime(schedule.time_slot, "%H:%M").time()
-                )
-                end_time = start_time + timedelta(hours=1)
-
-            slot = {
-                "schedule_id": schedule.id,
-                "class_type": schedule.class_type.name if schedule.class_type else None,
-                "is_individual": schedule.is_individual,
-                "capacity": schedule.capacity,
-                "booked": booking_count,
-                "available_slots": available_slots,
-                "coach": (
-                    schedule.coach.first_name + " " + schedule.coach.last_name
-                    if schedule.coach
-                    else "Sin asignar"
-                ),
-                "available": available,
-                "start": start_time.isoformat(),
-                "end": end_time.isoformat(),
-            }
-            slots.append(slot)
+        # Polls repetidos del sitio de reservas reciben 304 sin consultar la BD
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified.timestamp()
+        )
+        if not_modified is not None:
+            return not_modified
 
         response_data = {
             "date": requested_date.isoformat(),
-            "slots": sorted(slots, key=lambda x: x["start"]),  # ⬅️ ORDENA POR start
+            "slots": slots,  # ⬅️ ordenados por start
         }
-        return Response(response_data)
+        response = Response(response_data)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+        patch_cache_control(response, no_cache=True)
+        return response
 
     def post(self, request, format=None):
         """
@@ -1928,80 +1428,143 @@ class AvailabilityView(APIView):
         if not requested_date:
             return Response({"detail": "Formato de fecha inválido."}, status=400)
 
-        # Mapear weekday (0=Monday) a código de día definido en Schedule.DAY_CHOICES
-        day_code_map = {
-            0: "MON",
-            1: "TUE",
-            2: "WED",
-            3: "THU",
-            4: "FRI",
-            5: "SAT",
-            6: "SUN",
+        slots = get_slots(requested_date, client_id=client_id)
+        for slot in slots:
+            client_has_booking = slot.setdefault("client_has_booking", False)
+            slot["can_book_multiple"] = (
+                slot["available_slots"] > 1 and not client_has_booking
+            )
+            slot["available"] = slot["available"] and not client_has_booking
+
+        response_data = {
+            "date": requested_date.isoformat(),
+            "slots": slots,
+            "total_available_slots": sum(slot["available_slots"] for slot in slots),
+            "total_schedules": len(slots),
         }
-        day_code = day_code_map[requested_date.weekday()]
+        return Response(response_data)
 
-        # Obtener todas las plantillas de horario (Schedule) para ese día
-        schedules = Schedule.objects.filter(day=day_code)
 
-        slots = []
-        for schedule in schedules:
-            # Contar reservas activas para este schedule en la fecha solicitada
-            booking_count = (
-                Booking.objects.filter(
-                    schedule=schedule, class_date=requested_date, status="active"
-                )
-                .exclude(attendance_status="cancelled")
-                .count()
+class AvailabilityRangeView(APIView):
+    permission_classes = [permissions.AllowAny]
+    """
+    Disponibilidad para un rango de fechas (vista semanal del calendario).
+    Parámetros: start, end (YYYY-MM-DD), sede_ids (opcional), client_id (opcional)
+    """
+
+    def get(self, request, format=None):
+        start_str = request.query_params.get("start")
+        end_str = request.query_params.get("end")
+        if not start_str or not end_str:
+            return Response(
+                {
+                    "detail": "Se requieren los parámetros 'start' y 'end' en formato YYYY-MM-DD."
+                },
+                status=400,
             )
 
-            available = booking_count < schedule.capacity
-            available_slots = max(0, schedule.capacity - booking_count)
-
-            # Verificar si el cliente ya tiene una reserva para este horario
-            client_has_booking = False
-            if client_id:
-                client_has_booking = Booking.objects.filter(
-                    client_id=client_id,
-                    schedule=schedule,
-                    class_date=requested_date,
-                    status="active",
-                ).exists()
-
-            # Convertir el campo time_slot (e.g. '05:00') en un datetime combinando con requested_date
-            start_time = datetime.combine(
-                requested_date, datetime.strptime(schedule.time_slot, "%H:%M").time()
+        try:
+            start_date = parse_date(start_str)
+            end_date = parse_date(end_str)
+        except ValueError:
+            start_date = end_date = None
+        if not start_date or not end_date:
+            return Response({"detail": "Formato de fecha inválido."}, status=400)
+        if end_date < start_date:
+            return Response(
+                {"detail": "'end' debe ser igual o posterior a 'start'."}, status=400
             )
-            end_time = start_time + timedelta(hours=1)  # Cada slot dura 1 hora
-
-            slot = {
-                "schedule_id": schedule.id,
-                "class_type": schedule.class_type.name if schedule.class_type else None,
-                "is_individual": schedule.is_individual,
-                "capacity": schedule.capacity,
-                "booked": booking_count,
-                "available_slots": available_slots,
-                "coach": (
-                    schedule.coach.first_name + " " + schedule.coach.last_name
-                    if schedule.coach
-                    else "Sin asignar"
-                ),
-                "available": available and not client_has_booking,
-                "client_has_booking": client_has_booking,
-                "start": start_time.isoformat(),
-                "end": end_time.isoformat(),
-                "can_book_multiple": available_slots > 1 and not client_has_booking,
-            }
-            slots.append(slot)
+        if (end_date - start_date).days + 1 > MAX_RANGE_DAYS:
+            return Response(
+                {"detail": f"El rango máximo es de {MAX_RANGE_DAYS} días."},
+                status=400,
+            )
+
+        client_id = request.query_params.get("client_id")
+        matrix = get_availability_matrix(
+            start_date,
+            end_date,
+            sede_ids=get_requested_sede_ids(request),
+            client_id=client_id,
+        )
 
         response_data = {
-            "date": requested_date.isoformat(),
-            "slots": sorted(slots, key=lambda x: x["start"]),
-            "total_available_slots": sum(slot["available_slots"] for slot in slots),
-            "total_schedules": len(slots),
+            "start": start_date.isoformat(),
+            "end": end_date.isoformat(),
+            **matrix,
         }
         return Response(response_data)
 
 
+# Intervalo de comentarios keep-alive y duración máxima de cada conexión SSE;
+# EventSource se reconecta solo al cerrarse el stream.
+AVAILABILITY_STREAM_HEARTBEAT = 15
+AVAILABILITY_STREAM_MAX_SECONDS = 300
+
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def availability_stream(request):
+    """
+    Stream SSE (text/event-stream) con los cambios de cupos de una sede y fecha.
+    Parámetros: sede_id, date (YYYY-MM-DD)
+
+    Envía un evento ``snapshot`` con los slots actuales y luego un evento
+    ``seats`` por cada reserva creada, cancelada o reagendada. Requiere
+    servir la app por ASGI (revive_pilates/asgi.py).
+    """
+    requested_date = parse_date(request.GET.get("date") or "")
+    try:
+        sede_id = int(request.GET.get("sede_id") or request.headers.get("X-Sede-ID"))
+    except (TypeError, ValueError):
+        sede_id = None
+    if not requested_date or sede_id is None:
+        return JsonResponse(
+            {"detail": "Se requieren los parámetros 'sede_id' y 'date' (YYYY-MM-DD)."},
+            status=400,
+        )
+
+    # Suscribirse antes del snapshot para no perder cambios intermedios
+    subscription = get_broadcaster().subscribe(
+        availability_channel(sede_id, requested_date)
+    )
+    try:
+        slots, _, _ = await sync_to_async(get_cached_slots)(
+            requested_date, sede_ids=[sede_id]
+        )
+    except Exception:
+        subscription.close()
+        raise
+
+    # Bajo WSGI (p. ej. api/index.py) la respuesta no puede quedar abierta:
+    # solo se envía el snapshot y EventSource reintenta tras ``retry``.
+    keep_open = "wsgi.version" not in request.META
+
+    async def events():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + AVAILABILITY_STREAM_MAX_SECONDS
+        try:
+            yield f"retry: {AVAILABILITY_STREAM_HEARTBEAT * 1000}\n"
+            yield _sse_event(
+                "snapshot", {"date": requested_date.isoformat(), "slots": slots}
+            )
+            while keep_open and loop.time() < deadline:
+                message = await subscription.get(timeout=AVAILABILITY_STREAM_HEARTBEAT)
+                if message is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield _sse_event("seats", message)
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 class MembershipViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.AllowAny]
     queryset = Membership.objects.all()
@@ -2119,7 +1682,7 @@ class PaymentViewSet(SedeFilterMixin, viewsets.ModelViewSet):
         filters.OrderingFilter,
         filters.SearchFilter,
     ]
-    filterset_fields = ["client", "payment_method", "membership"]
+    filterset_fields = ["client", "payment_method", "method", "membership"]
     search_fields = [
         "client__first_name",
         "client__last_name",
@@ -2156,9 +1719,9 @@ class PaymentViewSet(SedeFilterMixin, viewsets.ModelViewSet):
         date_to = self.request.query_params.get("date_to", None)
 
         if date_from:
-            queryset = queryset.filter(date_paid__date__gte=date_from)
+            queryset = queryset.filter(paid_on__gte=date_from)
         if date_to:
-            queryset = queryset.filter(date_paid__date__lte=date_to)
+            queryset = queryset.filter(paid_on__lte=date_to)
 
         # Amount range filtering
         amount_min = self.request.query_params.get("amount_min", None)
@@ -2173,12 +1736,12 @@ class PaymentViewSet(SedeFilterMixin, viewsets.ModelViewSet):
         month = self.request.query_params.get("month", None)
         if month:
             year, month_num = month.split("-")
-            queryset = queryset.filter(date_paid__year=year, date_paid__month=month_num)
+            queryset = queryset.filter(paid_on__range=month_bounds(year, month_num))
 
         # Single date filtering (for backward compatibility)
         date = self.request.query_params.get("date", None)
         if date:
-            queryset = queryset.filter(date_paid__date=date)
+            queryset = queryset.filter(paid_on=date)
 
         # Limit results to prevent performance issues
         # If no specific filters are applied, limit to last 1000 records
@@ -2201,6 +1764,7 @@ class PaymentViewSet(SedeFilterMixin, viewsets.ModelViewSet):
 
         return queryset
 
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         # Validación de duplicados recientes (últimos 5 minutos)
         client_id = request.data.get('client_id')
@@ -2283,14 +1847,6 @@ class PaymentViewSet(SedeFilterMixin, viewsets.ModelViewSet):
         except PlanIntent.DoesNotExist:
             pass
 
-        # Actualizar ingresos mensuales
-        year = payment.date_paid.year
-        month = payment.date_paid.month
-        monthly, _ = MonthlyRevenue.objects.get_or_create(year=year, month=month)
-        monthly.total_amount = F("total_amount") + payment.amount
-        monthly.payment_count = F("payment_count") + 1
-        monthly.save()
-
         return Response(PaymentSerializer(payment).data, status=status.HTTP_201_CREATED)
 
     def get_total_allowed_classes(client):
@@ -2306,26 +1862,15 @@ class PaymentViewSet(SedeFilterMixin, viewsets.ModelViewSet):
             total += clases + (p.extra_classes or 0)
         return total
 
+    @transaction.atomic
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
 
-        amount = instance.amount
-        date_paid = instance.date_paid
         client = instance.client
 
+        # Los ingresos mensuales se descuentan en la señal de Payment
         self.perform_destroy(instance)
 
-        year = date_paid.year
-        month = date_paid.month
-
-        try:
-            monthly = MonthlyRevenue.objects.get(year=year, month=month)
-            monthly.total_amount = F("total_amount") - amount
-            monthly.payment_count = F("payment_count") - 1
-            monthly.save()
-        except MonthlyRevenue.DoesNotExist:
-            pass
-
         if not Payment.objects.filter(
             client=client, valid_until__gte=timezone.now().date()
         ).exists():
@@ -2427,33 +1972,15 @@ class VentaViewSet(SedeFilterMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, IsSedeOwnerOrReadOnly]
     ordering = ["-date_sold"]
 
+    # Los ingresos mensuales se actualizan en la señal de Venta, en la misma transacción
+    @transaction.atomic
     def perform_create(self, serializer):
-        venta = serializer.save()
-        date = venta.date_sold.date()
-        year, month = date.year, date.month
-
-        monthly, _ = MonthlyRevenue.objects.get_or_create(year=year, month=month)
-        monthly.total_amount = F("total_amount") + venta.total_amount
-        monthly.venta_total = F("venta_total") + venta.total_amount
-        monthly.venta_count = F("venta_count") + 1
-        monthly.save()
         serializer.save(created_by=self.request.user, modified_by=self.request.user)
 
+    @transaction.atomic
     def perform_destroy(self, instance):
-        date = instance.date_sold.date()
-        amount = instance.total_amount
-        year, month = date.year, date.month
         super().perform_destroy(instance)
 
-        try:
-            monthly = MonthlyRevenue.objects.get(year=year, month=month)
-            monthly.total_amount = F("total_amount") - amount
-            monthly.venta_total = F("venta_total") - amount
-            monthly.venta_count = F("venta_count") - 1
-            monthly.save()
-        except MonthlyRevenue.DoesNotExist:
-            pass
-
     def perform_update(self, serializer):
         serializer.save(modified_by=self.request.user)
 
@@ -2470,40 +1997,128 @@ class ScheduleViewSet(SedeFilterMixin, viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"], url_path="today")
     def get_today_classes(self, request):
+        """
+        Clases del día con sus reservas activas (``?date=YYYY-MM-DD`` para
+        otro día, hoy por defecto en la zona horaria del estudio). Número
+        fijo de consultas: horarios + reservas con su cliente.
+        """
         coach_id = request.query_params.get("coach_id")
-        today = datetime.now().date()
-        day_code = today.strftime("%a").upper()[:3]
+        date_param = request.query_params.get("date")
+        today = timezone.localdate()
+        if date_param:
+            try:
+                today = parse_date(date_param)
+            except ValueError:
+                today = None
+            if not today:
+                return Response(
+                    {"detail": "Formato de fecha inválido. Usa YYYY-MM-DD."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        day_code = day_code_for(today)
 
         # El filtrado por sede se maneja automáticamente por SedeFilterMixin
+        schedules = self.get_queryset().filter(day=day_code).prefetch_related(
+            Prefetch(
+                "booking_set",
+                queryset=Booking.objects.filter(class_date=today, status="active")
+                .select_related("client")
+                .order_by("id"),
+                to_attr="day_bookings",
+            )
+        )
         if coach_id:
             # Si se especifica un coach_id, mostrar solo sus clases
-            schedules = (
-                self.get_queryset()
-                .filter(day=day_code, coach_id=coach_id)
-                .order_by("time_slot")
-            )
+            schedules = schedules.filter(coach_id=coach_id)
         elif (
             request.user.is_superuser
             or request.user.groups.filter(name__in=["admin", "secretaria"]).exists()
         ):
             # Secretarias y admins pueden ver TODAS las clases del día
-            schedules = self.get_queryset().filter(day=day_code).order_by("time_slot")
+            pass
         else:
             # Coaches solo ven sus propias clases
-            schedules = (
-                self.get_queryset()
-                .filter(day=day_code, coach=request.user)
-                .order_by("time_slot")
-            )
+            schedules = schedules.filter(coach=request.user)
 
         serializer = ScheduleWithBookingsSerializer(
-            schedules, many=True, context={"request": request, "today": today}
+            schedules.order_by("time_slot"),
+            many=True,
+            context={"request": request, "today": today},
         )
         return Response(serializer.data)
 
+    @action(detail=False, methods=["get"], url_path="coach-agenda")
+    def coach_agenda(self, request):
+        """
+        Agenda de un coach entre ``start`` y ``end`` (YYYY-MM-DD, por defecto
+        los próximos 7 días) con cupos y asistentes. Los coaches solo ven la
+        suya; admin y secretaria pueden indicar ``coach_id``.
+        """
+        try:
+            start = parse_date(request.query_params.get("start") or "") or timezone.localdate()
+            end = parse_date(request.query_params.get("end") or "") or start + timedelta(days=6)
+        except ValueError:
+            return Response({"detail": "Formato de fecha inválido."}, status=400)
+        if end < start:
+            return Response(
+                {"detail": "'end' debe ser igual o posterior a 'start'."}, status=400
+            )
+        if (end - start).days + 1 > MAX_RANGE_DAYS:
+            return Response(
+                {"detail": f"El rango máximo es de {MAX_RANGE_DAYS} días."}, status=400
+            )
+
+        coach_id = request.user.id
+        if (
+            request.user.is_superuser
+            or request.user.groups.filter(name__in=["admin", "secretaria"]).exists()
+        ):
+            try:
+                coach_id = int(request.query_params.get("coach_id") or coach_id)
+            except ValueError:
+                return Response({"detail": "'coach_id' inválido."}, status=400)
+
+        sessions = coach_agenda(
+            coach_id, start, end, sede_ids=getattr(request, "sede_ids", None)
+        )
+        return Response(
+            {
+                "coach_id": coach_id,
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "sessions": sessions,
+            }
+        )
+
+
+class ClassOccurrenceViewSet(SedeFilterMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Calendario de clases concretas. ``start``/``end`` (YYYY-MM-DD, ``end``
+    incluido) acotan el rango; por defecto los próximos 7 días.
+    """
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = ClassOccurrenceSerializer
+    queryset = ClassOccurrence.objects.select_related("schedule__class_type", "coach")
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ["coach", "schedule"]
+
+    def get_queryset(self):
+        params = self.request.query_params
+        try:
+            start = parse_date(params.get("start") or "") or timezone.localdate()
+            end = parse_date(params.get("end") or "") or start + timedelta(days=6)
+        except ValueError:
+            raise ValidationError({"detail": "Formato de fecha inválido."})
+        return (
+            with_booked(super().get_queryset())
+            .filter(date__gte=start, date__lte=end)
+            .order_by("start")
+        )
+
 
 class MonthlyRevenueViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = MonthlyRevenue.objects.all()
+    queryset = MonthlyRevenue.objects.select_related("sede")
     serializer_class = MonthlyRevenueSerializer
     permission_classes = [IsAuthenticated, SedeAccessPermission]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
@@ -2511,6 +2126,14 @@ class MonthlyRevenueViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ["year", "month"]
     ordering = ["-year", "-month"]
 
+    def get_queryset(self):
+        # Filas de las sedes elegidas; sin sede, la fila global de cada mes
+        queryset = super().get_queryset()
+        sede_ids = getattr(self.request, "sede_ids", None)
+        if sede_ids:
+            return queryset.filter(sede_id__in=sede_ids)
+        return queryset.filter(sede__isnull=True)
+
     @action(detail=False, methods=["post"], url_path="recalculate")
     def recalculate(self, request):
         year = request.data.get("year")
@@ -2541,26 +2164,22 @@ class MonthlyRevenueViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=False, methods=["get"], url_path="total")
     def total_revenue(self, request):
-        from django.db.models import Sum
-
-        total = (
-            MonthlyRevenue.objects.aggregate(total=Sum("total_amount"))["total"] or 0
-        )
+        total = self.get_queryset().aggregate(total=Sum("total_amount"))["total"] or 0
         return Response({"total_revenue": float(total)})
 
 
 @api_view(["GET"])
 def get_today_payments_total(request):
     today = localtime(now()).date()
-    payments = Payment.objects.filter(date_paid__date=today)
+    payments = Payment.objects.filter(paid_on=today)
     
     # Apply sede filtering if sede_ids are provided
     if hasattr(request, "sede_ids") and request.sede_ids:
         payments = payments.filter(sede_id__in=request.sede_ids)
     
-    total = sum(p.amount for p in payments)
+    totals = payments.aggregate(total=Sum("amount"), count=Count("id"))
     return Response(
-        {"date": today, "total": round(total, 2), "count": payments.count()}
+        {"date": today, "total": round(totals["total"] or 0, 2), "count": totals["count"]}
     )
 
 
@@ -2625,16 +2244,12 @@ def closure_full_summary(request):
 
     # 1) Determinar rango de fechas
     if not raw_year and not raw_month:
-        # global: desde primer pago o booking hasta hoy
-        first_dates = []
-        first_payment = Payment.objects.order_by("date_paid").first()
-        if first_payment and first_payment.date_paid:
-            first_dates.append(first_payment.date_paid.date())
-        first_booking = Booking.objects.order_by("class_date").first()
-        if first_booking and first_booking.class_date:
-            first_dates.append(first_booking.class_date)
-        first_day = min(first_dates) if first_dates else tz_now().date()
+        # global: desde el primer cierre registrado hasta hoy
         last_day = tz_now().date()
+        first_day = (
+            DailyClosingFact.objects.aggregate(first=Min("date"))["first"] or last_day
+        )
+        first_day = min(first_day, last_day)
     else:
         # específico mes/año
         if raw_month and "-" in raw_month:
@@ -2645,194 +2260,60 @@ def closure_full_summary(request):
         first_day = date(year, month, 1)
         last_day = date(year, month, calendar.monthrange(year, month)[1])
 
-    # 2) Construir lista diaria
+    # 2) Totales por día desde los cierres precalculados (una consulta)
+    sede_ids = getattr(request, "sede_ids", None)
+    days_totals = closing_days(monday_of(first_day), last_day, sede_ids)
+
+    def full_summary_totals(totals):
+        total_pagos = totals["total_pagos"]
+        return {
+            "asistencias": totals["asistencias"],
+            "pruebas": totals["pruebas"],
+            "paquetes_vendidos": totals["asistencias"] - totals["pruebas"],
+            "clases_individuales": totals["individuales_asistidas"],
+            "total_pagos": total_pagos,
+            "visalink": totals["visalink"],
+            "efectivo": totals["efectivo"],
+            # Todo lo que no es efectivo ni VisaLink
+            "transferencia": total_pagos - totals["efectivo"] - totals["visalink"],
+            "ventas": totals["total_ventas"],
+            "total": total_pagos + totals["total_ventas"],
+        }
+
     daily = []
     current = first_day
     while current <= last_day:
-        qs = Booking.objects.filter(class_date=current, attendance_status="attended")
         daily.append(
             {
                 "fecha": current.isoformat(),
-                "asistencias": qs.count(),
-                "pruebas": qs.filter(client__trial_used=True).count(),
-                "paquetes_vendidos": qs.filter(client__trial_used=False).count(),
-                "clases_individuales": qs.filter(schedule__is_individual=True).count(),
+                **full_summary_totals(days_totals.get(current) or empty_totals()),
             }
         )
         current += timedelta(days=1)
 
-    # 3) Añadir pagos y ventas a cada día
-    for entry in daily:
-        dt = date.fromisoformat(entry["fecha"])
-        pagos = Payment.objects.filter(date_paid__date=dt)
-        total_pagos = pagos.aggregate(Sum("amount"))["amount__sum"] or 0
-        visalink = (
-            pagos.filter(payment_method__iexact="VisaLink").aggregate(Sum("amount"))[
-                "amount__sum"
-            ]
-            or 0
-        )
-        efectivo = (
-            pagos.filter(payment_method__iexact="Efectivo").aggregate(Sum("amount"))[
-                "amount__sum"
-            ]
-            or 0
-        )
-        visalink = (
-            pagos.filter(payment_method__iexact="Visalink").aggregate(Sum("amount"))[
-                "amount__sum"
-            ]
-            or 0
-        )
-        entry["total_pagos"] = total_pagos
-        entry["visalink"] = visalink
-        entry["efectivo"] = efectivo
-        entry["visalink"] = visalink
-        entry["transferencia"] = total_pagos - (visalink + efectivo + visalink)
-
-        ventas = Venta.objects.filter(date_sold__date=dt)
-        ventas_sum = ventas.aggregate(Sum("total_amount"))["total_amount__sum"] or 0
-        entry["ventas"] = ventas_sum
-        entry["total"] = total_pagos + ventas_sum
-
-    # 4) Agrupar en semanas de lunes (0) a sábado (5)
-    weekly = []
-    week_idx = 1
-
-    # Función para obtener el lunes de una semana
-    def get_monday_of_week(target_date):
-        days_since_monday = target_date.weekday()
-        return target_date - timedelta(days=days_since_monday)
-
-    # Función para obtener el sábado de una semana
-    def get_saturday_of_week(target_date):
-        days_until_saturday = 5 - target_date.weekday()
-        return target_date + timedelta(days=days_until_saturday)
-
-    # Generar semanas (Lunes a Sábado)
-    current_date = get_monday_of_week(first_day)
-
-    while current_date <= last_day:
-        week_end = get_saturday_of_week(current_date)
-
-        # Ajustar si el sábado excede el rango
-        if week_end > last_day:
-            week_end = last_day
-
-        # Inicializar datos de la semana
-        week_data = {
+    # 3) Semanas de lunes (0) a sábado (5)
+    weekly = [
+        {
             "week": week_idx,
-            "start": current_date,
-            "end": week_end,
-            "asistencias": 0,
-            "pruebas": 0,
-            "paquetes_vendidos": 0,
-            "clases_individuales": 0,
-            "visalink": 0,
-            "efectivo": 0,
-            "visalink": 0,
-            "transferencia": 0,
-            "ventas": 0,
-            "total": 0,
+            "rango": f"{week_start.strftime('%d/%m/%Y')} - {week_end.strftime('%d/%m/%Y')}",
+            **full_summary_totals(totals),
         }
-
-        # Sumar valores de cada día de la semana
-        temp_date = current_date
-        while temp_date <= week_end:
-            iso = temp_date.isoformat()
-            entry = next((d for d in daily if d["fecha"] == iso), None)
-            if entry:
-                for k in [
-                    "asistencias",
-                    "pruebas",
-                    "paquetes_vendidos",
-                    "clases_individuales",
-                    "visalink",
-                    "efectivo",
-                    "visalink",
-                    "transferencia",
-                    "ventas",
-                    "total",
-                ]:
-                    week_data[k] += entry[k]
-            temp_date += timedelta(days=1)
-
-        # Agregar semana a la lista
-        weekly.append(
-            {
-                "week": week_data["week"],
-                "rango": f"{week_data['start'].strftime('%d/%m/%Y')} - {week_data['end'].strftime('%d/%m/%Y')}",
-                **{
-                    k: week_data[k]
-                    for k in [
-                        "asistencias",
-                        "pruebas",
-                        "paquetes_vendidos",
-                        "clases_individuales",
-                        "visalink",
-                        "efectivo",
-                        "visalink",
-                        "transferencia",
-                        "ventas",
-                        "total",
-                    ]
-                },
-            }
+        for week_idx, (week_start, week_end, totals) in enumerate(
+            weekly_rollup(days_totals, first_day, last_day), start=1
         )
+    ]
 
-        # Avanzar a la siguiente semana (lunes)
-        current_date += timedelta(days=7)
-        week_idx += 1
-
-    # 5) Resumen global o mensual
+    # 4) Resumen global o mensual
+    summary_keys = ["visalink", "efectivo", "transferencia", "ventas", "total"]
     if not raw_year and not raw_month:
-        # resumen global por SQL
-        total_pagos = Payment.objects.aggregate(Sum("amount"))["amount__sum"] or 0
-        visalink = (
-            Payment.objects.filter(payment_method__iexact="VisaLink").aggregate(
-                Sum("amount")
-            )["amount__sum"]
-            or 0
-        )
-        efectivo = (
-            Payment.objects.filter(payment_method__iexact="Efectivo").aggregate(
-                Sum("amount")
-            )["amount__sum"]
-            or 0
-        )
-        visalink = (
-            Payment.objects.filter(payment_method__iexact="Visalink").aggregate(
-                Sum("amount")
-            )["amount__sum"]
-            or 0
-        )
-        transferencia = total_pagos - (visalink + efectivo + visalink)
-        total_ventas = (
-            Venta.objects.aggregate(Sum("total_amount"))["total_amount__sum"] or 0
-        )
-
-        summary = {
-            "visalink": visalink,
-            "efectivo": efectivo,
-            "visalink": visalink,
-            "transferencia": transferencia,
-            "ventas": total_ventas,
-            "total_pagos": total_pagos,
-            "total": total_pagos + total_ventas,
-        }
+        facts = DailyClosingFact.objects.all()
+        if sede_ids:
+            facts = facts.filter(sede_id__in=sede_ids)
+        totals = facts.aggregate(**{field: Sum(field) for field in FACT_FIELDS})
+        summary = full_summary_totals({k: v or 0 for k, v in totals.items()})
+        summary = {k: summary[k] for k in summary_keys + ["total_pagos"]}
     else:
-        # resumen mensual sumando daily
-        summary = {
-            k: sum(d[k] for d in daily)
-            for k in [
-                "visalink",
-                "efectivo",
-                "visalink",
-                "transferencia",
-                "ventas",
-                "total",
-            ]
-        }
+        summary = {k: sum(d[k] for d in daily) for k in summary_keys}
 
     return Response(
         {
@@ -2857,6 +2338,7 @@ class PromotionInstanceViewSet(SedeFilterMixin, viewsets.ModelViewSet):
     filterset_fields = ["promotion", "created_at"]
 
     @action(detail=True, methods=["post"], url_path="confirm-payment")
+    @transaction.atomic
     def confirm_payment(self, request, pk=None):
         instance = self.get_object()
         client_id = request.data.get("client_id")
@@ -2904,14 +2386,6 @@ class PromotionInstanceViewSet(SedeFilterMixin, viewsets.ModelViewSet):
         except PlanIntent.DoesNotExist:
             pass
 
-        # Recalcular ingresos mensuales
-        year = payment.date_paid.year
-        month = payment.date_paid.month
-        revenue, _ = MonthlyRevenue.objects.get_or_create(year=year, month=month)
-        revenue.total_amount = F("total_amount") + payment.amount
-        revenue.payment_count = F("payment_count") + 1
-        revenue.save()
-
         # Correo opcional
         try:
             send_subscription_confirmation_email(payment)
@@ -3047,209 +2521,97 @@ def create_authenticated_booking(request):
         )
 
     try:
-        schedule = Schedule.objects.get(pk=schedule_id)
-    except Schedule.DoesNotExist:
+        schedule_id = int(schedule_id)
+    except (TypeError, ValueError):
         return Response({"detail": "Horario no encontrado."}, status=404)
 
-    # Validar que la fecha no sea en el pasado
     try:
         booking_date = parse_date(class_date)
-        if not booking_date:
-            return Response({"detail": "Formato de fecha inválido."}, status=400)
+    except (TypeError, ValueError):
+        booking_date = None
+    if not booking_date:
+        return Response({"detail": "Formato de fecha inválido."}, status=400)
 
-        if booking_date < timezone.now().date():
-            return Response(
-                {"detail": "No se pueden hacer reservas para fechas pasadas."},
-                status=400,
-            )
+    # Sede para horarios sin sede: la del header, si es una sede activa
+    default_sede_id = request.headers.get("X-Sede-ID")
+    if default_sede_id:
+        try:
+            default_sede_id = int(default_sede_id)
+        except ValueError:
+            default_sede_id = None
+        if default_sede_id not in get_active_sede_ids():
+            return Response({"detail": "Sede inválida."}, status=400)
+    else:
+        default_sede_id = None
+
+    # Crear la reserva con las reglas compartidas (studio/booking_policy.py)
+    try:
+        decision = book(
+            client,
+            [BookingRequest(schedule_id, booking_date)],
+            membership_id=membership_id,
+            reject_past=True,
+            default_sede_id=default_sede_id,
+        )[0]
     except Exception as e:
-        print(f"Error al validar la fecha: {e}")
-        return Response({"detail": "Formato de fecha inválido."}, status=400)
+        return Response({"detail": f"Error al crear la reserva: {str(e)}"}, status=500)
 
-    # Verificar si ya existe una reserva para este cliente en este horario y fecha
-    existing_booking = Booking.objects.filter(
-        client=client, schedule=schedule, class_date=booking_date
-    ).first()
+    if not decision.ok:
+        status_code = 404 if decision.code == "schedule_not_found" else 400
+        return Response({"detail": decision.message}, status=status_code)
 
-    if existing_booking:
+    booking = decision.booking
+    if decision.kind == BookingDecision.INDIVIDUAL:
+        # Send pending payment email
+        try:
+            send_individual_booking_pending_email(booking)
+            print(f"Pending payment email sent for booking {booking.id}")
+        except Exception as e:
+            print(f"Error sending pending payment email: {e}")
         return Response(
-            {"detail": "Ya tienes una reserva para este horario en esta fecha."},
-            status=400,
+            {
+                "detail": "Tu reserva para la clase individual está pendiente de confirmación. Realiza el depósito del 40% (aprox. Q36) para confirmar tu clase.",
+                "booking_id": booking.id,
+            },
+            status=201,
         )
 
-    # Verificar cupo disponible
-    current_bookings = (
-        Booking.objects.filter(
-            schedule=schedule, class_date=booking_date, status="active"
+    # Send confirmation email
+    try:
+        send_booking_confirmation_email(booking, client)
+        print(f"Confirmation email sent for {decision.kind} booking {booking.id}")
+    except Exception as e:
+        print(f"Error sending confirmation email: {e}")
+
+    detail = "¡Reserva confirmada!"
+    if decision.kind == BookingDecision.TRIAL:
+        detail = "¡Reserva confirmada! Esta es tu clase de prueba gratuita."
+    return Response({"detail": detail, "booking_id": booking.id}, status=201)
+
+
+class BulkBookingViewSet(SedeFilterMixin, viewsets.ModelViewSet):
+    """ViewSet for handling bulk bookings with tracking"""
+
+    permission_classes = [IsAuthenticated, IsSedeOwnerOrReadOnly]
+    queryset = BulkBooking.objects.all()
+    serializer_class = BulkBookingSerializer
+
+    @action(detail=False, methods=["post"], url_path="create-multiple")
+    def create_multiple(self, request):
+        """Create multiple bookings at once with tracking"""
+        from .serializers import (
+            AsyncBulkBookingRequestSerializer,
+            BulkBookingRequestSerializer,
         )
-        .exclude(attendance_status="cancelled")
-        .count()
-    )
 
-    if current_bookings >= schedule.capacity:
-        return Response(
-            {"detail": "No hay cupo disponible para este horario."}, status=400
+        # ?async=1: se guarda la solicitud y se procesa en segundo plano
+        run_async = request.query_params.get("async") in ("1", "true")
+        serializer_class = (
+            AsyncBulkBookingRequestSerializer if run_async else BulkBookingRequestSerializer
         )
-
-    # Procesar la reserva según el tipo
-    membership = None
-    if membership_id:
-        try:
-            membership = Membership.objects.get(pk=membership_id)
-        except Membership.DoesNotExist:
-            return Response({"detail": "Membresía no encontrada."}, status=400)
-
-    # Crear la reserva
-    try:
-        # Get sede from schedule or request headers
-        sede_id = schedule.sede_id if schedule.sede_id else request.headers.get('X-Sede-ID')
-        
-        if membership and "individual" in membership.name.lower():  # Clase individual
-            booking = Booking.objects.create(
-                client=client,
-                schedule=schedule,
-                class_date=booking_date,
-                membership=membership,
-                status="pending",
-                sede_id=sede_id,
-            )
-            # Send pending payment email
-            try:
-                send_individual_booking_pending_email(booking)
-                print(f"Pending payment email sent for booking {booking.id}")
-            except Exception as e:
-                print(f"Error sending pending payment email: {e}")
-            return Response(
-                {
-                    "detail": "Tu reserva para la clase individual está pendiente de confirmación. Realiza el depósito del 40% (aprox. Q36) para confirmar tu clase.",
-                    "booking_id": booking.id,
-                },
-                status=201,
-            )
-
-        elif not client.trial_used:  # Clase de prueba gratuita
-            booking = Booking.objects.create(
-                client=client,
-                schedule=schedule,
-                class_date=booking_date,
-                status="active",
-                attendance_status="pending",
-                sede_id=sede_id,
-            )
-            client.trial_used = True
-            client.save(update_fields=["trial_used"])
-            # Send confirmation email
-            try:
-                send_booking_confirmation_email(booking, client)
-                print(f"Confirmation email sent for trial booking {booking.id}")
-            except Exception as e:
-                print(f"Error sending confirmation email: {e}")
-            return Response(
-                {
-                    "detail": "¡Reserva confirmada! Esta es tu clase de prueba gratuita.",
-                    "booking_id": booking.id,
-                },
-                status=201,
-            )
-
-        else:  # Cliente con membresía
-            # Verificar si tiene membresía activa
-            if not client.active_membership and client.trial_used:
-                return Response(
-                    {
-                        "detail": "No tienes una membresía activa y ya usaste tu clase de prueba gratuita. Por favor adquiere un plan para continuar."
-                    },
-                    status=400,
-                )
-
-            # Verificar límite de clases según membresía
-            today = timezone.now().date()
-            latest_payment = (
-                Payment.objects.filter(
-                    client=client, 
-                    valid_from__lte=today, 
-                    valid_until__gte=today
-                )
-                .order_by("-valid_until")
-                .first()
-            )
-
-            if not latest_payment:
-                return Response(
-                    {
-                        "detail": "No tienes una membresía activa. Por favor adquiere un plan para continuar."
-                    },
-                    status=400,
-                )
-
-            # Contar clases usadas este mes
-            month_start = date(today.year, today.month, 1)
-            month_end = date(
-                today.year, today.month, monthrange(today.year, today.month)[1]
-            )
-
-            classes_used = (
-                Booking.objects.filter(
-                    client=client,
-                    class_date__gte=month_start,
-                    class_date__lte=month_end,
-                    status="active",
-                )
-                .exclude(attendance_status="cancelled")
-                .count()
-            )
-
-            if (
-                latest_payment.membership.classes_per_month
-                and classes_used >= latest_payment.membership.classes_per_month
-            ):
-                return Response(
-                    {
-                        "detail": "Ya has usado todas las clases de tu membresía este mes."
-                    },
-                    status=400,
-                )
-
-            booking = Booking.objects.create(
-                client=client,
-                schedule=schedule,
-                class_date=booking_date,
-                membership=latest_payment.membership,
-                status="active",
-                attendance_status="pending",
-                sede_id=sede_id,
-            )
-
-            # Send confirmation email
-            try:
-                send_booking_confirmation_email(booking, client)
-                print(f"Confirmation email sent for membership booking {booking.id}")
-            except Exception as e:
-                print(f"Error sending confirmation email: {e}")
-
-            return Response(
-                {"detail": "¡Reserva confirmada!", "booking_id": booking.id}, status=201
-            )
-
-    except Exception as e:
-        return Response({"detail": f"Error al crear la reserva: {str(e)}"}, status=500)
-
-
-class BulkBookingViewSet(SedeFilterMixin, viewsets.ModelViewSet):
-    """ViewSet for handling bulk bookings with tracking"""
-
-    permission_classes = [IsAuthenticated, IsSedeOwnerOrReadOnly]
-    queryset = BulkBooking.objects.all()
-    serializer_class = BulkBookingSerializer
-
-    @action(detail=False, methods=["post"], url_path="create-multiple")
-    def create_multiple(self, request):
-        """Create multiple bookings at once with tracking"""
-        from .serializers import BulkBookingRequestSerializer
-
-        serializer = BulkBookingRequestSerializer(data=request.data)
-        if not serializer.is_valid():
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        serializer = serializer_class(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         client_id = serializer.validated_data["client_id"]
         bookings_data = serializer.validated_data["bookings"]
@@ -3262,244 +2624,41 @@ class BulkBookingViewSet(SedeFilterMixin, viewsets.ModelViewSet):
                 {"detail": "Cliente no encontrado."}, status=status.HTTP_404_NOT_FOUND
             )
 
+        if run_async:
+            with transaction.atomic():
+                bulk_booking = BulkBooking.objects.create(
+                    client=client,
+                    total_bookings=len(bookings_data),
+                    status="pending",
+                    request_data={
+                        "bookings": bookings_data,
+                        "number_of_slots": number_of_slots,
+                        "membership_id": request.data.get("membership_id"),
+                    },
+                )
+                enqueue_bulk_booking(bulk_booking.id)
+            return Response(
+                {
+                    "bulk_booking_id": bulk_booking.id,
+                    "status": bulk_booking.status,
+                    "total_requested": len(bookings_data),
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
+
         # Create bulk booking record
         bulk_booking = BulkBooking.objects.create(
             client=client, total_bookings=len(bookings_data), status="processing"
         )
 
-        successful_bookings = []
-        failed_bookings = []
-        errors = []
-
-        # Process each booking
-        for booking_data in bookings_data:
-            try:
-                with transaction.atomic():
-                    # Validate schedule exists
-                    try:
-                        schedule = Schedule.objects.get(id=booking_data["schedule_id"])
-                    except Schedule.DoesNotExist:
-                        failed_bookings.append(
-                            {
-                                "schedule_id": booking_data["schedule_id"],
-                                "class_date": booking_data["class_date"],
-                                "error": "Horario no encontrado",
-                            }
-                        )
-                        errors.append(
-                            f"Horario {booking_data['schedule_id']} no encontrado"
-                        )
-                        continue
-
-                    # Parse class date
-                    try:
-                        class_date = datetime.strptime(
-                            booking_data["class_date"], "%Y-%m-%d"
-                        ).date()
-                    except ValueError:
-                        failed_bookings.append(
-                            {
-                                "schedule_id": booking_data["schedule_id"],
-                                "class_date": booking_data["class_date"],
-                                "error": "Formato de fecha inválido",
-                            }
-                        )
-                        errors.append(f"Fecha inválida: {booking_data['class_date']}")
-                        continue
-
-                    # Check capacity
-                    current_bookings = (
-                        Booking.objects.filter(
-                            schedule=schedule, class_date=class_date, status="active"
-                        )
-                        .exclude(attendance_status="cancelled")
-                        .count()
-                    )
-
-                    available_slots = schedule.capacity - current_bookings
-
-                    if available_slots <= 0:
-                        failed_bookings.append(
-                            {
-                                "schedule_id": booking_data["schedule_id"],
-                                "class_date": booking_data["class_date"],
-                                "error": "No hay cupo disponible",
-                            }
-                        )
-                        errors.append(f"No hay cupo para {schedule} el {class_date}")
-                        continue
-
-                    # Check if requested slots exceed available capacity
-                    if number_of_slots > available_slots:
-                        failed_bookings.append(
-                            {
-                                "schedule_id": booking_data["schedule_id"],
-                                "class_date": booking_data["class_date"],
-                                "error": f"Solo hay {available_slots} cupos disponibles, se solicitaron {number_of_slots}",
-                            }
-                        )
-                        errors.append(
-                            f"Solo hay {available_slots} cupos disponibles para {schedule} el {class_date}, se solicitaron {number_of_slots}"
-                        )
-                        continue
-
-                    # Check if booking already exists
-                    if Booking.objects.filter(
-                        client=client, schedule=schedule, class_date=class_date
-                    ).exists():
-                        failed_bookings.append(
-                            {
-                                "schedule_id": booking_data["schedule_id"],
-                                "class_date": booking_data["class_date"],
-                                "error": "Ya tienes una reserva para esta clase",
-                            }
-                        )
-                        errors.append(
-                            f"Reserva duplicada para {schedule} el {class_date}"
-                        )
-                        continue
-
-                    # Create the booking
-                    booking = Booking.objects.create(
-                        client=client,
-                        schedule=schedule,
-                        class_date=class_date,
-                        bulk_booking=bulk_booking,
-                    )
-
-                    # Handle membership and payment logic (simplified version)
-                    # This follows the same logic as the single booking creation
-                    selected_membership = request.data.get("membership_id")
-
-                    if selected_membership == 1:  # Individual class
-                        # Buscar la membresía de clase individual más apropiada
-                        individual_membership = Membership.objects.filter(
-                            name__icontains="individual"
-                        ).first()
-                        
-                        if individual_membership:
-                            booking.membership = individual_membership
-                            booking.status = "pending"
-                            booking.save()
-                        # No enviar correo individual, se enviará al final
-                    elif not client.trial_used:
-                        # Trial class
-                        client.trial_used = True
-                        client.save(update_fields=["trial_used"])
-                        # No enviar correo individual, se enviará al final
-                    else:
-                        # Check active membership
-                        today = now().date()
-                        latest_payment = (
-                            Payment.objects.filter(
-                                client=client,
-                                valid_from__lte=today,
-                                valid_until__gte=today,
-                            )
-                            .order_by("-valid_until")
-                            .first()
-                        )
-
-                        if latest_payment:
-                            # Validate class limits
-                            membership_plan = latest_payment.membership
-                            total_permitidas = 0
-
-                            if latest_payment.promotion_id:
-                                promotion = latest_payment.promotion
-                                promo_instance = (
-                                    PromotionInstance.objects.filter(
-                                        promotion=promotion, clients=client
-                                    )
-                                    .order_by("-created_at")
-                                    .first()
-                                )
-
-                                if promo_instance and promo_instance.is_active():
-                                    total_permitidas = (
-                                        promotion.clases_por_cliente or 0
-                                    ) + (latest_payment.extra_classes or 0)
-                            elif membership_plan and membership_plan.classes_per_month:
-                                total_permitidas = membership_plan.classes_per_month + (
-                                    latest_payment.extra_classes or 0
-                                )
-
-                            if total_permitidas > 0:
-                                monthly_bookings = (
-                                    Booking.objects.filter(
-                                        client=client,
-                                        status="active",
-                                        payment=latest_payment,
-                                    )
-                                    .filter(
-                                        Q(attendance_status="attended")
-                                        | Q(
-                                            attendance_status="pending",
-                                            class_date__gte=today,
-                                        )
-                                    )
-                                    .count()
-                                )
-
-                                if monthly_bookings >= total_permitidas:
-                                    # Remove the booking if limit exceeded
-                                    booking.delete()
-                                    failed_bookings.append(
-                                        {
-                                            "schedule_id": booking_data["schedule_id"],
-                                            "class_date": booking_data["class_date"],
-                                            "error": "Has alcanzado tu límite de clases",
-                                        }
-                                    )
-                                    errors.append(
-                                        f"Límite de clases alcanzado para {schedule} el {class_date}"
-                                    )
-                                    continue
-
-                            # Set payment and membership
-                            booking.payment = latest_payment
-                            booking.membership = membership_plan
-                            booking.save()
-                            # No enviar correo individual, se enviará al final
-                        else:
-                            # No active membership and trial already used - remove booking
-                            if client.trial_used:
-                                booking.delete()
-                                failed_bookings.append(
-                                    {
-                                        "schedule_id": booking_data["schedule_id"],
-                                        "class_date": booking_data["class_date"],
-                                        "error": "No tienes una membresía activa y ya usaste tu clase de prueba gratuita",
-                                    }
-                                )
-                                errors.append(
-                                    f"Sin membresía activa y trial usado para {schedule} el {class_date}"
-                                )
-                                continue
-                            else:
-                                # Allow trial class
-                                booking.status = "active"
-                                booking.attendance_status = "pending"
-                                booking.save()
-
-                    successful_bookings.append(
-                        {
-                            "id": booking.id,
-                            "schedule": str(schedule),
-                            "class_date": booking_data["class_date"],
-                            "status": booking.status,
-                        }
-                    )
-
-            except Exception as e:
-                failed_bookings.append(
-                    {
-                        "schedule_id": booking_data["schedule_id"],
-                        "class_date": booking_data["class_date"],
-                        "error": str(e),
-                    }
-                )
-                errors.append(f"Error al crear reserva: {str(e)}")
+        # Decide y crea todas las reservas en una sola pasada
+        successful_bookings, failed_bookings, errors, created = create_bulk_bookings(
+            client,
+            bulk_booking,
+            bookings_data,
+            number_of_slots=number_of_slots,
+            membership_id=request.data.get("membership_id"),
+        )
 
         # Update bulk booking status
         bulk_booking.successful_bookings = len(successful_bookings)
@@ -3511,14 +2670,8 @@ class BulkBookingViewSet(SedeFilterMixin, viewsets.ModelViewSet):
             try:
                 from .management.mails.mails import send_bulk_booking_confirmation_email
 
-                # Get all successful booking objects
-                successful_booking_objects = bulk_booking.bookings.filter(
-                    id__in=[b["id"] for b in successful_bookings]
-                )
-                send_bulk_booking_confirmation_email(client, successful_booking_objects)
-                print(
-                    f"Bulk confirmation email sent for {len(successful_booking_objects)} bookings"
-                )
+                send_bulk_booking_confirmation_email(client, created)
+                print(f"Bulk confirmation email sent for {len(created)} bookings")
             except Exception as e:
                 print(f"Error sending bulk confirmation email: {e}")
 
@@ -3552,7 +2705,11 @@ class BulkBookingViewSet(SedeFilterMixin, viewsets.ModelViewSet):
                     "total_bookings": bulk_booking.total_bookings,
                     "successful_bookings": bulk_booking.successful_bookings,
                     "failed_bookings": bulk_booking.failed_bookings,
+                    "processed_bookings": bulk_booking.processed_bookings,
+                    "progress": bulk_booking.progress,
+                    "failed_items": bulk_booking.failed_items,
                     "created_at": bulk_booking.created_at,
+                    "updated_at": bulk_booking.updated_at,
                     "bookings": BookingSerializer(
                         bulk_booking.bookings.all(), many=True
                     ).data,
@@ -3565,6 +2722,107 @@ class BulkBookingViewSet(SedeFilterMixin, viewsets.ModelViewSet):
             )
 
 
+class StandingReservationViewSet(SedeFilterMixin, viewsets.ModelViewSet):
+    """Reservas fijas semanales; las reservas se generan con el job ``reservas_fijas``"""
+
+    permission_classes = [IsAuthenticated, IsSedeOwnerOrReadOnly]
+    queryset = StandingReservation.objects.select_related("client", "schedule")
+    serializer_class = StandingReservationSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ["client", "schedule", "is_active"]
+
+    def perform_create(self, serializer):
+        # La sede es la del horario, no la del usuario
+        serializer.save()
+
+    @action(detail=False, methods=["post"], url_path="materialize")
+    def materialize(self, request):
+        """Genera ya las reservas de las próximas semanas (?weeks=N, ?dry_run=1)"""
+        from .standing import STANDING_WEEKS_AHEAD, materialize_standing_reservations
+
+        try:
+            weeks = int(request.query_params.get("weeks", STANDING_WEEKS_AHEAD))
+        except ValueError:
+            return Response(
+                {"detail": "weeks debe ser un número."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        dry_run = request.query_params.get("dry_run") in ("1", "true")
+        result = materialize_standing_reservations(
+            weeks=max(1, min(weeks, 8)), dry_run=dry_run
+        )
+        return Response(result)
+
+
+class WaitlistEntryViewSet(SedeFilterMixin, viewsets.ModelViewSet):
+    """Lista de espera de clases llenas"""
+
+    permission_classes = [IsAuthenticated, IsSedeOwnerOrReadOnly]
+    queryset = WaitlistEntry.objects.select_related("client", "schedule")
+    serializer_class = WaitlistEntrySerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ["client", "schedule", "class_date", "status"]
+    http_method_names = ["get", "post", "delete", "head", "options"]
+
+    def _client(self, request, client_id):
+        if client_id:
+            return Client.objects.filter(id=client_id).first()
+        return Client.objects.filter(email__iexact=request.user.email).first()
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        client = data.get("client") or self._client(request, None)
+        if client is None:
+            return Response(
+                {"detail": "Cliente no encontrado."}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            entry = join_waitlist(client, data["schedule"].id, data["class_date"])
+        except WaitlistError as e:
+            return Response({"detail": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = self.get_serializer(entry).data
+        response["position"] = waitlist_position(
+            client.id, entry.schedule_id, entry.class_date
+        )
+        return Response(response, status=status.HTTP_201_CREATED)
+
+    def perform_destroy(self, instance):
+        # Se conserva el historial: salir de la lista solo cambia el estado
+        if instance.status == "waiting":
+            instance.status = "left"
+            instance.save(update_fields=["status", "updated_at"])
+
+    @action(detail=False, methods=["get"], url_path="position")
+    def position(self, request):
+        """¿En qué posición estoy? (?schedule_id=&class_date=[&client_id=])"""
+        try:
+            class_date = parse_date(request.query_params.get("class_date") or "")
+            schedule_id = int(request.query_params.get("schedule_id"))
+        except (TypeError, ValueError):
+            class_date = None
+        if not class_date:
+            return Response(
+                {"detail": "schedule_id y class_date son requeridos."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        client_id = request.query_params.get("client_id")
+        if not client_id:
+            client = self._client(request, None)
+            client_id = client.id if client else None
+
+        return Response(
+            {
+                "schedule_id": schedule_id,
+                "class_date": class_date,
+                "position": waitlist_position(client_id, schedule_id, class_date),
+            }
+        )
+
+
 class SedeViewSet(viewsets.ModelViewSet):
     """
     ViewSet for managing sedes (sites) in the multisite system.
@@ -3591,10 +2849,8 @@ class SedeViewSet(viewsets.ModelViewSet):
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def get_dashboard_data(request):
-    """Endpoint optimizado para datos del dashboard - solo datos agregados"""
+    """Endpoint optimizado para datos del dashboard - solo datos agregados (ver studio/dashboard.py)"""
     try:
-        # from django.db.models.functions import TruncDate, TruncMonth
-
         sede_ids = request.GET.getlist("sede_ids[]")
         sede_headers = request.headers.get("X-Sedes-Selected", "")
         sede_id_header = request.headers.get("X-Sede-ID", "")
@@ -3608,7 +2864,7 @@ def get_dashboard_data(request):
 
         # Si no hay sede_ids, usar todas las sedes del usuario
         if not sede_ids:
-            sede_ids = [str(sede.id) for sede in Sede.objects.filter(status=True)]
+            sede_ids = [str(pk) for pk in get_active_sede_ids()]
 
         # Convertir a enteros
         try:
@@ -3616,483 +2872,33 @@ def get_dashboard_data(request):
         except ValueError:
             return Response({"error": "IDs de sede inválidos"}, status=400)
 
-        today = timezone.now().date()
-        current_month = today.month
-        current_year = today.year
-
-        # Métricas básicas
-        today_bookings = Booking.objects.filter(
-            sede_id__in=sede_ids, class_date=today
-        ).count()
-
-        # Ingresos de hoy
-        today_revenue = (
-            Payment.objects.filter(
-                sede_id__in=sede_ids, date_paid__date=today
-            ).aggregate(total=Sum("amount"))["total"]
-            or 0
-        )
-
-        # Clientes activos (con membresía activa)
-        active_clients = (
-            Client.objects.filter(
-                sede_id__in=sede_ids, current_membership__isnull=False, status="A"
-            )
-            .distinct()
-            .count()
-        )
-
-        # Calcular total de clientes activos para porcentajes
-        total_active_clients = active_clients
-
-        # Nuevos clientes este mes
-        new_clients = Client.objects.filter(
-            sede_id__in=sede_ids,
-            created_at__year=current_year,
-            created_at__month=current_month,
-        ).count()
-
-        # Ingresos del mes actual
-        monthly_revenue = (
-            Payment.objects.filter(
-                sede_id__in=sede_ids,
-                date_paid__year=current_year,
-                date_paid__month=current_month,
-            ).aggregate(total=Sum("amount"))["total"]
-            or 0
-        )
-
-        # Ingresos totales históricos
-        total_revenue = (
-            Payment.objects.filter(sede_id__in=sede_ids).aggregate(total=Sum("amount"))[
-                "total"
-            ]
-            or 0
-        )
-
-        # Reservas por día (últimos 15 días)
-        daily_bookings = []
-        for i in range(14, -1, -1):
-            date = today - timedelta(days=i)
-            count = Booking.objects.filter(
-                sede_id__in=sede_ids, class_date=date
-            ).count()
-            daily_bookings.append({"date": date.strftime("%d/%m"), "count": count})
-
-        # Estadísticas de asistencia
-        attendance_stats = (
-            Booking.objects.filter(sede_id__in=sede_ids)
-            .values("attendance_status")
-            .annotate(count=Count("id"))
-        )
-
-        attendance_dict = {
-            item["attendance_status"]: item["count"] for item in attendance_stats
-        }
-
-        # Ingresos diarios (últimos 30 días)
-        daily_revenue = []
-        for i in range(29, -1, -1):
-            date = today - timedelta(days=i)
-            revenue = (
-                Payment.objects.filter(
-                    sede_id__in=sede_ids, date_paid__date=date
-                ).aggregate(total=Sum("amount"))["total"]
-                or 0
-            )
-            daily_revenue.append(
-                {"date": date.strftime("%d/%m"), "amount": float(revenue)}
-            )
-
-        # Métodos de pago
-        payment_methods = (
-            Payment.objects.filter(sede_id__in=sede_ids)
-            .values("payment_method")
-            .annotate(count=Count("id"))
-            .order_by("-count")
-        )
-
-        # Pagos recientes (solo los últimos 10)
-        recent_payments = (
-            Payment.objects.filter(sede_id__in=sede_ids)
-            .select_related("client", "membership")
-            .order_by("-date_paid")[:10]
-        )
+        # ?fresh=1 ignora el cache y recalcula todas las secciones
+        fresh = request.GET.get("fresh") in ("1", "true")
+        return Response(get_dashboard(sede_ids, fresh=fresh))
 
-        recent_payments_data = []
-        for payment in recent_payments:
-            recent_payments_data.append(
-                {
-                    "client_name": f"{payment.client.first_name or ''} {payment.client.last_name or ''}".strip(),
-                    "membership_name": (
-                        payment.membership.name if payment.membership else "N/A"
-                    ),
-                    "amount": float(payment.amount),
-                    "date_paid": payment.date_paid.strftime("%d/%m/%Y"),
-                    "payment_method": payment.payment_method or "Efectivo",
-                    "valid_until": (
-                        payment.valid_until.strftime("%d/%m/%Y")
-                        if payment.valid_until
-                        else "N/A"
-                    ),
-                }
-            )
-
-        # Ingresos mensuales con crecimiento
-        monthly_revenue_data = []
-        for i in range(12, 0, -1):
-            month_date = today - timedelta(days=30 * i)
-            month = month_date.month
-            year = month_date.year
-
-            revenue = (
-                Payment.objects.filter(
-                    sede_id__in=sede_ids, date_paid__year=year, date_paid__month=month
-                ).aggregate(total=Sum("amount"))["total"]
-                or 0
-            )
-
-            payment_count = Payment.objects.filter(
-                sede_id__in=sede_ids, date_paid__year=year, date_paid__month=month
-            ).count()
-
-            # Calcular crecimiento
-            prev_month = month - 1 if month > 1 else 12
-            prev_year = year if month > 1 else year - 1
-
-            prev_revenue = (
-                Payment.objects.filter(
-                    sede_id__in=sede_ids,
-                    date_paid__year=prev_year,
-                    date_paid__month=prev_month,
-                ).aggregate(total=Sum("amount"))["total"]
-                or 0
-            )
+    except Exception as e:
+        return Response({"error": f"Error interno del servidor: {str(e)}"}, status=500)
 
-            growth = 0
-            if prev_revenue > 0:
-                growth = ((revenue - prev_revenue) / prev_revenue) * 100
 
-            monthly_revenue_data.append(
-                {
-                    "year": year,
-                    "month": month,
-                    "month_name": calendar.month_name[month],
-                    "total_amount": float(revenue),
-                    "payment_count": payment_count,
-                    "average_payment": (
-                        float(revenue / payment_count) if payment_count > 0 else 0
-                    ),
-                    "growth": growth,
-                }
-            )
+@api_view(["GET", "POST"])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def run_cron_task(request, task_id):
+    """
+    Ejecuta una tarea programada (Vercel Cron, ver vercel.json). Requiere
+    ``Authorization: Bearer <CRON_SECRET>``.
+    """
+    from .tasks.jobs import TASKS, run_scheduled_task
 
-        return Response(
-            {
-                # Métricas básicas
-                "todayBookings": today_bookings,
-                "todayRevenue": float(today_revenue),
-                "activeClients": active_clients,
-                "newClients": new_clients,
-                "monthlyRevenue": float(monthly_revenue),  # noqa: F601
-                "totalRevenue": float(total_revenue),
-                # Datos de reservas
-                "dailyBookings": daily_bookings,
-                "attendanceStats": {
-                    "attended": attendance_dict.get("attended", 0),
-                    "no_show": attendance_dict.get("no_show", 0),
-                    "cancelled": attendance_dict.get("cancelled", 0),
-                },
-                "timeSlotStats": [
-                    {
-                        "time_slot": "05:00-06:00",
-                        "count": Booking.objects.filter(
-                            sede_id__in=sede_ids,
-                            schedule__time_slot="05:00",
-                            status="active",
-                        ).count(),
-                    },
-                    {
-                        "time_slot": "06:00-07:00",
-                        "count": Booking.objects.filter(
-                            sede_id__in=sede_ids,
-                            schedule__time_slot="06:00",
-                            status="active",
-                        ).count(),
-                    },
-                    {
-                        "time_slot": "07:00-08:00",
-                        "count": Booking.objects.filter(
-                            sede_id__in=sede_ids,
-                            schedule__time_slot="07:00",
-                            status="active",
-                        ).count(),
-                    },
-                    {
-                        "time_slot": "08:00-09:00",
-                        "count": Booking.objects.filter(
-                            sede_id__in=sede_ids,
-                            schedule__time_slot="08:00",
-                            status="active",
-                        ).count(),
-                    },
-                    {
-                        "time_slot": "09:00-10:00",
-                        "count": Booking.objects.filter(
-                            sede_id__in=sede_ids,
-                            schedule__time_slot="09:00",
-                            status="active",
-                        ).count(),
-                    },
-                    {
-                        "time_slot": "10:00-11:00",
-                        "count": Booking.objects.filter(
-                            sede_id__in=sede_ids,
-                            schedule__time_slot="10:00",
-                            status="active",
-                        ).count(),
-                    },
-                    {
-                        "time_slot": "11:00-12:00",
-                        "count": Booking.objects.filter(
-                            sede_id__in=sede_ids,
-                            schedule__time_slot="11:00",
-                            status="active",
-                        ).count(),
-                    },
-                    {
-                        "time_slot": "12:00-13:00",
-                        "count": Booking.objects.filter(
-                            sede_id__in=sede_ids,
-                            schedule__time_slot="12:00",
-                            status="active",
-                        ).count(),
-                    },
-                    {
-                        "time_slot": "16:00-17:00",
-                        "count": Booking.objects.filter(
-                            sede_id__in=sede_ids,
-                            schedule__time_slot="16:00",
-                            status="active",
-                        ).count(),
-                    },
-                    {
-                        "time_slot": "17:00-18:00",
-                        "count": Booking.objects.filter(
-                            sede_id__in=sede_ids,
-                            schedule__time_slot="17:00",
-                            status="active",
-                        ).count(),
-                    },
-                    {
-                        "time_slot": "18:00-19:00",
-                        "count": Booking.objects.filter(
-                            sede_id__in=sede_ids,
-                            schedule__time_slot="18:00",
-                            status="active",
-                        ).count(),
-                    },
-                    {
-                        "time_slot": "19:00-20:00",
-                        "count": Booking.objects.filter(
-                            sede_id__in=sede_ids,
-                            schedule__time_slot="19:00",
-                            status="active",
-                        ).count(),
-                    },
-                ],
-                # Datos de pagos
-                "dailyRevenue": daily_revenue,
-                "paymentMethods": [
-                    {
-                        "method": item["payment_method"] or "Efectivo",
-                        "count": item["count"],
-                    }
-                    for item in payment_methods
-                ],
-                "recentPayments": recent_payments_data,
-                "monthlyRevenue": monthly_revenue_data,  # noqa: F601
-                # Datos de clientes (mock por ahora)
-                "ageGroups": [
-                    {"range": "18-25", "count": int(active_clients * 0.2)},
-                    {"range": "26-35", "count": int(active_clients * 0.4)},
-                    {"range": "36-45", "count": int(active_clients * 0.3)},
-                    {"range": "46+", "count": int(active_clients * 0.1)},
-                ],
-                "clientStatus": {
-                    "active": active_clients,
-                    "inactive": int(active_clients * 0.1),
-                    "new": new_clients,
-                    "at_risk": int(active_clients * 0.05),
-                },
-                "topClients": [
-                    {
-                        "name": f"{client.first_name} {client.last_name}",
-                        "email": client.email or "N/A",
-                        "membership_name": (
-                            client.current_membership.name
-                            if client.current_membership
-                            else "Sin membresía"
-                        ),
-                        "classes_taken": Booking.objects.filter(
-                            client=client,
-                            sede_id__in=sede_ids,
-                            attendance_status="attended",
-                        ).count(),
-                        "last_visit": (
-                            Booking.objects.filter(
-                                client=client,
-                                sede_id__in=sede_ids,
-                                attendance_status="attended",
-                            )
-                            .order_by("-class_date")
-                            .first()
-                            .class_date.strftime("%d/%m/%Y")
-                            if Booking.objects.filter(
-                                client=client,
-                                sede_id__in=sede_ids,
-                                attendance_status="attended",
-                            ).exists()
-                            else "N/A"
-                        ),
-                        "status": "active" if client.status == "A" else "inactive",
-                        "total_value": Payment.objects.filter(
-                            client=client, sede_id__in=sede_ids
-                        ).aggregate(total=Sum("amount"))["total"]
-                        or 0,
-                    }
-                    for client in Client.objects.filter(sede_id__in=sede_ids).order_by(
-                        "-created_at"
-                    )[:10]
-                ],
-                "clientsAtRisk": [
-                    {
-                        "name": f"{client.first_name} {client.last_name}",
-                        "email": client.email or "N/A",
-                        "membership_name": (
-                            client.current_membership.name
-                            if client.current_membership
-                            else "Sin membresía"
-                        ),
-                        "last_visit": (
-                            Booking.objects.filter(
-                                client=client,
-                                sede_id__in=sede_ids,
-                                attendance_status="attended",
-                            )
-                            .order_by("-class_date")
-                            .first()
-                            .class_date.strftime("%d/%m/%Y")
-                            if Booking.objects.filter(
-                                client=client,
-                                sede_id__in=sede_ids,
-                                attendance_status="attended",
-                            ).exists()
-                            else "N/A"
-                        ),
-                        "days_since_visit": (
-                            (
-                                today
-                                - Booking.objects.filter(
-                                    client=client,
-                                    sede_id__in=sede_ids,
-                                    attendance_status="attended",
-                                )
-                                .order_by("-class_date")
-                                .first()
-                                .class_date
-                            ).days
-                            if Booking.objects.filter(
-                                client=client,
-                                sede_id__in=sede_ids,
-                                attendance_status="attended",
-                            ).exists()
-                            else 999
-                        ),
-                        "remaining_classes": (
-                            client.current_membership.classes_per_month
-                            if client.current_membership
-                            and client.current_membership.classes_per_month
-                            else "Ilimitado"
-                        ),
-                    }
-                    for client in Client.objects.filter(sede_id__in=sede_ids).order_by(
-                        "-created_at"
-                    )[:10]
-                    if Booking.objects.filter(
-                        client=client,
-                        sede_id__in=sede_ids,
-                        attendance_status="attended",
-                    ).exists()
-                    and (
-                        today
-                        - Booking.objects.filter(
-                            client=client,
-                            sede_id__in=sede_ids,
-                            attendance_status="attended",
-                        )
-                        .order_by("-class_date")
-                        .first()
-                        .class_date
-                    ).days
-                    > 14
-                ],
-                # Datos de membresías (mock por ahora)
-                "membershipStats": [
-                    {"name": "Mensual", "count": int(active_clients * 0.4)},
-                    {"name": "Trimestral", "count": int(active_clients * 0.3)},
-                    {"name": "Anual", "count": int(active_clients * 0.2)},
-                    {"name": "Clase Suelta", "count": int(active_clients * 0.1)},
-                ],
-                "membershipDetails": [
-                    {
-                        "name": membership.name,
-                        "active_clients": Client.objects.filter(
-                            sede_id__in=sede_ids,
-                            current_membership=membership,
-                            status="A",
-                        ).count(),
-                        "classes_per_month": membership.classes_per_month
-                        or "Ilimitado",
-                        "price": float(membership.price),
-                        "percentage": (
-                            Client.objects.filter(
-                                sede_id__in=sede_ids,
-                                current_membership=membership,
-                                status="A",
-                            ).count()
-                            / max(total_active_clients, 1)
-                        )
-                        * 100,
-                        "monthly_revenue": Payment.objects.filter(
-                            sede_id__in=sede_ids,
-                            membership=membership,
-                            date_paid__year=current_year,
-                            date_paid__month=current_month,
-                            valid_until__gte=today,
-                        ).aggregate(total=Sum("amount"))["total"]
-                        or 0,
-                    }
-                    for membership in Membership.objects.filter(
-                        Q(scope="GLOBAL") | Q(sede_id__in=sede_ids)
-                    ).distinct()
-                ],
-                "renewalStats": [
-                    {
-                        "month": calendar.month_name[month],
-                        "count": Payment.objects.filter(
-                            sede_id__in=sede_ids,
-                            date_paid__year=current_year,
-                            date_paid__month=month,
-                        ).count(),
-                    }
-                    for month in range(1, 13)
-                ],
-            }
-        )
+    secret = settings.CRON_SECRET
+    authorization = request.headers.get("Authorization", "")
+    if not secret or not secrets.compare_digest(authorization, f"Bearer {secret}"):
+        return Response({"error": "No autorizado"}, status=403)
+    if task_id not in TASKS:
+        return Response({"error": "Tarea no encontrada"}, status=404)
 
-    except Exception as e:
-        return Response({"error": f"Error interno del servidor: {str(e)}"}, status=500)
+    run_scheduled_task(task_id)
+    return Response({"task": task_id, "status": "ok"})
 
 
 class ClassTypeViewSet(SedeFilterMixin, viewsets.ModelViewSet):
@@ -4130,6 +2936,34 @@ class TimeSlotViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(sede_id=sede_id)
         return queryset
     
+    @action(detail=False, methods=["get"], url_path="utilization")
+    def utilization(self, request):
+        """
+        Mapa de calor de ocupación por TimeSlot y día de la semana entre
+        ``start`` y ``end`` (YYYY-MM-DD, por defecto las últimas 4 semanas).
+        """
+        try:
+            end = parse_date(request.query_params.get("end") or "") or timezone.localdate()
+            start = parse_date(request.query_params.get("start") or "") or end - timedelta(
+                days=UTILIZATION_DAYS - 1
+            )
+        except ValueError:
+            return Response({"detail": "Formato de fecha inválido."}, status=400)
+        if end < start:
+            return Response(
+                {"detail": "'end' debe ser igual o posterior a 'start'."}, status=400
+            )
+        if (end - start).days + 1 > MAX_UTILIZATION_DAYS:
+            return Response(
+                {"detail": f"El rango máximo es de {MAX_UTILIZATION_DAYS} días."},
+                status=400,
+            )
+        return Response(
+            time_slot_utilization(
+                start, end, sede_ids=getattr(request, "sede_ids", None) or None
+            )
+        )
+
     @action(detail=False, methods=['get'], url_path='by-sede/(?P<sede_id>[^/.]+)')
     def by_sede(self, request, sede_id=None):
         """Obtener todos los TimeSlots activos de una sede específica"""
@@ -0,0 +1,154 @@
+# studio/waitlist.py
+"""
+Lista de espera por clase (schedule, class_date).
+
+Solo se puede entrar a la lista si la clase está llena; para que nadie entre
+justo cuando se libera un cupo, ``join_waitlist`` y ``promote_waitlist``
+bloquean la misma fila de ``ClassOccupancy``. ``promote_waitlist`` se llama
+dentro de la transacción que libera el cupo (``cancel_booking``,
+``move_booking``): reserva al
+primero en espera con las reglas de ``studio/booking_policy.py`` y el correo
+sale en segundo plano cuando la transacción se confirma.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from .booking_policy import MESSAGES, BookingRequest, book
+from .models import Booking, Schedule, WaitlistEntry
+from .seats import lock_occupancies
+from .tasks.background import submit_on_commit
+
+# Máximo de personas revisadas por cupo liberado (las que no pueden reservar
+# se marcan como omitidas y se pasa a la siguiente)
+MAX_PROMOTION_CANDIDATES = 10
+
+
+class WaitlistError(ValidationError):
+    """No se puede entrar a la lista de espera."""
+
+    def __init__(self, message, code):
+        super().__init__(message, code=code)
+
+
+def waitlist_position(client_id, schedule_id, class_date):
+    """
+    Posición del cliente en la lista de espera (1 = siguiente), o ``None`` si
+    no está esperando. Una sola consulta sobre ``waitlist_queue_idx``.
+    """
+    ahead = (
+        WaitlistEntry.objects.filter(
+            schedule_id=OuterRef("schedule_id"),
+            class_date=OuterRef("class_date"),
+            status="waiting",
+        )
+        .filter(
+            Q(created_at__lt=OuterRef("created_at"))
+            | Q(created_at=OuterRef("created_at"), id__lte=OuterRef("id"))
+        )
+        .order_by()
+        .values("schedule_id")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    return (
+        WaitlistEntry.objects.filter(
+            client_id=client_id,
+            schedule_id=schedule_id,
+            class_date=class_date,
+            status="waiting",
+        )
+        .annotate(position=Subquery(ahead))
+        .values_list("position", flat=True)
+        .first()
+    )
+
+
+def join_waitlist(client, schedule_id, class_date):
+    """
+    Agrega a ``client`` a la lista de espera de la clase y devuelve la
+    ``WaitlistEntry`` (la existente si ya estaba esperando). Lanza
+    ``WaitlistError`` si la clase no existe, ya pasó, el cliente ya tiene la
+    reserva o todavía hay cupo.
+    """
+    with transaction.atomic():
+        schedule = Schedule.objects.filter(pk=schedule_id).first()
+        if schedule is None:
+            raise WaitlistError(MESSAGES["schedule_not_found"], "schedule_not_found")
+        if class_date < timezone.localdate():
+            raise WaitlistError(MESSAGES["past_date"], "past_date")
+        if Booking.objects.filter(
+            client=client, schedule=schedule, class_date=class_date
+        ).exists():
+            raise WaitlistError(MESSAGES["duplicate"], "duplicate")
+
+        key = (schedule.id, class_date)
+        occupancy = lock_occupancies({key})[key]
+        if occupancy.booked < schedule.capacity:
+            raise WaitlistError(
+                "Todavía hay cupo disponible, puedes reservar directamente.",
+                "has_seats",
+            )
+
+        entry, _ = WaitlistEntry.objects.get_or_create(
+            client=client,
+            schedule=schedule,
+            class_date=class_date,
+            status="waiting",
+        )
+    return entry
+
+
+def send_waitlist_notification(entry_id):
+    from .management.mails.mails import send_waitlist_promotion_email
+
+    entry = WaitlistEntry.objects.select_related(
+        "client", "booking__schedule__class_type"
+    ).get(pk=entry_id)
+    send_waitlist_promotion_email(entry.booking, entry.client)
+
+
+def promote_waitlist(schedule_id, class_date):
+    """
+    Reserva a los primeros en espera mientras haya cupo y devuelve las
+    entradas promovidas. Debe llamarse en la misma transacción que liberó el
+    cupo; quien no pueda reservar (sin membresía, límite alcanzado...) queda
+    omitido con el motivo en ``notes``.
+    """
+    if class_date < timezone.localdate():
+        return []
+
+    promoted = []
+    with transaction.atomic():
+        schedule = Schedule.objects.filter(pk=schedule_id).first()
+        if schedule is None:
+            return promoted
+        key = (schedule_id, class_date)
+        free = schedule.capacity - lock_occupancies({key})[key].booked
+        if free <= 0:
+            return promoted
+
+        candidates = (
+            WaitlistEntry.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(schedule_id=schedule_id, class_date=class_date, status="waiting")
+            .select_related("client")
+            .order_by("created_at", "id")[:MAX_PROMOTION_CANDIDATES]
+        )
+        for entry in candidates:
+            if free <= 0:
+                break
+            decision = book(
+                entry.client, [BookingRequest(schedule_id, class_date)], reject_past=True
+            )[0]
+            if decision.ok:
+                entry.status = "promoted"
+                entry.booking = decision.booking
+                free -= 1
+                promoted.append(entry)
+                submit_on_commit(send_waitlist_notification, entry.pk)
+            else:
+                entry.status = "skipped"
+                entry.notes = decision.message[:255]
+            entry.save(update_fields=["status", "booking", "notes", "updated_at"])
+    return promoted